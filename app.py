@@ -1,13 +1,11 @@
 # -*- coding: utf-8 -*-
 import json
 import os
-import urllib3
 import urllib.parse
 import requests
 import csv
-from bs4 import BeautifulSoup
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, send_file, session, abort, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, send_file, session, abort, send_from_directory, Response
 from werkzeug.utils import secure_filename
 # SOLUCIÓN: Importar CSRFProtect de manera compatible
 try:
@@ -16,15 +14,33 @@ except ImportError:
     # Fallback para versiones más nuevas
     from flask_wtf import CSRFProtect
 from werkzeug.security import generate_password_hash, check_password_hash
+# Logging por niveles escrito desde un hilo aparte (registro_logs.py); se configura antes
+# de importar los demás módulos para que sus mensajes de arranque también pasen por él
+from registro_logs import registro_logs, obtener_logger
+registro_logs.configurar()
+logger = obtener_logger('app')
+logger_datos = obtener_logger('app.datos', muestreo=True)   # cargar_datos/guardar_datos: en cada petición
+logger_tasas = obtener_logger('app.tasas', muestreo=True)   # tasa BCV: se consulta en casi todas las páginas
 from config_maps import get_maps_config
 from seguridad_fiscal import seguridad_fiscal
 from numeracion_fiscal import control_numeracion
 from comunicacion_seniat import comunicador_seniat
 from exportacion_seniat import exportador_seniat
-try:
-    import pdfkit
-except ImportError:
-    pdfkit = None
+from cola_seniat import cola_seniat
+from estatus_seniat import cache_estatus_seniat
+from servicio_pdf import servicio_pdf, ServicioPDFOcupado, rutas_estaticas_locales
+from trabajos_pdf import gestor_trabajos_pdf
+from indice_clientes import indice_clientes
+from indice_productos import indice_productos
+from versiones_datos import RegistroVersiones, proyectar
+from cache_http import cache_http
+from plantillas import capa_plantillas
+from imagenes_productos import generar_derivados, eliminar_derivados, imagen_producto
+from pdf_tabular import motor_pdf, generar_lista_precios, MOTOR_REPORTLAB, MOTOR_WKHTMLTOPDF
+from cliente_http import cliente_http
+from instrumentacion import instrumentacion
+# Módulos pesados u opcionales (bs4, pdfkit, urllib3) se importan en su primer uso
+from carga_perezosa import importar_opcional
 from functools import wraps
 import re
 import uuid
@@ -32,14 +48,19 @@ import io
 import zipfile
 from io import StringIO
 from uuid import uuid4
-from flask_sqlalchemy import SQLAlchemy
 import base64
 import copy
 import re
+import threading
+import time
 
 # --- Inicializar la Aplicación Flask ---
 app = Flask(__name__)
 
+# Tiempos por ruta, /metrics y perfilado con X-Perfil (instrumentacion.py); se registra
+# antes que las demás extensiones para que la medición incluya sus hooks
+instrumentacion.init_app(app, autorizar=lambda: session.get('usuario') == 'admin')
+
 # --- Configuración de la Aplicación ---
 app.config['SECRET_KEY'] = 'tu_clave_secreta_aqui'
 app.config['UPLOAD_FOLDER'] = 'uploads'
@@ -62,7 +83,7 @@ app.config['WTF_CSRF_HEADERS'] = ['X-CSRFToken']  # Headers personalizados
 #     print(f"⚠️ Error inicializando CSRF: {e}")
 #     csrf = None
 csrf = None
-print("🚫 CSRF deshabilitado completamente")
+logger.info("🚫 CSRF deshabilitado completamente")
 
 # --- Helper para Tokens CSRF ---
 def get_csrf_token():
@@ -112,7 +133,7 @@ def cargar_datos(nombre_archivo):
             os.makedirs(directorio, exist_ok=True)
             
         if not os.path.exists(nombre_archivo):
-            print(f"Archivo {nombre_archivo} no existe. Creando nuevo archivo.")
+            logger_datos.warning("Archivo %s no existe. Creando nuevo archivo.", nombre_archivo)
             with open(nombre_archivo, 'w', encoding='utf-8') as f:
                 json.dump({}, f, ensure_ascii=False, indent=4)
             return {}
@@ -120,15 +141,15 @@ def cargar_datos(nombre_archivo):
         with open(nombre_archivo, 'r', encoding='utf-8') as f:
             contenido = f.read()
             if not contenido.strip():
-                print(f"Archivo {nombre_archivo} está vacío.")
+                logger_datos.warning("Archivo %s está vacío.", nombre_archivo)
                 return {}
             try:
                 return json.loads(contenido)
             except json.JSONDecodeError as e:
-                print(f"Error decodificando JSON en {nombre_archivo}: {e}")
+                logger_datos.error("Error decodificando JSON en %s: %s", nombre_archivo, e)
                 return {}
     except Exception as e:
-        print(f"Error leyendo {nombre_archivo}: {e}")
+        logger_datos.error("Error leyendo %s: %s", nombre_archivo, e)
         return {}
 
 def guardar_datos(nombre_archivo, datos):
@@ -139,16 +160,16 @@ def guardar_datos(nombre_archivo, datos):
         if directorio:  # Si hay un directorio en la ruta
             try:
                 os.makedirs(directorio, exist_ok=True)
-                print(f"Directorio {directorio} creado/verificado exitosamente")
+                logger_datos.debug("Directorio %s creado/verificado exitosamente", directorio)
             except Exception as e:
-                print(f"Error creando directorio {directorio}: {e}")
+                logger_datos.error("Error creando directorio %s: %s", directorio, e)
                 return False
         
         # Verificar que los datos son serializables
         try:
             json.dumps(datos)
         except Exception as e:
-            print(f"Error serializando datos: {e}")
+            logger_datos.error("Error serializando datos: %s", e)
             return False
         
         # Intentar guardar con manejo de errores específico
@@ -163,10 +184,10 @@ def guardar_datos(nombre_archivo, datos):
                 os.remove(nombre_archivo)
             os.rename(temp_file, nombre_archivo)
             
-            print(f"Datos guardados exitosamente en {nombre_archivo}")
+            logger_datos.debug("Datos guardados exitosamente en %s", nombre_archivo)
             return True
         except Exception as e:
-            print(f"Error escribiendo en archivo {nombre_archivo}: {e}")
+            logger_datos.error("Error escribiendo en archivo %s: %s", nombre_archivo, e)
             # Limpiar archivo temporal si existe
             if os.path.exists(temp_file):
                 try:
@@ -175,7 +196,7 @@ def guardar_datos(nombre_archivo, datos):
                     pass
             return False
     except Exception as e:
-        print(f"Error general guardando {nombre_archivo}: {e}")
+        logger_datos.error("Error general guardando %s: %s", nombre_archivo, e)
         return False
 
 def guardar_ultima_tasa_bcv(tasa):
@@ -191,7 +212,7 @@ def guardar_ultima_tasa_bcv(tasa):
             with open(ULTIMA_TASA_BCV_FILE, 'w', encoding='utf-8') as f:
                 json.dump(data, f)
             
-            print(f"Tasa BCV guardada exitosamente: {tasa}")
+            logger_tasas.debug("Tasa BCV guardada exitosamente: %s", tasa)
             
             # Registrar en bitácora si hay sesión activa
             try:
@@ -201,38 +222,38 @@ def guardar_ultima_tasa_bcv(tasa):
                 else:
                     registrar_bitacora('Sistema', 'Actualizar tasa BCV', f'Tasa: {tasa}')
             except Exception as e:
-                print(f"Error registrando en bitácora: {e}")
+                logger_tasas.error("Error registrando en bitácora: %s", e)
                 
         except Exception as e:
-            print(f"Error guardando última tasa BCV: {e}")
+            logger_tasas.error("Error guardando última tasa BCV: %s", e)
             
     except Exception as e:
-        print(f"Error general en guardar_ultima_tasa_bcv: {e}")
+        logger_tasas.error("Error general en guardar_ultima_tasa_bcv: %s", e)
 
 def cargar_ultima_tasa_bcv():
     try:
         # Verificar si el archivo existe
         if not os.path.exists(ULTIMA_TASA_BCV_FILE):
-            print(f"Archivo de tasa BCV no encontrado: {ULTIMA_TASA_BCV_FILE}")
+            logger_tasas.warning("Archivo de tasa BCV no encontrado: %s", ULTIMA_TASA_BCV_FILE)
             return None
         
         with open(ULTIMA_TASA_BCV_FILE, 'r', encoding='utf-8') as f:
             data = json.load(f)
             tasa = float(data.get('tasa', 0))
             if tasa > 10:
-                print(f"Tasa BCV cargada desde archivo: {tasa}")
+                logger_tasas.debug("Tasa BCV cargada desde archivo: %s", tasa)
                 return tasa
             else:
-                print(f"Tasa BCV en archivo no válida: {tasa}")
+                logger_tasas.warning("Tasa BCV en archivo no válida: %s", tasa)
                 return None
     except FileNotFoundError:
-        print(f"Archivo de tasa BCV no encontrado: {ULTIMA_TASA_BCV_FILE}")
+        logger_tasas.warning("Archivo de tasa BCV no encontrado: %s", ULTIMA_TASA_BCV_FILE)
         return None
     except json.JSONDecodeError as e:
-        print(f"Error decodificando archivo de tasa BCV: {e}")
+        logger_tasas.error("Error decodificando archivo de tasa BCV: %s", e)
         return None
     except Exception as e:
-        print(f"Error inesperado cargando tasa BCV: {e}")
+        logger_tasas.error("Error inesperado cargando tasa BCV: %s", e)
         return None
 
 def obtener_ultima_tasa_del_sistema():
@@ -282,13 +303,13 @@ def obtener_ultima_tasa_del_sistema():
         if tasas_encontradas:
             # Usar la tasa más alta (más reciente) del sistema
             tasa_mas_reciente = max(tasas_encontradas)
-            print(f"Tasa encontrada en el sistema: {tasa_mas_reciente}")
+            logger_tasas.debug("Tasa encontrada en el sistema: %s", tasa_mas_reciente)
             return tasa_mas_reciente
         
         return None
         
     except Exception as e:
-        print(f"Error buscando tasa en el sistema: {e}")
+        logger_tasas.error("Error buscando tasa en el sistema: %s", e)
         return None
 
 def inicializar_archivos_por_defecto():
@@ -301,23 +322,23 @@ def inicializar_archivos_por_defecto():
             
             if tasa_sistema and tasa_sistema > 10:
                 tasa_default = tasa_sistema
-                print(f"Usando tasa del sistema: {tasa_default}")
+                logger.debug("Usando tasa del sistema: %s", tasa_default)
             else:
                 # Solo usar tasa por defecto si no hay ninguna en el sistema
                 tasa_default = 135.0  # Tasa más reciente conocida
-                print(f"Usando tasa por defecto del sistema: {tasa_default}")
+                logger.debug("Usando tasa por defecto del sistema: %s", tasa_default)
             
             with open(ULTIMA_TASA_BCV_FILE, 'w', encoding='utf-8') as f:
                 json.dump({'tasa': tasa_default, 'fecha': datetime.now().isoformat()}, f)
-            print(f"Archivo de tasa BCV creado con tasa: {tasa_default}")
+            logger.debug("Archivo de tasa BCV creado con tasa: %s", tasa_default)
     except Exception as e:
-        print(f"Error inicializando archivos por defecto: {e}")
+        logger.error("Error inicializando archivos por defecto: %s", e)
 
 def actualizar_tasa_bcv_automaticamente():
     """Actualiza la tasa BCV automáticamente si han pasado más de 24 horas."""
     try:
         if not os.path.exists(ULTIMA_TASA_BCV_FILE):
-            print("Archivo de tasa BCV no existe, creando...")
+            logger_tasas.warning("Archivo de tasa BCV no existe, creando...")
             inicializar_archivos_por_defecto()
             return
         
@@ -332,44 +353,44 @@ def actualizar_tasa_bcv_automaticamente():
                 
                 # Actualizar si han pasado más de 24 horas
                 if tiempo_transcurrido.total_seconds() > 24 * 3600:
-                    print("🔄 Han pasado más de 24 horas, actualizando tasa BCV automáticamente...")
+                    logger_tasas.debug("🔄 Han pasado más de 24 horas, actualizando tasa BCV automáticamente...")
                     nueva_tasa = obtener_tasa_bcv_dia()
                     if nueva_tasa and nueva_tasa > 10:
-                        print(f"✅ Tasa BCV actualizada automáticamente: {nueva_tasa}")
+                        logger_tasas.debug("✅ Tasa BCV actualizada automáticamente: %s", nueva_tasa)
                     else:
-                        print("❌ No se pudo actualizar la tasa BCV automáticamente")
+                        logger_tasas.error("❌ No se pudo actualizar la tasa BCV automáticamente")
                         # Intentar usar tasa del sistema como fallback
                         tasa_sistema = obtener_ultima_tasa_del_sistema()
                         if tasa_sistema and tasa_sistema > 10:
-                            print(f"⚠️ Usando tasa del sistema como fallback: {tasa_sistema}")
+                            logger_tasas.warning("⚠️ Usando tasa del sistema como fallback: %s", tasa_sistema)
                             guardar_ultima_tasa_bcv(tasa_sistema)
                 else:
-                    print(f"⏰ Tasa BCV actualizada recientemente, no es necesario actualizar")
+                    logger_tasas.debug("⏰ Tasa BCV actualizada recientemente, no es necesario actualizar")
                     # Aún así, verificar si hay una tasa más reciente disponible
-                    print("🔍 Verificando si hay tasa más reciente disponible...")
+                    logger_tasas.debug("🔍 Verificando si hay tasa más reciente disponible...")
                     tasa_web = obtener_tasa_bcv_dia()
                     if tasa_web and tasa_web > 0:
-                        print(f"🎯 Tasa más reciente encontrada: {tasa_web}")
+                        logger_tasas.debug("🎯 Tasa más reciente encontrada: %s", tasa_web)
                         guardar_ultima_tasa_bcv(tasa_web)
             except Exception as e:
-                print(f"Error verificando fecha de actualización: {e}")
+                logger_tasas.error("Error verificando fecha de actualización: %s", e)
         else:
             # Si no hay fecha, verificar si la tasa actual es válida
             tasa_actual = data.get('tasa', 0)
             if not tasa_actual or tasa_actual <= 10:
-                print("Tasa BCV no válida, buscando en el sistema...")
+                logger_tasas.warning("Tasa BCV no válida, buscando en el sistema...")
                 tasa_sistema = obtener_ultima_tasa_del_sistema()
                 if tasa_sistema and tasa_sistema > 10:
-                    print(f"Actualizando con tasa del sistema: {tasa_sistema}")
+                    logger_tasas.debug("Actualizando con tasa del sistema: %s", tasa_sistema)
                     guardar_ultima_tasa_bcv(tasa_sistema)
         
     except Exception as e:
-        print(f"Error en actualización automática de tasa BCV: {e}")
+        logger_tasas.error("Error en actualización automática de tasa BCV: %s", e)
         # En caso de error, intentar usar tasa del sistema
         try:
             tasa_sistema = obtener_ultima_tasa_del_sistema()
             if tasa_sistema and tasa_sistema > 10:
-                print(f"Usando tasa del sistema después de error: {tasa_sistema}")
+                logger_tasas.warning("Usando tasa del sistema después de error: %s", tasa_sistema)
                 guardar_ultima_tasa_bcv(tasa_sistema)
         except:
             pass
@@ -398,7 +419,7 @@ def registrar_bitacora(usuario, accion, detalles='', documento_tipo='', document
             lon = session['ubicacion_precisa'].get('lon', '')
             ubicacion = session['ubicacion_precisa'].get('texto', '')
         elif has_request_context():
-            resp = requests.get(f'http://ip-api.com/json/{ip}', timeout=3)
+            resp = cliente_http.get(f'http://ip-api.com/json/{ip}')
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get('status') == 'success':
@@ -411,7 +432,7 @@ def registrar_bitacora(usuario, accion, detalles='', documento_tipo='', document
                 ubicacion = f"API status: {resp.status_code}"
     except Exception as e:
         # Si hay algún error al acceder a Flask objects o API, usar valores por defecto
-        print(f"Error en registrar_bitacora: {e}")
+        logger.error("Error en registrar_bitacora: %s", e)
         ip = 'N/A'
         ubicacion = 'N/A'
         lat = ''
@@ -472,7 +493,7 @@ def verify_password(username, password):
         else:
             return False
     except Exception as e:
-        print(f"Error verificando contraseña: {e}")
+        logger.error("Error verificando contraseña: %s", e)
         return False
 
 def obtener_estadisticas():
@@ -544,52 +565,52 @@ def obtener_tasa_bcv():
     try:
         # Usar la constante definida
         if not os.path.exists(ULTIMA_TASA_BCV_FILE):
-            print(f"Archivo de tasa BCV no encontrado: {ULTIMA_TASA_BCV_FILE}")
+            logger_tasas.warning("Archivo de tasa BCV no encontrado: %s", ULTIMA_TASA_BCV_FILE)
             # Buscar en el sistema antes de usar tasa por defecto
             tasa_sistema = obtener_ultima_tasa_del_sistema()
             if tasa_sistema and tasa_sistema > 10:
-                print(f"Usando tasa del sistema: {tasa_sistema}")
+                logger_tasas.debug("Usando tasa del sistema: %s", tasa_sistema)
                 return tasa_sistema
             else:
-                print("No se encontró tasa válida en el sistema")
+                logger_tasas.debug("No se encontró tasa válida en el sistema")
                 return None
         
         with open(ULTIMA_TASA_BCV_FILE, 'r', encoding='utf-8') as f:
             data = json.load(f)
             tasa = float(data.get('tasa', 0))
             if tasa > 10:
-                print(f"Tasa BCV obtenida del archivo: {tasa}")
+                logger_tasas.debug("Tasa BCV obtenida del archivo: %s", tasa)
                 return tasa
             else:
-                print(f"Tasa BCV en archivo no válida: {tasa}")
+                logger_tasas.warning("Tasa BCV en archivo no válida: %s", tasa)
                 # Buscar en el sistema como fallback
                 tasa_sistema = obtener_ultima_tasa_del_sistema()
                 if tasa_sistema and tasa_sistema > 10:
-                    print(f"Usando tasa del sistema como fallback: {tasa_sistema}")
+                    logger_tasas.warning("Usando tasa del sistema como fallback: %s", tasa_sistema)
                     return tasa_sistema
                 return None
     except FileNotFoundError:
-        print(f"Archivo de tasa BCV no encontrado")
+        logger_tasas.warning("Archivo de tasa BCV no encontrado")
         # Buscar en el sistema
         tasa_sistema = obtener_ultima_tasa_del_sistema()
         if tasa_sistema and tasa_sistema > 10:
-            print(f"Usando tasa del sistema: {tasa_sistema}")
+            logger_tasas.debug("Usando tasa del sistema: %s", tasa_sistema)
             return tasa_sistema
         return None
     except json.JSONDecodeError as e:
-        print(f"Error decodificando archivo de tasa BCV: {e}")
+        logger_tasas.error("Error decodificando archivo de tasa BCV: %s", e)
         # Buscar en el sistema como fallback
         tasa_sistema = obtener_ultima_tasa_del_sistema()
         if tasa_sistema and tasa_sistema > 10:
-            print(f"Usando tasa del sistema como fallback: {tasa_sistema}")
+            logger_tasas.warning("Usando tasa del sistema como fallback: %s", tasa_sistema)
             return tasa_sistema
         return None
     except Exception as e:
-        print(f"Error inesperado obteniendo tasa BCV: {e}")
+        logger_tasas.error("Error inesperado obteniendo tasa BCV: %s", e)
         # Buscar en el sistema como último recurso
         tasa_sistema = obtener_ultima_tasa_del_sistema()
         if tasa_sistema and tasa_sistema > 10:
-            print(f"Usando tasa del sistema como último recurso: {tasa_sistema}")
+            logger_tasas.warning("Usando tasa del sistema como último recurso: %s", tasa_sistema)
             return tasa_sistema
         return None
 
@@ -598,16 +619,16 @@ def obtener_tasa_bcv_dia():
     try:
         # SIEMPRE intentar obtener desde la web primero (no usar tasa local)
         url = 'https://www.bcv.org.ve/glosario/cambio-oficial'
-        print(f"🔍 Obteniendo tasa BCV ACTUAL desde: {url}")
+        logger_tasas.debug("🔍 Obteniendo tasa BCV ACTUAL desde: %s", url)
         
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        resp = requests.get(url, timeout=20, verify=False)
+        resp = cliente_http.get(url)
         
         if resp.status_code != 200:
-            print(f"❌ Error HTTP al obtener tasa BCV: {resp.status_code}")
+            logger_tasas.error("❌ Error HTTP al obtener tasa BCV: %s", resp.status_code)
             return None
         
-        print(f"✅ Página BCV obtenida exitosamente, analizando contenido...")
+        logger_tasas.debug("✅ Página BCV obtenida exitosamente, analizando contenido...")
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(resp.text, 'html.parser')
         tasa = None
         
@@ -621,7 +642,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(txt)
                     if posible > 10:
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por ID 'dolar': {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por ID 'dolar': %s", tasa)
                 except:
                     pass
         
@@ -636,7 +657,7 @@ def obtener_tasa_bcv_dia():
                         posible = float(txt)
                         if posible > 10:
                             tasa = posible
-                            print(f"🎯 Tasa BCV encontrada por ID 'usd': {tasa}")
+                            logger_tasas.debug("🎯 Tasa BCV encontrada por ID 'usd': %s", tasa)
                     except:
                         pass
         
@@ -648,7 +669,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(txt)
                     if posible > 10 and posible < 1000:  # Rango razonable
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por strong: {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por strong: %s", tasa)
                         break
                 except:
                     continue
@@ -661,7 +682,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(txt)
                     if posible > 10 and posible < 1000:
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por span: {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por span: %s", tasa)
                         break
                 except:
                     continue
@@ -676,7 +697,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(m.replace('.', '').replace(',', '.'))
                     if posible > 10 and posible < 1000:
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por regex: {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por regex: %s", tasa)
                         break
                 except:
                     continue
@@ -691,7 +712,7 @@ def obtener_tasa_bcv_dia():
                             posible = float(txt)
                             if posible > 10 and posible < 1000:
                                 tasa = posible
-                                print(f"🎯 Tasa BCV encontrada en tabla: {tasa}")
+                                logger_tasas.debug("🎯 Tasa BCV encontrada en tabla: %s", tasa)
                                 break
                         except:
                             continue
@@ -713,7 +734,7 @@ def obtener_tasa_bcv_dia():
                             posible = float(num.replace('.', '').replace(',', '.'))
                             if posible > 10 and posible < 1000:
                                 tasa = posible
-                                print(f"🎯 Tasa BCV encontrada por texto USD: {tasa}")
+                                logger_tasas.debug("🎯 Tasa BCV encontrada por texto USD: %s", tasa)
                                 break
                         except:
                             continue
@@ -723,24 +744,24 @@ def obtener_tasa_bcv_dia():
         if tasa and tasa > 10:
             # Guardar la tasa en el archivo
             guardar_ultima_tasa_bcv(tasa)
-            print(f"💾 Tasa BCV ACTUAL guardada exitosamente: {tasa}")
+            logger_tasas.info("💾 Tasa BCV ACTUAL guardada exitosamente: %s", tasa)
             return tasa
         else:
-            print("❌ No se pudo encontrar una tasa BCV válida en la página")
+            logger_tasas.error("❌ No se pudo encontrar una tasa BCV válida en la página")
             # Solo como último recurso, usar tasa local
             tasa_local = cargar_ultima_tasa_bcv()
             if tasa_local and tasa_local > 10:
-                print(f"⚠️ Usando tasa BCV local como fallback: {tasa_local}")
+                logger_tasas.warning("⚠️ Usando tasa BCV local como fallback: %s", tasa_local)
                 return tasa_local
             return None
             
     except Exception as e:
-        print(f"❌ Error obteniendo tasa BCV: {e}")
+        logger_tasas.error("❌ Error obteniendo tasa BCV: %s", e)
         # Solo como último recurso, usar tasa local
         try:
             tasa_fallback = cargar_ultima_tasa_bcv()
             if tasa_fallback and tasa_fallback > 10:
-                print(f"⚠️ Usando tasa BCV de fallback después de error: {tasa_fallback}")
+                logger_tasas.warning("⚠️ Usando tasa BCV de fallback después de error: %s", tasa_fallback)
                 return tasa_fallback
         except:
             pass
@@ -749,8 +770,6 @@ def obtener_tasa_bcv_dia():
 # Llamar inicialización
 inicializar_archivos_por_defecto()
 
-# Ejecutar actualización automática al iniciar
-actualizar_tasa_bcv_automaticamente()
 # Usar SECRET_KEY desde variables de entorno en producción
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'unsafe-default-change-me')
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
@@ -761,6 +780,8 @@ csrf = CSRFProtect(app)
 # En Render no podemos escribir en /data. Usamos una carpeta del proyecto
 # que en despliegue se enlaza a un disco persistente (storage) en el start command.
 IS_RENDER = bool(os.environ.get('RENDER') or os.environ.get('RENDER_EXTERNAL_HOSTNAME'))
+# Envío automático de facturas al SENIAT mediante la cola persistente (cola_seniat.py)
+app.config['SENIAT_ENVIO_AUTOMATICO'] = os.environ.get('SENIAT_ENVIO_AUTOMATICO', '0') == '1'
 BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 CAPTURAS_FOLDER = os.path.join(BASE_PATH, 'uploads', 'capturas')
 CAPTURAS_URL = '/uploads/capturas'
@@ -768,12 +789,20 @@ CAPTURAS_URL = '/uploads/capturas'
 # Asegurar que las carpetas de capturas existen
 os.makedirs(CAPTURAS_FOLDER, exist_ok=True)
 
+# Compresión, ETags y URLs de static/ con hash del contenido (cache_http.py)
+cache_http.init_app(app)
+
 @app.route('/uploads/capturas/<filename>')
 def serve_captura(filename):
     try:
-        return send_from_directory(CAPTURAS_FOLDER, filename)
+        # Comprobantes de pago: privados y con nombre reutilizable, se revalidan con ETag
+        respuesta = send_from_directory(CAPTURAS_FOLDER, filename, max_age=0)
+        respuesta.cache_control.public = False
+        respuesta.cache_control.private = True
+        respuesta.cache_control.no_cache = True
+        return respuesta
     except Exception as e:
-        print(f"Error sirviendo captura {filename}: {str(e)}")
+        logger.error("Error sirviendo captura %s: %s", filename, str(e))
         abort(404)
 
 # --- Healthcheck ---
@@ -810,9 +839,16 @@ def guardar_imagen_producto(imagen, producto_id):
         
         # Guardar la imagen
         imagen.save(ruta_archivo)
+        ruta_relativa = f"imagenes_productos/{nombre_archivo}"
+
+        # Miniatura y tamaño mediano para listados, detalle y PDF (el original no se incrusta)
+        eliminar_derivados(ruta_relativa)
+        resultado = generar_derivados(ruta_relativa, forzar=True)
+        if 'error' in resultado and resultado.get('imagen'):
+            logger.error("Error generando derivados de %s: %s", ruta_relativa, resultado['error'])
         
         # Retornar la ruta relativa para guardar en la base de datos (siempre con /)
-        return f"imagenes_productos/{nombre_archivo}"
+        return ruta_relativa
     return None
 
 def cargar_clientes_desde_csv(archivo_csv):
@@ -837,7 +873,7 @@ def cargar_clientes_desde_csv(archivo_csv):
                     }
         return guardar_datos(ARCHIVO_CLIENTES, clientes)
     except Exception as e:
-        print(f"Error cargando clientes desde CSV: {e}")
+        logger.error("Error cargando clientes desde CSV: %s", e)
         return False
 
 def cargar_productos_desde_csv(archivo_csv):
@@ -859,7 +895,7 @@ def cargar_productos_desde_csv(archivo_csv):
                 }
         return guardar_datos(ARCHIVO_INVENTARIO, inventario)
     except Exception as e:
-        print(f"Error cargando productos desde CSV: {e}")
+        logger.error("Error cargando productos desde CSV: %s", e)
         return False
 
 def limpiar_valor_monetario(valor):
@@ -972,7 +1008,7 @@ def mapa_avanzado():
                              maps_config=maps_config)
     
     except Exception as e:
-        print(f"Error en mapa_avanzado: {str(e)}")
+        logger.error("Error en mapa_avanzado: %s", str(e))
         flash(f'Error al cargar el mapa avanzado: {str(e)}', 'danger')
         return redirect(url_for('mostrar_clientes'))
 
@@ -986,7 +1022,8 @@ def mostrar_clientes():
     q = request.args.get('q', '').strip().lower()
     filtro_orden = request.args.get('orden', 'nombre')
     if q:
-        clientes = {k: v for k, v in clientes.items() if q in v.get('nombre', '').lower() or q in k.lower()}
+        coincidencias = set(indice_clientes.buscar_ids(q, limite=None))
+        clientes = {k: v for k, v in clientes.items() if k in coincidencias}
     if filtro_orden == 'nombre':
         clientes = dict(sorted(clientes.items(), key=lambda item: item[1].get('nombre', '').lower()))
     elif filtro_orden == 'rif':
@@ -1013,12 +1050,12 @@ def nuevo_cliente():
     """Formulario para nuevo cliente - VALIDACIONES SENIAT APLICADAS."""
     if request.method == 'POST':
         try:
-            print("Iniciando proceso de creación de cliente con validaciones SENIAT...")
+            logger.debug("Iniciando proceso de creación de cliente con validaciones SENIAT...")
             
             # Cargar clientes existentes
             clientes = cargar_datos(ARCHIVO_CLIENTES)
             if clientes is None:
-                print("No se pudieron cargar los clientes existentes, creando nuevo diccionario")
+                logger.debug("No se pudieron cargar los clientes existentes, creando nuevo diccionario")
                 clientes = {}
             
             # === VALIDACIONES SENIAT - CAMPOS OBLIGATORIOS ===
@@ -1032,7 +1069,7 @@ def nuevo_cliente():
             telefono = f"{codigo_pais}{telefono_raw}"
             direccion = request.form.get('direccion', '').strip().title()
             
-            print(f"Datos recibidos - Tipo ID: {tipo_id}, Número ID: {numero_id}, DV: {digito_verificador}")
+            logger.debug("Datos recibidos - Tipo ID: %s, Número ID: %s, DV: %s", tipo_id, numero_id, digito_verificador)
             
             # === VALIDACIONES OBLIGATORIAS SENIAT ===
             errores = []
@@ -1083,11 +1120,11 @@ def nuevo_cliente():
             else:  # Personas jurídicas
                 rif_completo = f"{tipo_id}-{numero_id}-{digito_verificador}"
                 
-            print(f"RIF completo generado: {rif_completo}")
+            logger.debug("RIF completo generado: %s", rif_completo)
             
             # Verificar si el cliente ya existe
             if rif_completo in clientes:
-                print(f"Cliente con RIF {rif_completo} ya existe")
+                logger.debug("Cliente con RIF %s ya existe", rif_completo)
                 flash('❌ Ya existe un cliente con este RIF/Identificación', 'danger')
                 return render_template('cliente_form.html')
             
@@ -1108,15 +1145,17 @@ def nuevo_cliente():
                 'validado_seniat': True  # Marca que cumple validaciones SENIAT
             }
             
-            print(f"Cliente SENIAT creado: {cliente}")
+            logger.debug("Cliente SENIAT creado: %s", cliente)
             
             # Agregar cliente al diccionario
             clientes[rif_completo] = cliente
-            print(f"Cliente agregado. Total: {len(clientes)}")
+            logger.debug("Cliente agregado. Total: %s", len(clientes))
             
             # Guardar datos
+            firma_indice = indice_clientes.firma_archivo()
             if guardar_datos(ARCHIVO_CLIENTES, clientes):
-                print("Cliente SENIAT guardado exitosamente")
+                logger.debug("Cliente SENIAT guardado exitosamente")
+                indice_clientes.actualizar_cliente(rif_completo, cliente, firma_indice)
                 
                 # === REGISTRO FISCAL EN BITÁCORA ===
                 registrar_bitacora(
@@ -1130,12 +1169,12 @@ def nuevo_cliente():
                 flash(f'✅ Cliente creado exitosamente con RIF: {rif_completo} (SENIAT válido)', 'success')
                 return redirect(url_for('mostrar_clientes'))
             else:
-                print("Error al guardar el cliente")
+                logger.error("Error al guardar el cliente")
                 flash('❌ Error al guardar el cliente. Intente nuevamente.', 'danger')
                 return render_template('cliente_form.html')
                 
         except Exception as e:
-            print(f"Error inesperado al crear cliente SENIAT: {str(e)}")
+            logger.error("Error inesperado al crear cliente SENIAT: %s", str(e))
             flash('❌ Error al procesar datos del cliente. Intente nuevamente.', 'danger')
             return render_template('cliente_form.html')
     
@@ -1149,20 +1188,10 @@ def mostrar_inventario():
     filtro_categoria = request.args.get('categoria', '')
     filtro_orden = request.args.get('orden', 'nombre')
     
-    # Obtener categorías únicas
-    categorias = []
-    for producto in inventario.values():
-        if producto.get('categoria') and producto['categoria'] not in categorias:
-            categorias.append(producto['categoria'])
-    
-    # Filtrar productos
-    productos_filtrados = {}
-    for id, producto in inventario.items():
-        if q and q.lower() not in producto['nombre'].lower():
-            continue
-        if filtro_categoria and producto.get('categoria') != filtro_categoria:
-            continue
-        productos_filtrados[id] = producto
+    # Categorías únicas y productos filtrados desde el índice del catálogo
+    categorias = indice_productos.categorias()
+    productos_filtrados = {id: inventario[id] for id in indice_productos.filtrar(q=q, categoria=filtro_categoria)
+                           if id in inventario}
     
     # Ordenar productos
     if filtro_orden == 'nombre':
@@ -1259,13 +1288,15 @@ def editar_producto(id):
             nueva_ruta = guardar_imagen_producto(request.files['imagen'], id)
             if nueva_ruta:
                 # Eliminar imagen anterior si existe
-                if ruta_imagen:
+                # Con la misma extensión el archivo nuevo reemplazó al anterior: no borrarlo
+                if ruta_imagen and ruta_imagen != nueva_ruta:
                     try:
+                        eliminar_derivados(ruta_imagen)
                         ruta_anterior = os.path.join(BASE_DIR, 'static', ruta_imagen)
                         if os.path.exists(ruta_anterior):
                             os.remove(ruta_anterior)
                     except Exception as e:
-                        print(f"Error eliminando imagen anterior: {e}")
+                        logger.error("Error eliminando imagen anterior: %s", e)
                 ruta_imagen = nueva_ruta
         
         # Actualizar producto
@@ -1381,7 +1412,7 @@ def mostrar_facturas():
             })
             facturas[id] = factura
         except Exception as e:
-            print(f"Error normalizando factura {id}: {e}")
+            logger.error("Error normalizando factura %s: %s", id, e)
 
     # Filtros
     q_search = (request.args.get('search') or '').strip().lower()
@@ -1407,7 +1438,7 @@ def mostrar_facturas():
     for id, f in facturas.items():
         # Validar que el ID sea válido
         if not id or str(id).strip() == '':
-            print(f"ADVERTENCIA: Factura con ID inválido encontrada: {id}")
+            logger.warning("ADVERTENCIA: Factura con ID inválido encontrada: %s", id)
             continue
             
         numero = str(f.get('numero', id)).lower()
@@ -1541,27 +1572,27 @@ def ver_factura(id):
         flash('ID de factura inválido', 'danger')
         return redirect(url_for('mostrar_facturas'))
     """Muestra los detalles de una factura."""
-    print(f"=== DEBUG: Función ver_factura llamada con ID: {id} ===")
-    print(f"=== DEBUG: URL actual: {request.url} ===")
-    print(f"=== DEBUG: Template a usar: factura_dashboard.html ===")
+    logger.debug("=== DEBUG: Función ver_factura llamada con ID: %s ===", id)
+    logger.debug("=== DEBUG: URL actual: %s ===", request.url)
+    logger.debug("=== DEBUG: Template a usar: factura_dashboard.html ===")
     
     try:
-        print(f"DEBUG: Accediendo a factura con ID: {id}")
+        logger.debug("DEBUG: Accediendo a factura con ID: %s", id)
 
         facturas = cargar_datos(ARCHIVO_FACTURAS)
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         inventario = cargar_datos(ARCHIVO_INVENTARIO)
         
         if not facturas:
-            print("DEBUG: No se pudieron cargar las facturas")
+            logger.debug("DEBUG: No se pudieron cargar las facturas")
             flash('Error al cargar las facturas', 'danger')
             return redirect(url_for('mostrar_facturas'))
             
         factura = facturas.get(id)
-        print(f"DEBUG: Factura encontrada: {factura is not None}")
+        logger.debug("DEBUG: Factura encontrada: %s", factura is not None)
         
         if not factura:
-            print(f"DEBUG: Factura con ID {id} no encontrada")
+            logger.warning("DEBUG: Factura con ID %s no encontrada", id)
             flash('Factura no encontrada', 'danger')
             return redirect(url_for('mostrar_facturas'))
         
@@ -1584,20 +1615,17 @@ def ver_factura(id):
         
         # Asegurar que cliente_id esté presente
         if 'cliente_id' not in factura:
-            print(f"⚠️ ADVERTENCIA: factura {id} no tiene cliente_id")
-            print(f"⚠️ Campos disponibles en factura: {list(factura.keys())}")
+            logger.warning("⚠️ ADVERTENCIA: factura %s no tiene cliente_id", id)
+            logger.warning("⚠️ Campos disponibles en factura: %s", list(factura.keys()))
         else:
-            print(f"✅ factura {id} tiene cliente_id: {factura['cliente_id']}")
+            logger.debug("✅ factura %s tiene cliente_id: %s", id, factura['cliente_id'])
 
-        print(f"DEBUG: Renderizando template factura_dashboard.html para factura {id}")
-        print(f"DEBUG: Datos de factura: {factura}")
-        print(f"DEBUG: Datos de clientes: {list(clientes.keys())[:5]}...")
-        print(f"DEBUG: Datos de empresa: {empresa}")
+        logger.debug("DEBUG: Renderizando template factura_dashboard.html para factura %s", id)
+        logger.debug("DEBUG: Datos de factura: %s", factura)
+        logger.debug("DEBUG: Datos de clientes: %s...", list(clientes.keys())[:5])
+        logger.debug("DEBUG: Datos de empresa: %s", empresa)
         
-        # Forzar recarga del template
-        app.jinja_env.cache.clear()
-        
-        print("DEBUG: Llamando a render_template...")
+        logger.debug("DEBUG: Llamando a render_template...")
         resultado = render_template(
             'factura_dashboard.html',
             factura=factura, 
@@ -1605,11 +1633,11 @@ def ver_factura(id):
             inventario=inventario, 
             empresa=empresa
         )
-        print("DEBUG: render_template completado exitosamente")
+        logger.debug("DEBUG: render_template completado exitosamente")
         return resultado
         
     except Exception as e:
-        print(f"ERROR en ver_factura: {str(e)}")
+        logger.error("ERROR en ver_factura: %s", str(e))
         flash(f'Error al mostrar la factura: {str(e)}', 'danger')
         return redirect(url_for('mostrar_facturas'))
 
@@ -1762,6 +1790,7 @@ def editar_factura(id):
                 factura['estado'] = 'pendiente'
             
             factura['saldo_pendiente'] = saldo_pendiente
+            seguridad_fiscal.firmar_estado(factura)
             facturas[id] = factura
             
             # Guardar cambios en el inventario
@@ -1870,7 +1899,7 @@ def duplicar_factura():
         try:
             registrar_bitacora('duplicacion_factura', f"Factura {nueva_factura['numero']} duplicada desde factura original por {session.get('usuario', 'SISTEMA')}")
         except Exception as e:
-            print(f"Error registrando en bitácora: {e}")
+            logger.error("Error registrando en bitácora: %s", e)
         
         return jsonify({
             'success': True,
@@ -1880,7 +1909,7 @@ def duplicar_factura():
         })
         
     except Exception as e:
-        print(f"Error duplicando factura: {e}")
+        logger.error("Error duplicando factura: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -2041,6 +2070,7 @@ def nueva_factura():
                 factura_inmutable['estado'] = 'pendiente'
                 
             factura_inmutable['saldo_pendiente'] = saldo_pendiente
+            seguridad_fiscal.firmar_estado(factura_inmutable)
             
             # === FASE 11: VALIDAR Y ACTUALIZAR INVENTARIO ===
             for prod_id, cantidad in zip(productos, cantidades):
@@ -2081,6 +2111,12 @@ def nueva_factura():
             if guardar_datos(ARCHIVO_FACTURAS, facturas):
                 # === FASE 13: REGISTRAR EN BITÁCORA FISCAL ===
                 control_numeracion.marcar_numero_utilizado(numero_fiscal, 'FACTURA', usuario_actual)
+                if app.config['SENIAT_ENVIO_AUTOMATICO']:
+                    # Solo se encola: el envío lo hace el hilo de la cola sin bloquear este request
+                    try:
+                        cola_seniat.encolar(factura_inmutable, 'FACTURA', usuario_actual)
+                    except Exception as e:
+                        logger.warning("⚠️ No se pudo encolar la factura %s para el SENIAT: %s", numero_fiscal, e)
                 registrar_bitacora(
                     usuario_actual, 
                     'Nueva factura fiscal', 
@@ -2226,7 +2262,7 @@ def migrar_formato_facturas():
 
             facturas[fid] = f_actualizada
         except Exception as e:
-            print('Error migrando/normalizando factura', fid, e)
+            logger.error("Error migrando/normalizando factura %s %s", fid, e)
             continue
 
     if guardar_datos(ARCHIVO_FACTURAS, facturas):
@@ -2338,7 +2374,7 @@ def mostrar_cotizaciones():
                             'validez': validez
                         }
                 except Exception as e:
-                    print(f"Error procesando archivo {filename}: {str(e)}")
+                    logger.error("Error procesando archivo %s: %s", filename, str(e))
                     continue
         
         # Cargar clientes para el template
@@ -2351,7 +2387,7 @@ def mostrar_cotizaciones():
                              now=now)
                               
     except Exception as e:
-        print(f"Error al cargar las cotizaciones: {str(e)}")
+        logger.error("Error al cargar las cotizaciones: %s", str(e))
         flash('Error al cargar las cotizaciones. Por favor, intente nuevamente.', 'danger')
         return redirect(url_for('index'))
 
@@ -2437,61 +2473,65 @@ def cargar_datos(nombre_archivo):
             os.makedirs(directorio, exist_ok=True)
             
         if not os.path.exists(nombre_archivo):
-            print(f"Archivo {nombre_archivo} no existe. Creando nuevo archivo.")
+            logger_datos.warning("Archivo %s no existe. Creando nuevo archivo.", nombre_archivo)
             with open(nombre_archivo, 'w', encoding='utf-8') as f:
                 json.dump({}, f, ensure_ascii=False, indent=4)
             return {}
             
+        inicio = time.perf_counter()
         with open(nombre_archivo, 'r', encoding='utf-8') as f:
             contenido = f.read()
             if not contenido.strip():
-                print(f"Archivo {nombre_archivo} está vacío.")
+                logger_datos.warning("Archivo %s está vacío.", nombre_archivo)
                 return {}
             try:
-                return json.loads(contenido)
+                datos = json.loads(contenido)
             except json.JSONDecodeError as e:
-                print(f"Error decodificando JSON en {nombre_archivo}: {e}")
+                logger_datos.error("Error decodificando JSON en %s: %s", nombre_archivo, e)
                 return {}
+            instrumentacion.registrar_datos('cargar', os.fstat(f.fileno()).st_size, time.perf_counter() - inicio)
+            return datos
     except Exception as e:
-        print(f"Error leyendo {nombre_archivo}: {e}")
+        logger_datos.error("Error leyendo %s: %s", nombre_archivo, e)
         return {}
 
 def guardar_datos(nombre_archivo, datos):
     """Guarda datos en un archivo JSON."""
+    inicio = time.perf_counter()
     try:
         # Asegurar que el directorio existe
         directorio = os.path.dirname(nombre_archivo)
         if directorio:  # Si hay un directorio en la ruta
             try:
                 os.makedirs(directorio, exist_ok=True)
-                print(f"Directorio {directorio} creado/verificado exitosamente")
+                logger_datos.debug("Directorio %s creado/verificado exitosamente", directorio)
             except Exception as e:
-                print(f"Error creando directorio {directorio}: {e}")
+                logger_datos.error("Error creando directorio %s: %s", directorio, e)
                 return False
         
         # Verificar que los datos son serializables
         try:
             json.dumps(datos)
         except Exception as e:
-            print(f"Error serializando datos: {e}")
+            logger_datos.error("Error serializando datos: %s", e)
             return False
         
         # Intentar guardar con manejo de errores específico
         try:
-            # Primero intentamos escribir en un archivo temporal
-            temp_file = nombre_archivo + '.tmp'
+            # Primero escribimos en un temporal propio de esta llamada (varios workers o
+            # hilos pueden guardar el mismo archivo a la vez)
+            temp_file = f'{nombre_archivo}.{uuid4().hex}.tmp'
             with open(temp_file, 'w', encoding='utf-8') as f:
                 json.dump(datos, f, ensure_ascii=False, indent=4)
             
-            # Si la escritura temporal fue exitosa, reemplazamos el archivo original
-            if os.path.exists(nombre_archivo):
-                os.remove(nombre_archivo)
-            os.rename(temp_file, nombre_archivo)
+            # Reemplazo atómico: ningún lector ve el archivo ausente o a medio escribir
+            os.replace(temp_file, nombre_archivo)
+            instrumentacion.registrar_datos('guardar', os.path.getsize(nombre_archivo), time.perf_counter() - inicio)
             
-            print(f"Datos guardados exitosamente en {nombre_archivo}")
+            logger_datos.debug("Datos guardados exitosamente en %s", nombre_archivo)
             return True
         except Exception as e:
-            print(f"Error escribiendo en archivo {nombre_archivo}: {e}")
+            logger_datos.error("Error escribiendo en archivo %s: %s", nombre_archivo, e)
             # Limpiar archivo temporal si existe
             if os.path.exists(temp_file):
                 try:
@@ -2500,7 +2540,7 @@ def guardar_datos(nombre_archivo, datos):
                     pass
             return False
     except Exception as e:
-        print(f"Error general guardando {nombre_archivo}: {e}")
+        logger_datos.error("Error general guardando %s: %s", nombre_archivo, e)
         return False
 
 def guardar_ultima_tasa_bcv(tasa):
@@ -2516,7 +2556,7 @@ def guardar_ultima_tasa_bcv(tasa):
             with open(ULTIMA_TASA_BCV_FILE, 'w', encoding='utf-8') as f:
                 json.dump(data, f)
             
-            print(f"Tasa BCV guardada exitosamente: {tasa}")
+            logger_tasas.debug("Tasa BCV guardada exitosamente: %s", tasa)
             
             # Registrar en bitácora si hay sesión activa
             try:
@@ -2526,38 +2566,38 @@ def guardar_ultima_tasa_bcv(tasa):
                 else:
                     registrar_bitacora('Sistema', 'Actualizar tasa BCV', f'Tasa: {tasa}')
             except Exception as e:
-                print(f"Error registrando en bitácora: {e}")
+                logger_tasas.error("Error registrando en bitácora: %s", e)
                 
         except Exception as e:
-            print(f"Error guardando última tasa BCV: {e}")
+            logger_tasas.error("Error guardando última tasa BCV: %s", e)
             
     except Exception as e:
-        print(f"Error general en guardar_ultima_tasa_bcv: {e}")
+        logger_tasas.error("Error general en guardar_ultima_tasa_bcv: %s", e)
 
 def cargar_ultima_tasa_bcv():
     try:
         # Verificar si el archivo existe
         if not os.path.exists(ULTIMA_TASA_BCV_FILE):
-            print(f"Archivo de tasa BCV no encontrado: {ULTIMA_TASA_BCV_FILE}")
+            logger_tasas.warning("Archivo de tasa BCV no encontrado: %s", ULTIMA_TASA_BCV_FILE)
             return None
         
         with open(ULTIMA_TASA_BCV_FILE, 'r', encoding='utf-8') as f:
             data = json.load(f)
             tasa = float(data.get('tasa', 0))
             if tasa > 10:
-                print(f"Tasa BCV cargada desde archivo: {tasa}")
+                logger_tasas.debug("Tasa BCV cargada desde archivo: %s", tasa)
                 return tasa
             else:
-                print(f"Tasa BCV en archivo no válida: {tasa}")
+                logger_tasas.warning("Tasa BCV en archivo no válida: %s", tasa)
                 return None
     except FileNotFoundError:
-        print(f"Archivo de tasa BCV no encontrado: {ULTIMA_TASA_BCV_FILE}")
+        logger_tasas.warning("Archivo de tasa BCV no encontrado: %s", ULTIMA_TASA_BCV_FILE)
         return None
     except json.JSONDecodeError as e:
-        print(f"Error decodificando archivo de tasa BCV: {e}")
+        logger_tasas.error("Error decodificando archivo de tasa BCV: %s", e)
         return None
     except Exception as e:
-        print(f"Error inesperado cargando tasa BCV: {e}")
+        logger_tasas.error("Error inesperado cargando tasa BCV: %s", e)
         return None
 
 def obtener_ultima_tasa_del_sistema():
@@ -2607,13 +2647,13 @@ def obtener_ultima_tasa_del_sistema():
         if tasas_encontradas:
             # Usar la tasa más alta (más reciente) del sistema
             tasa_mas_reciente = max(tasas_encontradas)
-            print(f"Tasa encontrada en el sistema: {tasa_mas_reciente}")
+            logger_tasas.debug("Tasa encontrada en el sistema: %s", tasa_mas_reciente)
             return tasa_mas_reciente
         
         return None
         
     except Exception as e:
-        print(f"Error buscando tasa en el sistema: {e}")
+        logger_tasas.error("Error buscando tasa en el sistema: %s", e)
         return None
 
 def inicializar_archivos_por_defecto():
@@ -2626,23 +2666,23 @@ def inicializar_archivos_por_defecto():
             
             if tasa_sistema and tasa_sistema > 10:
                 tasa_default = tasa_sistema
-                print(f"Usando tasa del sistema: {tasa_default}")
+                logger.debug("Usando tasa del sistema: %s", tasa_default)
             else:
                 # Solo usar tasa por defecto si no hay ninguna en el sistema
                 tasa_default = 135.0  # Tasa más reciente conocida
-                print(f"Usando tasa por defecto del sistema: {tasa_default}")
+                logger.debug("Usando tasa por defecto del sistema: %s", tasa_default)
             
             with open(ULTIMA_TASA_BCV_FILE, 'w', encoding='utf-8') as f:
                 json.dump({'tasa': tasa_default, 'fecha': datetime.now().isoformat()}, f)
-            print(f"Archivo de tasa BCV creado con tasa: {tasa_default}")
+            logger.debug("Archivo de tasa BCV creado con tasa: %s", tasa_default)
     except Exception as e:
-        print(f"Error inicializando archivos por defecto: {e}")
+        logger.error("Error inicializando archivos por defecto: %s", e)
 
 def actualizar_tasa_bcv_automaticamente():
     """Actualiza la tasa BCV automáticamente si han pasado más de 24 horas."""
     try:
         if not os.path.exists(ULTIMA_TASA_BCV_FILE):
-            print("Archivo de tasa BCV no existe, creando...")
+            logger_tasas.warning("Archivo de tasa BCV no existe, creando...")
             inicializar_archivos_por_defecto()
             return
         
@@ -2657,44 +2697,44 @@ def actualizar_tasa_bcv_automaticamente():
                 
                 # Actualizar si han pasado más de 24 horas
                 if tiempo_transcurrido.total_seconds() > 24 * 3600:
-                    print("🔄 Han pasado más de 24 horas, actualizando tasa BCV automáticamente...")
+                    logger_tasas.debug("🔄 Han pasado más de 24 horas, actualizando tasa BCV automáticamente...")
                     nueva_tasa = obtener_tasa_bcv_dia()
                     if nueva_tasa and nueva_tasa > 10:
-                        print(f"✅ Tasa BCV actualizada automáticamente: {nueva_tasa}")
+                        logger_tasas.debug("✅ Tasa BCV actualizada automáticamente: %s", nueva_tasa)
                     else:
-                        print("❌ No se pudo actualizar la tasa BCV automáticamente")
+                        logger_tasas.error("❌ No se pudo actualizar la tasa BCV automáticamente")
                         # Intentar usar tasa del sistema como fallback
                         tasa_sistema = obtener_ultima_tasa_del_sistema()
                         if tasa_sistema and tasa_sistema > 10:
-                            print(f"⚠️ Usando tasa del sistema como fallback: {tasa_sistema}")
+                            logger_tasas.warning("⚠️ Usando tasa del sistema como fallback: %s", tasa_sistema)
                             guardar_ultima_tasa_bcv(tasa_sistema)
                 else:
-                    print(f"⏰ Tasa BCV actualizada recientemente, no es necesario actualizar")
+                    logger_tasas.debug("⏰ Tasa BCV actualizada recientemente, no es necesario actualizar")
                     # Aún así, verificar si hay una tasa más reciente disponible
-                    print("🔍 Verificando si hay tasa más reciente disponible...")
+                    logger_tasas.debug("🔍 Verificando si hay tasa más reciente disponible...")
                     tasa_web = obtener_tasa_bcv_dia()
                     if tasa_web and tasa_web > 0:
-                        print(f"🎯 Tasa más reciente encontrada: {tasa_web}")
+                        logger_tasas.debug("🎯 Tasa más reciente encontrada: %s", tasa_web)
                         guardar_ultima_tasa_bcv(tasa_web)
             except Exception as e:
-                print(f"Error verificando fecha de actualización: {e}")
+                logger_tasas.error("Error verificando fecha de actualización: %s", e)
         else:
             # Si no hay fecha, verificar si la tasa actual es válida
             tasa_actual = data.get('tasa', 0)
             if not tasa_actual or tasa_actual <= 10:
-                print("Tasa BCV no válida, buscando en el sistema...")
+                logger_tasas.warning("Tasa BCV no válida, buscando en el sistema...")
                 tasa_sistema = obtener_ultima_tasa_del_sistema()
                 if tasa_sistema and tasa_sistema > 10:
-                    print(f"Actualizando con tasa del sistema: {tasa_sistema}")
+                    logger_tasas.debug("Actualizando con tasa del sistema: %s", tasa_sistema)
                     guardar_ultima_tasa_bcv(tasa_sistema)
         
     except Exception as e:
-        print(f"Error en actualización automática de tasa BCV: {e}")
+        logger_tasas.error("Error en actualización automática de tasa BCV: %s", e)
         # En caso de error, intentar usar tasa del sistema
         try:
             tasa_sistema = obtener_ultima_tasa_del_sistema()
             if tasa_sistema and tasa_sistema > 10:
-                print(f"Usando tasa del sistema después de error: {tasa_sistema}")
+                logger_tasas.warning("Usando tasa del sistema después de error: %s", tasa_sistema)
                 guardar_ultima_tasa_bcv(tasa_sistema)
         except:
             pass
@@ -2723,7 +2763,7 @@ def registrar_bitacora(usuario, accion, detalles='', documento_tipo='', document
             lon = session['ubicacion_precisa'].get('lon', '')
             ubicacion = session['ubicacion_precisa'].get('texto', '')
         elif has_request_context():
-            resp = requests.get(f'http://ip-api.com/json/{ip}', timeout=3)
+            resp = cliente_http.get(f'http://ip-api.com/json/{ip}')
             if resp.status_code == 200:
                 data = resp.json()
                 if data.get('status') == 'success':
@@ -2736,7 +2776,7 @@ def registrar_bitacora(usuario, accion, detalles='', documento_tipo='', document
                 ubicacion = f"API status: {resp.status_code}"
     except Exception as e:
         # Si hay algún error al acceder a Flask objects o API, usar valores por defecto
-        print(f"Error en registrar_bitacora: {e}")
+        logger.error("Error en registrar_bitacora: %s", e)
         ip = 'N/A'
         ubicacion = 'N/A'
         lat = ''
@@ -2797,7 +2837,7 @@ def verify_password(username, password):
         else:
             return False
     except Exception as e:
-        print(f"Error verificando contraseña: {e}")
+        logger.error("Error verificando contraseña: %s", e)
         return False
 
 def obtener_estadisticas():
@@ -2869,52 +2909,52 @@ def obtener_tasa_bcv():
     try:
         # Usar la constante definida
         if not os.path.exists(ULTIMA_TASA_BCV_FILE):
-            print(f"Archivo de tasa BCV no encontrado: {ULTIMA_TASA_BCV_FILE}")
+            logger_tasas.warning("Archivo de tasa BCV no encontrado: %s", ULTIMA_TASA_BCV_FILE)
             # Buscar en el sistema antes de usar tasa por defecto
             tasa_sistema = obtener_ultima_tasa_del_sistema()
             if tasa_sistema and tasa_sistema > 10:
-                print(f"Usando tasa del sistema: {tasa_sistema}")
+                logger_tasas.debug("Usando tasa del sistema: %s", tasa_sistema)
                 return tasa_sistema
             else:
-                print("No se encontró tasa válida en el sistema")
+                logger_tasas.debug("No se encontró tasa válida en el sistema")
                 return None
         
         with open(ULTIMA_TASA_BCV_FILE, 'r', encoding='utf-8') as f:
             data = json.load(f)
             tasa = float(data.get('tasa', 0))
             if tasa > 10:
-                print(f"Tasa BCV obtenida del archivo: {tasa}")
+                logger_tasas.debug("Tasa BCV obtenida del archivo: %s", tasa)
                 return tasa
             else:
-                print(f"Tasa BCV en archivo no válida: {tasa}")
+                logger_tasas.warning("Tasa BCV en archivo no válida: %s", tasa)
                 # Buscar en el sistema como fallback
                 tasa_sistema = obtener_ultima_tasa_del_sistema()
                 if tasa_sistema and tasa_sistema > 10:
-                    print(f"Usando tasa del sistema como fallback: {tasa_sistema}")
+                    logger_tasas.warning("Usando tasa del sistema como fallback: %s", tasa_sistema)
                     return tasa_sistema
                 return None
     except FileNotFoundError:
-        print(f"Archivo de tasa BCV no encontrado")
+        logger_tasas.warning("Archivo de tasa BCV no encontrado")
         # Buscar en el sistema
         tasa_sistema = obtener_ultima_tasa_del_sistema()
         if tasa_sistema and tasa_sistema > 10:
-            print(f"Usando tasa del sistema: {tasa_sistema}")
+            logger_tasas.debug("Usando tasa del sistema: %s", tasa_sistema)
             return tasa_sistema
         return None
     except json.JSONDecodeError as e:
-        print(f"Error decodificando archivo de tasa BCV: {e}")
+        logger_tasas.error("Error decodificando archivo de tasa BCV: %s", e)
         # Buscar en el sistema como fallback
         tasa_sistema = obtener_ultima_tasa_del_sistema()
         if tasa_sistema and tasa_sistema > 10:
-            print(f"Usando tasa del sistema como fallback: {tasa_sistema}")
+            logger_tasas.warning("Usando tasa del sistema como fallback: %s", tasa_sistema)
             return tasa_sistema
         return None
     except Exception as e:
-        print(f"Error inesperado obteniendo tasa BCV: {e}")
+        logger_tasas.error("Error inesperado obteniendo tasa BCV: %s", e)
         # Buscar en el sistema como último recurso
         tasa_sistema = obtener_ultima_tasa_del_sistema()
         if tasa_sistema and tasa_sistema > 10:
-            print(f"Usando tasa del sistema como último recurso: {tasa_sistema}")
+            logger_tasas.warning("Usando tasa del sistema como último recurso: %s", tasa_sistema)
             return tasa_sistema
         return None
 
@@ -2923,16 +2963,16 @@ def obtener_tasa_bcv_dia():
     try:
         # SIEMPRE intentar obtener desde la web primero (no usar tasa local)
         url = 'https://www.bcv.org.ve/glosario/cambio-oficial'
-        print(f"🔍 Obteniendo tasa BCV ACTUAL desde: {url}")
+        logger_tasas.debug("🔍 Obteniendo tasa BCV ACTUAL desde: %s", url)
         
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        resp = requests.get(url, timeout=20, verify=False)
+        resp = cliente_http.get(url)
         
         if resp.status_code != 200:
-            print(f"❌ Error HTTP al obtener tasa BCV: {resp.status_code}")
+            logger_tasas.error("❌ Error HTTP al obtener tasa BCV: %s", resp.status_code)
             return None
         
-        print(f"✅ Página BCV obtenida exitosamente, analizando contenido...")
+        logger_tasas.debug("✅ Página BCV obtenida exitosamente, analizando contenido...")
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(resp.text, 'html.parser')
         tasa = None
         
@@ -2946,7 +2986,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(txt)
                     if posible > 10:
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por ID 'dolar': {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por ID 'dolar': %s", tasa)
                 except:
                     pass
         
@@ -2961,7 +3001,7 @@ def obtener_tasa_bcv_dia():
                         posible = float(txt)
                         if posible > 10:
                             tasa = posible
-                            print(f"🎯 Tasa BCV encontrada por ID 'usd': {tasa}")
+                            logger_tasas.debug("🎯 Tasa BCV encontrada por ID 'usd': %s", tasa)
                     except:
                         pass
         
@@ -2973,7 +3013,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(txt)
                     if posible > 10 and posible < 1000:  # Rango razonable
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por strong: {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por strong: %s", tasa)
                         break
                 except:
                     continue
@@ -2986,7 +3026,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(txt)
                     if posible > 10 and posible < 1000:
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por span: {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por span: %s", tasa)
                         break
                 except:
                     continue
@@ -3001,7 +3041,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(m.replace('.', '').replace(',', '.'))
                     if posible > 10 and posible < 1000:
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por regex: {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por regex: %s", tasa)
                         break
                 except:
                     continue
@@ -3016,7 +3056,7 @@ def obtener_tasa_bcv_dia():
                             posible = float(txt)
                             if posible > 10 and posible < 1000:
                                 tasa = posible
-                                print(f"🎯 Tasa BCV encontrada en tabla: {tasa}")
+                                logger_tasas.debug("🎯 Tasa BCV encontrada en tabla: %s", tasa)
                                 break
                         except:
                             continue
@@ -3038,7 +3078,7 @@ def obtener_tasa_bcv_dia():
                             posible = float(num.replace('.', '').replace(',', '.'))
                             if posible > 10 and posible < 1000:
                                 tasa = posible
-                                print(f"🎯 Tasa BCV encontrada por texto USD: {tasa}")
+                                logger_tasas.debug("🎯 Tasa BCV encontrada por texto USD: %s", tasa)
                                 break
                         except:
                             continue
@@ -3048,24 +3088,24 @@ def obtener_tasa_bcv_dia():
         if tasa and tasa > 10:
             # Guardar la tasa en el archivo
             guardar_ultima_tasa_bcv(tasa)
-            print(f"💾 Tasa BCV ACTUAL guardada exitosamente: {tasa}")
+            logger_tasas.info("💾 Tasa BCV ACTUAL guardada exitosamente: %s", tasa)
             return tasa
         else:
-            print("❌ No se pudo encontrar una tasa BCV válida en la página")
+            logger_tasas.error("❌ No se pudo encontrar una tasa BCV válida en la página")
             # Solo como último recurso, usar tasa local
             tasa_local = cargar_ultima_tasa_bcv()
             if tasa_local and tasa_local > 10:
-                print(f"⚠️ Usando tasa BCV local como fallback: {tasa_local}")
+                logger_tasas.warning("⚠️ Usando tasa BCV local como fallback: %s", tasa_local)
                 return tasa_local
             return None
             
     except Exception as e:
-        print(f"❌ Error obteniendo tasa BCV: {e}")
+        logger_tasas.error("❌ Error obteniendo tasa BCV: %s", e)
         # Solo como último recurso, usar tasa local
         try:
             tasa_fallback = cargar_ultima_tasa_bcv()
             if tasa_fallback and tasa_fallback > 10:
-                print(f"⚠️ Usando tasa BCV de fallback después de error: {tasa_fallback}")
+                logger_tasas.warning("⚠️ Usando tasa BCV de fallback después de error: %s", tasa_fallback)
                 return tasa_fallback
         except:
             pass
@@ -3074,8 +3114,6 @@ def obtener_tasa_bcv_dia():
 # Llamar inicialización
 inicializar_archivos_por_defecto()
 
-# Ejecutar actualización automática al iniciar
-actualizar_tasa_bcv_automaticamente()
 # Usar SECRET_KEY desde variables de entorno en producción
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'unsafe-default-change-me')
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
@@ -3318,7 +3356,7 @@ def ver_cliente(id):
                              maps_config=maps_config)
     
     except Exception as e:
-        print(f"Error al cargar detalles del cliente {id}: {e}")
+        logger.error("Error al cargar detalles del cliente %s: %s", id, e)
         flash('❌ Error al cargar los detalles del cliente', 'danger')
         return redirect(url_for('mostrar_clientes'))
 
@@ -3333,7 +3371,7 @@ def editar_cliente(id):
         
     if request.method == 'POST':
         try:
-            print(f"Editando cliente SENIAT: {id}")
+            logger.debug("Editando cliente SENIAT: %s", id)
             
             # === OBTENER DATOS CON VALIDACIONES SENIAT ===
             nombre = request.form.get('nombre', '').strip().upper()
@@ -3387,11 +3425,13 @@ def editar_cliente(id):
                 'validado_seniat': True  # Mantener validación SENIAT
             }
             
-            print(f"Cliente SENIAT actualizado: {cliente_actualizado}")
+            logger.debug("Cliente SENIAT actualizado: %s", cliente_actualizado)
             
             # Guardar cambios
             clientes[id] = cliente_actualizado
+            firma_indice = indice_clientes.firma_archivo()
             if guardar_datos(ARCHIVO_CLIENTES, clientes):
+                indice_clientes.actualizar_cliente(id, cliente_actualizado, firma_indice)
                 
                 # === REGISTRO FISCAL EN BITÁCORA ===
                 registrar_bitacora(
@@ -3408,7 +3448,7 @@ def editar_cliente(id):
                 flash('❌ Error al actualizar el cliente', 'danger')
                 
         except Exception as e:
-            print(f"Error editando cliente SENIAT: {str(e)}")
+            logger.error("Error editando cliente SENIAT: %s", str(e))
             flash('❌ Error al procesar la actualización del cliente', 'danger')
             
     return render_template('cliente_form.html', cliente=clientes[id])
@@ -3420,7 +3460,9 @@ def eliminar_cliente(id):
     clientes = cargar_datos(ARCHIVO_CLIENTES)
     if id in clientes:
         del clientes[id]
+        firma_indice = indice_clientes.firma_archivo()
         if guardar_datos(ARCHIVO_CLIENTES, clientes):
+            indice_clientes.eliminar_cliente(id, firma_indice)
             flash('Cliente eliminado exitosamente', 'success')
             registrar_bitacora(session['usuario'], 'Eliminar cliente', f"ID: {id}")
         else:
@@ -3472,17 +3514,15 @@ def ajustar_stock():
     q = request.args.get('q', '').strip().lower()
     filtro_categoria = request.args.get('categoria', '').strip().lower()
     filtro_orden = request.args.get('orden', 'nombre')
-    # Filtrar por búsqueda
-    if q:
-        inventario = {k: v for k, v in inventario.items() if q in v.get('nombre', '').lower()}
-    # Filtrar por categoría
-    if filtro_categoria:
-        inventario = {k: v for k, v in inventario.items() if filtro_categoria in v.get('categoria', '').lower()}
+    # Filtrar por búsqueda y categoría (índice del catálogo)
+    if q or filtro_categoria:
+        inventario = {k: inventario[k] for k in indice_productos.filtrar(q=q, categoria_contiene=filtro_categoria)
+                      if k in inventario}
     # Ordenar
     if filtro_orden == 'nombre':
         inventario = dict(sorted(inventario.items(), key=lambda item: item[1].get('nombre', '').lower()))
     elif filtro_orden == 'stock':
-        inventario = dict(sorted(inventario.items(), key=lambda item: x[1]['cantidad']))
+        inventario = dict(sorted(inventario.items(), key=lambda item: item[1].get('cantidad', 0)))
     
     return render_template('ajustar_stock.html', inventario=inventario, q=q, filtro_categoria=filtro_categoria, filtro_orden=filtro_orden)
 
@@ -3564,17 +3604,59 @@ def reporte_inventario():
         return redirect(url_for('mostrar_inventario'))
 
 # --- API Endpoints ---
+versiones_inventario = RegistroVersiones(ARCHIVO_INVENTARIO)
+versiones_clientes = RegistroVersiones(ARCHIVO_CLIENTES)
+
+def respuesta_api_datos(versiones):
+    """
+    Respuesta de /api/productos y /api/clientes.
+
+    Parámetros opcionales:
+        fields=id,nombre,precio   solo esos campos de cada registro
+        since=<token>             solo lo cambiado después de ese token ('<id>-v<n>'):
+                                  {version, completo, cambios, eliminados}; un token
+                                  de otro registro o ilegible recibe completo=True
+    El token actual va en 'version', en la cabecera X-Version-Datos y en el
+    ETag (If-None-Match → 304 sin serializar nada).
+    """
+    foto = versiones.sincronizar()
+    campos = [c.strip() for c in request.args.get('fields', '').split(',') if c.strip()] or None
+    since = request.args.get('since')
+    token = RegistroVersiones.token(foto)
+    etag = RegistroVersiones.etag(foto, campos, since)
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+    elif since is None:
+        response = jsonify({i: proyectar(r, i, campos) for i, r in foto['datos'].items()})
+    else:
+        completo, cambios, eliminados = RegistroVersiones.cambios_desde(foto, since, campos)
+        response = jsonify({'version': token, 'completo': completo,
+                            'cambios': cambios, 'eliminados': eliminados})
+    response.set_etag(etag)
+    response.headers['X-Version-Datos'] = token
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/api/productos')
 def api_productos():
     """API endpoint para obtener productos."""
-    inventario = cargar_datos(ARCHIVO_INVENTARIO)
-    return jsonify(inventario)
+    return respuesta_api_datos(versiones_inventario)
+
+@app.route('/api/buscar-productos')
+@login_required
+def api_buscar_productos():
+    """API para el buscador de productos de la factura (solo los mejores resultados)."""
+    try:
+        q = request.args.get('q', '').strip()
+        limite = min(max(request.args.get('limite', 20, type=int) or 20, 1), 100)
+        return jsonify({'productos': indice_productos.buscar(q, limite=limite)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/clientes')
 def api_clientes():
     """API endpoint para obtener clientes."""
-    clientes = cargar_datos(ARCHIVO_CLIENTES)
-    return jsonify(clientes)
+    return respuesta_api_datos(versiones_clientes)
 
 @app.route('/api/tasa-bcv')
 def api_tasa_bcv():
@@ -3593,7 +3675,7 @@ def api_tasa_bcv():
         return jsonify({'error': 'No se pudo obtener la tasa BCV'}), 500
         
     except Exception as e:
-        print(f"Error en /api/tasa-bcv: {e}")
+        logger_tasas.error("Error en /api/tasa-bcv: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/buscar-clientes')
@@ -3604,34 +3686,8 @@ def api_buscar_clientes():
         if not q or len(q) < 2:
             return jsonify({'clientes': []})
         
-        clientes = cargar_datos(ARCHIVO_CLIENTES)
-        resultados = []
-        
-        q_lower = q.lower()
-        for id_cliente, cliente in clientes.items():
-            nombre_cliente = cliente.get('nombre', '').lower()
-            rif_cliente = cliente.get('rif', '').lower()
-            
-            # Búsqueda predictiva
-            nombre_match = q_lower in nombre_cliente
-            rif_match = q_lower in rif_cliente
-            
-            # Búsqueda por palabras
-            palabras_busqueda = q_lower.split()
-            nombre_palabras_match = all(palabra in nombre_cliente for palabra in palabras_busqueda)
-            rif_palabras_match = all(palabra in rif_cliente for palabra in palabras_busqueda)
-            
-            if nombre_match or rif_match or nombre_palabras_match or rif_palabras_match:
-                resultados.append({
-                    'id': id_cliente,
-                    'nombre': cliente.get('nombre', ''),
-                    'rif': cliente.get('rif', ''),
-                    'email': cliente.get('email', ''),
-                    'telefono': cliente.get('telefono', '')
-                })
-        
-        # Limitar a 10 resultados para mejor rendimiento
-        return jsonify({'clientes': resultados[:10]})
+        # Índice en memoria (nombre, RIF y teléfono normalizados); se detiene en 10 resultados
+        return jsonify({'clientes': indice_clientes.buscar(q, limite=10)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -3652,7 +3708,7 @@ def api_geocodificar():
             'addressdetails': 1
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = cliente_http.get(url, params=params)
         if response.status_code == 200:
             data = response.json()
             if data:
@@ -3680,16 +3736,16 @@ def obtener_tasa_bcv_dia():
     try:
         # SIEMPRE intentar obtener desde la web primero (no usar tasa local)
         url = 'https://www.bcv.org.ve/glosario/cambio-oficial'
-        print(f"🔍 Obteniendo tasa BCV ACTUAL desde: {url}")
+        logger_tasas.debug("🔍 Obteniendo tasa BCV ACTUAL desde: %s", url)
         
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        resp = requests.get(url, timeout=20, verify=False)
+        resp = cliente_http.get(url)
         
         if resp.status_code != 200:
-            print(f"❌ Error HTTP al obtener tasa BCV: {resp.status_code}")
+            logger_tasas.error("❌ Error HTTP al obtener tasa BCV: %s", resp.status_code)
             return None
         
-        print(f"✅ Página BCV obtenida exitosamente, analizando contenido...")
+        logger_tasas.debug("✅ Página BCV obtenida exitosamente, analizando contenido...")
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(resp.text, 'html.parser')
         tasa = None
         
@@ -3703,7 +3759,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(txt)
                     if posible > 10:
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por ID 'dolar': {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por ID 'dolar': %s", tasa)
                 except:
                     pass
         
@@ -3718,7 +3774,7 @@ def obtener_tasa_bcv_dia():
                         posible = float(txt)
                         if posible > 10:
                             tasa = posible
-                            print(f"🎯 Tasa BCV encontrada por ID 'usd': {tasa}")
+                            logger_tasas.debug("🎯 Tasa BCV encontrada por ID 'usd': %s", tasa)
                     except:
                         pass
         # Método 3: Buscar por strong con texto que parezca una tasa
@@ -3729,7 +3785,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(txt)
                     if posible > 10 and posible < 1000:  # Rango razonable
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por strong: {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por strong: %s", tasa)
                         break
                 except:
                     continue
@@ -3742,7 +3798,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(txt)
                     if posible > 10 and posible < 1000:
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por span: {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por span: %s", tasa)
                         break
                 except:
                     continue
@@ -3757,7 +3813,7 @@ def obtener_tasa_bcv_dia():
                     posible = float(m.replace('.', '').replace(',', '.'))
                     if posible > 10 and posible < 1000:
                         tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por regex: {tasa}")
+                        logger_tasas.debug("🎯 Tasa BCV encontrada por regex: %s", tasa)
                         break
                 except:
                     continue
@@ -3772,7 +3828,7 @@ def obtener_tasa_bcv_dia():
                             posible = float(txt)
                             if posible > 10 and posible < 1000:
                                 tasa = posible
-                                print(f"🎯 Tasa BCV encontrada en tabla: {tasa}")
+                                logger_tasas.debug("🎯 Tasa BCV encontrada en tabla: %s", tasa)
                                 break
                         except:
                             continue
@@ -3794,7 +3850,7 @@ def obtener_tasa_bcv_dia():
                             posible = float(num.replace('.', '').replace(',', '.'))
                             if posible > 10 and posible < 1000:
                                 tasa = posible
-                                print(f"🎯 Tasa BCV encontrada por texto USD: {tasa}")
+                                logger_tasas.debug("🎯 Tasa BCV encontrada por texto USD: %s", tasa)
                                 break
                         except:
                             continue
@@ -3804,24 +3860,24 @@ def obtener_tasa_bcv_dia():
         if tasa and tasa > 10:
             # Guardar la tasa en el archivo
             guardar_ultima_tasa_bcv(tasa)
-            print(f"💾 Tasa BCV ACTUAL guardada exitosamente: {tasa}")
+            logger_tasas.info("💾 Tasa BCV ACTUAL guardada exitosamente: %s", tasa)
             return tasa
         else:
-            print("❌ No se pudo encontrar una tasa BCV válida en la página")
+            logger_tasas.error("❌ No se pudo encontrar una tasa BCV válida en la página")
             # Solo como último recurso, usar tasa local
             tasa_local = cargar_ultima_tasa_bcv()
             if tasa_local and tasa_local > 10:
-                print(f"⚠️ Usando tasa BCV local como fallback: {tasa_local}")
+                logger_tasas.warning("⚠️ Usando tasa BCV local como fallback: %s", tasa_local)
                 return tasa_local
             return None
             
     except Exception as e:
-        print(f"❌ Error obteniendo tasa BCV: {e}")
+        logger_tasas.error("❌ Error obteniendo tasa BCV: %s", e)
         # Solo como último recurso, usar tasa local
         try:
             tasa_fallback = cargar_ultima_tasa_bcv()
             if tasa_fallback and tasa_fallback > 10:
-                print(f"⚠️ Usando tasa BCV de fallback después de error: {tasa_fallback}")
+                logger_tasas.warning("⚠️ Usando tasa BCV de fallback después de error: %s", tasa_fallback)
                 return tasa_fallback
         except:
             pass
@@ -4191,9 +4247,79 @@ def reporte_clientes():
             tipo_cliente=tipo_cliente
         )
     except Exception as e:
-        print(f"Error en reporte_clientes: {e}")
+        logger.error("Error en reporte_clientes: %s", e)
         return str(e), 500
 
+def _facturas_de_cliente(cliente_id, facturas):
+    """Facturas del cliente con su ID, total abonado y saldo pendiente (alineado con ver_factura)."""
+    facturas_cliente = []
+    for factura_id, factura_data in facturas.items():
+        if factura_data.get('cliente_id') != cliente_id:
+            continue
+        factura_copia = factura_data.copy()
+        factura_copia['id'] = factura_id
+        total_abonado = 0
+        pagos = factura_copia.get('pagos') or []
+        try:
+            pagos_iterables = pagos.values() if isinstance(pagos, dict) else pagos
+        except Exception:
+            pagos_iterables = []
+        for pago in pagos_iterables:
+            try:
+                monto = float(str(pago.get('monto', 0)).replace('$', '').replace(',', ''))
+                total_abonado += monto
+            except Exception:
+                continue
+        try:
+            total_usd_factura = float(str(factura_copia.get('total_usd', factura_copia.get('total', 0))).replace('$', '').replace(',', ''))
+        except Exception:
+            total_usd_factura = 0.0
+        factura_copia['total_abonado'] = total_abonado
+        factura_copia['saldo_pendiente'] = max(total_usd_factura - total_abonado, 0)
+        facturas_cliente.append(factura_copia)
+    return facturas_cliente
+
+def _totales_historial(facturas_filtradas):
+    """(total USD, total Bs) de las facturas del historial."""
+    total_compras = sum(
+        float(f.get('total_usd', f.get('total', 0)).replace('$', '').replace(',', '')) if isinstance(f.get('total_usd', f.get('total', 0)), str) else float(f.get('total_usd', f.get('total', 0)))
+        for f in facturas_filtradas
+    )
+    total_bs = sum(
+        float(f.get('total_bs', 0)) if f.get('total_bs', 0) else (
+            float(f.get('total_usd', f.get('total', 0))) * float(f.get('tasa_bcv', 0) or 0)
+        )
+        for f in facturas_filtradas
+    )
+    return total_compras, total_bs
+
+def _productos_comprados(facturas_filtradas, inventario):
+    """Cantidad y valor comprado por producto, ordenados por valor total."""
+    productos_comprados = {}
+    for factura in facturas_filtradas:
+        productos = factura.get('productos', [])
+        cantidades = factura.get('cantidades', [])
+        precios = factura.get('precios', [])
+        
+        for i in range(len(productos)):
+            prod_id = productos[i]
+            if prod_id in inventario:
+                if prod_id not in productos_comprados:
+                    productos_comprados[prod_id] = {
+                        'nombre': inventario[prod_id]['nombre'],
+                        'cantidad': 0,
+                        'valor': 0
+                    }
+                try:
+                    cantidad = int(cantidades[i])
+                    precio = float(precios[i])
+                    productos_comprados[prod_id]['cantidad'] += cantidad
+                    productos_comprados[prod_id]['valor'] += cantidad * precio
+                except (ValueError, TypeError, IndexError):
+                    continue
+
+    return dict(sorted(productos_comprados.items(), key=lambda x: x[1]['valor'], reverse=True))
+
 @app.route('/clientes/<path:id>/historial')
 def historial_cliente(id):
     clientes = cargar_datos(ARCHIVO_CLIENTES)
@@ -4221,32 +4347,7 @@ def historial_cliente(id):
         filtro_mes = ''
 
     # Filtrar facturas por cliente, preservando el ID y calculando pagos/saldos
-    facturas_cliente = []
-    for factura_id, factura_data in facturas.items():
-        if factura_data.get('cliente_id') != id:
-            continue
-        factura_copia = factura_data.copy()
-        factura_copia['id'] = factura_id
-        # Calcular totales de pagos y saldo pendiente (alineado con ver_factura)
-        total_abonado = 0
-        pagos = factura_copia.get('pagos') or []
-        try:
-            pagos_iterables = pagos.values() if isinstance(pagos, dict) else pagos
-        except Exception:
-            pagos_iterables = []
-        for pago in pagos_iterables:
-            try:
-                monto = float(str(pago.get('monto', 0)).replace('$', '').replace(',', ''))
-                total_abonado += monto
-            except Exception:
-                continue
-        try:
-            total_usd_factura = float(str(factura_copia.get('total_usd', factura_copia.get('total', 0))).replace('$', '').replace(',', ''))
-        except Exception:
-            total_usd_factura = 0.0
-        factura_copia['total_abonado'] = total_abonado
-        factura_copia['saldo_pendiente'] = max(total_usd_factura - total_abonado, 0)
-        facturas_cliente.append(factura_copia)
+    facturas_cliente = _facturas_de_cliente(id, facturas)
     
     # Filtrar facturas por año y mes seleccionados
     facturas_filtradas = []
@@ -4289,43 +4390,10 @@ def historial_cliente(id):
     cuenta = next((c for c in cuentas.values() if c.get('cliente_id') == id), None)
     
     # Totales filtrados
-    total_compras = sum(
-        float(f.get('total_usd', f.get('total', 0)).replace('$', '').replace(',', '')) if isinstance(f.get('total_usd', f.get('total', 0)), str) else float(f.get('total_usd', f.get('total', 0)))
-        for f in facturas_filtradas
-    )
-    total_bs = sum(
-        float(f.get('total_bs', 0)) if f.get('total_bs', 0) else (
-            float(f.get('total_usd', f.get('total', 0))) * float(f.get('tasa_bcv', 0) or 0)
-        )
-        for f in facturas_filtradas
-    )
-
-    # Productos comprados filtrados
-    productos_comprados = {}
-    for factura in facturas_filtradas:
-        productos = factura.get('productos', [])
-        cantidades = factura.get('cantidades', [])
-        precios = factura.get('precios', [])
-        
-        for i in range(len(productos)):
-            prod_id = productos[i]
-            if prod_id in inventario:
-                if prod_id not in productos_comprados:
-                    productos_comprados[prod_id] = {
-                        'nombre': inventario[prod_id]['nombre'],
-                        'cantidad': 0,
-                        'valor': 0
-                    }
-                try:
-                    cantidad = int(cantidades[i])
-                    precio = float(precios[i])
-                    productos_comprados[prod_id]['cantidad'] += cantidad
-                    productos_comprados[prod_id]['valor'] += cantidad * precio
-                except (ValueError, TypeError, IndexError):
-                    continue
+    total_compras, total_bs = _totales_historial(facturas_filtradas)
 
-    # Ordenar productos por valor total
-    productos_comprados = dict(sorted(productos_comprados.items(), key=lambda x: x[1]['valor'], reverse=True))
+    # Productos comprados filtrados, ordenados por valor total
+    productos_comprados = _productos_comprados(facturas_filtradas, inventario)
 
     # Para el formulario de filtro (protegido)
     anios_disponibles_set = set()
@@ -4472,6 +4540,23 @@ def eliminar_productos_multiples():
     
     return redirect(url_for('mostrar_inventario'))
 
+# --- Helper de plantillas para imágenes de productos ---
+@app.template_global('imagen_producto_url')
+def imagen_producto_url(ruta_imagen, tamano='mediana', webp=False):
+    """URL de la imagen del producto en el tamaño pedido ('miniatura', 'mediana' u 'original').
+
+    Si el derivado no existe devuelve el original; con webp=True devuelve None si no hay WebP.
+    """
+    ruta = imagen_producto(ruta_imagen, tamano, webp)
+    return url_for('static', filename=ruta) if ruta else None
+
+@app.template_global('version_datos')
+def version_datos(nombre):
+    """Versión actual de 'inventario' o 'clientes', para las claves de cache_fragmento."""
+    versiones = {'inventario': versiones_inventario, 'clientes': versiones_clientes}[nombre]
+    foto = versiones.sincronizar()
+    return f"{foto['id']}-v{foto['version']}"
+
 # --- Filtro personalizado para fechas legibles ---
 @app.template_filter('datetimeformat')
 def datetimeformat(value, format='%d/%m/%Y %H:%M:%S'):
@@ -4521,20 +4606,20 @@ def es_number(value, decimales=2):
 @app.route('/cuentas-por-cobrar/enviar_recordatorio_whatsapp', methods=['POST'])
 def enviar_recordatorio_cuentas_por_cobrar_body():
     """Endpoint que recibe cliente_id por body JSON y genera recordatorio inteligente con diferentes niveles de urgencia."""
-    print(f"🔍 RUTA REGISTRADA: /cuentas-por-cobrar/enviar_recordatorio_whatsapp")
-    print(f"🔍 Endpoint llamado - Método: {request.method}")
+    logger.debug("🔍 RUTA REGISTRADA: /cuentas-por-cobrar/enviar_recordatorio_whatsapp")
+    logger.debug("🔍 Endpoint llamado - Método: %s", request.method)
     
     try:
         # Obtener datos del body
         data = request.get_json(silent=True)
-        print(f"🔍 JSON recibido: {data}")
+        logger.debug("🔍 JSON recibido: %s", data)
         
         if not data:
             data = request.form.to_dict()
-            print(f"🔍 Form data recibido: {data}")
+            logger.debug("🔍 Form data recibido: %s", data)
         
         cliente_id = str(data.get('cliente_id') or '').strip()
-        print(f"🔍 Cliente ID extraído: '{cliente_id}'")
+        logger.debug("🔍 Cliente ID extraído: '%s'", cliente_id)
         
         if not cliente_id:
             return jsonify({'error': 'Falta cliente_id en la solicitud'}), 400
@@ -4743,13 +4828,11 @@ def enviar_recordatorio_cuentas_por_cobrar_body():
             'total_facturas_vencidas': len(facturas_vencidas)
         }
         
-        print(f"✅ Recordatorio {tipo_mensaje} preparado exitosamente para {cliente.get('nombre', 'N/A')}")
+        logger.debug("✅ Recordatorio %s preparado exitosamente para %s", tipo_mensaje, cliente.get('nombre', 'N/A'))
         return jsonify(resultado)
         
     except Exception as e:
-        print(f"❌ Error en endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error en endpoint: %s", e)
         return jsonify({'error': f'Error: {str(e)}'}), 500
 
 @app.route('/cuentas-por-cobrar')
@@ -5282,7 +5365,7 @@ def mostrar_pagos_recibidos():
     tasa_paralelo = None
     tasa_bcv_eur = None
     try:
-        r = requests.get('https://s3.amazonaws.com/dolartoday/data.json', timeout=5)
+        r = cliente_http.get('https://s3.amazonaws.com/dolartoday/data.json')
         data = r.json()
         tasa_bcv = float(data['USD']['bcv']) if 'USD' in data and 'bcv' in data['USD'] else None
         tasa_paralelo = float(data['USD']['promedio']) if 'USD' in data and 'promedio' in data['USD'] else None
@@ -5386,6 +5469,7 @@ def reporte_facturas():
             factura['estado'] = 'pagada'
         else:
             factura['estado'] = 'pendiente'
+        seguridad_fiscal.firmar_estado(factura)
         factura['total_abonado'] = total_abonado
         factura['saldo_pendiente'] = max(total_factura - total_abonado, 0)
         facturas_filtradas.append(factura)
@@ -5469,7 +5553,7 @@ def reparar_totales_facturas():
             facturas[id] = factura
             actualizadas += 1
         except Exception as e:
-            print(f"Error actualizando factura {id}: {e}")
+            logger.error("Error actualizando factura %s: %s", id, e)
     guardar_datos(ARCHIVO_FACTURAS, facturas)
     flash(f'Se actualizaron {actualizadas} facturas con los totales y pagos recalculados.', 'success')
     return redirect(url_for('mostrar_facturas'))
@@ -5565,8 +5649,22 @@ def imprimir_cotizacion(id):
             continue
     return render_template('cotizacion_imprimir.html', cotizacion=cotizacion, clientes=clientes, inventario=inventario, empresa=empresa, zip=zip, total_usd=total_usd, total_bs=total_bs)
 
+def respuesta_pdf(clave, nombre_archivo, generar_pdf):
+    """Responde un PDF con ETag; si el cliente ya lo tiene (If-None-Match) devuelve 304 sin generarlo."""
+    if request.if_none_match.contains(clave):
+        response = make_response('', 304)
+    else:
+        response = make_response(generar_pdf())
+        response.headers['Content-Type'] = 'application/pdf'
+        response.headers['Content-Disposition'] = f'attachment; filename={nombre_archivo}'
+    response.set_etag(clave)
+    # El navegador puede guardar el PDF pero debe revalidarlo en cada descarga
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/cotizaciones/<id>/pdf')
 def descargar_cotizacion_pdf(id):
+    pdfkit = importar_opcional('pdfkit')
     if pdfkit is None:
         flash('PDFKit no está instalado. Instala con: pip install pdfkit', 'danger')
         return redirect(url_for('ver_cotizacion', id=id))
@@ -5593,51 +5691,15 @@ def descargar_cotizacion_pdf(id):
                              empresa=empresa,
                              zip=zip)
     try:
-        # Intentar diferentes ubicaciones comunes de wkhtmltopdf
-        wkhtmltopdf_paths = [
-            'C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe',
-            '/usr/bin/wkhtmltopdf',
-            '/usr/local/bin/wkhtmltopdf',
-            'wkhtmltopdf'  # Si está en el PATH
-        ]
-        
-        config = None
-        for path in wkhtmltopdf_paths:
-            if os.path.exists(path):
-                config = pdfkit.configuration(wkhtmltopdf=path)
-                break
-        
-        if config is None:
-            # Si no se encuentra wkhtmltopdf, intentar usar el comando directamente
-            config = pdfkit.configuration(wkhtmltopdf='wkhtmltopdf')
-            
-        options = {
-            'page-size': 'A4',
-            'margin-top': '20mm',
-            'margin-right': '15mm',
-            'margin-bottom': '20mm',
-            'margin-left': '15mm',
-            'encoding': 'UTF-8',
-            'no-outline': None,
-            'quiet': '',
-            'print-media-type': '',
-            'disable-smart-shrinking': '',
-            'dpi': 300,
-            'image-quality': 100,
-            'enable-local-file-access': None,
-            'footer-right': '[page] de [topage]',
-            'footer-font-size': '8',
-            'footer-spacing': '5',
-            'javascript-delay': '1000',
-            'no-stop-slow-scripts': None
-        }
-        pdf = pdfkit.from_string(rendered, False, configuration=config, options=options)
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=cotizacion_{cotizacion["numero"]}.pdf'
-        return response
+        # El HTML de la cotización no depende de la hora: su hash identifica al PDF
+        clave = servicio_pdf.clave_documento('cotizacion', rendered)
+        return respuesta_pdf(clave, f'cotizacion_{cotizacion["numero"]}.pdf',
+                             lambda: servicio_pdf.obtener_o_renderizar(clave, 'cotizacion', lambda: rendered))
+    except ServicioPDFOcupado as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('ver_cotizacion', id=id))
     except Exception as e:
-        print(f"Error al generar PDF: {str(e)}")  # Para debugging
+        logger.error("Error al generar PDF: %s", str(e))  # Para debugging
         flash(f'Error al generar PDF: {str(e)}', 'danger')
         return redirect(url_for('ver_cotizacion', id=id))
 
@@ -5753,9 +5815,37 @@ def limpiar_bitacora():
         flash('Bitácora limpiada exitosamente.', 'success')
     except Exception as e:
         flash(f'Error al limpiar la bitácora: {str(e)}', 'danger')
-    
+
     return redirect(url_for('ver_bitacora'))
 
+# --- Métricas y perfilado (instrumentacion.py) ---
+@app.route('/metrics')
+def metricas_prometheus():
+    """Métricas del proceso en formato de texto de Prometheus."""
+    if not instrumentacion.acceso_metricas():
+        abort(401)
+    respuesta = Response(instrumentacion.exportar_prometheus(), mimetype='text/plain; version=0.0.4')
+    respuesta.cache_control.no_store = True
+    return respuesta
+
+@app.route('/admin/metricas')
+@admin_required
+def ver_metricas():
+    """Página de administración con los tiempos por ruta y las peticiones más lentas."""
+    return render_template('metricas.html',
+                           resumen=instrumentacion.obtener_resumen(),
+                           hosts=cliente_http.obtener_metricas(),
+                           pdf=servicio_pdf.estadisticas if servicio_pdf.esta_inicializada() else None,
+                           fragmentos=capa_plantillas.fragmentos.obtener_estadisticas(),
+                           precalentamiento=capa_plantillas.precalentamiento,
+                           perfiles=instrumentacion.listar_perfiles())
+
+@app.route('/admin/metricas/perfiles/<nombre>')
+@admin_required
+def descargar_perfil(nombre):
+    """Descarga un perfil guardado con la cabecera X-Perfil."""
+    return send_from_directory(os.path.abspath(instrumentacion.directorio_perfiles), nombre, as_attachment=True)
+
 @app.route('/facturas/<id>/registrar_pago', methods=['POST'])
 @login_required
 def registrar_pago(id):
@@ -5814,6 +5904,7 @@ def registrar_pago(id):
             factura['estado'] = 'pendiente'
         
         factura['saldo_pendiente'] = saldo_pendiente
+        seguridad_fiscal.firmar_estado(factura)
         
         # Sincronizar automáticamente con cuentas por cobrar
         sincronizar_cuentas_por_cobrar(factura)
@@ -5862,6 +5953,7 @@ def eliminar_pago(id, pago_id):
                     factura['estado'] = 'pendiente'
                 
                 factura['saldo_pendiente'] = saldo_pendiente
+                seguridad_fiscal.firmar_estado(factura)
                 pagos.pop(i)
                 pago_encontrado = True
                 break
@@ -5913,77 +6005,77 @@ def enviar_recordatorio_whatsapp(id):
         flash('ID de factura inválido', 'danger')
         return redirect(url_for('mostrar_facturas'))
     try:
-        print(f"🔍 Iniciando envío de recordatorio WhatsApp para factura: {id}")
+        logger.debug("🔍 Iniciando envío de recordatorio WhatsApp para factura: %s", id)
         
         # Cargar datos necesarios
         facturas = cargar_datos(ARCHIVO_FACTURAS)
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         
-        print(f"📊 Facturas cargadas: {len(facturas)}")
-        print(f"👥 Clientes cargados: {len(clientes)}")
+        logger.debug("📊 Facturas cargadas: %s", len(facturas))
+        logger.debug("👥 Clientes cargados: %s", len(clientes))
         
         if id not in facturas:
-            print(f"❌ Factura {id} no encontrada")
+            logger.error("❌ Factura %s no encontrada", id)
             return jsonify({'error': 'Factura no encontrada'}), 404
         
         factura = facturas[id]
         cliente_id = factura.get('cliente_id')
         
-        print(f"👤 Cliente ID: {cliente_id}")
-        print(f"📄 Factura: {factura.get('numero', 'N/A')}")
+        logger.debug("👤 Cliente ID: %s", cliente_id)
+        logger.debug("📄 Factura: %s", factura.get('numero', 'N/A'))
         
         if not cliente_id:
-            print(f"❌ Factura {id} no tiene cliente_id")
+            logger.error("❌ Factura %s no tiene cliente_id", id)
             return jsonify({'error': 'La factura no tiene cliente asignado'}), 400
         
         # Verificar si el cliente_id está en la lista de clientes
-        print(f"🔍 Buscando cliente_id '{cliente_id}' en clientes...")
-        print(f"🔍 Clientes disponibles: {list(clientes.keys())}")
+        logger.debug("🔍 Buscando cliente_id '%s' en clientes...", cliente_id)
+        logger.debug("🔍 Clientes disponibles: %s", list(clientes.keys()))
         
         if cliente_id not in clientes:
-            print(f"❌ Cliente {cliente_id} no encontrado en clientes")
+            logger.error("❌ Cliente %s no encontrado en clientes", cliente_id)
             return jsonify({'error': 'Cliente no encontrado'}), 404
         
         cliente = clientes[cliente_id]
         telefono = cliente.get('telefono', '')
         
-        print(f"📱 Teléfono del cliente: {telefono}")
-        print(f"👤 Nombre del cliente: {cliente.get('nombre', 'N/A')}")
+        logger.debug("📱 Teléfono del cliente: %s", telefono)
+        logger.debug("👤 Nombre del cliente: %s", cliente.get('nombre', 'N/A'))
         
         if not telefono:
-            print(f"❌ Cliente {cliente_id} no tiene teléfono")
+            logger.error("❌ Cliente %s no tiene teléfono", cliente_id)
             return jsonify({'error': 'El cliente no tiene número de teléfono registrado'}), 400
         
         # Limpiar y formatear el número de teléfono
         telefono_original = telefono
         try:
             telefono = limpiar_numero_telefono(telefono)
-            print(f"📱 Teléfono formateado exitosamente: {telefono}")
+            logger.debug("📱 Teléfono formateado exitosamente: %s", telefono)
         except Exception as e:
-            print(f"❌ Error formateando teléfono: {e}")
+            logger.error("❌ Error formateando teléfono: %s", e)
             return jsonify({'error': f'Error formateando teléfono: {str(e)}'}), 400
         
-        print(f"📱 Teléfono original: {telefono_original}")
-        print(f"📱 Teléfono formateado: {telefono}")
+        logger.debug("📱 Teléfono original: %s", telefono_original)
+        logger.debug("📱 Teléfono formateado: %s", telefono)
         
         if not telefono or len(telefono) < 10:
-            print(f"❌ Teléfono formateado no válido: {telefono}")
+            logger.error("❌ Teléfono formateado no válido: %s", telefono)
             return jsonify({'error': 'El número de teléfono no es válido'}), 400
         
         # Crear mensaje personalizado
         try:
             mensaje = crear_mensaje_recordatorio(factura, cliente)
-            print(f"💬 Mensaje creado exitosamente: {len(mensaje)} caracteres")
+            logger.debug("💬 Mensaje creado exitosamente: %s caracteres", len(mensaje))
         except Exception as e:
-            print(f"❌ Error creando mensaje: {e}")
+            logger.error("❌ Error creando mensaje: %s", e)
             return jsonify({'error': f'Error creando mensaje: {str(e)}'}), 400
         
         # Generar enlace de WhatsApp
         try:
             enlace_whatsapp = generar_enlace_whatsapp(telefono, mensaje)
-            print(f"🔗 Enlace WhatsApp generado exitosamente: {enlace_whatsapp}")
+            logger.debug("🔗 Enlace WhatsApp generado exitosamente: %s", enlace_whatsapp)
         except Exception as e:
-            print(f"❌ Error generando enlace: {e}")
+            logger.error("❌ Error generando enlace: %s", e)
             return jsonify({'error': f'Error generando enlace: {str(e)}'}), 400
         
         # Registrar en la bitácora
@@ -5993,9 +6085,9 @@ def enviar_recordatorio_whatsapp(id):
                 'Recordatorio WhatsApp Enviado',
                 f'Factura {factura.get("numero", "N/A")} - Cliente: {cliente.get("nombre", "N/A")}'
             )
-            print("📝 Registrado en bitácora")
+            logger.debug("📝 Registrado en bitácora")
         except Exception as e:
-            print(f"⚠️ Error registrando en bitácora: {e}")
+            logger.error("⚠️ Error registrando en bitácora: %s", e)
         
         resultado = {
             'success': True,
@@ -6012,15 +6104,12 @@ def enviar_recordatorio_whatsapp(id):
             }
         }
         
-        print(f"✅ Recordatorio preparado exitosamente para {cliente.get('nombre', 'N/A')}")
+        logger.debug("✅ Recordatorio preparado exitosamente para %s", cliente.get('nombre', 'N/A'))
         return jsonify(resultado)
         
     except Exception as e:
         error_msg = f"Error al enviar recordatorio WhatsApp: {str(e)}"
-        print(f"❌ {error_msg}")
-        import traceback
-        print(f"🔍 Traceback completo:")
-        traceback.print_exc()
+        logger.exception("❌ %s", error_msg)
         
         return jsonify({
             'success': False,
@@ -6041,8 +6130,7 @@ def guardar_ubicacion_precisa():
         # Reverse geocoding con Nominatim
         try:
             url = f'https://nominatim.openstreetmap.org/reverse?format=json&lat={lat}&lon={lon}&zoom=10&addressdetails=1'
-            headers = {'User-Agent': 'mi-app-web/1.0'}
-            resp = requests.get(url, headers=headers, timeout=5)
+            resp = cliente_http.get(url, timeout=5)
             if resp.status_code == 200:
                 info = resp.json().get('address', {})
                 ciudad = info.get('city') or info.get('town') or info.get('village') or info.get('hamlet') or ''
@@ -6061,7 +6149,7 @@ def guardar_ubicacion_precisa():
 def probar_recordatorio_whatsapp(id):
     """Ruta de prueba para verificar el funcionamiento del recordatorio WhatsApp."""
     try:
-        print(f"🧪 PROBANDO recordatorio WhatsApp para factura: {id}")
+        logger.debug("🧪 PROBANDO recordatorio WhatsApp para factura: %s", id)
         
         # Cargar datos necesarios
         facturas = cargar_datos(ARCHIVO_FACTURAS)
@@ -6145,7 +6233,7 @@ def probar_recordatorio_whatsapp(id):
             'error_type': type(e).__name__,
             'traceback': traceback.format_exc()
         }
-        print(f"❌ Error en prueba: {error_info}")
+        logger.error("❌ Error en prueba: %s", error_info)
         return jsonify(error_info), 500
         
         # Probar generación de mensaje
@@ -6181,7 +6269,7 @@ def probar_recordatorio_whatsapp(id):
 def forzar_actualizacion_tasa_bcv():
     """Fuerza la actualización de la tasa BCV desde la web del BCV."""
     try:
-        print("🔄 FORZANDO actualización de tasa BCV desde web...")
+        logger_tasas.debug("🔄 FORZANDO actualización de tasa BCV desde web...")
         
         # Obtener tasa desde web (ignorar archivo local)
         nueva_tasa = obtener_tasa_bcv_dia()
@@ -6194,20 +6282,20 @@ def forzar_actualizacion_tasa_bcv():
                 'fecha_actualizacion': datetime.now().isoformat(),
                 'fuente': 'BCV Web Oficial'
             }
-            print(f"✅ Tasa BCV actualizada: {nueva_tasa}")
+            logger_tasas.debug("✅ Tasa BCV actualizada: %s", nueva_tasa)
         else:
             resultado = {
                 'success': False,
                 'message': 'No se pudo obtener la tasa BCV desde la web',
                 'error': 'Tasa no válida o no encontrada'
             }
-            print("❌ No se pudo obtener tasa válida desde web")
+            logger_tasas.error("❌ No se pudo obtener tasa válida desde web")
         
         return jsonify(resultado)
         
     except Exception as e:
         error_msg = f"Error forzando actualización: {str(e)}"
-        print(f"❌ {error_msg}")
+        logger_tasas.error("❌ %s", error_msg)
         return jsonify({
             'success': False,
             'message': error_msg,
@@ -6300,7 +6388,7 @@ def actualizar_tasa_bcv():
         })
         
     except Exception as e:
-        print(f"Error al actualizar tasa BCV: {str(e)}")
+        logger_tasas.error("Error al actualizar tasa BCV: %s", str(e))
         return jsonify({
             'success': False,
             'error': f'Error al actualizar la tasa BCV: {str(e)}'
@@ -6486,7 +6574,7 @@ def ajustes_masivos():
 @app.route('/api/tasas')
 def api_tasas():
     try:
-        r = requests.get('https://s3.amazonaws.com/dolartoday/data.json', timeout=5)
+        r = cliente_http.get('https://s3.amazonaws.com/dolartoday/data.json')
         data = r.json()
         tasa_bcv = float(data['USD']['bcv']) if 'USD' in data and 'bcv' in data['USD'] else None
         tasa_paralelo = float(data['USD']['promedio']) if 'USD' in data and 'promedio' in data['USD'] else None
@@ -6505,13 +6593,13 @@ def api_tasas_actualizadas():
         # 1. Obtener tasa BCV (USD/BS) desde Monitor Dólar
         tasa_bcv = None
         try:
-            r = requests.get('https://s3.amazonaws.com/dolartoday/data.json', timeout=5)
+            r = cliente_http.get('https://s3.amazonaws.com/dolartoday/data.json')
             if r.status_code == 200:
                 data = r.json()
                 if 'USD' in data and 'bcv' in data['USD']:
                     tasa_bcv = float(str(data['USD']['bcv']).replace(',', '.'))
         except Exception as e:
-            print(f"Error obteniendo BCV de Monitor Dólar: {e}")
+            logger_tasas.error("Error obteniendo BCV de Monitor Dólar: %s", e)
             tasa_bcv = None
 
         # 2. Tasa paralela: manual (no scraping ni API)
@@ -6522,7 +6610,7 @@ def api_tasas_actualizadas():
         tasa_bcv_eur = None
         try:
             url_bcv = 'https://www.bcv.org.ve/'
-            resp = requests.get(url_bcv, timeout=10, verify=False)
+            resp = cliente_http.get(url_bcv, timeout=(5, 10))
             if resp.status_code == 200:
                 from bs4 import BeautifulSoup
                 import re
@@ -6540,11 +6628,11 @@ def api_tasas_actualizadas():
                     except Exception as e:
                         continue
             if tasa_bcv_eur is None:
-                print('No se encontró la tasa EUR en <strong> en el HTML del BCV. Primeros 2000 caracteres:')
-                print(resp.text[:2000])
+                logger_tasas.debug("No se encontró la tasa EUR en <strong> en el HTML del BCV. Primeros 2000 caracteres:")
+                logger_tasas.debug("%s", resp.text[:2000])
                 tasa_bcv_eur = 0
         except Exception as e:
-            print(f"Error obteniendo EUR/BS de BCV: {e}")
+            logger_tasas.error("Error obteniendo EUR/BS de BCV: %s", e)
             tasa_bcv_eur = 0
 
         # Fallbacks
@@ -6579,6 +6667,17 @@ def api_tasas_actualizadas():
             'fecha_actualizacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         })
 
+def _filtrar_lista_precios(inventario, categoria, precio_min, precio_max, busqueda):
+    """Productos de la lista de precios que cumplen los filtros, en el orden del inventario."""
+    def _precio(valor):
+        try:
+            return float(valor) if valor not in (None, '') else None
+        except ValueError:
+            return None
+    ids = indice_productos.filtrar(q=busqueda, categoria=categoria,
+                                   precio_min=_precio(precio_min), precio_max=_precio(precio_max))
+    return {id_producto: inventario[id_producto] for id_producto in ids if id_producto in inventario}
+
 @app.route('/inventario/lista-precios/<tipo>')
 @login_required
 def lista_precios(tipo):
@@ -6596,28 +6695,10 @@ def lista_precios(tipo):
     empresa = cargar_datos('empresa.json')
     fecha_actual = datetime.now()
     
-    # Obtener categorías únicas
-    categorias = sorted(set(producto.get('categoria', '') for producto in inventario.values() if producto.get('categoria')))
-    
-    # Filtrar productos
-    productos_filtrados = {}
-    for id_producto, producto in inventario.items():
-        # Aplicar filtros
-        if filtro_categoria and producto.get('categoria') != filtro_categoria:
-            continue
-            
-        precio = float(producto.get('precio', 0))
-        if filtro_precio_min and precio < float(filtro_precio_min):
-            continue
-        if filtro_precio_max and precio > float(filtro_precio_max):
-            continue
-            
-        if filtro_busqueda:
-            busqueda = filtro_busqueda.lower()
-            if busqueda not in producto.get('nombre', '').lower():
-                continue
-                
-        productos_filtrados[id_producto] = producto
+    # Categorías únicas y productos filtrados desde el índice del catálogo
+    categorias = indice_productos.categorias(ordenadas=True)
+    productos_filtrados = _filtrar_lista_precios(inventario, filtro_categoria, filtro_precio_min,
+                                                 filtro_precio_max, filtro_busqueda)
     
     return render_template('lista_precios.html', 
                          inventario=productos_filtrados, 
@@ -6643,6 +6724,8 @@ def lista_precios_pdf(tipo):
     # Cargar datos
     inventario = cargar_datos(ARCHIVO_INVENTARIO)
     empresa = cargar_datos('empresa.json')
+    motor = motor_pdf('lista_precios')
+    logo_local = os.path.join(app.static_folder, empresa['logo']) if empresa.get('logo') else None
     
     # Convertir rutas relativas a absolutas para las imágenes
     if empresa.get('logo'):
@@ -6651,24 +6734,13 @@ def lista_precios_pdf(tipo):
         empresa['membrete'] = request.url_root.rstrip('/') + url_for('static', filename=empresa['membrete'])
     
     fecha_actual = datetime.now()
-    # Obtener categorías únicas
-    categorias = sorted(set(producto.get('categoria', '') for producto in inventario.values() if producto.get('categoria')))
-    # Filtrar productos
-    productos_filtrados = {}
-    for id_producto, producto in inventario.items():
-        if filtro_categoria and producto.get('categoria') != filtro_categoria:
-            continue
-        precio = float(producto.get('precio', 0))
-        if filtro_precio_min and precio < float(filtro_precio_min):
-            continue
-        if filtro_precio_max and precio > float(filtro_precio_max):
-            continue
-        if filtro_busqueda:
-            busqueda = filtro_busqueda.lower()
-            if busqueda not in producto.get('nombre', '').lower():
-                continue
-        productos_filtrados[id_producto] = producto
-    rendered = render_template('lista_precios.html', 
+    # Categorías únicas y productos filtrados desde el índice del catálogo
+    categorias = indice_productos.categorias(ordenadas=True)
+    productos_filtrados = _filtrar_lista_precios(inventario, filtro_categoria, filtro_precio_min,
+                                                 filtro_precio_max, filtro_busqueda)
+
+    def generar_html():
+        return render_template('lista_precios.html', 
                              inventario=productos_filtrados, 
                              tipo=tipo, 
                              empresa=empresa, 
@@ -6680,52 +6752,153 @@ def lista_precios_pdf(tipo):
                              filtro_precio_min=filtro_precio_min,
                              filtro_precio_max=filtro_precio_max,
                              filtro_busqueda=filtro_busqueda)
+
+    def generar_pdf():
+        if motor == MOTOR_REPORTLAB:
+            # Catálogos grandes: las filas van directo al PDF, sin HTML ni wkhtmltopdf
+            return servicio_pdf.obtener_o_generar(clave, lambda: generar_lista_precios(
+                productos_filtrados, tipo, empresa, fecha_actual, logo_local))
+        return servicio_pdf.obtener_o_renderizar(clave, 'lista_precios', generar_html)
+
     try:
-        # Intentar diferentes ubicaciones comunes de wkhtmltopdf
-        wkhtmltopdf_paths = [
-            'C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe',
-            '/usr/bin/wkhtmltopdf',
-            '/usr/local/bin/wkhtmltopdf',
-            'wkhtmltopdf'  # Si está en el PATH
-        ]
-        
-        config = None
-        for path in wkhtmltopdf_paths:
-            if os.path.exists(path):
-                config = pdfkit.configuration(wkhtmltopdf=path)
-                break
-        
-        if config is None:
-            # Si no se encuentra wkhtmltopdf, intentar usar el comando directamente
-            config = pdfkit.configuration(wkhtmltopdf='wkhtmltopdf')
-        
-        options = {
-            'page-size': 'A4',
-            'margin-top': '20mm',
-            'margin-right': '20mm',
-            'margin-bottom': '20mm',
-            'margin-left': '20mm',
-            'encoding': 'UTF-8',
-            'no-outline': None,
-            'quiet': '',
-            'print-media-type': None,
-            'orientation': 'Portrait',
-            'dpi': 300,
-            'image-quality': 100,
-            'enable-local-file-access': None,
-            'javascript-delay': '1000',
-            'no-stop-slow-scripts': None
-        }
-        pdf = pdfkit.from_string(rendered, False, options=options, configuration=config)
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=lista_precios_{tipo}.pdf'
-        return response
+        if motor == MOTOR_WKHTMLTOPDF and importar_opcional('pdfkit') is None:
+            raise ImportError('PDFKit no está instalado. Instala con: pip install pdfkit')
+        # Clave por contenido (productos, empresa, filtros, fecha de emisión y contenido de la
+        # plantilla): un acierto no renderiza ni el HTML, y cada día se emite con su propia fecha.
+        # Ambos motores imprimen solo la fecha, sin hora: un PDF en caché nunca muestra una hora vieja
+        plantilla = os.path.join(app.root_path, app.template_folder, 'lista_precios.html')
+        clave = servicio_pdf.clave_documento('lista_precios', tipo, productos_filtrados, empresa, categorias,
+                                             [filtro_categoria, filtro_precio_min, filtro_precio_max, filtro_busqueda],
+                                             fecha_actual.strftime('%Y-%m-%d'),
+                                             servicio_pdf.hash_plantilla(plantilla), motor)
+        return respuesta_pdf(clave, f'lista_precios_{tipo}.pdf', generar_pdf)
+    except ServicioPDFOcupado as e:
+        flash(str(e), 'warning')
+        return redirect(url_for('lista_precios', tipo=tipo))
     except Exception as e:
-        print(f"Error al generar PDF: {str(e)}")  # Para debugging
+        logger.error("Error al generar PDF: %s", str(e))  # Para debugging
         flash(f'Error al generar PDF: {str(e)}', 'danger')
         return redirect(url_for('lista_precios', tipo=tipo))
 
+# ========================================
+# TRABAJOS PDF MASIVOS (EN SEGUNDO PLANO)
+# ========================================
+
+def _parametro_entero(nombre, defecto):
+    datos = request.get_json(silent=True) or request.form or request.args
+    try:
+        return int(datos.get(nombre) or defecto)
+    except (TypeError, ValueError):
+        return defecto
+
+def _documentos_facturas_mes(anio, mes):
+    """(nombre, html) de cada factura del mes, con las imágenes leídas del disco."""
+    facturas = cargar_datos(ARCHIVO_FACTURAS)
+    clientes = cargar_datos(ARCHIVO_CLIENTES)
+    inventario = cargar_datos(ARCHIVO_INVENTARIO)
+    empresa = cargar_empresa()
+    prefijo = f'{anio:04d}-{mes:02d}'
+    documentos = []
+    for factura_id, factura in sorted(facturas.items(), key=lambda x: str(x[1].get('numero', ''))):
+        if not str(factura.get('fecha', '')).startswith(prefijo):
+            continue
+        factura = dict(factura)
+        factura['id'] = factura_id
+        html = render_template('factura_imprimir.html', factura=factura, clientes=clientes,
+                               inventario=inventario, empresa=empresa, now=datetime.now, zip=zip)
+        documentos.append((f"factura_{factura.get('numero') or factura_id}",
+                           rutas_estaticas_locales(html, app.static_folder)))
+    return documentos
+
+def _documentos_historiales(anio):
+    """(nombre, html) del historial de cada cliente con facturas en el año."""
+    facturas = cargar_datos(ARCHIVO_FACTURAS)
+    clientes_con_facturas = sorted({
+        f.get('cliente_id') for f in facturas.values()
+        if f.get('cliente_id') and str(f.get('fecha', '')).startswith(f'{anio:04d}-')
+    })
+    clientes = cargar_datos(ARCHIVO_CLIENTES)
+    inventario = cargar_datos(ARCHIVO_INVENTARIO)
+    empresa = cargar_empresa()
+    documentos = []
+    for cliente_id in clientes_con_facturas:
+        if cliente_id not in clientes:
+            continue
+        facturas_anio = [f for f in _facturas_de_cliente(cliente_id, facturas)
+                         if str(f.get('fecha', '')).startswith(f'{anio:04d}-')]
+        facturas_anio.sort(key=lambda f: (str(f.get('fecha', '')), str(f.get('numero', ''))))
+        total_compras, total_bs = _totales_historial(facturas_anio)
+        html = render_template('historial_cliente_imprimir.html', cliente=dict(clientes[cliente_id], id=cliente_id),
+                               facturas=facturas_anio, anio=anio, empresa=empresa,
+                               total_compras=total_compras, total_bs=total_bs,
+                               productos_comprados=_productos_comprados(facturas_anio, inventario),
+                               now=datetime.now)
+        documentos.append((f'historial_cliente_{cliente_id}', rutas_estaticas_locales(html, app.static_folder)))
+    return documentos
+
+@app.route('/trabajos-pdf/facturas-mes', methods=['POST'])
+@login_required
+def crear_trabajo_facturas_mes():
+    """Crea un trabajo que genera el PDF de todas las facturas de un mes."""
+    if importar_opcional('pdfkit') is None:
+        return jsonify({'error': 'PDFKit no está instalado. Instala con: pip install pdfkit'}), 503
+    hoy = datetime.now()
+    anio = _parametro_entero('anio', hoy.year)
+    mes = _parametro_entero('mes', hoy.month)
+    if not 1 <= mes <= 12:
+        return jsonify({'error': 'Mes inválido'}), 400
+    trabajo = gestor_trabajos_pdf.crear_trabajo(
+        'facturas_mes', f'Facturas {anio:04d}-{mes:02d}', _documentos_facturas_mes(anio, mes),
+        'factura', usuario=session.get('usuario'))
+    return jsonify({**trabajo, 'url_estado': url_for('estado_trabajo_pdf', id=trabajo['id']),
+                    'url_zip': url_for('descargar_trabajo_pdf', id=trabajo['id'])}), 202
+
+@app.route('/trabajos-pdf/historiales', methods=['POST'])
+@login_required
+def crear_trabajo_historiales():
+    """Crea un trabajo que genera el historial en PDF de cada cliente con facturas en el año."""
+    if importar_opcional('pdfkit') is None:
+        return jsonify({'error': 'PDFKit no está instalado. Instala con: pip install pdfkit'}), 503
+    anio = _parametro_entero('anio', datetime.now().year)
+    trabajo = gestor_trabajos_pdf.crear_trabajo(
+        'historiales_clientes', f'Historiales de clientes {anio:04d}', _documentos_historiales(anio),
+        'historial_cliente', usuario=session.get('usuario'))
+    return jsonify({**trabajo, 'url_estado': url_for('estado_trabajo_pdf', id=trabajo['id']),
+                    'url_zip': url_for('descargar_trabajo_pdf', id=trabajo['id'])}), 202
+
+@app.route('/trabajos-pdf')
+@login_required
+def listar_trabajos_pdf():
+    return jsonify(gestor_trabajos_pdf.listar_trabajos())
+
+@app.route('/trabajos-pdf/<id>')
+@login_required
+def estado_trabajo_pdf(id):
+    """Progreso del trabajo (para polling); reanuda el trabajo si quedó interrumpido."""
+    try:
+        trabajo = gestor_trabajos_pdf.obtener_estado(id)
+    except ValueError:
+        trabajo = None
+    if trabajo is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    return jsonify(trabajo)
+
+@app.route('/trabajos-pdf/<id>/zip')
+@login_required
+def descargar_trabajo_pdf(id):
+    """ZIP con los PDF del trabajo, enviado a medida que se arma."""
+    try:
+        trabajo = gestor_trabajos_pdf.obtener_estado(id)
+    except ValueError:
+        trabajo = None
+    if trabajo is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    if not trabajo['terminado']:
+        return jsonify({'error': 'El trabajo aún no termina', 'progreso': trabajo['progreso']}), 409
+    nombre = secure_filename(trabajo['titulo']) or trabajo['id']
+    return Response(gestor_trabajos_pdf.generar_zip(id), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename={nombre}.zip'})
+
 # ========================================
 # RUTAS SENIAT - INTERFACE DE CONSULTA Y ADMINISTRACIÓN
 # ========================================
@@ -6752,9 +6925,11 @@ def seniat_consulta():
         'estado': 'ACTIVO',
         'endpoints_disponibles': [
             '/seniat/facturas/consultar',
+            '/seniat/facturas/estatus',
             '/seniat/exportar/facturas',
             '/seniat/exportar/logs',
             '/seniat/auditoria/integridad',
+            '/seniat/numeracion/consecutividad',
             '/seniat/sistema/estado'
         ],
         'timestamp': datetime.now().isoformat()
@@ -6808,6 +6983,11 @@ def seniat_consultar_facturas():
             }
             resultados.append(factura_seniat)
         
+        # Estatus en el SENIAT desde la caché local (sin consultas remotas por factura)
+        estatus = cache_estatus_seniat.obtener_varios([f['numero'] for f in resultados])
+        for factura_seniat in resultados:
+            factura_seniat['estatus_seniat'] = estatus.get(factura_seniat['numero'])
+        
         # Registrar consulta SENIAT
         seguridad_fiscal.registrar_log_fiscal(
             usuario='SENIAT',
@@ -6829,6 +7009,31 @@ def seniat_consultar_facturas():
             'codigo': 'CONSULTA_ERROR'
         }), 500
 
+@app.route('/seniat/facturas/estatus')
+def seniat_estatus_facturas():
+    """Estatus de facturas en el SENIAT, respondido desde la caché local"""
+    try:
+        numeros = [n.strip() for n in request.args.get('numeros', request.args.get('numero', '')).split(',') if n.strip()]
+        tipo = request.args.get('tipo', 'FACTURA')
+        # Solo se consulta al SENIAT si se pide explícitamente y para un único documento
+        if len(numeros) == 1 and request.args.get('refrescar') == '1':
+            estatus = {numeros[0]: cache_estatus_seniat.consultar(numeros[0], tipo, permitir_remoto=True)}
+        else:
+            estatus = cache_estatus_seniat.obtener_varios(numeros, tipo)
+            
+        return jsonify({
+            'tipo': tipo,
+            'estatus': estatus,
+            'sin_estatus': [n for n in numeros if n not in estatus],
+            'ttl_segundos': cache_estatus_seniat.ttl,
+            'timestamp_consulta': datetime.now().isoformat()
+        })
+    except Exception as e:
+        return jsonify({
+            'error': f'Error consultando estatus: {str(e)}',
+            'codigo': 'ESTATUS_ERROR'
+        }), 500
+
 @app.route('/seniat/exportar/facturas')
 def seniat_exportar_facturas():
     """Exporta facturas para auditoría SENIAT"""
@@ -6863,12 +7068,27 @@ def seniat_exportar_facturas():
             'codigo': 'EXPORTACION_ERROR'
         }), 500
 
+@app.route('/seniat/numeracion/consecutividad')
+def seniat_consecutividad_numeracion():
+    """Justificación de cada número de factura: emitido, hueco registrado o pendiente en un bloque"""
+    try:
+        conciliados = control_numeracion.conciliar_arrendamientos('FACTURA')
+        reporte = control_numeracion.reporte_consecutividad('FACTURA')
+        reporte['arrendamientos_conciliados'] = len(conciliados)
+        return jsonify(reporte)
+    except Exception as e:
+        return jsonify({
+            'error': f'Error en reporte de consecutividad: {str(e)}',
+            'codigo': 'CONSECUTIVIDAD_ERROR'
+        }), 500
+
 @app.route('/seniat/sistema/estado')
 def seniat_estado_sistema():
     """Obtiene el estado del sistema fiscal"""
     try:
         # Estado de numeración
         estado_numeracion = control_numeracion.obtener_estado_numeracion()
+        consecutividad = control_numeracion.reporte_consecutividad('FACTURA')
         
         # Estado de comunicación SENIAT
         estado_comunicacion = comunicador_seniat.obtener_configuracion_actual()
@@ -6885,11 +7105,16 @@ def seniat_estado_sistema():
             },
             'numeracion': {
                 'series_activas': len([s for s in estado_numeracion.get('series', {}).values() if s.get('activa')]),
-                'total_documentos_emitidos': estado_numeracion.get('auditoria', {}).get('total_documentos_emitidos', 0)
+                'total_documentos_emitidos': estado_numeracion.get('auditoria', {}).get('total_documentos_emitidos', 0),
+                'numeros_en_huecos': consecutividad['numeros_en_huecos'],
+                'bloques_abiertos': len(consecutividad['arrendamientos_abiertos']),
+                'huecos_consistentes': consecutividad['huecos_consistentes']
             },
             'comunicacion_seniat': {
                 'configurado': bool(estado_comunicacion['configuracion'].get('rif_empresa')),
-                'conectado': estado_comunicacion['estado_conexion'].get('conectado', False)
+                'conectado': estado_comunicacion['estado_conexion'].get('conectado', False),
+                'envio_automatico': app.config['SENIAT_ENVIO_AUTOMATICO'],
+                'cola_envio': cola_seniat.obtener_estadisticas()['por_estado']
             },
             'seguridad': {
                 'logs_fiscales_activos': True,
@@ -6910,7 +7135,7 @@ def seniat_estado_sistema():
 def limpiar_numero_telefono(telefono):
     """Limpia y formatea un número de teléfono para WhatsApp."""
     try:
-        print(f"🔧 Formateando teléfono: {telefono}")
+        logger.debug("🔧 Formateando teléfono: %s", telefono)
         
         # Verificar que el teléfono no esté vacío
         if not telefono or str(telefono).strip() == '':
@@ -6918,7 +7143,7 @@ def limpiar_numero_telefono(telefono):
         
         # Remover todos los caracteres no numéricos
         telefono_limpio = re.sub(r'[^\d]', '', str(telefono))
-        print(f"🔧 Solo números: {telefono_limpio}")
+        logger.debug("🔧 Solo números: %s", telefono_limpio)
         
         # Verificar que haya números después de limpiar
         if not telefono_limpio:
@@ -6927,22 +7152,22 @@ def limpiar_numero_telefono(telefono):
         # Si empieza con 0, removerlo
         if telefono_limpio.startswith('0'):
             telefono_limpio = telefono_limpio[1:]
-            print(f"🔧 Removido 0 inicial: {telefono_limpio}")
+            logger.debug("🔧 Removido 0 inicial: %s", telefono_limpio)
         
         # Si empieza con +58, removerlo
         if telefono_limpio.startswith('58'):
             telefono_limpio = telefono_limpio[2:]
-            print(f"🔧 Removido 58 inicial: {telefono_limpio}")
+            logger.debug("🔧 Removido 58 inicial: %s", telefono_limpio)
         
         # Verificar longitud y agregar 58 si es necesario
         if len(telefono_limpio) == 10:
             telefono_limpio = '58' + telefono_limpio
-            print(f"🔧 Agregado 58 para 10 dígitos: {telefono_limpio}")
+            logger.debug("🔧 Agregado 58 para 10 dígitos: %s", telefono_limpio)
         elif len(telefono_limpio) == 9:
             telefono_limpio = '58' + telefono_limpio
-            print(f"🔧 Agregado 58 para 9 dígitos: {telefono_limpio}")
+            logger.debug("🔧 Agregado 58 para 9 dígitos: %s", telefono_limpio)
         
-        print(f"🔧 Teléfono final formateado: {telefono_limpio}")
+        logger.debug("🔧 Teléfono final formateado: %s", telefono_limpio)
         
         # Validar que el resultado sea válido
         if len(telefono_limpio) < 11:
@@ -6951,14 +7176,14 @@ def limpiar_numero_telefono(telefono):
         return telefono_limpio
         
     except Exception as e:
-        print(f"❌ Error en limpiar_numero_telefono: {e}")
+        logger.error("❌ Error en limpiar_numero_telefono: %s", e)
         raise
 
 def crear_mensaje_recordatorio(factura, cliente):
     """Crea un mensaje personalizado de recordatorio de pago."""
     try:
-        print(f"💬 Creando mensaje para factura: {factura.get('numero', 'N/A')}")
-        print(f"💬 Cliente: {cliente.get('nombre', 'N/A')}")
+        logger.debug("💬 Creando mensaje para factura: %s", factura.get('numero', 'N/A'))
+        logger.debug("💬 Cliente: %s", cliente.get('nombre', 'N/A'))
         
         numero_factura = factura.get('numero', 'N/A')
         fecha_factura = factura.get('fecha', 'N/A')
@@ -6966,7 +7191,7 @@ def crear_mensaje_recordatorio(factura, cliente):
         saldo_pendiente = factura.get('saldo_pendiente', 0)
         vencimiento = factura.get('fecha_vencimiento', 'No especificado')
         
-        print(f"💬 Datos extraídos: Factura={numero_factura}, Fecha={fecha_factura}, Total=${total_usd}, Saldo=${saldo_pendiente}")
+        logger.debug("💬 Datos extraídos: Factura=%s, Fecha=%s, Total=$%s, Saldo=$%s", numero_factura, fecha_factura, total_usd, saldo_pendiente)
         
         mensaje = f"""🏢 *RECORDATORIO DE PAGO*
 
@@ -6992,29 +7217,29 @@ Para cualquier consulta, no dudes en contactarnos.
 ---
 *Este es un mensaje automático del sistema de facturación*"""
         
-        print(f"💬 Mensaje creado exitosamente: {len(mensaje)} caracteres")
+        logger.debug("💬 Mensaje creado exitosamente: %s caracteres", len(mensaje))
         return mensaje
         
     except Exception as e:
-        print(f"❌ Error creando mensaje: {e}")
+        logger.error("❌ Error creando mensaje: %s", e)
         raise
 
 def generar_enlace_whatsapp(telefono, mensaje):
     """Genera un enlace de WhatsApp con el mensaje predefinido."""
     try:
-        print(f"🔗 Generando enlace para teléfono: {telefono}")
-        print(f"🔗 Mensaje a codificar: {len(mensaje)} caracteres")
+        logger.debug("🔗 Generando enlace para teléfono: %s", telefono)
+        logger.debug("🔗 Mensaje a codificar: %s caracteres", len(mensaje))
         
         # Codificar el mensaje para URL - preservar emojis
         mensaje_codificado = urllib.parse.quote(mensaje, safe='')
-        print(f"🔗 Mensaje codificado: {len(mensaje_codificado)} caracteres")
+        logger.debug("🔗 Mensaje codificado: %s caracteres", len(mensaje_codificado))
         
         # Crear enlace de WhatsApp - usar api.whatsapp.com para mejor compatibilidad
         enlace = f"https://api.whatsapp.com/send?phone={telefono}&text={mensaje_codificado}"
-        print(f"🔗 Enlace generado: {enlace[:100]}...")
+        logger.debug("🔗 Enlace generado: %s...", enlace[:100])
         return enlace
     except Exception as e:
-        print(f"❌ Error generando enlace: {e}")
+        logger.error("❌ Error generando enlace: %s", e)
         raise
 
 # --- Bloque para Ejecutar la Aplicación ---
@@ -7031,7 +7256,7 @@ def initdb():
 def debug_recordatorio(id):
     """Ruta de debug para diagnosticar problemas con recordatorios."""
     try:
-        print(f"🔍 DEBUG recordatorio para factura: {id}")
+        logger.debug("🔍 DEBUG recordatorio para factura: %s", id)
         
         # Verificar que la factura existe
         facturas = cargar_datos(ARCHIVO_FACTURAS)
@@ -7066,36 +7291,36 @@ def debug_recordatorio(id):
         try:
             telefono_formateado = limpiar_numero_telefono(telefono)
             debug_info['telefono_formateado'] = telefono_formateado
-            print(f"✅ Teléfono formateado: {telefono_formateado}")
+            logger.debug("✅ Teléfono formateado: %s", telefono_formateado)
         except Exception as e:
             error_msg = f"Error formateando teléfono: {e}"
             debug_info['errores'].append(error_msg)
-            print(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             return jsonify(debug_info)
         
         try:
             mensaje = crear_mensaje_recordatorio(factura, cliente)
             debug_info['mensaje_generado'] = mensaje[:200] + '...' if len(mensaje) > 200 else mensaje
-            print(f"✅ Mensaje generado: {len(mensaje)} caracteres")
+            logger.debug("✅ Mensaje generado: %s caracteres", len(mensaje))
         except Exception as e:
             error_msg = f"Error creando mensaje: {e}"
             debug_info['errores'].append(error_msg)
-            print(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             return jsonify(debug_info)
         
         try:
             enlace = generar_enlace_whatsapp(telefono_formateado, mensaje)
             debug_info['enlace_generado'] = enlace[:200] + '...' if len(enlace) > 200 else enlace
-            print(f"✅ Enlace generado: {len(enlace)} caracteres")
+            logger.debug("✅ Enlace generado: %s caracteres", len(enlace))
         except Exception as e:
             error_msg = f"Error generando enlace: {e}"
             debug_info['errores'].append(error_msg)
-            print(f"❌ {error_msg}")
+            logger.error("❌ %s", error_msg)
             return jsonify(debug_info)
         
         debug_info['success'] = True
         debug_info['message'] = 'Todas las funciones funcionan correctamente'
-        print(f"✅ Debug completado exitosamente para factura {id}")
+        logger.debug("✅ Debug completado exitosamente para factura %s", id)
         return jsonify(debug_info)
         
     except Exception as e:
@@ -7106,7 +7331,7 @@ def debug_recordatorio(id):
             'error_type': type(e).__name__,
             'traceback': traceback.format_exc()
         }
-        print(f"❌ Error fatal en debug: {error_info}")
+        logger.error("❌ Error fatal en debug: %s", error_info)
         return jsonify(error_info), 500
 
 @app.route('/webauthn/register/options', methods=['POST'])
@@ -7223,14 +7448,14 @@ def test_whatsapp_simple(cliente_id):
 def debug_whatsapp(cliente_id):
     """Ruta de debug para diagnosticar problemas con WhatsApp"""
     try:
-        print(f"🔍 DEBUG WhatsApp para cliente: {cliente_id}")
+        logger.debug("🔍 DEBUG WhatsApp para cliente: %s", cliente_id)
         
         # Cargar datos
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         facturas = cargar_datos(ARCHIVO_FACTURAS)
         
-        print(f"📊 Clientes cargados: {len(clientes)}")
-        print(f"📊 Facturas cargadas: {len(facturas)}")
+        logger.debug("📊 Clientes cargados: %s", len(clientes))
+        logger.debug("📊 Facturas cargadas: %s", len(facturas))
         
         if cliente_id not in clientes:
             return jsonify({'error': 'Cliente no encontrado'}), 404
@@ -7260,13 +7485,11 @@ def debug_whatsapp(cliente_id):
             'longitud_telefono': len(str(telefono)) if telefono else 0
         }
         
-        print(f"🔍 Debug info: {debug_info}")
+        logger.debug("🔍 Debug info: %s", debug_info)
         return jsonify(debug_info)
         
     except Exception as e:
-        print(f"❌ Error en debug: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error en debug: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # Ruta para servir la página de prueba
@@ -7283,7 +7506,7 @@ def test_whatsapp_routes():
 def test_whatsapp_working(cliente_id):
     """Ruta de prueba que funciona exactamente como la principal pero sin autenticación"""
     try:
-        print(f"🔍 TEST WhatsApp WORKING para cliente: {cliente_id}")
+        logger.debug("🔍 TEST WhatsApp WORKING para cliente: %s", cliente_id)
         
         # Cargar datos
         clientes = cargar_datos(ARCHIVO_CLIENTES)
@@ -7347,9 +7570,7 @@ def test_whatsapp_working(cliente_id):
         })
         
     except Exception as e:
-        print(f"❌ Error en test working: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error en test working: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # Ruta de prueba que simula el botón de WhatsApp (sin login)
@@ -7357,7 +7578,7 @@ def test_whatsapp_working(cliente_id):
 def test_whatsapp_button(cliente_id):
     """Ruta de prueba que simula exactamente lo que hace el botón de WhatsApp"""
     try:
-        print(f"🔍 TEST WhatsApp Button para cliente: {cliente_id}")
+        logger.debug("🔍 TEST WhatsApp Button para cliente: %s", cliente_id)
         
         # Cargar datos
         clientes = cargar_datos(ARCHIVO_CLIENTES)
@@ -7407,7 +7628,7 @@ def test_whatsapp_button(cliente_id):
         })
         
     except Exception as e:
-        print(f"❌ Error en test: {e}")
+        logger.error("❌ Error en test: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # Ruta de prueba sin login para diagnosticar problemas
@@ -7416,7 +7637,7 @@ def test_whatsapp_button(cliente_id):
 def test_whatsapp_no_login(cliente_id):
     """Ruta de prueba sin login para diagnosticar problemas de WhatsApp"""
     try:
-        print(f"🔍 TEST WhatsApp NO LOGIN para cliente: {cliente_id}")
+        logger.debug("🔍 TEST WhatsApp NO LOGIN para cliente: %s", cliente_id)
         
         # Cargar datos
         clientes = cargar_datos(ARCHIVO_CLIENTES)
@@ -7470,7 +7691,7 @@ def test_whatsapp_no_login(cliente_id):
         })
         
     except Exception as e:
-        print(f"❌ Error en test no login: {e}")
+        logger.error("❌ Error en test no login: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # RUTA CON PARÁMETROS - COMENTADA TEMPORALMENTE PARA EVITAR CONFLICTOS
@@ -7480,26 +7701,26 @@ def test_whatsapp_no_login(cliente_id):
     try:
         # Verificar autenticación manualmente para mejor manejo de errores
         if 'usuario' not in session:
-            print("❌ Usuario no autenticado")
+            logger.error("❌ Usuario no autenticado")
             return jsonify({
                 'error': 'Usuario no autenticado',
                 'redirect': url_for('login')
             }), 401
         
-        print(f"🔍 Iniciando envío de recordatorio WhatsApp para cliente: {cliente_id}")
-        print(f"🔍 Método HTTP: {request.method}")
-        print(f"🔍 Headers: {dict(request.headers)}")
-        print(f"🔍 Usuario autenticado: {session.get('usuario')}")
+        logger.debug("🔍 Iniciando envío de recordatorio WhatsApp para cliente: %s", cliente_id)
+        logger.debug("🔍 Método HTTP: %s", request.method)
+        logger.debug("🔍 Headers: %s", dict(request.headers))
+        logger.debug("🔍 Usuario autenticado: %s", session.get('usuario'))
         
         # Cargar datos necesarios
         facturas = cargar_datos(ARCHIVO_FACTURAS)
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         
-        print(f"📊 Facturas cargadas: {len(facturas)}")
-        print(f"👥 Clientes cargados: {len(clientes)}")
+        logger.debug("📊 Facturas cargadas: %s", len(facturas))
+        logger.debug("👥 Clientes cargados: %s", len(clientes))
         
         if cliente_id not in clientes:
-            print(f"❌ Cliente {cliente_id} no encontrado")
+            logger.error("❌ Cliente %s no encontrado", cliente_id)
             return jsonify({
                 'error': 'Cliente no encontrado',
                 'debug_info': {
@@ -7511,11 +7732,11 @@ def test_whatsapp_no_login(cliente_id):
         cliente = clientes[cliente_id]
         telefono = cliente.get('telefono', '')
         
-        print(f"👤 Cliente: {cliente.get('nombre', 'N/A')}")
-        print(f"📱 Teléfono: '{telefono}' (tipo: {type(telefono)})")
+        logger.debug("👤 Cliente: %s", cliente.get('nombre', 'N/A'))
+        logger.debug("📱 Teléfono: '%s' (tipo: %s)", telefono, type(telefono))
         
         if not telefono or str(telefono).strip() == '':
-            print(f"❌ Cliente {cliente_id} no tiene teléfono o está vacío")
+            logger.error("❌ Cliente %s no tiene teléfono o está vacío", cliente_id)
             return jsonify({
                 'error': 'El cliente no tiene número de teléfono registrado o está vacío',
                 'debug_info': {
@@ -7550,7 +7771,7 @@ def test_whatsapp_no_login(cliente_id):
                     total_pendiente += saldo_pendiente
         
         if not facturas_pendientes:
-            print(f"✅ Cliente {cliente_id} no tiene facturas pendientes")
+            logger.debug("✅ Cliente %s no tiene facturas pendientes", cliente_id)
             return jsonify({
                 'success': True,
                 'message': 'El cliente no tiene facturas pendientes de pago',
@@ -7558,21 +7779,21 @@ def test_whatsapp_no_login(cliente_id):
                 'total_pendiente': 0
             })
         
-        print(f"📋 Facturas pendientes encontradas: {len(facturas_pendientes)}")
-        print(f"💰 Total pendiente: ${total_pendiente:.2f}")
+        logger.debug("📋 Facturas pendientes encontradas: %s", len(facturas_pendientes))
+        logger.debug("💰 Total pendiente: $%.2f", total_pendiente)
         
         # Limpiar y formatear el número de teléfono
         telefono_original = telefono
-        print(f"📱 Teléfono original recibido: '{telefono}' (tipo: {type(telefono)})")
+        logger.debug("📱 Teléfono original recibido: '%s' (tipo: %s)", telefono, type(telefono))
         
         try:
             # Formateo simple y directo
             telefono = str(telefono).replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
             if not telefono.startswith('58'):
                 telefono = '58' + telefono.lstrip('0')
-            print(f"📱 Teléfono formateado exitosamente: {telefono}")
+            logger.debug("📱 Teléfono formateado exitosamente: %s", telefono)
         except Exception as e:
-            print(f"❌ Error formateando teléfono: {e}")
+            logger.error("❌ Error formateando teléfono: %s", e)
             return jsonify({
                 'error': f'Error formateando teléfono: {str(e)}',
                 'debug_info': {
@@ -7584,7 +7805,7 @@ def test_whatsapp_no_login(cliente_id):
             }), 400
         
         if not telefono or len(str(telefono)) < 8:
-            print(f"❌ Teléfono formateado no válido: {telefono}")
+            logger.error("❌ Teléfono formateado no válido: %s", telefono)
             return jsonify({
                 'error': 'El número de teléfono no es válido después del formateo',
                 'debug_info': {
@@ -7598,32 +7819,32 @@ def test_whatsapp_no_login(cliente_id):
         try:
             # Mensaje simple y directo
             mensaje = f"Hola {cliente.get('nombre', 'Cliente')}, tienes {len(facturas_pendientes)} facturas pendientes por un total de ${total_pendiente:.2f} USD. Por favor contacta para coordinar el pago."
-            print(f"💬 Mensaje creado exitosamente: {len(mensaje)} caracteres")
-            print(f"💬 Mensaje completo: {mensaje}")
+            logger.debug("💬 Mensaje creado exitosamente: %s caracteres", len(mensaje))
+            logger.debug("💬 Mensaje completo: %s", mensaje)
         except Exception as e:
-            print(f"❌ Error creando mensaje: {e}")
+            logger.error("❌ Error creando mensaje: %s", e)
             return jsonify({'error': f'Error creando mensaje: {str(e)}'}), 400
         
         # Generar enlace de WhatsApp
         try:
             # Enlace simple y directo
             telefono_limpio = str(telefono).replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
-            print(f"🔗 Teléfono limpio: {telefono_limpio}")
+            logger.debug("🔗 Teléfono limpio: %s", telefono_limpio)
             if not telefono_limpio.startswith('58'):
                 telefono_limpio = '58' + telefono_limpio.lstrip('0')
-                print(f"🔗 Teléfono con prefijo 58: {telefono_limpio}")
+                logger.debug("🔗 Teléfono con prefijo 58: %s", telefono_limpio)
             enlace_whatsapp = f"https://wa.me/{telefono_limpio}?text={mensaje.replace(' ', '%20')}"
-            print(f"🔗 Enlace WhatsApp generado exitosamente: {enlace_whatsapp}")
+            logger.debug("🔗 Enlace WhatsApp generado exitosamente: %s", enlace_whatsapp)
         except Exception as e:
-            print(f"❌ Error generando enlace: {e}")
+            logger.error("❌ Error generando enlace: %s", e)
             return jsonify({'error': f'Error generando enlace: {str(e)}'}), 400
         
         # Registrar en la bitácora (opcional, no fallar si hay error)
         try:
             # Registro simple en consola
-            print(f"📝 REGISTRO: Usuario {session.get('usuario', 'Sistema')} envió recordatorio WhatsApp a {cliente.get('nombre', 'N/A')} - {len(facturas_pendientes)} facturas pendientes - Total: ${total_pendiente:.2f}")
+            logger.info("📝 REGISTRO: Usuario %s envió recordatorio WhatsApp a %s - %s facturas pendientes - Total: $%.2f", session.get('usuario', 'Sistema'), cliente.get('nombre', 'N/A'), len(facturas_pendientes), total_pendiente)
         except Exception as e:
-            print(f"⚠️ Error registrando en bitácora (no crítico): {e}")
+            logger.error("⚠️ Error registrando en bitácora (no crítico): %s", e)
         
         resultado = {
             'success': True,
@@ -7636,18 +7857,15 @@ def test_whatsapp_no_login(cliente_id):
             'total_pendiente': total_pendiente,
         }
         
-        print(f"✅ Recordatorio preparado exitosamente para {cliente.get('nombre', 'N/A')}")
-        print(f"📱 Teléfono: {telefono}")
-        print(f"🔗 Enlace: {enlace_whatsapp}")
+        logger.debug("✅ Recordatorio preparado exitosamente para %s", cliente.get('nombre', 'N/A'))
+        logger.debug("📱 Teléfono: %s", telefono)
+        logger.debug("🔗 Enlace: %s", enlace_whatsapp)
         
         return jsonify(resultado)
         
     except Exception as e:
         error_msg = f"Error al enviar recordatorio de cuentas por cobrar: {str(e)}"
-        print(f"❌ {error_msg}")
-        import traceback
-        print(f"🔍 Traceback completo:")
-        traceback.print_exc()
+        logger.exception("❌ %s", error_msg)
         
         return jsonify({
             'success': False,
@@ -7665,23 +7883,23 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
     try:
         # Verificar autenticación manualmente para mejor manejo de errores
         if 'usuario' not in session:
-            print("❌ Usuario no autenticado")
+            logger.error("❌ Usuario no autenticado")
             return jsonify({
                 'error': 'Usuario no autenticado',
                 'redirect': url_for('login')
             }), 401
         
-        print(f"🔍 Iniciando envío de recordatorio WhatsApp para cliente: {cliente_id}")
+        logger.debug("🔍 Iniciando envío de recordatorio WhatsApp para cliente: %s", cliente_id)
         
         # Cargar datos necesarios
         facturas = cargar_datos(ARCHIVO_FACTURAS)
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         
-        print(f"📊 Facturas cargadas: {len(facturas)}")
-        print(f"👥 Clientes cargados: {len(clientes)}")
+        logger.debug("📊 Facturas cargadas: %s", len(facturas))
+        logger.debug("👥 Clientes cargados: %s", len(clientes))
         
         if cliente_id not in clientes:
-            print(f"❌ Cliente {cliente_id} no encontrado")
+            logger.error("❌ Cliente %s no encontrado", cliente_id)
             return jsonify({
                 'error': 'Cliente no encontrado',
                 'debug_info': {
@@ -7693,11 +7911,11 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
         cliente = clientes[cliente_id]
         telefono = cliente.get('telefono', '')
         
-        print(f"👤 Cliente: {cliente.get('nombre', 'N/A')}")
-        print(f"📱 Teléfono: '{telefono}' (tipo: {type(telefono)})")
+        logger.debug("👤 Cliente: %s", cliente.get('nombre', 'N/A'))
+        logger.debug("📱 Teléfono: '%s' (tipo: %s)", telefono, type(telefono))
         
         if not telefono or str(telefono).strip() == '':
-            print(f"❌ Cliente {cliente_id} no tiene teléfono o está vacío")
+            logger.error("❌ Cliente %s no tiene teléfono o está vacío", cliente_id)
             return jsonify({
                 'error': 'El cliente no tiene número de teléfono registrado o está vacío',
                 'debug_info': {
@@ -7732,7 +7950,7 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
                     total_pendiente += saldo_pendiente
         
         if not facturas_pendientes:
-            print(f"✅ Cliente {cliente_id} no tiene facturas pendientes")
+            logger.debug("✅ Cliente %s no tiene facturas pendientes", cliente_id)
             return jsonify({
                 'success': True,
                 'message': 'El cliente no tiene facturas pendientes de pago',
@@ -7740,21 +7958,21 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
                 'total_pendiente': 0
             })
         
-        print(f"📋 Facturas pendientes encontradas: {len(facturas_pendientes)}")
-        print(f"💰 Total pendiente: ${total_pendiente:.2f}")
+        logger.debug("📋 Facturas pendientes encontradas: %s", len(facturas_pendientes))
+        logger.debug("💰 Total pendiente: $%.2f", total_pendiente)
         
         # Limpiar y formatear el número de teléfono
         telefono_original = telefono
-        print(f"📱 Teléfono original recibido: '{telefono}' (tipo: {type(telefono)})")
+        logger.debug("📱 Teléfono original recibido: '%s' (tipo: %s)", telefono, type(telefono))
         
         try:
             # Formateo simple y directo
             telefono = str(telefono).replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
             if not telefono.startswith('58'):
                 telefono = '58' + telefono.lstrip('0')
-            print(f"📱 Teléfono formateado exitosamente: {telefono}")
+            logger.debug("📱 Teléfono formateado exitosamente: %s", telefono)
         except Exception as e:
-            print(f"❌ Error formateando teléfono: {e}")
+            logger.error("❌ Error formateando teléfono: %s", e)
             return jsonify({
                 'error': f'Error formateando número de teléfono: {str(e)}',
                 'debug_info': {
@@ -7766,7 +7984,7 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
             }), 400
         
         if not telefono or len(str(telefono)) < 8:
-            print(f"❌ Teléfono formateado no válido: {telefono}")
+            logger.error("❌ Teléfono formateado no válido: %s", telefono)
             return jsonify({
                 'error': 'El número de teléfono no es válido después del formateo',
                 'debug_info': {
@@ -7780,36 +7998,36 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
         try:
             # Mensaje simple y directo
             mensaje = f"Hola {cliente.get('nombre', 'Cliente')}, tienes {len(facturas_pendientes)} facturas pendientes por un total de ${total_pendiente:.2f} USD. Por favor contacta para coordinar el pago."
-            print(f"💬 Mensaje creado exitosamente: {len(mensaje)} caracteres")
-            print(f"💬 Mensaje completo: {mensaje}")
+            logger.debug("💬 Mensaje creado exitosamente: %s caracteres", len(mensaje))
+            logger.debug("💬 Mensaje completo: %s", mensaje)
         except Exception as e:
-            print(f"❌ Error creando mensaje: {e}")
+            logger.error("❌ Error creando mensaje: %s", e)
             return jsonify({'error': f'Error creando mensaje: {str(e)}'}), 400
         
         # Generar enlace de WhatsApp
         try:
             # Enlace simple y directo
             telefono_limpio = str(telefono).replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
-            print(f"🔗 Teléfono limpio: {telefono_limpio}")
+            logger.debug("🔗 Teléfono limpio: %s", telefono_limpio)
             if not telefono_limpio.startswith('58'):
                 telefono_limpio = '58' + telefono_limpio.lstrip('0')
-                print(f"🔗 Teléfono con prefijo 58: {telefono_limpio}")
+                logger.debug("🔗 Teléfono con prefijo 58: %s", telefono_limpio)
             # Usar urllib.parse.quote para codificar el mensaje correctamente
             mensaje_codificado = urllib.parse.quote(mensaje)
             enlace_whatsapp = f"https://wa.me/{telefono_limpio}?text={mensaje_codificado}"
             enlace_web = f"https://web.whatsapp.com/send?phone={telefono_limpio}&text={mensaje_codificado}"
-            print(f"🔗 Enlace WhatsApp generado exitosamente: {enlace_whatsapp}")
-            print(f"🔗 Enlace Web generado exitosamente: {enlace_web}")
+            logger.debug("🔗 Enlace WhatsApp generado exitosamente: %s", enlace_whatsapp)
+            logger.debug("🔗 Enlace Web generado exitosamente: %s", enlace_web)
         except Exception as e:
-            print(f"❌ Error generando enlace: {e}")
+            logger.error("❌ Error generando enlace: %s", e)
             return jsonify({'error': f'Error generando enlace: {str(e)}'}), 400
         
         # Registrar en la bitácora (opcional, no fallar si hay error)
         try:
             # Registro simple en consola
-            print(f"📝 REGISTRO: Usuario {session.get('usuario', 'Sistema')} envió recordatorio WhatsApp a {cliente.get('nombre', 'N/A')} - {len(facturas_pendientes)} facturas pendientes - Total: ${total_pendiente:.2f}")
+            logger.info("📝 REGISTRO: Usuario %s envió recordatorio WhatsApp a %s - %s facturas pendientes - Total: $%.2f", session.get('usuario', 'Sistema'), cliente.get('nombre', 'N/A'), len(facturas_pendientes), total_pendiente)
         except Exception as e:
-            print(f"⚠️ Error registrando en bitácora (no crítico): {e}")
+            logger.error("⚠️ Error registrando en bitácora (no crítico): %s", e)
         
         resultado = {
             'success': True,
@@ -7825,18 +8043,15 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
             'total_pendiente': total_pendiente,
         }
         
-        print(f"✅ Recordatorio preparado exitosamente para {cliente.get('nombre', 'N/A')}")
-        print(f"📱 Teléfono: {telefono}")
-        print(f"🔗 Enlace: {enlace_whatsapp}")
+        logger.debug("✅ Recordatorio preparado exitosamente para %s", cliente.get('nombre', 'N/A'))
+        logger.debug("📱 Teléfono: %s", telefono)
+        logger.debug("🔗 Enlace: %s", enlace_whatsapp)
         
         return jsonify(resultado)
         
     except Exception as e:
         error_msg = f"Error al enviar recordatorio de cuentas por cobrar: {str(e)}"
-        print(f"❌ {error_msg}")
-        import traceback
-        print(f"🔍 Traceback completo:")
-        traceback.print_exc()
+        logger.exception("❌ %s", error_msg)
         
         return jsonify({
             'success': False,
@@ -7870,7 +8085,7 @@ def test_post():
 def enviar_informe_facturas_pagadas(cliente_id):
     """Envía un informe de facturas pagadas, abonadas y cobradas por WhatsApp al cliente."""
     try:
-        print(f"📊 Iniciando envío de informe de facturas pagadas para cliente: {cliente_id}")
+        logger.debug("📊 Iniciando envío de informe de facturas pagadas para cliente: %s", cliente_id)
         
         # Cargar datos
         clientes = cargar_datos(ARCHIVO_CLIENTES)
@@ -7884,29 +8099,29 @@ def enviar_informe_facturas_pagadas(cliente_id):
         if not cliente:
             return jsonify({'error': 'Cliente no encontrado'}), 404
         
-        print(f"👤 Cliente encontrado: {cliente.get('nombre', 'N/A')}")
+        logger.debug("👤 Cliente encontrado: %s", cliente.get('nombre', 'N/A'))
         
         # Obtener teléfono del cliente
         telefono = cliente.get('telefono', '')
         if not telefono:
             return jsonify({'error': 'El cliente no tiene número de teléfono registrado'}), 400
         
-        print(f"📱 Teléfono del cliente: {telefono}")
+        logger.debug("📱 Teléfono del cliente: %s", telefono)
         
         # Limpiar y formatear el número de teléfono
         telefono_original = telefono
         try:
             telefono = limpiar_numero_telefono(telefono)
-            print(f"📱 Teléfono formateado exitosamente: {telefono}")
+            logger.debug("📱 Teléfono formateado exitosamente: %s", telefono)
         except Exception as e:
-            print(f"❌ Error formateando teléfono: {e}")
+            logger.error("❌ Error formateando teléfono: %s", e)
             return jsonify({'error': f'Error formateando teléfono: {str(e)}'}), 400
         
-        print(f"📱 Teléfono original: {telefono_original}")
-        print(f"📱 Teléfono formateado: {telefono}")
+        logger.debug("📱 Teléfono original: %s", telefono_original)
+        logger.debug("📱 Teléfono formateado: %s", telefono)
         
         if not telefono or len(telefono) < 10:
-            print(f"❌ Teléfono formateado no válido: {telefono}")
+            logger.error("❌ Teléfono formateado no válido: %s", telefono)
             return jsonify({'error': 'El número de teléfono no es válido'}), 400
         
         # Filtrar facturas del cliente
@@ -7920,22 +8135,22 @@ def enviar_informe_facturas_pagadas(cliente_id):
         if not facturas_cliente:
             return jsonify({'error': 'El cliente no tiene facturas registradas'}), 400
         
-        print(f"📄 Facturas encontradas para el cliente: {len(facturas_cliente)}")
+        logger.debug("📄 Facturas encontradas para el cliente: %s", len(facturas_cliente))
         
         # Crear mensaje del informe
         try:
             mensaje = crear_mensaje_informe_facturas_pagadas(cliente, facturas_cliente)
-            print(f"💬 Mensaje del informe creado exitosamente: {len(mensaje)} caracteres")
+            logger.debug("💬 Mensaje del informe creado exitosamente: %s caracteres", len(mensaje))
         except Exception as e:
-            print(f"❌ Error creando mensaje del informe: {e}")
+            logger.error("❌ Error creando mensaje del informe: %s", e)
             return jsonify({'error': f'Error creando mensaje del informe: {str(e)}'}), 400
         
         # Generar enlace de WhatsApp
         try:
             enlace_whatsapp = generar_enlace_whatsapp(telefono, mensaje)
-            print(f"🔗 Enlace WhatsApp generado exitosamente: {enlace_whatsapp}")
+            logger.debug("🔗 Enlace WhatsApp generado exitosamente: %s", enlace_whatsapp)
         except Exception as e:
-            print(f"❌ Error generando enlace: {e}")
+            logger.error("❌ Error generando enlace: %s", e)
             return jsonify({'error': f'Error generando enlace: {str(e)}'}), 400
         
         # Registrar en la bitácora
@@ -7945,9 +8160,9 @@ def enviar_informe_facturas_pagadas(cliente_id):
                 'Informe Facturas Pagadas WhatsApp Enviado',
                 f'Cliente: {cliente.get("nombre", "N/A")} - {len(facturas_cliente)} facturas en el informe'
             )
-            print("📝 Registrado en bitácora")
+            logger.debug("📝 Registrado en bitácora")
         except Exception as e:
-            print(f"⚠️ Error registrando en bitácora: {e}")
+            logger.error("⚠️ Error registrando en bitácora: %s", e)
         
         resultado = {
             'success': True,
@@ -7964,15 +8179,12 @@ def enviar_informe_facturas_pagadas(cliente_id):
             }
         }
         
-        print(f"✅ Informe de facturas pagadas preparado exitosamente para {cliente.get('nombre', 'N/A')}")
+        logger.debug("✅ Informe de facturas pagadas preparado exitosamente para %s", cliente.get('nombre', 'N/A'))
         return jsonify(resultado)
         
     except Exception as e:
         error_msg = f"Error al enviar informe de facturas pagadas: {str(e)}"
-        print(f"❌ {error_msg}")
-        import traceback
-        print(f"🔍 Traceback completo:")
-        traceback.print_exc()
+        logger.exception("❌ %s", error_msg)
         
         return jsonify({
             'success': False,
@@ -8000,8 +8212,8 @@ def enviar_informe_facturas_pagadas_post():
 def crear_mensaje_informe_facturas_pagadas(cliente, facturas_cliente):
     """Crea un mensaje personalizado del informe de facturas pagadas, abonadas y cobradas."""
     try:
-        print(f"💬 Creando informe de facturas para cliente: {cliente.get('nombre', 'N/A')}")
-        print(f"💬 Total de facturas: {len(facturas_cliente)}")
+        logger.debug("💬 Creando informe de facturas para cliente: %s", cliente.get('nombre', 'N/A'))
+        logger.debug("💬 Total de facturas: %s", len(facturas_cliente))
         
         nombre_cliente = cliente.get('nombre', 'Cliente')
         
@@ -8027,9 +8239,9 @@ def crear_mensaje_informe_facturas_pagadas(cliente, facturas_cliente):
         total_abonado = sum(float(f.get('total_abonado', 0)) for f in facturas_abonadas)
         total_pagado = sum(float(f.get('total_usd', 0)) for f in facturas_pagadas)
         
-        print(f"💬 Facturas cobradas: {len(facturas_cobradas)} - Total: ${total_cobrado:.2f}")
-        print(f"💬 Facturas abonadas: {len(facturas_abonadas)} - Total: ${total_abonado:.2f}")
-        print(f"💬 Facturas pagadas: {len(facturas_pagadas)} - Total: ${total_pagado:.2f}")
+        logger.debug("💬 Facturas cobradas: %s - Total: $%.2f", len(facturas_cobradas), total_cobrado)
+        logger.debug("💬 Facturas abonadas: %s - Total: $%.2f", len(facturas_abonadas), total_abonado)
+        logger.debug("💬 Facturas pagadas: %s - Total: $%.2f", len(facturas_pagadas), total_pagado)
         
         # Crear mensaje
         mensaje = f"""🏢 *INFORME DE FACTURAS - {nombre_cliente.upper()}*
@@ -8087,19 +8299,19 @@ Para cualquier consulta sobre tus facturas, no dudes en contactarnos.
 ---
 *Este es un informe automático del sistema de facturación*"""
         
-        print(f"💬 Informe de facturas creado exitosamente: {len(mensaje)} caracteres")
+        logger.debug("💬 Informe de facturas creado exitosamente: %s caracteres", len(mensaje))
         return mensaje
         
     except Exception as e:
-        print(f"❌ Error creando informe de facturas: {e}")
+        logger.error("❌ Error creando informe de facturas: %s", e)
         raise
 
 def crear_mensaje_cuentas_por_cobrar(cliente, facturas_pendientes, total_pendiente):
     """Crea un mensaje personalizado de recordatorio de cuentas por cobrar."""
     try:
-        print(f"💬 Creando mensaje de cuentas por cobrar para cliente: {cliente.get('nombre', 'N/A')}")
-        print(f"💬 Facturas pendientes: {len(facturas_pendientes)}")
-        print(f"💬 Total pendiente: ${total_pendiente:.2f}")
+        logger.debug("💬 Creando mensaje de cuentas por cobrar para cliente: %s", cliente.get('nombre', 'N/A'))
+        logger.debug("💬 Facturas pendientes: %s", len(facturas_pendientes))
+        logger.debug("💬 Total pendiente: $%.2f", total_pendiente)
         
         nombre_cliente = cliente.get('nombre', 'Cliente')
         
@@ -8132,11 +8344,11 @@ Para cualquier consulta o para coordinar pagos, no dudes en contactarnos.
 ---
 *Este es un mensaje automático del sistema de facturación*"""
         
-        print(f"💬 Mensaje de cuentas por cobrar creado exitosamente: {len(mensaje)} caracteres")
+        logger.debug("💬 Mensaje de cuentas por cobrar creado exitosamente: %s caracteres", len(mensaje))
         return mensaje
         
     except Exception as e:
-        print(f"❌ Error creando mensaje de cuentas por cobrar: {e}")
+        logger.error("❌ Error creando mensaje de cuentas por cobrar: %s", e)
         raise
 
 # NOTA: Esta sección se consolidó al inicio del archivo para evitar usar rutas del sistema como /data en Render.
@@ -8295,10 +8507,10 @@ def nueva_nota_entrega():
                                          f"Producto: {producto_id}, Cantidad: {cantidad_vendida}, Stock anterior: {cantidad_actual}, Stock nuevo: {nuevo_stock}")
                 
                 guardar_datos(ARCHIVO_INVENTARIO, inventario)
-                print(f"✅ Stock descontado exitosamente para nota {numero_nota}")
+                logger.debug("✅ Stock descontado exitosamente para nota %s", numero_nota)
                 
             except Exception as e:
-                print(f"❌ Error descontando stock: {e}")
+                logger.error("❌ Error descontando stock: %s", e)
                 # No fallar la creación de la nota si hay error en stock
                 flash(f'Nota creada pero hubo un error actualizando el inventario: {e}', 'warning')
             
@@ -8501,25 +8713,25 @@ def test_eliminar_nota(id):
 @login_required
 def eliminar_nota_entrega(id):
     """Elimina o anula una nota de entrega según su estado."""
-    print(f"🔍 Función eliminar_nota_entrega llamada con ID: {id}")
-    print(f"🔍 Método HTTP: {request.method}")
-    print(f"🔍 URL: {request.url}")
+    logger.debug("🔍 Función eliminar_nota_entrega llamada con ID: %s", id)
+    logger.debug("🔍 Método HTTP: %s", request.method)
+    logger.debug("🔍 URL: %s", request.url)
     
     try:
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-        print(f"🔍 Notas cargadas: {len(notas)} notas encontradas")
+        logger.debug("🔍 Notas cargadas: %s notas encontradas", len(notas))
         
         if id not in notas:
-            print(f"❌ Nota {id} no encontrada")
+            logger.error("❌ Nota %s no encontrada", id)
             flash('Nota de entrega no encontrada', 'danger')
             return redirect(url_for('mostrar_notas_entrega'))
         
         nota = notas[id]
-        print(f"✅ Nota {id} encontrada: {nota.get('numero', 'N/A')}")
+        logger.debug("✅ Nota %s encontrada: %s", id, nota.get('numero', 'N/A'))
         
         # Si la nota está entregada, marcarla como ANULADA en lugar de eliminar
         if nota.get('estado') == 'ENTREGADO':
-            print(f"🔄 Nota {id} ya entregada, marcando como ANULADA")
+            logger.debug("🔄 Nota %s ya entregada, marcando como ANULADA", id)
             
             # Marcar como anulada
             nota['estado'] = 'ANULADO'
@@ -8530,14 +8742,14 @@ def eliminar_nota_entrega(id):
             
             # Guardar cambios
             guardar_datos(ARCHIVO_NOTAS_ENTREGA, notas)
-            print(f"✅ Nota {id} marcada como ANULADA exitosamente")
+            logger.debug("✅ Nota %s marcada como ANULADA exitosamente", id)
             
             flash(f'Nota de entrega #{id} marcada como ANULADA', 'warning')
             registrar_bitacora(session['usuario'], 'Anular nota de entrega', f"Nota: {id} - Estado: ENTREGADO -> ANULADO")
             return redirect(url_for('mostrar_notas_entrega'))
         
         # Si la nota NO está entregada, eliminarla completamente
-        print(f"🗑️ Nota {id} no entregada, eliminando completamente")
+        logger.debug("🗑️ Nota %s no entregada, eliminando completamente", id)
         
         # Restaurar stock del inventario antes de eliminar
         try:
@@ -8557,23 +8769,23 @@ def eliminar_nota_entrega(id):
                                      f"Producto: {producto_id}, Cantidad: {cantidad_restaurada}, Stock anterior: {cantidad_actual}, Stock nuevo: {nuevo_stock}")
             
             guardar_datos(ARCHIVO_INVENTARIO, inventario)
-            print(f"✅ Stock restaurado exitosamente para nota {id}")
+            logger.debug("✅ Stock restaurado exitosamente para nota %s", id)
             
         except Exception as e:
-            print(f"❌ Error restaurando stock: {e}")
+            logger.error("❌ Error restaurando stock: %s", e)
             # Continuar con la eliminación aunque falle la restauración de stock
         
         # Eliminar nota completamente
         del notas[id]
         guardar_datos(ARCHIVO_NOTAS_ENTREGA, notas)
-        print(f"✅ Nota {id} eliminada completamente exitosamente")
+        logger.debug("✅ Nota %s eliminada completamente exitosamente", id)
         
         flash(f'Nota de entrega #{id} eliminada completamente', 'success')
         registrar_bitacora(session['usuario'], 'Eliminar nota de entrega', f"Nota: {id}")
         return redirect(url_for('mostrar_notas_entrega'))
         
     except Exception as e:
-        print(f"❌ Error procesando nota {id}: {e}")
+        logger.error("❌ Error procesando nota %s: %s", id, e)
         flash(f'Error procesando nota de entrega: {e}', 'danger')
         return redirect(url_for('mostrar_notas_entrega'))
 
@@ -8581,7 +8793,7 @@ def eliminar_nota_entrega(id):
 @login_required
 def anular_nota_entrega(id):
     """Anula una nota de entrega entregada (marca como ANULADO)."""
-    print(f"🔄 Función anular_nota_entrega llamada con ID: {id}")
+    logger.debug("🔄 Función anular_nota_entrega llamada con ID: %s", id)
     
     try:
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
@@ -8606,14 +8818,14 @@ def anular_nota_entrega(id):
         
         # Guardar cambios
         guardar_datos(ARCHIVO_NOTAS_ENTREGA, notas)
-        print(f"✅ Nota {id} anulada exitosamente")
+        logger.debug("✅ Nota %s anulada exitosamente", id)
         
         flash(f'Nota de entrega #{id} anulada exitosamente', 'warning')
         registrar_bitacora(session['usuario'], 'Anular nota de entrega', f"Nota: {id} - Estado: ENTREGADO -> ANULADO")
         return redirect(url_for('mostrar_notas_entrega'))
         
     except Exception as e:
-        print(f"❌ Error anulando nota {id}: {e}")
+        logger.error("❌ Error anulando nota %s: %s", id, e)
         flash(f'Error anulando nota de entrega: {e}', 'danger')
         return redirect(url_for('mostrar_notas_entrega'))
 
@@ -8809,7 +9021,7 @@ def sincronizar_cuentas_por_cobrar(factura):
         
         # Guardar cambios
         if guardar_datos(ARCHIVO_CUENTAS, cuentas):
-            print(f"✅ Cuenta por cobrar sincronizada: {numero_factura} - Estado: {estado}")
+            logger.debug("✅ Cuenta por cobrar sincronizada: %s - Estado: %s", numero_factura, estado)
             
             # Registrar en bitácora
             try:
@@ -8819,15 +9031,15 @@ def sincronizar_cuentas_por_cobrar(factura):
                     f"Factura: {numero_factura}, Estado: {estado}, Abonado: ${total_abonado:.2f}"
                 )
             except Exception as e:
-                print(f"⚠️ Error registrando en bitácora: {e}")
+                logger.error("⚠️ Error registrando en bitácora: %s", e)
                 
             return True
         else:
-            print(f"❌ Error guardando cuenta por cobrar: {numero_factura}")
+            logger.error("❌ Error guardando cuenta por cobrar: %s", numero_factura)
             return False
             
     except Exception as e:
-        print(f"❌ Error en sincronización automática: {e}")
+        logger.error("❌ Error en sincronización automática: %s", e)
         return False
 
 def notificar_pago_recibido(factura, pago):
@@ -8853,7 +9065,7 @@ def notificar_pago_recibido(factura, pago):
 
 ¡Gracias por tu pago! 🎉"""
         
-        print(f"💬 Notificación de pago creada para {nombre_cliente}")
+        logger.debug("💬 Notificación de pago creada para %s", nombre_cliente)
         
         # Aquí se podría integrar con WhatsApp o email
         # Por ahora solo se registra en la bitácora
@@ -8866,7 +9078,7 @@ def notificar_pago_recibido(factura, pago):
         return mensaje
         
     except Exception as e:
-        print(f"❌ Error creando notificación: {e}")
+        logger.error("❌ Error creando notificación: %s", e)
         return None
 
 # --- FUNCIONALIDAD DE PAGOS EN NOTAS DE ENTREGA ---
@@ -8883,7 +9095,7 @@ def procesar_pago_nota_entrega(nota_id, monto_pago, metodo_pago, referencia_pago
         inventario = cargar_datos(ARCHIVO_INVENTARIO)
         
         if nota_id not in notas:
-            print(f"❌ Nota de entrega {nota_id} no encontrada")
+            logger.error("❌ Nota de entrega %s no encontrada", nota_id)
             return False, "Nota de entrega no encontrada"
         
         nota = notas[nota_id]
@@ -8938,13 +9150,13 @@ def procesar_pago_nota_entrega(nota_id, monto_pago, metodo_pago, referencia_pago
                     inventario[producto_id]['cantidad'] = nuevo_stock
                     inventario[producto_id]['ultima_salida'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
                     
-                    print(f"📦 Producto {producto_id}: Stock {stock_actual} -> {nuevo_stock} (descontado: {cantidad})")
+                    logger.debug("📦 Producto %s: Stock %s -> %s (descontado: %s)", producto_id, stock_actual, nuevo_stock, cantidad)
                 else:
-                    print(f"⚠️ Producto {producto_id} no encontrado en inventario")
+                    logger.warning("⚠️ Producto %s no encontrado en inventario", producto_id)
             
             # Guardar inventario actualizado
             guardar_datos(ARCHIVO_INVENTARIO, inventario)
-            print(f"✅ Inventario actualizado para nota {nota_id}")
+            logger.debug("✅ Inventario actualizado para nota %s", nota_id)
         
         # SINCRONIZAR CON CUENTAS POR COBRAR SIEMPRE que se procese un pago
         if nota.get('estado') == 'PAGADA':
@@ -8952,10 +9164,10 @@ def procesar_pago_nota_entrega(nota_id, monto_pago, metodo_pago, referencia_pago
             factura = crear_factura_desde_nota_pagada(nota)
             if factura:
                 sincronizar_cuentas_por_cobrar(factura)
-                print(f"✅ Factura creada y sincronizada: {factura['numero']}")
+                logger.debug("✅ Factura creada y sincronizada: %s", factura['numero'])
             else:
                 # Si no se puede crear factura, sincronizar directamente la nota
-                print(f"📊 Sincronizando nota de entrega con cuentas por cobrar")
+                logger.debug("📊 Sincronizando nota de entrega con cuentas por cobrar")
                 # Crear entrada en cuentas por cobrar para la nota pagada
                 cuentas = cargar_datos(ARCHIVO_CUENTAS)
                 entrada_cuenta = {
@@ -8971,7 +9183,7 @@ def procesar_pago_nota_entrega(nota_id, monto_pago, metodo_pago, referencia_pago
                 }
                 cuentas[f"NE-{nota_id}"] = entrada_cuenta
                 guardar_datos(ARCHIVO_CUENTAS, cuentas)
-                print(f"✅ Nota sincronizada con cuentas por cobrar")
+                logger.debug("✅ Nota sincronizada con cuentas por cobrar")
         
         # Registrar en bitácora
         registrar_bitacora(
@@ -8980,11 +9192,11 @@ def procesar_pago_nota_entrega(nota_id, monto_pago, metodo_pago, referencia_pago
             f"Nota: {nota_id}, Monto: ${monto_pago:.2f}, Estado: {nota['estado']}"
         )
         
-        print(f"✅ Pago procesado exitosamente en nota {nota_id}")
+        logger.debug("✅ Pago procesado exitosamente en nota %s", nota_id)
         return True, f"Pago procesado. Estado actual: {nota['estado']}"
         
     except Exception as e:
-        print(f"❌ Error procesando pago en nota de entrega: {e}")
+        logger.error("❌ Error procesando pago en nota de entrega: %s", e)
         return False, f"Error: {str(e)}"
 
 def crear_factura_desde_nota_pagada(nota):
@@ -9039,7 +9251,7 @@ def crear_factura_desde_nota_pagada(nota):
         return factura
         
     except Exception as e:
-        print(f"❌ Error creando factura desde nota pagada: {e}")
+        logger.error("❌ Error creando factura desde nota pagada: %s", e)
         return None
 
 @app.route('/notas-entrega/<id>/procesar-pago', methods=['POST'])
@@ -9071,6 +9283,9 @@ def procesar_pago_nota_entrega_route(id):
         flash(f'Error procesando pago: {e}', 'danger')
         return redirect(url_for('mostrar_notas_entrega'))
 
+# --- Plantillas: bytecode en disco, fragmentos y precompilación (con todos los filtros ya registrados) ---
+capa_plantillas.init_app(app)
+
 # --- Ruta de prueba ---
 # NOTA: La función index ya está definida anteriormente
 
@@ -9079,14 +9294,60 @@ def test():
     return "Test de funcionamiento OK ✅"
 
 # Debug: Imprimir rutas disponibles
+# ========================================
+# TAREAS AL INICIAR CADA WORKER
+# ========================================
+
+def iniciar_tareas_worker():
+    """
+    Tareas de arranque de cada proceso que atiende peticiones.
+
+    Se llaman desde post_worker_init (gunicorn.conf.py) o al ejecutar
+    python app.py, nunca al importar app: así no las pagan el proceso
+    maestro de Gunicorn, los tests ni los benchmarks.
+    """
+    # Bloques de numeración que dejó abiertos un worker terminado abruptamente
+    # (por ejemplo por el timeout de Gunicorn): sus números sin factura pasan a huecos
+    try:
+        conciliados = control_numeracion.conciliar_arrendamientos('FACTURA')
+        if conciliados:
+            logger.warning("🔢 %s bloques de numeración abandonados conciliados como huecos", len(conciliados))
+        reporte = control_numeracion.reporte_consecutividad('FACTURA')
+        if not reporte['huecos_consistentes']:
+            logger.error("❌ Huecos de numeración inconsistentes: revisar /seniat/numeracion/consecutividad")
+    except Exception as e:
+        logger.error("Error conciliando la numeración fiscal: %s", e)
+
+    # Los envíos pendientes o reprogramados antes del reinicio no esperan a la próxima factura
+    if app.config['SENIAT_ENVIO_AUTOMATICO']:
+        try:
+            cola_seniat.iniciar_trabajador()
+        except Exception as e:
+            logger.error("Error iniciando la cola de envío SENIAT: %s", e)
+
+    # La tasa BCV se refresca en segundo plano: una consulta lenta o sin red al BCV
+    # no retrasa el arranque ni la primera petición (mientras tanto se usa la tasa guardada)
+    threading.Thread(target=actualizar_tasa_bcv_automaticamente, name='actualizar-tasa-bcv',
+                     daemon=True).start()
+
+    # Trabajos PDF masivos: se borran los vencidos y se retoman los que cortó el reinicio
+    try:
+        eliminados = gestor_trabajos_pdf.eliminar_antiguos()
+        reanudados = gestor_trabajos_pdf.reanudar()
+        if eliminados or reanudados:
+            logger.info("📄 Trabajos PDF: %s antiguos eliminados, %s reanudados", eliminados, len(reanudados))
+    except Exception as e:
+        logger.error("Error preparando los trabajos PDF: %s", e)
+
 if __name__ == '__main__':
-    print("🔍 Rutas disponibles en la aplicación:")
+    iniciar_tareas_worker()
+    logger.info("🔍 Rutas disponibles en la aplicación:")
     for rule in app.url_map.iter_rules():
-        print(f"  {rule.rule} -> {rule.endpoint}")
-    print("🚀 Aplicación iniciada correctamente")
-    print("🌐 Iniciando servidor web en http://127.0.0.1:5000")
-    print("📱 Para acceder a las notas de entrega: http://127.0.0.1:5000/notas-entrega")
-    print("⏹️  Presiona CTRL+C para detener el servidor")
+        logger.info("  %s -> %s", rule.rule, rule.endpoint)
+    logger.info("🚀 Aplicación iniciada correctamente")
+    logger.info("🌐 Iniciando servidor web en http://127.0.0.1:5000")
+    logger.info("📱 Para acceder a las notas de entrega: http://127.0.0.1:5000/notas-entrega")
+    logger.info("⏹️  Presiona CTRL+C para detener el servidor")
     
     # Iniciar el servidor Flask
     app.run(debug=True, host='127.0.0.1', port=5000)
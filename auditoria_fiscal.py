@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Auditoría Fiscal Encadenada - Cumplimiento SENIAT
+===========================================================
+
+Escritor del log de auditoría fiscal (logs/auditoria_fiscal.log) con
+escritura por lotes y encadenamiento de hashes: cada línea incluye el hash
+de la línea anterior (PREV) y su propio hash (HASH), de modo que alterar,
+eliminar o truncar entradas rompe la cadena y es detectable.
+
+Funcionalidades:
+- Archivo abierto de forma persistente con escritura por lotes
+- Política de fsync configurable (siempre, lote, nunca)
+- Bloqueo entre procesos (bloqueo_procesos) para mantener una sola cadena con varios workers
+- Ancla externa con el último hash para detectar truncamientos
+- Verificación en streaming de todo el log
+
+Uso de la verificación:
+    python auditoria_fiscal.py verificar
+    python auditoria_fiscal.py verificar logs/auditoria_fiscal.log
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from bloqueo_procesos import BloqueoArchivo
+
+logger = logging.getLogger(__name__)
+
+HASH_GENESIS = '0' * 64
+SEPARADOR_PREV = ' | PREV:'
+SEPARADOR_HASH = ' | HASH:'
+POLITICAS_FSYNC = ('siempre', 'lote', 'nunca')
+
+
+def calcular_hash_linea(linea_base: str) -> str:
+    """Hash SHA-256 de una línea de log (incluye el campo PREV, sin el campo HASH)"""
+    return hashlib.sha256(linea_base.encode('utf-8')).hexdigest()
+
+
+class EscritorAuditoria:
+    """Clase para escribir el log de auditoría fiscal por lotes y encadenado"""
+
+    def __init__(self,
+                 archivo: str = 'logs/auditoria_fiscal.log',
+                 politica_fsync: Optional[str] = None,
+                 tamano_lote: int = 100,
+                 intervalo_vaciado: float = 1.0):
+        """
+        Inicializa el escritor de auditoría
+
+        Args:
+            archivo: Ruta del log de auditoría
+            politica_fsync: 'siempre' (cada entrada), 'lote' (cada lote) o 'nunca'.
+                            Por defecto se toma de SENIAT_AUDITORIA_FSYNC o 'lote'
+            tamano_lote: Entradas acumuladas que disparan una escritura
+            intervalo_vaciado: Segundos máximos que una entrada espera en memoria
+        """
+        politica = politica_fsync or os.environ.get('SENIAT_AUDITORIA_FSYNC', 'lote')
+        if politica not in POLITICAS_FSYNC:
+            raise ValueError(f"Política de fsync '{politica}' no válida. Use: {', '.join(POLITICAS_FSYNC)}")
+
+        self.archivo = archivo
+        self.archivo_ancla = archivo + '.ancla'
+        self.archivo_bloqueo = archivo + '.lock'
+        self.politica_fsync = politica
+        self.tamano_lote = 1 if politica == 'siempre' else max(1, tamano_lote)
+        self.intervalo_vaciado = intervalo_vaciado
+
+        # Identificador de sesión por proceso (antes se generaba un uuid por entrada)
+        self.session_id = str(uuid.uuid4())
+
+        self._pendientes: List[str] = []
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._archivo = None
+        self._ultimo_hash: Optional[str] = None
+        self._tamano_conocido = -1
+
+        atexit.register(self.cerrar)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(before=self.vaciar, after_in_child=self._reiniciar_tras_fork)
+
+    def registrar(self, linea_base: str) -> None:
+        """
+        Encola una línea de auditoría (sin campos PREV ni HASH)
+
+        Args:
+            linea_base: Línea formateada según el estándar del log fiscal
+        """
+        linea_base = linea_base.replace('\r', ' ').replace('\n', ' ')
+        with self._lock:
+            self._pendientes.append(linea_base)
+            if len(self._pendientes) >= self.tamano_lote:
+                self._escribir_pendientes()
+                return
+        self._asegurar_hilo_vaciado()
+
+    def vaciar(self) -> None:
+        """Escribe en disco todas las entradas pendientes"""
+        with self._lock:
+            if self._pendientes:
+                self._escribir_pendientes()
+
+    def cerrar(self) -> None:
+        """Vacía las entradas pendientes y cierra el archivo"""
+        try:
+            self.vaciar()
+        except Exception as e:
+            logger.error("Error vaciando log de auditoría al cerrar: %s", e)
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+    def _asegurar_hilo_vaciado(self) -> None:
+        """Arranca (una vez por proceso) el hilo que vacía lotes incompletos"""
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._bucle_vaciado, name='auditoria-fiscal', daemon=True)
+            self._hilo.start()
+
+    def _bucle_vaciado(self) -> None:
+        while not self._evento.wait(self.intervalo_vaciado):
+            try:
+                self.vaciar()
+            except Exception as e:
+                logger.error("Error vaciando log de auditoría: %s", e)
+
+    def _reiniciar_tras_fork(self) -> None:
+        """En el proceso hijo: descartar estado heredado (el padre ya vació sus entradas)"""
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._hilo = None
+        self._pendientes = []
+        self._archivo = None
+        self._ultimo_hash = None
+        self._tamano_conocido = -1
+        self.session_id = str(uuid.uuid4())
+
+    def _abrir(self) -> None:
+        if self._archivo is None:
+            os.makedirs(os.path.dirname(self.archivo) or '.', exist_ok=True)
+            self._archivo = open(self.archivo, 'a', encoding='utf-8')
+
+    def _escribir_pendientes(self) -> None:
+        """Encadena y escribe el lote pendiente. Debe llamarse con self._lock tomado."""
+        pendientes, self._pendientes = self._pendientes, []
+        try:
+            self._abrir()
+            with BloqueoArchivo(self.archivo_bloqueo):
+                # Si otro proceso escribió desde nuestra última escritura, continuar su cadena
+                tamano_actual = os.fstat(self._archivo.fileno()).st_size
+                if self._ultimo_hash is None or tamano_actual != self._tamano_conocido:
+                    self._ultimo_hash = leer_ultimo_hash(self.archivo)
+
+                bloque = []
+                for linea_base in pendientes:
+                    linea_encadenada = f"{linea_base}{SEPARADOR_PREV}{self._ultimo_hash}"
+                    self._ultimo_hash = calcular_hash_linea(linea_encadenada)
+                    bloque.append(f"{linea_encadenada}{SEPARADOR_HASH}{self._ultimo_hash}\n")
+
+                self._archivo.write(''.join(bloque))
+                self._archivo.flush()
+                if self.politica_fsync != 'nunca':
+                    os.fsync(self._archivo.fileno())
+
+                self._tamano_conocido = os.fstat(self._archivo.fileno()).st_size
+                self._guardar_ancla(len(pendientes))
+        except Exception as e:
+            # Log de emergencia en caso de error (mismo criterio que SeguridadFiscal)
+            self._ultimo_hash = None
+            emergency_log = (f"[ERROR_LOG] {datetime.now().isoformat()} - Error escribiendo log: {str(e)} "
+                             f"({len(pendientes)} entradas)\n")
+            with open(os.path.join(os.path.dirname(self.archivo) or '.', 'emergency.log'), 'a', encoding='utf-8') as f:
+                f.write(emergency_log)
+                for linea_base in pendientes:
+                    f.write(f"[ENTRADA_NO_ESCRITA] {linea_base}\n")
+
+    def _guardar_ancla(self, entradas_escritas: int) -> None:
+        """Guarda el último hash y el tamaño del log para detectar truncamientos"""
+        ancla = {
+            'ultimo_hash': self._ultimo_hash,
+            'tamano_bytes': self._tamano_conocido,
+            'entradas_ultimo_lote': entradas_escritas,
+            'fecha': datetime.now().isoformat()
+        }
+        temp_file = f"{self.archivo_ancla}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(ancla, f)
+        os.replace(temp_file, self.archivo_ancla)
+
+
+def extraer_hash(linea: str) -> Optional[str]:
+    """Devuelve el campo HASH de una línea de log, o None si no lo tiene"""
+    posicion = linea.rfind(SEPARADOR_HASH)
+    if posicion == -1:
+        return None
+    return linea[posicion + len(SEPARADOR_HASH):].strip()
+
+
+def leer_ultimo_hash(archivo: str) -> str:
+    """Lee el hash de la última línea del log sin recorrer el archivo completo"""
+    if not os.path.exists(archivo):
+        return HASH_GENESIS
+
+    with open(archivo, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        posicion = f.tell()
+        bloque = b''
+        while posicion > 0:
+            leer = min(4096, posicion)
+            posicion -= leer
+            f.seek(posicion)
+            bloque = f.read(leer) + bloque
+            lineas = [l for l in bloque.split(b'\n') if l.strip()]
+            # Con más de una línea en el bloque, la última está completa
+            if len(lineas) > 1 or (lineas and posicion == 0):
+                return extraer_hash(lineas[-1].decode('utf-8', errors='replace')) or HASH_GENESIS
+    return HASH_GENESIS
+
+
+def verificar_cadena(archivo: str = 'logs/auditoria_fiscal.log') -> Dict[str, Any]:
+    """
+    Verifica en streaming la cadena de hashes del log de auditoría
+
+    Las líneas anteriores al encadenamiento (sin campo PREV) se cuentan como
+    heredadas y no invalidan el log. Una vez aparece la primera línea
+    encadenada, cualquier línea sin PREV es un error: quitar el campo PREV
+    no debe servir para ocultar una línea alterada.
+
+    Args:
+        archivo: Ruta del log de auditoría
+
+    Returns:
+        Diccionario con el resultado de la verificación
+    """
+    resultado = {
+        'archivo': archivo,
+        'valido': True,
+        'lineas_total': 0,
+        'lineas_encadenadas': 0,
+        'lineas_heredadas': 0,
+        'errores': [],
+        'ancla': 'no_disponible',
+        'duracion_segundos': 0.0
+    }
+    if not os.path.exists(archivo):
+        resultado['errores'].append('El archivo de auditoría no existe')
+        resultado['valido'] = False
+        return resultado
+
+    ancla = None
+    if os.path.exists(archivo + '.ancla'):
+        with open(archivo + '.ancla', 'r', encoding='utf-8') as f:
+            ancla = json.load(f)
+
+    inicio = time.perf_counter()
+    hash_anterior = None
+    ancla_vista = False
+    encadenamiento_iniciado = False
+    sha256 = hashlib.sha256
+
+    with open(archivo, 'rb') as f:
+        for numero, linea_bytes in enumerate(f, start=1):
+            linea_bytes = linea_bytes.rstrip(b'\r\n')
+            if not linea_bytes:
+                continue
+            resultado['lineas_total'] += 1
+
+            pos_hash = linea_bytes.rfind(b' | HASH:')
+            pos_prev = linea_bytes.rfind(b' | PREV:', 0, pos_hash if pos_hash != -1 else None)
+            if pos_hash == -1 or pos_prev == -1:
+                if encadenamiento_iniciado:
+                    resultado['errores'].append(f'Línea {numero}: línea sin encadenar después del inicio de la cadena')
+                else:
+                    # Línea anterior al encadenamiento
+                    resultado['lineas_heredadas'] += 1
+                hash_anterior = extraer_hash(linea_bytes.decode('utf-8', errors='replace'))
+                continue
+
+            base = linea_bytes[:pos_hash]
+            hash_linea = linea_bytes[pos_hash + 8:].strip().decode('ascii', errors='replace')
+            prev = base[pos_prev + 8:].strip().decode('ascii', errors='replace')
+            esperado_prev = hash_anterior or HASH_GENESIS
+
+            if prev != esperado_prev:
+                resultado['errores'].append(f'Línea {numero}: PREV no coincide con el hash de la línea anterior')
+            if sha256(base).hexdigest() != hash_linea:
+                resultado['errores'].append(f'Línea {numero}: HASH no corresponde al contenido (línea alterada)')
+
+            resultado['lineas_encadenadas'] += 1
+            encadenamiento_iniciado = True
+            hash_anterior = hash_linea
+            if ancla and hash_linea == ancla.get('ultimo_hash'):
+                ancla_vista = True
+
+    if ancla:
+        if hash_anterior == ancla.get('ultimo_hash'):
+            resultado['ancla'] = 'coincide'
+        elif ancla_vista:
+            resultado['ancla'] = 'entradas_posteriores_a_la_ancla'
+        else:
+            resultado['ancla'] = 'no_encontrada'
+            resultado['errores'].append('El último hash registrado en la ancla no aparece en el log (posible truncamiento)')
+
+    resultado['duracion_segundos'] = time.perf_counter() - inicio
+    resultado['valido'] = not resultado['errores']
+    return resultado
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) < 2 or argv[1] != 'verificar':
+        print("Uso: python auditoria_fiscal.py verificar [ruta_log]")
+        return 2
+
+    archivo = argv[2] if len(argv) > 2 else 'logs/auditoria_fiscal.log'
+    print(f"🔍 Verificando cadena de auditoría: {archivo}")
+    resultado = verificar_cadena(archivo)
+
+    duracion = resultado['duracion_segundos'] or 1e-9
+    print(f"   Líneas: {resultado['lineas_total']} "
+          f"(encadenadas: {resultado['lineas_encadenadas']}, heredadas: {resultado['lineas_heredadas']})")
+    print(f"   Ancla: {resultado['ancla']}")
+    print(f"   Velocidad: {resultado['lineas_total'] / duracion:,.0f} líneas/s")
+
+    for error in resultado['errores'][:20]:
+        print(f"   ❌ {error}")
+    if len(resultado['errores']) > 20:
+        print(f"   ... y {len(resultado['errores']) - 20} errores más")
+
+    if resultado['valido']:
+        print("✅ Cadena de auditoría íntegra")
+        return 0
+    print("❌ La cadena de auditoría NO es válida")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de arranque de workers
+================================
+
+Mide cuánto tarda en importarse la aplicación (lo que paga cada worker de
+Gunicorn al arrancar) usando `python -X importtime`, y muestra los módulos
+más costosos para que las regresiones sean visibles.
+
+Uso:
+    python benchmark_arranque.py
+    python benchmark_arranque.py --repeticiones 5 --top 20
+    python benchmark_arranque.py --presupuesto-ms 600   # falla si se excede
+    python benchmark_arranque.py --json resultado_arranque.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def medir_importacion(modulo):
+    """Importa el módulo en un proceso nuevo y devuelve (tiempo_total_ms, tabla_importtime)."""
+    comando = [sys.executable, '-X', 'importtime', '-c', f'import {modulo}']
+    inicio = time.perf_counter()
+    proceso = subprocess.run(comando, cwd=BASE_DIR, capture_output=True, text=True)
+    total_ms = (time.perf_counter() - inicio) * 1000
+
+    if proceso.returncode != 0:
+        print(proceso.stderr[-2000:])
+        raise RuntimeError(f"No se pudo importar '{modulo}' (código {proceso.returncode})")
+
+    return total_ms, parsear_importtime(proceso.stderr)
+
+
+def parsear_importtime(salida):
+    """
+    Parsea la salida de -X importtime
+
+    Returns:
+        Lista de dicts con modulo, propio_us, acumulado_us y nivel de anidamiento
+    """
+    filas = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:') or 'self [us]' in linea:
+            continue
+        try:
+            propio, acumulado, nombre = linea[len('import time:'):].split('|', 2)
+            propio_us, acumulado_us = int(propio), int(acumulado)
+        except ValueError:
+            continue
+        # El nombre viene con un espacio separador más dos espacios por nivel de anidamiento
+        nombre = nombre.rstrip()[1:]
+        filas.append({
+            'modulo': nombre.strip(),
+            'nivel': (len(nombre) - len(nombre.lstrip(' '))) // 2,
+            'propio_us': propio_us,
+            'acumulado_us': acumulado_us,
+        })
+    return filas
+
+
+def resumir(filas, modulo):
+    """Calcula los totales del arranque a partir de la tabla de importtime."""
+    raiz = next((f for f in filas if f['modulo'] == modulo and f['nivel'] == 0), None)
+    return {
+        'import_total_ms': (raiz['acumulado_us'] / 1000) if raiz else None,
+        'cuerpo_modulo_ms': (raiz['propio_us'] / 1000) if raiz else None,
+        'modulos_importados': len(filas),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide el tiempo de arranque (importación) de la aplicación')
+    parser.add_argument('--modulo', default='app', help='Módulo a importar (por defecto: app)')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Número de mediciones')
+    parser.add_argument('--top', type=int, default=15, help='Cantidad de módulos más lentos a mostrar')
+    parser.add_argument('--presupuesto-ms', type=float, default=None,
+                        help='Presupuesto de importación en ms; sale con código 1 si la mediana lo excede')
+    parser.add_argument('--json', dest='archivo_json', default=None, help='Guardar resultados en un archivo JSON')
+    args = parser.parse_args()
+
+    print(f"⏱️  Midiendo arranque de '{args.modulo}' ({args.repeticiones} repeticiones)")
+    print("=" * 60)
+
+    totales_proceso = []
+    totales_import = []
+    ultima_tabla = []
+    for i in range(args.repeticiones):
+        total_ms, tabla = medir_importacion(args.modulo)
+        resumen = resumir(tabla, args.modulo)
+        totales_proceso.append(total_ms)
+        if resumen['import_total_ms'] is not None:
+            totales_import.append(resumen['import_total_ms'])
+        ultima_tabla = tabla
+        print(f"  #{i + 1}: proceso {total_ms:8.1f} ms | import {resumen['import_total_ms'] or 0:8.1f} ms"
+              f" | cuerpo del módulo {resumen['cuerpo_modulo_ms'] or 0:8.1f} ms")
+
+    # Módulos de primer nivel (lo que el módulo importa directamente) ordenados por costo acumulado
+    directos = [f for f in ultima_tabla if f['nivel'] == 1]
+    directos.sort(key=lambda f: f['acumulado_us'], reverse=True)
+
+    print("\n📦 Importaciones directas más costosas (última medición):")
+    print("-" * 60)
+    for fila in directos[:args.top]:
+        print(f"  {fila['acumulado_us'] / 1000:8.1f} ms  {fila['modulo'].strip()}")
+
+    resultado = {
+        'modulo': args.modulo,
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'repeticiones': args.repeticiones,
+        'proceso_mediana_ms': round(statistics.median(totales_proceso), 1),
+        'import_mediana_ms': round(statistics.median(totales_import), 1) if totales_import else None,
+        'importaciones_directas': [
+            {'modulo': f['modulo'].strip(), 'acumulado_ms': round(f['acumulado_us'] / 1000, 1)}
+            for f in directos[:args.top]
+        ],
+    }
+
+    print("\n📊 RESUMEN")
+    print("-" * 60)
+    print(f"  Arranque del proceso (mediana): {resultado['proceso_mediana_ms']} ms")
+    print(f"  Importación de '{args.modulo}' (mediana): {resultado['import_mediana_ms']} ms")
+
+    if args.archivo_json:
+        with open(args.archivo_json, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"💾 Resultados guardados en {args.archivo_json}")
+
+    if args.presupuesto_ms is not None and resultado['import_mediana_ms'] is not None:
+        if resultado['import_mediana_ms'] > args.presupuesto_ms:
+            print(f"❌ Presupuesto excedido: {resultado['import_mediana_ms']} ms > {args.presupuesto_ms} ms")
+            return 1
+        print(f"✅ Dentro del presupuesto de {args.presupuesto_ms} ms")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
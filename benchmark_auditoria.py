@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark del log de auditoría fiscal
+=====================================
+
+Mide el rendimiento de SeguridadFiscal.registrar_log_fiscal en entradas por
+segundo, comparando la huella del equipo recalculada en cada entrada
+(comportamiento anterior) con la huella cacheada por proceso, las políticas
+de fsync del escritor encadenado y la velocidad de verificación de la cadena.
+
+Se ejecuta en un directorio temporal para no tocar logs/auditoria_fiscal.log.
+
+Uso:
+    python benchmark_auditoria.py
+    python benchmark_auditoria.py --entradas 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+
+def medir(seguridad, entradas, refrescar_huella):
+    """Registra `entradas` logs y devuelve entradas por segundo."""
+    inicio = time.perf_counter()
+    for i in range(entradas):
+        if refrescar_huella:
+            seguridad.obtener_huella_host(refrescar=True)
+        seguridad.registrar_log_fiscal(
+            usuario='benchmark',
+            accion='ASIGNACION_NUMERO',
+            documento_tipo='FACTURA',
+            documento_numero=f'FAC-{i:08d}',
+            detalles='Entrada de prueba de rendimiento'
+        )
+    seguridad.vaciar_log_auditoria()
+    duracion = time.perf_counter() - inicio
+    return entradas / duracion if duracion else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide el rendimiento del log de auditoría fiscal')
+    parser.add_argument('--entradas', type=int, default=2000, help='Entradas a registrar por escenario')
+    args = parser.parse_args()
+
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_auditoria_') as directorio:
+        os.chdir(directorio)
+        try:
+            from seguridad_fiscal import SeguridadFiscal
+            from auditoria_fiscal import EscritorAuditoria, verificar_cadena
+            seguridad = SeguridadFiscal(clave_maestra='clave-benchmark-auditoria')
+
+            print(f"📝 Benchmark de auditoría fiscal ({args.entradas} entradas por escenario)")
+            print("=" * 60)
+
+            sin_cache = medir(seguridad, args.entradas, refrescar_huella=True)
+            print(f"  Huella recalculada por entrada: {sin_cache:10.0f} entradas/s")
+
+            con_cache = medir(seguridad, args.entradas, refrescar_huella=False)
+            print(f"  Huella cacheada por proceso:    {con_cache:10.0f} entradas/s")
+
+            print(f"  Mejora por huella cacheada: x{con_cache / sin_cache:.1f}")
+
+            for politica in ('siempre', 'nunca'):
+                seguridad.escritor_auditoria = EscritorAuditoria(seguridad.log_auditoria_file, politica)
+                velocidad = medir(seguridad, args.entradas, refrescar_huella=False)
+                print(f"  fsync '{politica}':{' ' * (22 - len(politica))}{velocidad:10.0f} entradas/s")
+
+            resultado = verificar_cadena(seguridad.log_auditoria_file)
+            duracion = resultado['duracion_segundos'] or 1e-9
+            print("-" * 60)
+            print(f"  Verificación de cadena: {resultado['lineas_total']} líneas, "
+                  f"{resultado['lineas_total'] / duracion:,.0f} líneas/s, "
+                  f"{'íntegra' if resultado['valido'] else 'INVÁLIDA'}")
+        finally:
+            os.chdir(directorio_original)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de bytes transferidos por las páginas principales
+===========================================================
+
+Mide, con una copia de los datos del proyecto, los bytes que recibe el
+navegador en las páginas principales antes y después de la capa cache_http:
+
+- Antes: sin compresión y sin ETag en JSON; en cada visita el HTML se
+  descarga completo y cada imagen de static/ se revalida con una petición
+- Después: gzip (o brotli), 304 para JSON sin cambios e imágenes con hash
+  en el nombre (immutable: la segunda visita no las pide)
+
+Uso:
+    python benchmark_cache_http.py
+    python benchmark_cache_http.py --json resultado_cache_http.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+PAGINAS = ['/', '/inventario', '/clientes', '/facturas', '/facturas/nueva', '/cotizaciones',
+           '/inventario/lista-precios/detal', '/api/productos', '/api/clientes']
+
+PATRON_ESTATICOS = re.compile(r'''(?:src|href)=["'](/static/[^"'?#]+)''')
+
+
+def copiar_datos(destino):
+    """Copia los JSON de datos para no tocar los del proyecto."""
+    for ruta in glob.glob(os.path.join(BASE_DIR, '*.json')):
+        shutil.copy2(ruta, destino)
+    for carpeta in glob.glob(os.path.join(BASE_DIR, '*_json')):
+        shutil.copytree(carpeta, os.path.join(destino, os.path.basename(carpeta)))
+
+
+def medir_pagina(cliente, pagina):
+    antes = cliente.get(pagina, headers={'Accept-Encoding': 'identity'})
+    despues = cliente.get(pagina, headers={'Accept-Encoding': 'gzip, br'})
+    etag = despues.headers.get('ETag')
+    revisita = cliente.get(pagina, headers={'Accept-Encoding': 'gzip, br', **({'If-None-Match': etag} if etag else {})})
+    estaticos = sorted(set(PATRON_ESTATICOS.findall(antes.get_data(as_text=True))))
+    bytes_estaticos = 0
+    inmutables = 0
+    for url in estaticos:
+        respuesta = cliente.get(url)
+        bytes_estaticos += len(respuesta.data)
+        inmutables += bool(respuesta.cache_control.immutable)
+    return {
+        'pagina': pagina,
+        'estado': antes.status_code,
+        'bytes_antes': len(antes.data),
+        'bytes_despues': len(despues.data),
+        'codificacion': despues.headers.get('Content-Encoding', '-'),
+        'bytes_revisita_antes': len(antes.data),
+        'bytes_revisita_despues': len(revisita.data),
+        'estaticos': len(estaticos),
+        'bytes_estaticos': bytes_estaticos,
+        # Antes: cada visita revalida cada imagen; después solo las que no tienen hash
+        'peticiones_revisita_antes': len(estaticos),
+        'peticiones_revisita_despues': len(estaticos) - inmutables,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bytes transferidos por las páginas principales')
+    parser.add_argument('--json', help='Guardar resultados en este archivo')
+    args = parser.parse_args()
+
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='bench_cache_http_') as directorio:
+        copiar_datos(directorio)
+        os.chdir(directorio)
+        try:
+            import app as aplicacion
+
+            cliente = aplicacion.app.test_client()
+            with cliente.session_transaction() as sesion:
+                sesion['usuario'] = 'admin'
+            resultados = [medir_pagina(cliente, pagina) for pagina in PAGINAS]
+        finally:
+            os.chdir(directorio_original)
+
+    print("\n🌐 Bytes transferidos por página (cuerpo de la respuesta)")
+    print("=" * 96)
+    print(f"{'Página':34} {'Antes':>10} {'Después':>10} {'Cod.':>5} {'Revisita':>18} {'Estáticos (peticiones 2ª visita)':>34}")
+    for r in resultados:
+        revisita = f"{r['bytes_revisita_antes'] / 1024:,.0f} → {r['bytes_revisita_despues'] / 1024:,.1f} KB"
+        estaticos = f"{r['estaticos']} ({r['bytes_estaticos'] / 1024:,.0f} KB): {r['peticiones_revisita_antes']} → {r['peticiones_revisita_despues']}"
+        print(f"{r['pagina']:34} {r['bytes_antes'] / 1024:8,.1f}KB {r['bytes_despues'] / 1024:8,.1f}KB "
+              f"{r['codificacion']:>5} {revisita:>18} {estaticos:>34}")
+    antes = sum(r['bytes_antes'] for r in resultados)
+    despues = sum(r['bytes_despues'] for r in resultados)
+    print("-" * 96)
+    print(f"{'Total primera visita':34} {antes / 1024:8,.1f}KB {despues / 1024:8,.1f}KB  (x{antes / max(despues, 1):.1f})")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de concurrencia por modo de Gunicorn
+==============================================
+
+Levanta la aplicación con Gunicorn en cada modo de gunicorn.conf.py (sync,
+gthread, gevent, eventlet) sobre una copia de los datos y la carga con N
+usuarios virtuales (cliente asyncio incluido, sin dependencias) que recorren
+las rutas principales con sesión de admin:
+
+- Latencia p50/p95/p99, peticiones por segundo y errores por ruta y por modo
+- Recorrido reproducible: cada usuario elige rutas con su propia semilla
+- Los modos cuyo paquete no está instalado (gevent, eventlet) se omiten
+
+Uso:
+    python benchmark_concurrencia.py
+    python benchmark_concurrencia.py --modos sync,gthread,gevent --usuarios 20 --duracion 30
+    python benchmark_concurrencia.py --generar 100000          # datos sintéticos (datos_sinteticos.py)
+    python benchmark_concurrencia.py --datos /ruta/a/datos_prueba
+    python benchmark_concurrencia.py --rutas /,/facturas,/api/tasa-bcv --json resultado_concurrencia.json
+"""
+
+import argparse
+import asyncio
+import glob
+import importlib.util
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+RUTAS = ['/', '/inventario', '/clientes', '/facturas', '/cuentas-por-cobrar', '/cotizaciones',
+         '/notas-entrega', '/api/productos', '/api/clientes', '/api/buscar-clientes?q=a']
+
+SECRET_KEY = 'benchmark-concurrencia'
+
+
+def copiar_datos(origen, destino):
+    """Copia los JSON de datos para no tocar los del proyecto."""
+    for ruta in glob.glob(os.path.join(origen, '*.json')):
+        shutil.copy2(ruta, destino)
+    for carpeta in glob.glob(os.path.join(origen, '*_json')):
+        shutil.copytree(carpeta, os.path.join(destino, os.path.basename(carpeta)))
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def cookie_admin():
+    """Cookie de sesión firmada con SECRET_KEY, como la que deja /login para el admin."""
+    from flask import Flask
+    from flask.sessions import SecureCookieSessionInterface
+
+    app = Flask(__name__)
+    app.secret_key = SECRET_KEY
+    serializador = SecureCookieSessionInterface().get_signing_serializer(app)
+    return f"{app.config['SESSION_COOKIE_NAME']}={serializador.dumps({'usuario': 'admin'})}"
+
+
+async def pedir(puerto, ruta, cookie, timeout):
+    """GET con Connection: close; devuelve (código, bytes). El cuerpo se lee hasta EOF."""
+    lector, escritor = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', puerto), timeout)
+    try:
+        escritor.write((f"GET {ruta} HTTP/1.1\r\nHost: 127.0.0.1:{puerto}\r\nCookie: {cookie}\r\n"
+                        "Accept-Encoding: gzip\r\nConnection: close\r\n\r\n").encode('latin-1'))
+        await escritor.drain()
+        respuesta = await asyncio.wait_for(lector.read(), timeout)
+    finally:
+        escritor.close()
+    linea_estado = respuesta.split(b'\r\n', 1)[0].split()
+    return int(linea_estado[1]) if len(linea_estado) > 1 else 0, len(respuesta)
+
+
+async def usuario_virtual(numero, args, puerto, cookie, fin, muestras):
+    rng = random.Random(args.semilla * 1000 + numero)
+    while time.monotonic() < fin:
+        ruta = rng.choice(args.rutas)
+        inicio = time.perf_counter()
+        try:
+            codigo, _ = await pedir(puerto, ruta, cookie, args.timeout)
+        except (OSError, asyncio.TimeoutError, ValueError):
+            codigo = 0
+        muestras.append((ruta, codigo, time.perf_counter() - inicio))
+        if args.pausa_ms:
+            await asyncio.sleep(rng.uniform(0, 2 * args.pausa_ms) / 1000)
+
+
+async def cargar(args, puerto, cookie):
+    # Calentamiento: la primera visita a cada ruta construye índices y cachés
+    for ruta in args.rutas:
+        await pedir(puerto, ruta, cookie, args.timeout)
+    muestras = []
+    inicio = time.monotonic()
+    fin = inicio + args.duracion
+    await asyncio.gather(*(usuario_virtual(i, args, puerto, cookie, fin, muestras) for i in range(args.usuarios)))
+    return muestras, time.monotonic() - inicio
+
+
+def esperar_servidor(proceso, puerto, espera):
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(('127.0.0.1', puerto), timeout=1) as s:
+                s.sendall(b"GET /login HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n")
+                if s.recv(12).startswith(b'HTTP/1.'):
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.25)
+    return False
+
+
+def resumir(muestras, segundos):
+    """Percentiles (ms), peticiones/s y errores de un conjunto de muestras."""
+    duraciones = sorted(d * 1000 for _, _, d in muestras)
+    if not duraciones:
+        return {'peticiones': 0, 'errores': 0, 'por_segundo': 0.0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    if len(duraciones) > 1:
+        cortes = statistics.quantiles(duraciones, n=100, method='inclusive')
+        p50, p95, p99 = cortes[49], cortes[94], cortes[98]
+    else:
+        p50 = p95 = p99 = duraciones[0]
+    return {
+        'peticiones': len(duraciones),
+        'errores': sum(1 for _, codigo, _ in muestras if not 200 <= codigo < 400),
+        'por_segundo': round(len(duraciones) / segundos, 1),
+        'p50_ms': round(p50, 1),
+        'p95_ms': round(p95, 1),
+        'p99_ms': round(p99, 1),
+    }
+
+
+def medir_modo(modo, args, directorio, cookie):
+    puerto = puerto_libre()
+    entorno = dict(os.environ, GUNICORN_MODO=modo, PORT=str(puerto), SECRET_KEY=SECRET_KEY,
+                   LOG_NIVEL=os.environ.get('LOG_NIVEL', 'WARNING'))
+    registro = os.path.join(directorio, f'gunicorn_{modo}.log')
+    comando = [sys.executable, '-m', 'gunicorn', '--config', os.path.join(BASE_DIR, 'gunicorn.conf.py'),
+               '--chdir', directorio, '--pythonpath', BASE_DIR, '--access-logfile', os.devnull, 'app:app']
+    with open(registro, 'w', encoding='utf-8') as salida:
+        proceso = subprocess.Popen(comando, cwd=directorio, env=entorno, stdout=salida, stderr=subprocess.STDOUT)
+    try:
+        if not esperar_servidor(proceso, puerto, args.espera):
+            with open(registro, encoding='utf-8', errors='replace') as f:
+                print(f.read()[-3000:])
+            raise RuntimeError(f"Gunicorn no respondió en modo {modo}")
+        muestras, segundos = asyncio.run(cargar(args, puerto, cookie))
+    finally:
+        proceso.terminate()
+        try:
+            proceso.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proceso.kill()
+
+    with open(registro, encoding='utf-8', errors='replace') as f:
+        arranque = next((linea.split('listo', 1)[1].strip().strip('()') for linea in f if 'Servidor Gunicorn listo' in linea), '')
+    return {
+        'modo': modo,
+        'configuracion': arranque,
+        'segundos': round(segundos, 1),
+        'total': resumir(muestras, segundos),
+        'rutas': {ruta: resumir([m for m in muestras if m[0] == ruta], segundos) for ruta in args.rutas},
+    }
+
+
+def formatear(valor):
+    return f"{valor:,.1f}" if valor is not None else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia por modo de Gunicorn bajo carga concurrente')
+    parser.add_argument('--modos', default='sync,gthread,gevent', help='Modos separados por coma')
+    parser.add_argument('--usuarios', type=int, default=10, help='Usuarios virtuales simultáneos')
+    parser.add_argument('--duracion', type=float, default=20, help='Segundos de carga por modo')
+    parser.add_argument('--rutas', default=','.join(RUTAS), help='Rutas separadas por coma')
+    parser.add_argument('--pausa-ms', type=float, default=0, help='Pausa media entre peticiones de un usuario')
+    parser.add_argument('--timeout', type=float, default=60, help='Timeout por petición (s)')
+    parser.add_argument('--espera', type=float, default=60, help='Segundos máximos de arranque de Gunicorn')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla del recorrido de los usuarios')
+    parser.add_argument('--datos', default=BASE_DIR, help='Directorio con los JSON de datos (por defecto los del proyecto)')
+    parser.add_argument('--generar', type=int, metavar='FACTURAS',
+                        help='Usar un conjunto sintético de este número de facturas (con --semilla)')
+    parser.add_argument('--json', help='Guardar resultados en este archivo')
+    args = parser.parse_args()
+    args.rutas = [r.strip() for r in args.rutas.split(',') if r.strip()]
+
+    modos = []
+    for modo in (m.strip().lower() for m in args.modos.split(',') if m.strip()):
+        if modo in ('gevent', 'eventlet') and importlib.util.find_spec(modo) is None:
+            print(f"⏭️  Modo {modo} omitido: requiere 'pip install {modo}'")
+            continue
+        modos.append(modo)
+
+    cookie = cookie_admin()
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix='bench_concurrencia_') as directorio:
+        copiar_datos(os.path.abspath(args.datos), directorio)
+        if args.generar:
+            sys.path.insert(0, BASE_DIR)
+            from datos_sinteticos import GeneradorDatos
+
+            resumen = GeneradorDatos(facturas=args.generar, semilla=args.semilla).generar(directorio)
+            print(f"🧪 Datos sintéticos: {args.generar:,} facturas en {resumen['duracion_segundos']:.1f} s "
+                  f"(huella {resumen['huella'][:16]})")
+        for modo in modos:
+            print(f"🚀 Modo {modo}: {args.usuarios} usuarios durante {args.duracion:g} s...")
+            resultados.append(medir_modo(modo, args, directorio, cookie))
+
+    for resultado in resultados:
+        print(f"\n⚙️  {resultado['modo']} ({resultado['configuracion']})")
+        print("=" * 86)
+        print(f"{'Ruta':32} {'Pet.':>7} {'Err.':>5} {'Pet/s':>7} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+        for ruta, r in list(resultado['rutas'].items()) + [('TOTAL', resultado['total'])]:
+            if ruta == 'TOTAL':
+                print("-" * 86)
+            print(f"{ruta:32} {r['peticiones']:>7} {r['errores']:>5} {r['por_segundo']:>7} "
+                  f"{formatear(r['p50_ms']):>10} {formatear(r['p95_ms']):>10} {formatear(r['p99_ms']):>10}")
+
+    if len(resultados) > 1:
+        print("\n📊 Comparación por modo")
+        print("=" * 60)
+        print(f"{'Modo':10} {'Pet/s':>8} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'Err.':>6}")
+        for resultado in resultados:
+            r = resultado['total']
+            print(f"{resultado['modo']:10} {r['por_segundo']:>8} {formatear(r['p50_ms']):>10} "
+                  f"{formatear(r['p95_ms']):>10} {formatear(r['p99_ms']):>10} {r['errores']:>6}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'usuarios': args.usuarios, 'duracion': args.duracion, 'semilla': args.semilla,
+                       'facturas_sinteticas': args.generar,
+                       'resultados': resultados}, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+
+if __name__ == '__main__':
+    main()
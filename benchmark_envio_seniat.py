@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de envío de documentos al SENIAT
+==========================================
+
+Compara contra un servidor SENIAT falso local (con latencia simulada) el
+envío documento por documento (enviar_factura) con el envío por lotes
+(enviar_lote) sobre conexiones persistentes y concurrencia acotada.
+
+Se ejecuta en un directorio temporal para no tocar logs/auditoria_fiscal.log.
+
+Uso:
+    python benchmark_envio_seniat.py
+    python benchmark_envio_seniat.py --documentos 500 --latencia-ms 30 --concurrencia 16
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+
+def crear_servidor(latencia):
+    """Servidor HTTP/1.1 (keep-alive) que acepta todo documento tras `latencia` segundos."""
+
+    class SeniatFalso(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        conexiones = set()
+
+        def log_message(self, *args):
+            pass
+
+        def _responder(self, datos):
+            SeniatFalso.conexiones.add(self.client_address)
+            time.sleep(latencia)
+            cuerpo = json.dumps(datos).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def do_GET(self):
+            self._responder({'estado': 'ok'})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            self._responder({'id_seniat': self.headers.get('Idempotency-Key'), 'codigo_control': 'OK'})
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), SeniatFalso)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, SeniatFalso
+
+
+def facturas_de_prueba(cantidad):
+    return [{
+        'numero': f'FAC-{i:08d}',
+        'fecha': '2025-08-01',
+        'hora': '10:00:00',
+        'items': [{'producto': 'Producto', 'cantidad': 1, 'precio': 10.0}] * 5,
+        'total_usd': 50.0
+    } for i in range(1, cantidad + 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide documentos por segundo enviados al SENIAT')
+    parser.add_argument('--documentos', type=int, default=200, help='Documentos por escenario')
+    parser.add_argument('--latencia-ms', type=float, default=20.0, help='Latencia simulada del SENIAT')
+    parser.add_argument('--concurrencia', type=int, default=8, help='Envíos simultáneos en el lote')
+    args = parser.parse_args()
+
+    directorio_original = os.getcwd()
+    os.environ.setdefault('SENIAT_CLAVE_MAESTRA', 'clave-benchmark-envio')
+    servidor, manejador = crear_servidor(args.latencia_ms / 1000)
+    with tempfile.TemporaryDirectory(prefix='bench_envio_seniat_') as directorio:
+        os.chdir(directorio)
+        try:
+            from comunicacion_seniat import ComunicacionSENIAT
+
+            config = ComunicacionSENIAT()._cargar_configuracion_default()
+            config['url_base'] = f'http://127.0.0.1:{servidor.server_port}/'
+            config['concurrencia_lote'] = args.concurrencia
+            facturas = facturas_de_prueba(args.documentos)
+
+            print(f"📤 Envío SENIAT: {args.documentos} documentos, latencia {args.latencia_ms:.0f} ms")
+            print("=" * 60)
+
+            comunicador = ComunicacionSENIAT(dict(config))
+            inicio = time.perf_counter()
+            enviados = sum(1 for f in facturas if comunicador.enviar_factura(f)['exito'])
+            individual = args.documentos / (time.perf_counter() - inicio)
+            print(f"  Uno por uno (enviar_factura): {individual:8.1f} docs/s ({enviados} enviados)")
+
+            manejador.conexiones.clear()
+            comunicador = ComunicacionSENIAT(dict(config))
+            resultado = comunicador.enviar_lote(facturas)
+            print(f"  Lote (enviar_lote, x{args.concurrencia}):   {resultado['documentos_por_segundo']:8.1f} docs/s "
+                  f"({resultado['enviados']} enviados, {len(manejador.conexiones)} conexiones TCP)")
+            print("-" * 60)
+            print(f"  Mejora: x{resultado['documentos_por_segundo'] / individual:.1f}")
+        finally:
+            os.chdir(directorio_original)
+            servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
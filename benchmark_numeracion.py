@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark y prueba de estrés de la numeración fiscal
+====================================================
+
+Lanza varios procesos que piden números de FACTURA al mismo tiempo sobre un
+mismo archivo de control (como varios workers de Gunicorn) y comprueba que:
+
+- Ningún número se entrega dos veces
+- Cada número de 1 al último asignado está emitido o registrado como hueco
+  (con arrendamiento de bloques, incluyendo un worker que muere sin liberar)
+
+Reporta asignaciones por segundo sin bloques y con bloques. Se ejecuta en un
+directorio temporal para no tocar control_numeracion_fiscal.json.
+
+Uso:
+    python benchmark_numeracion.py
+    python benchmark_numeracion.py --procesos 8 --numeros 300 --bloque 50
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+# Segundos máximos de espera por los resultados de todos los workers
+TIMEOUT_ESCENARIO = 120
+
+
+def trabajador(cola, cantidad, tamano_bloque, abortar):
+    """Pide `cantidad` números; si `abortar`, termina sin liberar su bloque."""
+    from numeracion_fiscal import ControlNumeracionFiscal
+    control = ControlNumeracionFiscal(tamano_bloque=tamano_bloque)
+    numeros = [control.obtener_siguiente_numero('FACTURA', 'benchmark')[0] for _ in range(cantidad)]
+    cola.put(numeros)
+    if abortar:
+        cola.close()
+        cola.join_thread()
+        os._exit(0)
+    control.liberar_arrendamientos()
+
+
+def ejecutar(procesos, cantidad, tamano_bloque, con_caida):
+    """Ejecuta un escenario en el directorio actual y devuelve sus resultados."""
+    for archivo in ('control_numeracion_fiscal.json', 'facturas_json/facturas.json'):
+        if os.path.exists(archivo):
+            os.remove(archivo)
+
+    cola = multiprocessing.Queue()
+    hijos = []
+    inicio = time.perf_counter()
+    for i in range(procesos):
+        # El último worker pide menos números que un bloque y muere sin liberarlo
+        abortar = con_caida and i == procesos - 1
+        pedir = max(1, tamano_bloque // 2) if abortar else cantidad
+        hijo = multiprocessing.Process(target=trabajador, args=(cola, pedir, tamano_bloque, abortar))
+        hijo.start()
+        hijos.append(hijo)
+
+    emitidos = []
+    pendientes = len(hijos)
+    while pendientes:
+        try:
+            emitidos.extend(cola.get(timeout=1))
+            pendientes -= 1
+            continue
+        except queue.Empty:
+            pass
+        # Un worker que falla antes de entregar sus números dejaría la espera colgada
+        fallidos = [hijo.exitcode for hijo in hijos if hijo.exitcode not in (None, 0)]
+        terminados = all(hijo.exitcode is not None for hijo in hijos)
+        vencido = time.perf_counter() - inicio > TIMEOUT_ESCENARIO
+        if fallidos or terminados or vencido:
+            for hijo in hijos:
+                if hijo.is_alive():
+                    hijo.terminate()
+                hijo.join()
+            motivo = (f"códigos de salida {fallidos}" if fallidos else
+                      "terminaron sin entregar sus números" if terminados else
+                      f"sin respuesta tras {TIMEOUT_ESCENARIO} s")
+            raise RuntimeError(f"{pendientes} de {len(hijos)} workers fallaron: {motivo}")
+    for hijo in hijos:
+        hijo.join()
+    fallidos = [hijo.exitcode for hijo in hijos if hijo.exitcode != 0]
+    if fallidos:
+        raise RuntimeError(f"Workers terminados con error: códigos de salida {fallidos}")
+    duracion = time.perf_counter() - inicio
+
+    # Simular que cada número entregado terminó en una factura guardada
+    os.makedirs('facturas_json', exist_ok=True)
+    with open('facturas_json/facturas.json', 'w', encoding='utf-8') as f:
+        json.dump({str(i): {'numero': n} for i, n in enumerate(emitidos)}, f)
+
+    from numeracion_fiscal import ControlNumeracionFiscal
+    control = ControlNumeracionFiscal(tamano_bloque=0)
+    conciliados = control.conciliar_arrendamientos('FACTURA')
+    reporte = control.reporte_consecutividad('FACTURA')
+
+    secuenciales = [int(n.split('-')[1]) for n in emitidos]
+    en_huecos = set()
+    for hueco in reporte['huecos']:
+        en_huecos.update(range(hueco['desde'], hueco['hasta'] + 1))
+    cubiertos = set(secuenciales) | en_huecos
+    esperados = set(range(1, reporte['ultimo_numero_asignado'] + 1))
+
+    return {
+        'asignaciones_por_segundo': len(emitidos) / duracion if duracion else float('inf'),
+        'emitidos': len(emitidos),
+        'duplicados': len(secuenciales) - len(set(secuenciales)),
+        'huecos': len(en_huecos),
+        'conciliados': len(conciliados),
+        'sin_justificar': len(esperados - cubiertos),
+        'emitido_y_hueco': len(set(secuenciales) & en_huecos),
+        'bloques_abiertos': len(reporte['arrendamientos_abiertos'])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de estrés de la numeración fiscal entre procesos')
+    parser.add_argument('--procesos', type=int, default=4, help='Procesos concurrentes')
+    parser.add_argument('--numeros', type=int, default=200, help='Números por proceso')
+    parser.add_argument('--bloque', type=int, default=50, help='Tamaño de bloque para el escenario con arrendamiento')
+    args = parser.parse_args()
+
+    directorio_original = os.getcwd()
+    os.environ.setdefault('SENIAT_CLAVE_MAESTRA', 'clave-benchmark-numeracion')
+    correcto = True
+    with tempfile.TemporaryDirectory(prefix='bench_numeracion_') as directorio:
+        os.chdir(directorio)
+        try:
+            print(f"🔢 Numeración fiscal: {args.procesos} procesos x {args.numeros} números")
+            print("=" * 60)
+            escenarios = [
+                ('Sin bloques (bloqueo por número)', 0, False),
+                (f'Bloques de {args.bloque}', args.bloque, False),
+                (f'Bloques de {args.bloque} + worker caído', args.bloque, True),
+            ]
+            for nombre, bloque, con_caida in escenarios:
+                try:
+                    r = ejecutar(args.procesos, args.numeros, bloque, con_caida)
+                except RuntimeError as e:
+                    correcto = False
+                    print(f"  ❌ {nombre}: {e}")
+                    continue
+                ok = r['duplicados'] == 0 and r['sin_justificar'] == 0 and r['emitido_y_hueco'] == 0 \
+                    and r['bloques_abiertos'] == 0
+                correcto = correcto and ok
+                print(f"  {'✅' if ok else '❌'} {nombre}: {r['asignaciones_por_segundo']:,.0f} asignaciones/s")
+                print(f"      emitidos={r['emitidos']} duplicados={r['duplicados']} huecos={r['huecos']} "
+                      f"conciliados={r['conciliados']} sin_justificar={r['sin_justificar']}")
+        finally:
+            os.chdir(directorio_original)
+
+    return 0 if correcto else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
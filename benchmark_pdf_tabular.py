@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la lista de precios en PDF
+=======================================
+
+Compara, para catálogos sintéticos de 1.000 y 10.000 productos, el tiempo y
+la memoria de generar la lista de precios:
+
+- HTML: plantilla lista_precios.html (Jinja) + wkhtmltopdf
+- Nativo: pdf_tabular (reportlab), filas directo al canvas
+
+Los motores que no estén instalados se reportan como no disponibles. La
+memoria de Python es el pico de tracemalloc; la de wkhtmltopdf, el RSS
+máximo del proceso hijo.
+
+Uso:
+    python benchmark_pdf_tabular.py
+    python benchmark_pdf_tabular.py --productos 1000 10000 50000
+    python benchmark_pdf_tabular.py --json resultado_pdf_tabular.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+CATEGORIAS = ['Herramientas', 'Ferretería', 'Electricidad', 'Plomería', 'Pinturas', 'Jardinería',
+              'Construcción', 'Iluminación', 'Seguridad', 'Limpieza']
+
+
+def catalogo_sintetico(cantidad, semilla=42):
+    aleatorio = random.Random(semilla)
+    catalogo = {}
+    for i in range(1, cantidad + 1):
+        precio = round(aleatorio.uniform(0.5, 500), 2)
+        catalogo[str(i)] = {
+            'nombre': f'Producto de prueba {i} {aleatorio.choice(["rojo", "azul", "mediano", "x 12 unid."])}',
+            'categoria': aleatorio.choice(CATEGORIAS),
+            'precio': precio,
+            'precio_detal': precio,
+            'precio_distribuidor': round(precio * 0.85, 2),
+            'cantidad': aleatorio.randint(0, 300)
+        }
+    return catalogo
+
+
+def medir(funcion):
+    """Ejecuta la función y devuelve (resultado, segundos, pico_memoria_mb)."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    try:
+        resultado = funcion()
+    finally:
+        duracion = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return resultado, duracion, pico / (1024 * 1024)
+
+
+def rss_hijos_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # Linux reporta KB, macOS bytes
+    return rss / 1024 if sys.platform != 'darwin' else rss / (1024 * 1024)
+
+
+def benchmark_html(aplicacion, catalogo, empresa, fecha):
+    from servicio_pdf import servicio_pdf
+
+    def renderizar_html():
+        with aplicacion.app.test_request_context('/'):
+            return aplicacion.render_template('lista_precios.html', inventario=catalogo, tipo='detal',
+                                              empresa=empresa, pdf=True, now=fecha, app=aplicacion.app,
+                                              categorias=CATEGORIAS, filtro_categoria='', filtro_precio_min='',
+                                              filtro_precio_max='', filtro_busqueda='')
+
+    html, segundos_html, memoria_html = medir(renderizar_html)
+    resultado = {'html_segundos': segundos_html, 'html_memoria_mb': memoria_html, 'html_bytes': len(html)}
+    try:
+        servicio_pdf.obtener_configuracion()
+        pdf, segundos_pdf, _ = medir(lambda: servicio_pdf._renderizar_sin_cache(html, 'lista_precios', None, 600))
+        resultado.update({'wkhtmltopdf_segundos': segundos_pdf, 'wkhtmltopdf_rss_mb': rss_hijos_mb(),
+                          'total_segundos': segundos_html + segundos_pdf, 'pdf_bytes': len(pdf)})
+    except Exception as e:
+        resultado['wkhtmltopdf_error'] = str(e)
+    return resultado
+
+
+def benchmark_nativo(catalogo, empresa, fecha):
+    from pdf_tabular import generar_lista_precios
+
+    try:
+        pdf, segundos, memoria = medir(lambda: generar_lista_precios(catalogo, 'detal', empresa, fecha))
+    except ImportError as e:
+        return {'error': str(e)}
+    return {'total_segundos': segundos, 'memoria_mb': memoria, 'pdf_bytes': len(pdf)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara los motores PDF de la lista de precios')
+    parser.add_argument('--productos', type=int, nargs='+', default=[1000, 10000], help='Tamaños de catálogo')
+    parser.add_argument('--json', help='Guardar resultados en este archivo')
+    args = parser.parse_args()
+
+    directorio_original = os.getcwd()
+    resultados = []
+    with tempfile.TemporaryDirectory(prefix='bench_pdf_tabular_') as directorio:
+        os.chdir(directorio)
+        try:
+            import app as aplicacion
+
+            empresa = {'nombre': 'Empresa de Prueba, C.A.', 'rif': 'J-000000000', 'telefono': '0212-0000000',
+                       'direccion': 'Caracas', 'email': 'ventas@ejemplo.com'}
+            fecha = datetime.now()
+
+            print("📄 Lista de precios en PDF: HTML + wkhtmltopdf vs. motor nativo")
+            print("=" * 72)
+            for cantidad in args.productos:
+                catalogo = catalogo_sintetico(cantidad)
+                html = benchmark_html(aplicacion, catalogo, empresa, fecha)
+                nativo = benchmark_nativo(catalogo, empresa, fecha)
+                resultados.append({'productos': cantidad, 'html': html, 'nativo': nativo})
+
+                print(f"\n  {cantidad:,} productos")
+                print(f"    Jinja → HTML:      {html['html_segundos']:8.3f} s  "
+                      f"{html['html_memoria_mb']:7.1f} MB  ({html['html_bytes'] / 1024:,.0f} KB de HTML)")
+                if 'wkhtmltopdf_segundos' in html:
+                    rss = f"{html['wkhtmltopdf_rss_mb']:7.1f} MB RSS" if html['wkhtmltopdf_rss_mb'] else ''
+                    print(f"    wkhtmltopdf:       {html['wkhtmltopdf_segundos']:8.3f} s  {rss}")
+                    print(f"    Total HTML:        {html['total_segundos']:8.3f} s")
+                else:
+                    print(f"    wkhtmltopdf:       no disponible ({html['wkhtmltopdf_error']})")
+                if 'error' in nativo:
+                    print(f"    Nativo (reportlab): no disponible ({nativo['error']})")
+                else:
+                    print(f"    Nativo (reportlab): {nativo['total_segundos']:7.3f} s  {nativo['memoria_mb']:7.1f} MB  "
+                          f"({nativo['pdf_bytes'] / 1024:,.0f} KB de PDF)")
+                    if 'total_segundos' in html:
+                        print(f"    Mejora: x{html['total_segundos'] / nativo['total_segundos']:.1f}")
+        finally:
+            os.chdir(directorio_original)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Suite de benchmarks de rendimiento
+==================================
+
+Mide las rutas críticas de la aplicación sobre datos sintéticos
+(datos_sinteticos.py) de uno o varios tamaños, con el cliente de pruebas de
+Flask y sesión de admin:
+
+- Almacenamiento: cargar_datos/guardar_datos de clientes, inventario y facturas
+- Reportes: obtener_estadisticas, /facturas con filtros y ordenamiento,
+  /cuentas-por-cobrar (antigüedad y vencidas), /api/buscar-clientes
+- Exportación: ExportacionSENIAT.generar_reporte_consolidado del último mes
+- PDF: HTML de impresión de factura y lista de precios en PDF con cada motor
+  (wkhtmltopdf y reportlab; el que no esté instalado queda como no disponible)
+
+Cada benchmark se ejecuta una vez de calentamiento y luego N repeticiones; se
+guardan mínimo, mediana, media y máximo en un JSON con el commit, para
+comparar entre commits. Con --comparar se marca como regresión toda mediana
+que empeore más de --umbral % (y más de --minimo-ms) y el proceso sale con
+código 1.
+
+Uso:
+    python benchmark_rendimiento.py
+    python benchmark_rendimiento.py --facturas 1000 10000 100000 --repeticiones 5
+    python benchmark_rendimiento.py --solo facturas,cuentas --guardar
+    python benchmark_rendimiento.py --guardar --comparar ultimo --umbral 15
+    python benchmark_rendimiento.py --actual resultados_benchmark/b.json --comparar resultados_benchmark/a.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+DIRECTORIO_RESULTADOS = os.path.join(BASE_DIR, 'resultados_benchmark')
+ARCHIVOS_CONFIGURACION = ('empresa.json', 'usuarios.json', 'config.json')
+BUSQUEDAS_CLIENTES = ['mar', 'farmacia', 'v-1', 'gonzalez', 'natura', 'j-3', 'luna']
+
+
+class NoDisponible(Exception):
+    """El benchmark no puede ejecutarse en este entorno (p. ej. falta el motor de PDF)"""
+
+
+def info_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        cambios = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=BASE_DIR,
+                                 capture_output=True, text=True).stdout.strip()
+        return commit, bool(cambios)
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido', False
+
+
+def definir_benchmarks(aplicacion, cliente, fecha_final):
+    """Lista de (nombre, función(i)) para el conjunto de datos del directorio actual."""
+    facturas = aplicacion.cargar_datos(aplicacion.ARCHIVO_FACTURAS)
+    id_factura = next(iter(facturas))
+    datos = {archivo: aplicacion.cargar_datos(archivo) for archivo in
+             (aplicacion.ARCHIVO_CLIENTES, aplicacion.ARCHIVO_INVENTARIO, aplicacion.ARCHIVO_FACTURAS)}
+    del facturas
+    inicio_mes = fecha_final[:8] + '01'
+
+    def get(url, pdf=False):
+        def ejecutar(_):
+            respuesta = cliente.get(url)
+            if pdf and respuesta.mimetype != 'application/pdf':
+                raise NoDisponible(f'{url} no devolvió un PDF (código {respuesta.status_code}); '
+                                   'falta el motor de PDF')
+            if respuesta.status_code != 200:
+                raise RuntimeError(f'{url} respondió {respuesta.status_code}')
+            return len(respuesta.data)
+        return ejecutar
+
+    def lista_precios(motor):
+        # PDF_MOTOR_LISTA_PRECIOS se lee en cada petición: se fija solo durante la medición
+        consultar = get('/inventario/lista-precios/detal/pdf', pdf=True)
+
+        def ejecutar(i):
+            if motor == aplicacion.MOTOR_REPORTLAB and aplicacion.importar_opcional('reportlab') is None:
+                raise NoDisponible('reportlab no está instalado')
+            anterior = os.environ.get('PDF_MOTOR_LISTA_PRECIOS')
+            os.environ['PDF_MOTOR_LISTA_PRECIOS'] = motor
+            try:
+                return consultar(i)
+            finally:
+                if anterior is None:
+                    del os.environ['PDF_MOTOR_LISTA_PRECIOS']
+                else:
+                    os.environ['PDF_MOTOR_LISTA_PRECIOS'] = anterior
+        return ejecutar
+
+    def cargar(archivo):
+        def ejecutar(_):
+            aplicacion.cargar_datos(archivo)
+            return os.path.getsize(archivo)
+        return ejecutar
+
+    def guardar(archivo):
+        def ejecutar(_):
+            if not aplicacion.guardar_datos(archivo, datos[archivo]):
+                raise RuntimeError(f'guardar_datos({archivo}) falló')
+            return os.path.getsize(archivo)
+        return ejecutar
+
+    def estadisticas(_):
+        with aplicacion.app.test_request_context():
+            aplicacion.obtener_estadisticas()
+
+    def buscar_clientes(i):
+        return get(f'/api/buscar-clientes?q={BUSQUEDAS_CLIENTES[i % len(BUSQUEDAS_CLIENTES)]}')(i)
+
+    def reporte_seniat(_):
+        from exportacion_seniat import ExportacionSENIAT
+
+        resultado = ExportacionSENIAT().generar_reporte_consolidado(inicio_mes, fecha_final)
+        if not resultado.get('exito'):
+            raise RuntimeError(resultado.get('error', 'generar_reporte_consolidado falló'))
+        tamano = os.path.getsize(resultado['archivo'])
+        os.remove(resultado['archivo'])
+        return tamano
+
+    benchmarks = []
+    for archivo in datos:
+        benchmarks.append((f'cargar_datos[{os.path.basename(archivo)}]', cargar(archivo)))
+    benchmarks += [
+        ('obtener_estadisticas', estadisticas),
+        ('facturas[todas]', get('/facturas')),
+        ('facturas[pendientes_por_total]', get('/facturas?estado=pendiente&sort=total_usd&order=desc')),
+        ('facturas[busqueda_rango_por_cliente]',
+         get(f'/facturas?search=fac-0000&fecha_desde={fecha_final[:4]}-01-01&fecha_hasta={fecha_final}'
+             '&sort=cliente&order=asc')),
+        ('cuentas_por_cobrar[por_cobrar]', get('/cuentas-por-cobrar')),
+        ('cuentas_por_cobrar[vencidas]', get('/cuentas-por-cobrar?solo_vencidas=1')),
+        ('cuentas_por_cobrar[cobradas_anio]', get(f'/cuentas-por-cobrar?estado=cobradas&anio={fecha_final[:4]}')),
+        ('api_buscar_clientes', buscar_clientes),
+        ('exportacion_seniat[reporte_consolidado_mes]', reporte_seniat),
+        ('pdf[factura_imprimir_html]', get(f'/facturas/{id_factura}/imprimir')),
+        ('pdf[lista_precios_wkhtmltopdf]', lista_precios(aplicacion.MOTOR_WKHTMLTOPDF)),
+        ('pdf[lista_precios_reportlab]', lista_precios(aplicacion.MOTOR_REPORTLAB)),
+    ]
+    # guardar_datos al final: reescribe los archivos que leen los demás
+    for archivo in datos:
+        benchmarks.append((f'guardar_datos[{os.path.basename(archivo)}]', guardar(archivo)))
+    return benchmarks
+
+
+def medir(funcion, repeticiones, calentamiento):
+    """Ejecuta la función y devuelve las estadísticas de las repeticiones (ms)."""
+    tamano = None
+    for i in range(calentamiento):
+        tamano = funcion(i)
+    tiempos = []
+    for i in range(repeticiones):
+        inicio = time.perf_counter()
+        tamano = funcion(calentamiento + i)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        'estado': 'ok',
+        'repeticiones': repeticiones,
+        'minimo_ms': round(min(tiempos), 2),
+        'mediana_ms': round(statistics.median(tiempos), 2),
+        'media_ms': round(statistics.fmean(tiempos), 2),
+        'maximo_ms': round(max(tiempos), 2),
+        'bytes': tamano if isinstance(tamano, int) and not isinstance(tamano, bool) else None,
+    }
+
+
+def ejecutar_tamano(facturas, args):
+    """
+    Corre los benchmarks de un tamaño en un proceso aparte
+
+    La app y sus módulos guardan estado global ligado al directorio de datos
+    (índices, verificador de integridad, cachés), así que cada tamaño usa un
+    intérprete nuevo.
+    """
+    with tempfile.TemporaryDirectory(prefix='bench_rendimiento_') as directorio:
+        salida = os.path.join(directorio, 'resultados.json')
+        comando = [sys.executable, os.path.abspath(__file__), '--interno', str(facturas), '--salida-interna', salida,
+                   '--repeticiones', str(args.repeticiones), '--calentamiento', str(args.calentamiento),
+                   '--semilla', str(args.semilla), '--fecha-final', args.fecha_final]
+        if args.solo:
+            comando += ['--solo', ','.join(args.solo)]
+        proceso = subprocess.run(comando, cwd=BASE_DIR)
+        if proceso.returncode != 0 or not os.path.exists(salida):
+            print(f"   ❌ El proceso de {facturas:,} facturas terminó con código {proceso.returncode}")
+            return [{'benchmark': '*', 'facturas': facturas, 'estado': 'error',
+                     'detalle': f'proceso terminó con código {proceso.returncode}'}]
+        with open(salida, encoding='utf-8') as f:
+            return json.load(f)
+
+
+def ejecutar_en_proceso(facturas, args):
+    """Genera los datos de un tamaño, importa la app en ese directorio y corre los benchmarks."""
+    from datos_sinteticos import GeneradorDatos
+
+    resultados = []
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=f'bench_rendimiento_{facturas}_') as directorio:
+        for nombre in ARCHIVOS_CONFIGURACION:
+            shutil.copy2(os.path.join(BASE_DIR, nombre), directorio)
+        resumen = GeneradorDatos(facturas=facturas, semilla=args.semilla, fecha_final=args.fecha_final).generar(directorio)
+        print(f"\n🧪 {facturas:,} facturas sintéticas (huella {resumen['huella'][:16]}, "
+              f"{resumen['duracion_segundos']:.1f} s)")
+        os.chdir(directorio)
+        try:
+            import app as aplicacion
+
+            # Los archivos quedan en el formato en que los escribe la aplicación (indent=4)
+            for archivo in (aplicacion.ARCHIVO_CLIENTES, aplicacion.ARCHIVO_INVENTARIO, aplicacion.ARCHIVO_FACTURAS):
+                aplicacion.guardar_datos(archivo, aplicacion.cargar_datos(archivo))
+            cliente = aplicacion.app.test_client()
+            with cliente.session_transaction() as sesion:
+                sesion['usuario'] = 'admin'
+
+            for nombre, funcion in definir_benchmarks(aplicacion, cliente, args.fecha_final):
+                if args.solo and not any(filtro in nombre for filtro in args.solo):
+                    continue
+                try:
+                    resultado = medir(funcion, args.repeticiones, args.calentamiento)
+                    print(f"   ⏱️  {nombre:45} {resultado['mediana_ms']:>10,.1f} ms "
+                          f"(mín {resultado['minimo_ms']:,.1f}, máx {resultado['maximo_ms']:,.1f})")
+                except NoDisponible as e:
+                    resultado = {'estado': 'no_disponible', 'detalle': str(e)}
+                    print(f"   ⏭️  {nombre:45} no disponible: {e}")
+                except Exception as e:
+                    resultado = {'estado': 'error', 'detalle': f'{type(e).__name__}: {e}'}
+                    print(f"   ❌ {nombre:45} {resultado['detalle']}")
+                resultados.append({'benchmark': nombre, 'facturas': facturas, **resultado})
+        finally:
+            os.chdir(directorio_original)
+    return resultados
+
+
+def cargar_resultados(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def ultimo_resultado(excluir=None):
+    archivos = sorted(glob.glob(os.path.join(DIRECTORIO_RESULTADOS, '*.json')))
+    archivos = [a for a in archivos if not excluir or os.path.abspath(a) != os.path.abspath(excluir)]
+    return archivos[-1] if archivos else None
+
+
+def comparar(base, actual, umbral, minimo_ms):
+    """
+    Compara las medianas de dos ejecuciones
+
+    Returns:
+        Lista de filas con benchmark, facturas, base, actual, cambio (%) y veredicto
+    """
+    indice_base = {(r['benchmark'], r['facturas']): r for r in base['resultados'] if r.get('estado') == 'ok'}
+    filas = []
+    for r in actual['resultados']:
+        anterior = indice_base.get((r['benchmark'], r['facturas']))
+        if r.get('estado') != 'ok' or anterior is None:
+            continue
+        cambio = (r['mediana_ms'] - anterior['mediana_ms']) / max(anterior['mediana_ms'], 1e-9) * 100
+        diferencia = r['mediana_ms'] - anterior['mediana_ms']
+        if cambio > umbral and diferencia > minimo_ms:
+            veredicto = 'regresion'
+        elif cambio < -umbral and -diferencia > minimo_ms:
+            veredicto = 'mejora'
+        else:
+            veredicto = 'igual'
+        filas.append({'benchmark': r['benchmark'], 'facturas': r['facturas'], 'base_ms': anterior['mediana_ms'],
+                      'actual_ms': r['mediana_ms'], 'cambio_pct': round(cambio, 1), 'veredicto': veredicto})
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de almacenamiento, reportes, exportación y PDF')
+    parser.add_argument('--facturas', type=int, nargs='+', default=[1000, 10000], help='Tamaños de los datos sintéticos')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Repeticiones medidas por benchmark')
+    parser.add_argument('--calentamiento', type=int, default=1, help='Ejecuciones previas no medidas')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla de los datos sintéticos')
+    parser.add_argument('--fecha-final', default='2025-08-31', help='Fecha de la última factura sintética')
+    parser.add_argument('--solo', help='Ejecutar solo los benchmarks cuyo nombre contenga alguno de estos textos (coma)')
+    parser.add_argument('--json', help='Guardar resultados en este archivo')
+    parser.add_argument('--guardar', action='store_true', help=f'Guardar resultados en {os.path.basename(DIRECTORIO_RESULTADOS)}/')
+    parser.add_argument('--actual', help='No ejecutar: usar este archivo de resultados como ejecución actual')
+    parser.add_argument('--comparar', help="Archivo de resultados base, o 'ultimo' (el más reciente guardado)")
+    parser.add_argument('--umbral', type=float, default=20.0, help='Empeoramiento de la mediana (%%) que cuenta como regresión')
+    parser.add_argument('--minimo-ms', type=float, default=5.0, help='Diferencia mínima (ms) para marcar un cambio')
+    parser.add_argument('--interno', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--salida-interna', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.solo = [s.strip() for s in args.solo.split(',')] if args.solo else None
+
+    if args.interno:
+        # Medir el renderizado real de PDF, no la caché en disco
+        os.environ['PDF_CACHE_MAX_MB'] = '0'
+        os.environ.setdefault('LOG_NIVEL', 'ERROR')
+        with open(args.salida_interna, 'w', encoding='utf-8') as f:
+            json.dump(ejecutar_en_proceso(args.interno, args), f)
+        return 0
+
+    ruta_guardada = None
+    if args.actual:
+        actual = cargar_resultados(args.actual)
+        ruta_guardada = args.actual
+    else:
+        commit, modificado = info_commit()
+        actual = {
+            'commit': commit,
+            'modificado': modificado,
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'semilla': args.semilla,
+            'repeticiones': args.repeticiones,
+            'resultados': [],
+        }
+        for facturas in args.facturas:
+            actual['resultados'] += ejecutar_tamano(facturas, args)
+
+        if args.guardar:
+            os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+            ruta_guardada = os.path.join(DIRECTORIO_RESULTADOS, f"{datetime.now():%Y%m%d_%H%M%S}_{commit}"
+                                                                 f"{'_modificado' if modificado else ''}.json")
+        for ruta in filter(None, (ruta_guardada, args.json)):
+            with open(ruta, 'w', encoding='utf-8') as f:
+                json.dump(actual, f, indent=2, ensure_ascii=False)
+            print(f"\n💾 Resultados guardados en {ruta}")
+
+    if not args.comparar:
+        return 0
+    ruta_base = ultimo_resultado(excluir=ruta_guardada) if args.comparar == 'ultimo' else args.comparar
+    if not ruta_base:
+        print("\nℹ️ No hay resultados anteriores con los que comparar")
+        return 0
+    base = cargar_resultados(ruta_base)
+    filas = comparar(base, actual, args.umbral, args.minimo_ms)
+
+    print(f"\n📊 Comparación con {base.get('commit', '?')} ({os.path.basename(ruta_base)}), umbral {args.umbral:g} %")
+    print("=" * 100)
+    print(f"{'Benchmark':45} {'Facturas':>9} {'Base ms':>11} {'Actual ms':>11} {'Cambio':>9}")
+    iconos = {'regresion': '🔴', 'mejora': '🟢', 'igual': '  '}
+    for fila in filas:
+        print(f"{fila['benchmark']:45} {fila['facturas']:>9,} {fila['base_ms']:>11,.1f} {fila['actual_ms']:>11,.1f} "
+              f"{fila['cambio_pct']:>+8.1f}% {iconos[fila['veredicto']]}")
+    regresiones = [f for f in filas if f['veredicto'] == 'regresion']
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} regresiones por encima del {args.umbral:g} %")
+        return 1
+    print("\n✅ Sin regresiones")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
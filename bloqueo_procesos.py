@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Bloqueo entre Procesos
+================================
+
+Bloqueo exclusivo basado en un archivo .lock, para serializar secciones
+críticas entre varios workers de Gunicorn (threading.Lock solo protege un
+proceso).
+
+- Linux/macOS: fcntl.flock
+- Windows: msvcrt.locking sobre el primer byte del archivo
+"""
+
+import os
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+class BloqueoArchivo:
+    """Context manager de bloqueo exclusivo entre procesos"""
+
+    def __init__(self, ruta: str):
+        """
+        Args:
+            ruta: Ruta del archivo de bloqueo (se crea si no existe)
+        """
+        self.ruta = ruta
+        self._fd = None
+
+    def __enter__(self):
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        return False
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Caché HTTP - Compresión, ETags y Archivos Estáticos con Hash
+======================================================================
+
+Capa de respuestas HTTP para la aplicación Flask:
+
+- Compresión gzip (o brotli si está instalado) de HTML, JSON, CSS, JS y
+  texto por encima de un tamaño mínimo, con Vary: Accept-Encoding
+- ETag fuerte para las respuestas JSON y GET condicional (304) para toda
+  respuesta con ETag (APIs, PDF generados)
+- URLs de static/ con el hash del contenido en el nombre
+  (logo.png → logo.3f2a9c1b0e.png), servidas con Cache-Control immutable;
+  el resto de archivos estáticos se revalida con ETag
+
+Al comprimir, el ETag lleva el sufijo -gz / -br (la representación cambia);
+el sufijo se quita del If-None-Match entrante para que las rutas que
+comparan su propio ETag (respuesta_pdf, /api/productos) sigan acertando.
+
+Configuración por variables de entorno:
+    COMPRESION_MIN_BYTES     Tamaño mínimo para comprimir (por defecto 1024)
+    COMPRESION_NIVEL_GZIP    Nivel gzip 1-9 (por defecto 6)
+    CACHE_STATIC_MAX_AGE     Segundos de caché de static/ sin hash (por defecto 3600)
+    STATIC_URLS_CON_HASH     '1' (por defecto) agrega el hash a url_for('static', ...)
+
+Uso:
+    from cache_http import cache_http
+    cache_http.init_app(app)
+"""
+
+import gzip
+import hashlib
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+from flask import request, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from carga_perezosa import importar_opcional
+
+COMPRESION_MIN_BYTES = int(os.environ.get('COMPRESION_MIN_BYTES', '1024'))
+COMPRESION_NIVEL_GZIP = int(os.environ.get('COMPRESION_NIVEL_GZIP', '6'))
+CACHE_STATIC_MAX_AGE = int(os.environ.get('CACHE_STATIC_MAX_AGE', '3600'))
+CACHE_INMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+TIPOS_COMPRIMIBLES = {
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript', 'application/javascript',
+    'application/json', 'application/xml', 'text/xml', 'image/svg+xml',
+}
+
+LARGO_HASH = 10
+PATRON_HASH = re.compile(r'^(?P<base>.+)\.(?P<hash>[0-9a-f]{%d})(?P<extension>\.[A-Za-z0-9]+)$' % LARGO_HASH)
+PATRON_SUFIJO_ETAG = re.compile(r'-(?:gz|br)"')
+
+
+def quitar_hash_estatico(nombre: str) -> Tuple[str, Optional[str]]:
+    """('logo.3f2a9c1b0e.png') → ('logo.png', '3f2a9c1b0e'); sin hash → (nombre, None)"""
+    coincidencia = PATRON_HASH.match(nombre)
+    if not coincidencia:
+        return nombre, None
+    return coincidencia.group('base') + coincidencia.group('extension'), coincidencia.group('hash')
+
+
+class _SinSufijoCompresion:
+    """Middleware WSGI: quita -gz / -br de If-None-Match antes de que Flask lo lea"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        valor = environ.get('HTTP_IF_NONE_MATCH')
+        if valor and '-' in valor:
+            environ['HTTP_IF_NONE_MATCH'] = PATRON_SUFIJO_ETAG.sub('"', valor)
+        return self.wsgi_app(environ, start_response)
+
+
+class CacheHTTP:
+    """Clase que agrega compresión, ETags y caché de estáticos a una app Flask"""
+
+    def __init__(self, app=None):
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}   # ruta → (mtime_ns, tamaño, hash)
+        self._lock = threading.Lock()
+        self.directorio_static: Optional[str] = None
+        self.urls_con_hash = os.environ.get('STATIC_URLS_CON_HASH', '1') != '0'
+        self._brotli = importar_opcional('brotli')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        """Registra los hooks de respuesta, las URL con hash y la vista de static/"""
+        self.directorio_static = app.static_folder
+        app.wsgi_app = _SinSufijoCompresion(app.wsgi_app)
+        app.after_request(self._despues_de_respuesta)
+        app.url_defaults(self._url_estatica)
+        app.view_functions['static'] = self._servir_estatico
+
+    # --- Archivos estáticos ---
+
+    def hash_archivo(self, nombre: str) -> Optional[str]:
+        """Hash del contenido de static/<nombre> (recalculado solo si el archivo cambió)"""
+        ruta = os.path.join(self.directorio_static or '', nombre)
+        try:
+            info = os.stat(ruta)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        guardado = self._hashes.get(ruta)
+        if guardado and guardado[0] == info.st_mtime_ns and guardado[1] == info.st_size:
+            return guardado[2]
+        digest = hashlib.blake2b(digest_size=8)
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(bloque)
+        valor = digest.hexdigest()[:LARGO_HASH]
+        with self._lock:
+            self._hashes[ruta] = (info.st_mtime_ns, info.st_size, valor)
+        return valor
+
+    def nombre_con_hash(self, nombre: str) -> str:
+        """'logo.png' → 'logo.<hash>.png' (sin cambios si el archivo no existe)"""
+        base, extension = os.path.splitext(nombre)
+        valor = self.hash_archivo(nombre) if extension else None
+        return f'{base}.{valor}{extension}' if valor else nombre
+
+    def _url_estatica(self, endpoint, values) -> None:
+        if endpoint == 'static' and self.urls_con_hash and values.get('filename'):
+            values['filename'] = self.nombre_con_hash(values['filename'])
+
+    def _servir_estatico(self, filename):
+        directorio = self.directorio_static
+        original, valor = quitar_hash_estatico(filename)
+        # Validar antes de leer el archivo para el hash: '../' no debe salir de static/
+        if safe_join(directorio, filename) is None or safe_join(directorio, original) is None:
+            raise NotFound()
+        if valor and not os.path.isfile(safe_join(directorio, filename)):
+            if valor == self.hash_archivo(original):
+                # El nombre cambia con el contenido: el navegador no necesita revalidar
+                respuesta = send_from_directory(directorio, original, max_age=CACHE_INMUTABLE_MAX_AGE)
+                respuesta.cache_control.immutable = True
+                return respuesta
+            # Hash viejo (el archivo cambió): se sirve el actual sin caché larga
+            return send_from_directory(directorio, original, max_age=0)
+        return send_from_directory(directorio, filename, max_age=CACHE_STATIC_MAX_AGE)
+
+    # --- Respuestas ---
+
+    def _despues_de_respuesta(self, response):
+        directa = response.direct_passthrough or response.is_streamed
+        if not directa and request.method == 'GET' and response.status_code == 200:
+            etag, debil = response.get_etag()
+            if etag is None and response.mimetype == 'application/json':
+                response.add_etag()
+            if response.get_etag()[0]:
+                # 304 si el navegador ya tiene esta versión
+                response.make_conditional(request)
+        if not directa:
+            self._comprimir(response)
+        return response
+
+    def _codificacion(self) -> Optional[str]:
+        aceptadas = request.accept_encodings
+        if self._brotli is not None and aceptadas['br']:
+            return 'br'
+        if aceptadas['gzip']:
+            return 'gzip'
+        return None
+
+    def _comprimir(self, response) -> None:
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return
+        if response.mimetype not in TIPOS_COMPRIMIBLES or 'Content-Encoding' in response.headers:
+            return
+        datos = response.get_data()
+        if len(datos) < COMPRESION_MIN_BYTES:
+            return
+        response.vary.add('Accept-Encoding')
+        codificacion = self._codificacion()
+        if codificacion is None:
+            return
+        if codificacion == 'br':
+            comprimido = self._brotli.compress(datos, quality=5)
+        else:
+            comprimido = gzip.compress(datos, compresslevel=COMPRESION_NIVEL_GZIP, mtime=0)
+        response.set_data(comprimido)
+        response.headers['Content-Encoding'] = codificacion
+        etag, debil = response.get_etag()
+        if etag and not debil:
+            response.set_etag(f"{etag}-{'br' if codificacion == 'br' else 'gz'}")
+
+
+# Instancia global de la capa de caché HTTP (se registra con init_app)
+cache_http = CacheHTTP()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Carga Perezosa
+========================
+
+Utilidades para diferir trabajo costoso hasta su primer uso y así reducir
+el tiempo de arranque de cada worker de Gunicorn.
+
+Funcionalidades:
+- Instancias globales que se construyen en el primer acceso
+- Importación diferida de módulos opcionales
+"""
+
+import importlib
+import threading
+from typing import Any, Callable, Optional
+
+
+class InstanciaPerezosa:
+    """Proxy que construye la instancia real la primera vez que se usa"""
+
+    def __init__(self, fabrica: Callable[[], Any]):
+        """
+        Inicializa el proxy sin construir la instancia
+
+        Args:
+            fabrica: Callable sin argumentos que crea la instancia real
+        """
+        object.__setattr__(self, '_fabrica', fabrica)
+        object.__setattr__(self, '_instancia', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def obtener_instancia(self) -> Any:
+        """Devuelve la instancia real, creándola si aún no existe"""
+        instancia = object.__getattribute__(self, '_instancia')
+        if instancia is None:
+            with object.__getattribute__(self, '_lock'):
+                instancia = object.__getattribute__(self, '_instancia')
+                if instancia is None:
+                    instancia = object.__getattribute__(self, '_fabrica')()
+                    object.__setattr__(self, '_instancia', instancia)
+        return instancia
+
+    def esta_inicializada(self) -> bool:
+        """Indica si la instancia real ya fue construida"""
+        return object.__getattribute__(self, '_instancia') is not None
+
+    def __getattr__(self, nombre: str) -> Any:
+        return getattr(self.obtener_instancia(), nombre)
+
+    def __setattr__(self, nombre: str, valor: Any) -> None:
+        setattr(self.obtener_instancia(), nombre, valor)
+
+    def __repr__(self) -> str:
+        if self.esta_inicializada():
+            return repr(self.obtener_instancia())
+        return f"<InstanciaPerezosa {object.__getattribute__(self, '_fabrica')!r} (sin inicializar)>"
+
+
+_modulos_opcionales = {}
+_lock_modulos = threading.Lock()
+
+
+def importar_opcional(nombre_modulo: str) -> Optional[Any]:
+    """
+    Importa un módulo opcional en su primer uso y recuerda el resultado
+
+    Args:
+        nombre_modulo: Nombre del módulo a importar (por ejemplo 'pdfkit')
+
+    Returns:
+        El módulo importado, o None si no está instalado
+    """
+    if nombre_modulo not in _modulos_opcionales:
+        with _lock_modulos:
+            if nombre_modulo not in _modulos_opcionales:
+                try:
+                    _modulos_opcionales[nombre_modulo] = importlib.import_module(nombre_modulo)
+                except ImportError:
+                    _modulos_opcionales[nombre_modulo] = None
+    return _modulos_opcionales[nombre_modulo]
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo Cliente HTTP - Conexiones Salientes Compartidas
+======================================================
+
+Cliente HTTP único para todas las integraciones externas (BCV, DolarToday,
+Nominatim, ip-api, SENIAT). Mantiene una sesión con conexiones persistentes
+por host, de modo que solo la primera llamada paga DNS + TCP + TLS.
+
+Funcionalidades:
+- Sesión con pool de conexiones por host
+- Política de reintentos (errores de conexión; 502/503/504 solo en GET/HEAD)
+- Timeouts y verificación SSL configurables por host
+- Métricas por host: histograma de latencia, códigos HTTP y errores
+
+Uso:
+    from cliente_http import cliente_http
+    resp = cliente_http.get('https://www.bcv.org.ve/')
+    cliente_http.obtener_metricas()
+"""
+
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit
+from instrumentacion import instrumentacion
+
+# Límites superiores (ms) de los intervalos del histograma de latencia
+INTERVALOS_LATENCIA_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+CONFIGURACION_HOST_DEFAULT = {
+    'timeout': (5, 15),       # (conexión, lectura) en segundos
+    'verificar_ssl': True,
+    'reintentos': 2,
+    'factor_espera': 0.3,     # espera entre reintentos: factor * 2^(intento-1)
+    'conexiones': 10,         # tamaño del pool de conexiones del host
+    'headers': {}
+}
+
+# Ajustes de cada integración conocida (los mismos timeouts que usaban las llamadas originales)
+HOSTS_PREDETERMINADOS = {
+    'www.bcv.org.ve': {'timeout': (5, 20), 'verificar_ssl': False, 'reintentos': 1},  # El BCV publica un certificado incompleto
+    's3.amazonaws.com': {'timeout': 5},
+    'ip-api.com': {'timeout': 3, 'reintentos': 0},
+    'nominatim.openstreetmap.org': {'timeout': 10, 'headers': {'User-Agent': 'mi-app-web/1.0'}},
+}
+
+
+class ClienteHTTP:
+    """Clase para realizar solicitudes HTTP salientes con sesiones por host y métricas"""
+
+    def __init__(self, hosts: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Inicializa el cliente
+
+        Args:
+            hosts: Configuración por host que complementa a HOSTS_PREDETERMINADOS
+        """
+        self._config_hosts: Dict[str, Dict[str, Any]] = {}
+        self._sesiones: Dict[str, Any] = {}
+        self._metricas: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        for host, config in {**HOSTS_PREDETERMINADOS, **(hosts or {})}.items():
+            self.configurar_host(host, **config)
+        self._advertencias_ssl_silenciadas = False
+
+        if hasattr(os, 'register_at_fork'):
+            # Las conexiones abiertas no deben compartirse entre el proceso padre y los workers
+            os.register_at_fork(after_in_child=self._reiniciar_tras_fork)
+
+    def _reiniciar_tras_fork(self):
+        self._lock = threading.Lock()
+        self._sesiones = {}
+        self._metricas = {}
+
+    @staticmethod
+    def _host(url_o_host: str) -> str:
+        if '://' in url_o_host:
+            return urlsplit(url_o_host).netloc.lower()
+        return url_o_host.lower()
+
+    def configurar_host(self, url_o_host: str, **config) -> None:
+        """
+        Ajusta la configuración de un host (timeout, verificar_ssl, reintentos,
+        factor_espera, conexiones, headers). La sesión existente se descarta
+        para que tome la nueva configuración.
+        """
+        host = self._host(url_o_host)
+        with self._lock:
+            actual = self._config_hosts.get(host, dict(CONFIGURACION_HOST_DEFAULT))
+            nueva = {**actual, **config}
+            if nueva == actual and host in self._config_hosts:
+                return
+            self._config_hosts[host] = nueva
+            sesion = self._sesiones.pop(host, None)
+        if sesion is not None:
+            sesion.close()
+
+    def configuracion_host(self, url_o_host: str) -> Dict[str, Any]:
+        return self._config_hosts.get(self._host(url_o_host), CONFIGURACION_HOST_DEFAULT)
+
+    def sesion(self, url_o_host: str):
+        """Sesión con conexiones persistentes del host (se crea en el primer uso)"""
+        host = self._host(url_o_host)
+        sesion = self._sesiones.get(host)
+        if sesion is not None:
+            return sesion
+
+        with self._lock:
+            sesion = self._sesiones.get(host)
+            if sesion is None:
+                sesion = self._crear_sesion(self.configuracion_host(host))
+                self._sesiones[host] = sesion
+            return sesion
+
+    def _crear_sesion(self, config: Dict[str, Any]):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        reintentos = Retry(
+            total=config['reintentos'],
+            connect=config['reintentos'],
+            read=0,  # Un timeout de lectura no se repite: multiplicaría la espera del usuario
+            status=config['reintentos'],
+            backoff_factor=config['factor_espera'],
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({'GET', 'HEAD', 'OPTIONS'}),
+            raise_on_status=False,
+            respect_retry_after_header=True
+        )
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=config['conexiones'], max_retries=reintentos)
+
+        sesion = requests.Session()
+        sesion.mount('http://', adaptador)
+        sesion.mount('https://', adaptador)
+        sesion.verify = config['verificar_ssl']
+        sesion.headers.update(config['headers'])
+        if not config['verificar_ssl']:
+            self._silenciar_advertencias_ssl()
+        return sesion
+
+    def _silenciar_advertencias_ssl(self) -> None:
+        if not self._advertencias_ssl_silenciadas:
+            import urllib3
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+            self._advertencias_ssl_silenciadas = True
+
+    def solicitar(self, metodo: str, url: str, **kwargs):
+        """
+        Realiza una solicitud HTTP con la sesión y configuración del host
+
+        Args:
+            metodo: Método HTTP
+            url: URL completa
+            **kwargs: Argumentos de requests (timeout, headers, params, json...)
+
+        Returns:
+            requests.Response
+
+        Raises:
+            requests.RequestException: Si la solicitud falla tras los reintentos
+        """
+        host = self._host(url)
+        kwargs.setdefault('timeout', self.configuracion_host(host)['timeout'])
+        inicio = time.perf_counter()
+        try:
+            respuesta = self.sesion(host).request(metodo, url, **kwargs)
+        except Exception as e:
+            self._registrar(host, time.perf_counter() - inicio, error=type(e).__name__)
+            raise
+        self._registrar(host, time.perf_counter() - inicio, codigo=respuesta.status_code)
+        return respuesta
+
+    def get(self, url: str, **kwargs):
+        return self.solicitar('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.solicitar('POST', url, **kwargs)
+
+    # --- Métricas ---
+
+    def _registrar(self, host: str, duracion: float, codigo: Optional[int] = None,
+                   error: Optional[str] = None) -> None:
+        ms = duracion * 1000
+        instrumentacion.sumar('http_saliente', duracion)
+        with self._lock:
+            metricas = self._metricas.get(host)
+            if metricas is None:
+                metricas = self._metricas[host] = {
+                    'solicitudes': 0,
+                    'latencia_total_ms': 0.0,
+                    'latencia_maxima_ms': 0.0,
+                    'histograma_ms': {**{str(limite): 0 for limite in INTERVALOS_LATENCIA_MS}, '+Inf': 0},
+                    'codigos': {},
+                    'errores': {}
+                }
+            metricas['solicitudes'] += 1
+            metricas['latencia_total_ms'] += ms
+            metricas['latencia_maxima_ms'] = max(metricas['latencia_maxima_ms'], ms)
+            intervalo = next((str(limite) for limite in INTERVALOS_LATENCIA_MS if ms <= limite), '+Inf')
+            metricas['histograma_ms'][intervalo] += 1
+            if codigo is not None:
+                metricas['codigos'][str(codigo)] = metricas['codigos'].get(str(codigo), 0) + 1
+                if codigo >= 500:
+                    metricas['errores'][f'HTTP_{codigo}'] = metricas['errores'].get(f'HTTP_{codigo}', 0) + 1
+            if error is not None:
+                metricas['errores'][error] = metricas['errores'].get(error, 0) + 1
+
+    def obtener_metricas(self) -> Dict[str, Any]:
+        """Métricas por host desde el arranque del proceso"""
+        with self._lock:
+            resultado = {}
+            for host, metricas in self._metricas.items():
+                copia = {**metricas,
+                         'histograma_ms': dict(metricas['histograma_ms']),
+                         'codigos': dict(metricas['codigos']),
+                         'errores': dict(metricas['errores'])}
+                copia['latencia_promedio_ms'] = metricas['latencia_total_ms'] / metricas['solicitudes']
+                resultado[host] = copia
+            return resultado
+
+
+# Instancia global del cliente HTTP
+cliente_http = ClienteHTTP()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Cola de Envío SENIAT - Bandeja de Salida Persistente
+==============================================================
+
+Los documentos a enviar al SENIAT se guardan en una tabla SQLite local
+(cola_seniat/bandeja_salida.db) y un hilo en segundo plano los despacha, de
+modo que crear una factura nunca espera por la red del SENIAT.
+
+- Clave de idempotencia por documento (TIPO:numero): encolar dos veces el
+  mismo número no duplica el envío, y la clave viaja en el encabezado
+  Idempotency-Key para que el SENIAT pueda descartar reintentos.
+- Reintentos con retroceso exponencial y jitter, sin time.sleep en el hilo
+  del request.
+- Estado de conectividad tomado de los últimos envíos: tras un error de red
+  se posponen los demás documentos en lugar de intentar cada uno.
+- Varios workers de Gunicorn pueden compartir la cola: cada documento se
+  toma con una transacción inmediata y queda bloqueado mientras se envía.
+- Un documento 'fallido' vuelve a 'pendiente' si se encola de nuevo o con
+  reencolar_fallidos (por ejemplo tras corregir la configuración).
+
+Uso:
+    python cola_seniat.py estado
+    python cola_seniat.py procesar      # despacha lo pendiente una vez
+    python cola_seniat.py reencolar     # devuelve los fallidos a pendiente
+"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+from carga_perezosa import InstanciaPerezosa
+
+logger = logging.getLogger(__name__)
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_ENVIANDO = 'enviando'
+ESTADO_ENVIADO = 'enviado'
+ESTADO_FALLIDO = 'fallido'
+
+# Errores que no se resuelven reintentando
+ERRORES_DEFINITIVOS = ('FORMATO_INVALIDO', 'VALIDACION_ERROR')
+# El SENIAT ya tiene el documento: se considera enviado
+ERRORES_YA_ENVIADO = ('DOCUMENTO_DUPLICADO',)
+# Errores de red, que indican falta de conectividad
+ERRORES_CONECTIVIDAD = ('COMUNICACION_ERROR', 'CONECTIVIDAD_ERROR')
+
+
+class ColaEnvioSENIAT:
+    """Clase para encolar documentos fiscales y despacharlos al SENIAT en segundo plano"""
+
+    def __init__(self,
+                 archivo: str = 'cola_seniat/bandeja_salida.db',
+                 comunicador=None,
+                 max_intentos: int = 10,
+                 espera_base: float = 2.0,
+                 espera_maxima: float = 600.0,
+                 tiempo_bloqueo: float = 120.0):
+        """
+        Inicializa la cola de envío
+
+        Args:
+            archivo: Base SQLite de la bandeja de salida
+            comunicador: Instancia de ComunicacionSENIAT (por defecto la global)
+            max_intentos: Intentos antes de marcar un documento como fallido
+            espera_base: Segundos del primer reintento (se duplica en cada intento)
+            espera_maxima: Tope de espera entre reintentos
+            tiempo_bloqueo: Segundos tras los cuales un envío sin terminar
+                            (worker caído) vuelve a estar disponible
+        """
+        self.archivo = archivo
+        self._comunicador = comunicador
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.tiempo_bloqueo = tiempo_bloqueo
+
+        self._hilo: Optional[threading.Thread] = None
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self._cache_estatus = None
+        self._crear_tabla()
+
+    @property
+    def comunicador(self):
+        if self._comunicador is None:
+            from comunicacion_seniat import comunicador_seniat
+            self._comunicador = comunicador_seniat
+        return self._comunicador
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexion = sqlite3.connect(self.archivo, timeout=30, isolation_level=None)
+        conexion.row_factory = sqlite3.Row
+        return conexion
+
+    def _crear_tabla(self) -> None:
+        directorio = os.path.dirname(self.archivo)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = self._conectar()
+        try:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('''
+                CREATE TABLE IF NOT EXISTS envios (
+                    clave_idempotencia TEXT PRIMARY KEY,
+                    tipo TEXT NOT NULL,
+                    numero TEXT NOT NULL,
+                    documento TEXT NOT NULL,
+                    usuario TEXT NOT NULL,
+                    estado TEXT NOT NULL,
+                    intentos INTEGER NOT NULL DEFAULT 0,
+                    proximo_intento REAL NOT NULL,
+                    bloqueado_hasta REAL NOT NULL DEFAULT 0,
+                    ultimo_error TEXT,
+                    resultado TEXT,
+                    fecha_creacion TEXT NOT NULL,
+                    fecha_actualizacion TEXT NOT NULL
+                )
+            ''')
+            conexion.execute('CREATE INDEX IF NOT EXISTS idx_envios_estado ON envios (estado, proximo_intento)')
+        finally:
+            conexion.close()
+
+    @staticmethod
+    def clave_idempotencia(tipo: str, numero: str) -> str:
+        """Clave única de envío para un documento"""
+        return f'{tipo}:{numero}'
+
+    def encolar(self, documento: Dict[str, Any], tipo: str = 'FACTURA', usuario: str = 'SISTEMA',
+                iniciar_trabajador: bool = True) -> Dict[str, Any]:
+        """
+        Guarda un documento en la bandeja de salida (no hace llamadas de red)
+
+        Args:
+            documento: Documento fiscal a enviar
+            tipo: FACTURA, NOTA_CREDITO o NOTA_DEBITO
+            usuario: Usuario que origina el envío
+            iniciar_trabajador: Arrancar el hilo de despacho si no está activo
+
+        Returns:
+            Diccionario con la clave de idempotencia y si el documento ya estaba
+            encolado. Un documento 'fallido' se vuelve a encolar con el contenido nuevo.
+        """
+        numero = str(documento.get('numero') or '')
+        if not numero:
+            raise ValueError('El documento no tiene número fiscal')
+
+        clave = self.clave_idempotencia(tipo, numero)
+        ahora = datetime.now().isoformat()
+        contenido = json.dumps(documento, ensure_ascii=False, default=str)
+        conexion = self._conectar()
+        try:
+            conexion.execute('BEGIN IMMEDIATE')
+            cursor = conexion.execute(
+                '''INSERT OR IGNORE INTO envios
+                   (clave_idempotencia, tipo, numero, documento, usuario, estado,
+                    proximo_intento, fecha_creacion, fecha_actualizacion)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                (clave, tipo, numero, contenido, usuario, ESTADO_PENDIENTE, time.time(), ahora, ahora)
+            )
+            nuevo = cursor.rowcount == 1
+            reencolado = False
+            if not nuevo:
+                # Pendientes, en envío y enviados se ignoran; un fallido vuelve a la cola
+                cursor = conexion.execute(
+                    '''UPDATE envios SET documento = ?, usuario = ?, estado = ?, intentos = 0,
+                       proximo_intento = ?, bloqueado_hasta = 0, ultimo_error = NULL, resultado = NULL,
+                       fecha_actualizacion = ? WHERE clave_idempotencia = ? AND estado = ?''',
+                    (contenido, usuario, ESTADO_PENDIENTE, time.time(), ahora, clave, ESTADO_FALLIDO)
+                )
+                reencolado = cursor.rowcount == 1
+            conexion.execute('COMMIT')
+        except Exception:
+            conexion.execute('ROLLBACK')
+            raise
+        finally:
+            conexion.close()
+
+        if iniciar_trabajador:
+            self.iniciar_trabajador()
+        self._despertar.set()
+        encolado = nuevo or reencolado
+        return {'clave_idempotencia': clave, 'encolado': encolado, 'reencolado': reencolado,
+                'duplicado': not encolado}
+
+    def reencolar_fallidos(self, tipo: Optional[str] = None, numero: Optional[str] = None) -> int:
+        """
+        Devuelve a 'pendiente' (con los intentos en cero) los documentos fallidos
+
+        Args:
+            tipo: Solo documentos de este tipo (None para todos)
+            numero: Solo este número (requiere tipo)
+
+        Returns:
+            Cantidad de documentos reencolados
+        """
+        condiciones, parametros = ['estado = ?'], [ESTADO_FALLIDO]
+        if tipo and numero:
+            condiciones.append('clave_idempotencia = ?')
+            parametros.append(self.clave_idempotencia(tipo, numero))
+        elif tipo:
+            condiciones.append('tipo = ?')
+            parametros.append(tipo)
+        conexion = self._conectar()
+        try:
+            cursor = conexion.execute(
+                f'''UPDATE envios SET estado = ?, intentos = 0, proximo_intento = ?, bloqueado_hasta = 0,
+                    fecha_actualizacion = ? WHERE {' AND '.join(condiciones)}''',
+                [ESTADO_PENDIENTE, time.time(), datetime.now().isoformat(), *parametros]
+            )
+            reencolados = cursor.rowcount
+        finally:
+            conexion.close()
+        if reencolados:
+            self._despertar.set()
+        return reencolados
+
+    def _tomar_pendientes(self, limite: int) -> List[sqlite3.Row]:
+        """Marca como 'enviando' hasta `limite` documentos vencidos y los devuelve"""
+        ahora = time.time()
+        conexion = self._conectar()
+        try:
+            conexion.execute('BEGIN IMMEDIATE')
+            filas = conexion.execute(
+                '''SELECT * FROM envios
+                   WHERE (estado = ? AND proximo_intento <= ?)
+                      OR (estado = ? AND bloqueado_hasta <= ?)
+                   ORDER BY proximo_intento LIMIT ?''',
+                (ESTADO_PENDIENTE, ahora, ESTADO_ENVIANDO, ahora, limite)
+            ).fetchall()
+            conexion.executemany(
+                'UPDATE envios SET estado = ?, bloqueado_hasta = ? WHERE clave_idempotencia = ?',
+                [(ESTADO_ENVIANDO, ahora + self.tiempo_bloqueo, fila['clave_idempotencia']) for fila in filas]
+            )
+            conexion.execute('COMMIT')
+            return filas
+        except Exception:
+            conexion.execute('ROLLBACK')
+            raise
+        finally:
+            conexion.close()
+
+    def calcular_espera(self, intentos: int) -> float:
+        """Retroceso exponencial con jitter: entre la mitad y el total de base*2^intentos"""
+        espera = min(self.espera_maxima, self.espera_base * (2 ** max(0, intentos - 1)))
+        return espera / 2 + random.uniform(0, espera / 2)
+
+    def procesar_pendientes(self, limite: int = 20) -> Dict[str, int]:
+        """
+        Envía los documentos vencidos de la bandeja de salida
+
+        Args:
+            limite: Máximo de documentos por ronda
+
+        Returns:
+            Conteo de documentos enviados, reprogramados y fallidos en la ronda
+        """
+        resumen = {'enviados': 0, 'reprogramados': 0, 'fallidos': 0}
+        filas = self._tomar_pendientes(limite)
+        sin_conexion_hasta = None
+
+        for fila in filas:
+            intentos = fila['intentos'] + 1
+            if sin_conexion_hasta is not None:
+                # El SENIAT no respondió en esta ronda: no insistir con el resto
+                self._reprogramar(fila, fila['intentos'], sin_conexion_hasta, 'Pospuesto por falta de conectividad')
+                resumen['reprogramados'] += 1
+                continue
+
+            try:
+                documento = json.loads(fila['documento'])
+                resultado = self.comunicador.enviar_documento_una_vez(
+                    documento, fila['tipo'], fila['usuario'], clave_idempotencia=fila['clave_idempotencia']
+                )
+            except Exception as e:
+                # Un documento con error no debe dejar el resto de la ronda bloqueado en 'enviando':
+                # se reprograma con retroceso o queda fallido al agotar los intentos
+                logger.error("Error enviando %s %s desde la bandeja de salida: %s", fila['tipo'], fila['numero'], e)
+                resultado = {'exito': False, 'error': f'Error interno: {e}', 'codigo_error': None}
+            codigo = resultado.get('codigo_error')
+
+            if resultado.get('exito') or codigo in ERRORES_YA_ENVIADO:
+                self._finalizar(fila, ESTADO_ENVIADO, intentos, resultado)
+                self._registrar_estatus(fila, resultado)
+                resumen['enviados'] += 1
+            elif codigo in ERRORES_DEFINITIVOS or intentos >= self.max_intentos:
+                self._finalizar(fila, ESTADO_FALLIDO, intentos, resultado)
+                resumen['fallidos'] += 1
+            else:
+                proximo = time.time() + self.calcular_espera(intentos)
+                self._reprogramar(fila, intentos, proximo, resultado.get('error', ''))
+                resumen['reprogramados'] += 1
+                if codigo in ERRORES_CONECTIVIDAD:
+                    sin_conexion_hasta = proximo
+
+        return resumen
+
+    def _finalizar(self, fila: sqlite3.Row, estado: str, intentos: int, resultado: Dict[str, Any]) -> None:
+        conexion = self._conectar()
+        try:
+            conexion.execute(
+                '''UPDATE envios SET estado = ?, intentos = ?, bloqueado_hasta = 0, resultado = ?,
+                   ultimo_error = ?, fecha_actualizacion = ? WHERE clave_idempotencia = ?''',
+                (estado, intentos, json.dumps(resultado, ensure_ascii=False, default=str),
+                 None if resultado.get('exito') else resultado.get('error'),
+                 datetime.now().isoformat(), fila['clave_idempotencia'])
+            )
+        finally:
+            conexion.close()
+
+    def _registrar_estatus(self, fila: sqlite3.Row, resultado: Dict[str, Any]) -> None:
+        """Anota en la caché de estatus que el SENIAT recibió el documento"""
+        try:
+            if self._cache_estatus is None:
+                from estatus_seniat import CacheEstatusSENIAT
+                self._cache_estatus = CacheEstatusSENIAT(self.archivo, self._comunicador)
+            self._cache_estatus.registrar(fila['tipo'], fila['numero'], 'RECIBIDO', resultado, origen='envio')
+        except Exception as e:
+            logger.error("Error registrando estatus SENIAT de %s: %s", fila['numero'], e)
+
+    def _reprogramar(self, fila: sqlite3.Row, intentos: int, proximo: float, error: str) -> None:
+        conexion = self._conectar()
+        try:
+            conexion.execute(
+                '''UPDATE envios SET estado = ?, intentos = ?, proximo_intento = ?, bloqueado_hasta = 0,
+                   ultimo_error = ?, fecha_actualizacion = ? WHERE clave_idempotencia = ?''',
+                (ESTADO_PENDIENTE, intentos, proximo, error, datetime.now().isoformat(),
+                 fila['clave_idempotencia'])
+            )
+        finally:
+            conexion.close()
+
+    def _segundos_hasta_proximo(self) -> float:
+        conexion = self._conectar()
+        try:
+            fila = conexion.execute(
+                'SELECT MIN(proximo_intento) AS proximo FROM envios WHERE estado = ?', (ESTADO_PENDIENTE,)
+            ).fetchone()
+        finally:
+            conexion.close()
+        if not fila or fila['proximo'] is None:
+            return 60.0
+        return max(0.1, min(60.0, fila['proximo'] - time.time()))
+
+    # --- Hilo de despacho ---
+
+    def iniciar_trabajador(self) -> None:
+        """Arranca el hilo de despacho de este proceso si no está activo"""
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle_trabajador, name='cola-seniat', daemon=True)
+            self._hilo.start()
+
+    def detener_trabajador(self, timeout: float = 5.0) -> None:
+        """Detiene el hilo de despacho"""
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+            self._hilo = None
+
+    def _bucle_trabajador(self) -> None:
+        while not self._detener.is_set():
+            try:
+                resumen = self.procesar_pendientes()
+                if resumen['enviados'] or resumen['fallidos']:
+                    continue
+                espera = self._segundos_hasta_proximo()
+            except Exception as e:
+                logger.error("Error en la cola de envío SENIAT: %s", e)
+                espera = 5.0
+            self._despertar.wait(espera)
+            self._despertar.clear()
+
+    # --- Consultas ---
+
+    def obtener_envio(self, tipo: str, numero: str) -> Optional[Dict[str, Any]]:
+        """Estado de envío de un documento"""
+        conexion = self._conectar()
+        try:
+            fila = conexion.execute('SELECT * FROM envios WHERE clave_idempotencia = ?',
+                                    (self.clave_idempotencia(tipo, numero),)).fetchone()
+        finally:
+            conexion.close()
+        if fila is None:
+            return None
+        envio = {k: fila[k] for k in fila.keys() if k != 'documento'}
+        envio['resultado'] = json.loads(envio['resultado']) if envio['resultado'] else None
+        return envio
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        """Cantidad de documentos por estado y conectividad reciente"""
+        conexion = self._conectar()
+        try:
+            filas = conexion.execute('SELECT estado, COUNT(*) AS total FROM envios GROUP BY estado').fetchall()
+        finally:
+            conexion.close()
+        por_estado = {estado: 0 for estado in (ESTADO_PENDIENTE, ESTADO_ENVIANDO, ESTADO_ENVIADO, ESTADO_FALLIDO)}
+        por_estado.update({fila['estado']: fila['total'] for fila in filas})
+        return {
+            'por_estado': por_estado,
+            'trabajador_activo': self._hilo is not None and self._hilo.is_alive(),
+            'conectado': self._comunicador.conectado if self._comunicador is not None else None
+        }
+
+
+# Instancia global de la cola de envío (se construye en el primer uso)
+cola_seniat = InstanciaPerezosa(ColaEnvioSENIAT)
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Bandeja de salida de documentos SENIAT')
+    parser.add_argument('accion', choices=['estado', 'procesar', 'reencolar'])
+    parser.add_argument('--tipo', help='Tipo de documento a reencolar (por defecto todos)')
+    parser.add_argument('--numero', help='Número de documento a reencolar (requiere --tipo)')
+    args = parser.parse_args(argv[1:])
+
+    if args.accion == 'reencolar':
+        print(f"🔁 Reencolados: {cola_seniat.reencolar_fallidos(args.tipo, args.numero)}")
+    elif args.accion == 'procesar':
+        resumen = cola_seniat.procesar_pendientes(limite=1000)
+        print(f"📤 Enviados: {resumen['enviados']}, reprogramados: {resumen['reprogramados']}, "
+              f"fallidos: {resumen['fallidos']}")
+
+    print(f"📊 {json.dumps(cola_seniat.obtener_estadisticas()['por_estado'], ensure_ascii=False)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
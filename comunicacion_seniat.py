@@ -13,19 +13,27 @@ Funcionalidades:
 - Envío de notas de crédito/débito
 - Consulta de estatus de documentos
 - Manejo de respuestas y errores
-- Verificación de conectividad
+- Verificación de conectividad (cacheada)
 - Sistema de reintentos automáticos
+- Envío de un solo intento con clave de idempotencia (usado por cola_seniat)
+- Envío por lotes con concurrencia acotada sobre conexiones persistentes
 """
 
 import json
-# import requests  # Temporarily commented out for testing
 import time
 import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Tuple
 from urllib.parse import urljoin
 import xml.etree.ElementTree as ET
 from seguridad_fiscal import seguridad_fiscal
+from carga_perezosa import InstanciaPerezosa
+from cliente_http import cliente_http
+
+# El SENIAT ya tiene el documento: cuenta como entregado (igual que en cola_seniat)
+ERRORES_YA_ENVIADO = ('DOCUMENTO_DUPLICADO',)
 
 class ComunicacionSENIAT:
     """Clase para manejar la comunicación con las APIs del SENIAT"""
@@ -40,10 +48,13 @@ class ComunicacionSENIAT:
         # URLs base del SENIAT (URLs reales deben obtenerse del SENIAT)
         self.config = configuracion or self._cargar_configuracion_default()
         
-        # Configurar sesión HTTP con SSL/TLS
-        # self.session = requests.Session()  # Temporarily commented out for testing
-        # self.session.verify = True  # Verificar certificados SSL  # Temporarily commented out for testing
-        self.session = None  # Temporarily set to None
+        # Conexiones HTTP(S) persistentes del cliente compartido, con tantas
+        # conexiones como envíos simultáneos de enviar_lote
+        cliente_http.configurar_host(
+            self.config['url_base'],
+            verificar_ssl=True,
+            conexiones=self.config.get('concurrencia_lote', 8)
+        )
         
         # Headers por defecto
         self.headers = {
@@ -52,11 +63,25 @@ class ComunicacionSENIAT:
             'User-Agent': 'SistemaFiscal/1.0.0 SENIAT-Compliant'
         }
         
-        # Estado de conectividad
+        # Estado de conectividad (actualizado también por cada envío; los
+        # hilos de enviar_lote lo comparten, por eso va bajo _lock_conectividad)
+        self._lock_conectividad = threading.Lock()
         self.conectado = False
         self.ultima_conexion = None
+        self.ultima_verificacion = None
         self.errores_consecutivos = 0
         
+    def _registrar_conectividad(self, conectado: bool) -> None:
+        """Actualiza el estado de conectividad a partir de una respuesta (o su ausencia)"""
+        with self._lock_conectividad:
+            self.conectado = conectado
+            self.ultima_verificacion = datetime.now()
+            if conectado:
+                self.ultima_conexion = self.ultima_verificacion
+                self.errores_consecutivos = 0
+            else:
+                self.errores_consecutivos += 1
+        
     def _cargar_configuracion_default(self) -> Dict[str, Any]:
         """Carga configuración por defecto para SENIAT"""
         return {
@@ -83,6 +108,8 @@ class ComunicacionSENIAT:
             'max_reintentos': 3,
             'tiempo_espera': 30,  # segundos
             'timeout_conexion': 60,  # segundos
+            'ttl_conectividad': 60,  # segundos que se reutiliza el último estado de conectividad
+            'concurrencia_lote': 8,  # envíos simultáneos en enviar_lote
             
             # Configuración de logs
             'log_requests': True,
@@ -107,26 +134,38 @@ class ComunicacionSENIAT:
         self.headers['X-RIF-Empresa'] = rif
         self.headers['X-Codigo-Contribuyente'] = codigo_contribuyente
         
-    def verificar_conectividad(self) -> bool:
+    def verificar_conectividad(self, forzar: bool = False) -> bool:
         """
         Verifica la conectividad con los servicios del SENIAT
         
+        Si hubo una verificación o un envío hace menos de 'ttl_conectividad'
+        segundos se devuelve ese resultado sin consultar url_estatus.
+        
+        Args:
+            forzar: Consultar url_estatus aunque el estado en caché esté vigente
+            
         Returns:
             True si hay conectividad, False en caso contrario
         """
+        if not forzar:
+            with self._lock_conectividad:
+                ultima_verificacion, conectado = self.ultima_verificacion, self.conectado
+            if ultima_verificacion is not None:
+                antiguedad = (datetime.now() - ultima_verificacion).total_seconds()
+                if antiguedad < self.config.get('ttl_conectividad', 60):
+                    return conectado
+                
         try:
             url = urljoin(self.config['url_base'], self.config['url_estatus'])
             
-            response = self.session.get(
+            response = cliente_http.get(
                 url,
                 headers=self.headers,
                 timeout=self.config['timeout_conexion']
             )
             
             if response.status_code == 200:
-                self.conectado = True
-                self.ultima_conexion = datetime.now()
-                self.errores_consecutivos = 0
+                self._registrar_conectividad(True)
                 
                 # Registrar conectividad exitosa
                 seguridad_fiscal.registrar_log_fiscal(
@@ -139,13 +178,11 @@ class ComunicacionSENIAT:
                 
                 return True
             else:
-                self.conectado = False
-                self.errores_consecutivos += 1
+                self._registrar_conectividad(False)
                 return False
                 
         except Exception as e:
-            self.conectado = False
-            self.errores_consecutivos += 1
+            self._registrar_conectividad(False)
             
             # Registrar error de conectividad
             seguridad_fiscal.registrar_log_fiscal(
@@ -197,6 +234,162 @@ class ComunicacionSENIAT:
         """
         return self._enviar_documento(nota, 'NOTA_DEBITO', self.config['url_notas_debito'], usuario)
         
+    def _endpoint_tipo(self, tipo: str) -> str:
+        """Endpoint de la API para un tipo de documento"""
+        endpoints = {
+            'FACTURA': self.config['url_facturas'],
+            'NOTA_CREDITO': self.config['url_notas_credito'],
+            'NOTA_DEBITO': self.config['url_notas_debito']
+        }
+        if tipo not in endpoints:
+            raise ValueError(f"Tipo de documento '{tipo}' no válido")
+        return endpoints[tipo]
+        
+    def enviar_documento_una_vez(self, documento: Dict[str, Any], tipo: str, usuario: str = 'SISTEMA',
+                                 clave_idempotencia: Optional[str] = None,
+                                 registrar_envio: bool = True) -> Dict[str, Any]:
+        """
+        Realiza un único intento de envío, sin verificar conectividad ni esperar
+        
+        Los reintentos quedan a cargo de quien llama (cola_seniat). La clave de
+        idempotencia se envía en el encabezado Idempotency-Key.
+        
+        Args:
+            documento: Documento a enviar
+            tipo: Tipo de documento
+            usuario: Usuario que envía
+            clave_idempotencia: Clave única del envío (por defecto TIPO:numero)
+            registrar_envio: Registrar en auditoría el intento además de la respuesta
+            
+        Returns:
+            Resultado del envío, con el mismo formato que enviar_factura
+        """
+        numero_documento = documento.get('numero', 'N/A')
+        url = urljoin(self.config['url_base'], self._endpoint_tipo(tipo))
+        headers = dict(self.headers)
+        headers['Idempotency-Key'] = clave_idempotencia or f'{tipo}:{numero_documento}'
+        
+        if registrar_envio:
+            seguridad_fiscal.registrar_log_fiscal(
+                usuario=usuario,
+                accion=f'ENVIO_SENIAT_{tipo}',
+                documento_tipo=tipo,
+                documento_numero=numero_documento,
+                detalles=f'Enviando a {url} (clave {headers["Idempotency-Key"]})'
+            )
+        
+        try:
+            response = cliente_http.post(
+                url,
+                json=self._preparar_payload_seniat(documento, tipo),
+                headers=headers,
+                timeout=self.config['timeout_conexion']
+            )
+        except Exception as e:
+            self._registrar_conectividad(False)
+            seguridad_fiscal.registrar_log_fiscal(
+                usuario=usuario,
+                accion=f'ERROR_ENVIO_SENIAT_{tipo}',
+                documento_tipo=tipo,
+                documento_numero=numero_documento,
+                detalles=f'Error de comunicación: {str(e)}'
+            )
+            return {
+                'exito': False,
+                'error': f'Error de comunicación: {str(e)}',
+                'codigo_error': 'COMUNICACION_ERROR',
+                'timestamp': datetime.now().isoformat()
+            }
+            
+        # Cualquier respuesta HTTP por debajo de 500 prueba que el servicio está disponible
+        self._registrar_conectividad(response.status_code < 500)
+        return self._procesar_respuesta_seniat(response, tipo, numero_documento, usuario)
+        
+    def enviar_lote(self, documentos: List[Dict[str, Any]], tipo: str = 'FACTURA',
+                    usuario: str = 'SISTEMA', concurrencia: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Envía varios documentos del mismo tipo con concurrencia acotada
+        
+        Se verifica la conectividad una sola vez para todo el lote y cada
+        documento se envía en un único intento (con su clave de idempotencia)
+        reutilizando las conexiones persistentes de la sesión. Un documento que
+        el SENIAT ya tenía (DOCUMENTO_DUPLICADO) cuenta como enviado, igual que
+        en cola_seniat. Los documentos que fallen pueden reenviarse con otro
+        lote o con cola_seniat.
+        
+        Args:
+            documentos: Lista de documentos a enviar
+            tipo: Tipo de documento de todo el lote
+            usuario: Usuario que envía
+            concurrencia: Envíos simultáneos (por defecto 'concurrencia_lote')
+            
+        Returns:
+            Totales del lote y resultado por número de documento
+        """
+        inicio = time.perf_counter()
+        concurrencia = max(1, concurrencia or self.config.get('concurrencia_lote', 8))
+        self._endpoint_tipo(tipo)  # Validar el tipo antes de enviar nada
+        
+        resumen = {
+            'exito': False,
+            'tipo': tipo,
+            'total': len(documentos),
+            'enviados': 0,
+            'duplicados': 0,
+            'fallidos': 0,
+            'resultados': {},
+            'timestamp': datetime.now().isoformat()
+        }
+        if not documentos:
+            resumen['exito'] = True
+            return resumen
+            
+        if not self.verificar_conectividad():
+            error = {'exito': False, 'error': 'No hay conectividad con SENIAT', 'codigo_error': 'CONECTIVIDAD_ERROR'}
+            resumen['fallidos'] = len(documentos)
+            resumen['resultados'] = {str(d.get('numero', 'N/A')): error for d in documentos}
+            return resumen
+            
+        seguridad_fiscal.registrar_log_fiscal(
+            usuario=usuario,
+            accion=f'ENVIO_LOTE_SENIAT_{tipo}',
+            documento_tipo=tipo,
+            documento_numero=f'{documentos[0].get("numero", "N/A")}..{documentos[-1].get("numero", "N/A")}',
+            detalles=f'Enviando lote de {len(documentos)} documentos (concurrencia {concurrencia})'
+        )
+        
+        def enviar(documento):
+            try:
+                return self.enviar_documento_una_vez(documento, tipo, usuario, registrar_envio=False)
+            except Exception as e:
+                return {'exito': False, 'error': f'Error crítico: {str(e)}', 'codigo_error': 'ERROR_CRITICO'}
+                
+        with ThreadPoolExecutor(max_workers=min(concurrencia, len(documentos))) as pool:
+            for documento, resultado in zip(documentos, pool.map(enviar, documentos)):
+                resumen['resultados'][str(documento.get('numero', 'N/A'))] = resultado
+                if resultado.get('exito'):
+                    resumen['enviados'] += 1
+                elif resultado.get('codigo_error') in ERRORES_YA_ENVIADO:
+                    resumen['enviados'] += 1
+                    resumen['duplicados'] += 1
+                else:
+                    resumen['fallidos'] += 1
+                    
+        duracion = time.perf_counter() - inicio
+        resumen['exito'] = resumen['fallidos'] == 0
+        resumen['duracion_segundos'] = duracion
+        resumen['documentos_por_segundo'] = len(documentos) / duracion if duracion else 0
+        
+        seguridad_fiscal.registrar_log_fiscal(
+            usuario=usuario,
+            accion=f'RESULTADO_LOTE_SENIAT_{tipo}',
+            documento_tipo=tipo,
+            documento_numero=f'{documentos[0].get("numero", "N/A")}..{documentos[-1].get("numero", "N/A")}',
+            detalles=f'Lote: {resumen["enviados"]} enviados ({resumen["duplicados"]} ya estaban en SENIAT), '
+                     f'{resumen["fallidos"]} fallidos en {duracion:.2f} s'
+        )
+        return resumen
+        
     def _enviar_documento(self, documento: Dict[str, Any], tipo: str, endpoint: str, usuario: str) -> Dict[str, Any]:
         """
         Método interno para enviar documentos al SENIAT
@@ -240,7 +433,7 @@ class ComunicacionSENIAT:
                         detalles=f'Intento {intento + 1}/{self.config["max_reintentos"]} - Enviando a {url}'
                     )
                     
-                    response = self.session.post(
+                    response = cliente_http.post(
                         url,
                         json=payload,
                         headers=self.headers,
@@ -471,7 +664,7 @@ class ComunicacionSENIAT:
                 'rif_empresa': self.config['rif_empresa']
             }
             
-            response = self.session.get(
+            response = cliente_http.get(
                 url,
                 params=params,
                 headers=self.headers,
@@ -498,14 +691,16 @@ class ComunicacionSENIAT:
         if 'token_api' in config_safe:
             config_safe['token_api'] = '*' * 10 + config_safe['token_api'][-4:] if config_safe['token_api'] else ''
             
-        return {
-            'configuracion': config_safe,
-            'estado_conexion': {
+        with self._lock_conectividad:
+            estado_conexion = {
                 'conectado': self.conectado,
                 'ultima_conexion': self.ultima_conexion.isoformat() if self.ultima_conexion else None,
                 'errores_consecutivos': self.errores_consecutivos
             }
+        return {
+            'configuracion': config_safe,
+            'estado_conexion': estado_conexion
         }
 
-# Instancia global del comunicador SENIAT
-comunicador_seniat = ComunicacionSENIAT() 
\ No newline at end of file
+# Instancia global del comunicador SENIAT (se construye en el primer uso)
+comunicador_seniat = InstanciaPerezosa(ComunicacionSENIAT) 
\ No newline at end of file
@@ -0,0 +1,661 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Datos Sintéticos - Generador para Pruebas de Escala
+=============================================================
+
+Genera un conjunto de datos realista con el esquema JSON actual de la
+aplicación, para que los benchmarks y las pruebas de regresión compartan una
+misma línea base a escala de producción (de 1k a 1M facturas):
+
+- clientes.json, inventario.json (con historial de ajustes)
+- facturas_json/facturas.json con pagos, abonos y vencimientos coherentes
+  con la antigüedad de cada factura, y cuentas_por_cobrar.json
+- notas_entrega_json/notas_entrega.json y cotizaciones_json/cotizacion_<número>.json
+- bitacora.log y logs/auditoria_fiscal.log (encadenado, con su ancla, de modo
+  que `python auditoria_fiscal.py verificar` lo valida)
+- control_numeracion_fiscal.json con la serie FACTURA a continuación de la última
+
+Determinista: con la misma semilla, tamaño y fecha final los archivos son
+idénticos byte a byte (ids, fechas y tasas salen del generador aleatorio, no
+del reloj). Los archivos se escriben en streaming, un registro por línea, sin
+armar los diccionarios completos en memoria.
+
+Tamaños predefinidos (facturas): 1k, 10k, 100k y 1m. El resto de entidades se
+escala a partir de las facturas (1 cliente cada 20, 1 nota cada 10, ...).
+
+Uso:
+    python datos_sinteticos.py generar --tamano 10k --destino datos_prueba
+    python datos_sinteticos.py generar --facturas 250000 --semilla 7 --destino /tmp/datos
+
+    from datos_sinteticos import GeneradorDatos
+    resumen = GeneradorDatos(facturas=1000, semilla=42).generar('datos_prueba')
+"""
+
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from auditoria_fiscal import HASH_GENESIS, SEPARADOR_HASH, SEPARADOR_PREV, calcular_hash_linea
+
+TAMANOS = {'1k': 1_000, '10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+NOMBRES = ['MARIA', 'JOSE', 'LUIS', 'CARMEN', 'ANA', 'CARLOS', 'ROSA', 'JUAN', 'YELITZA', 'PEDRO', 'ALICIA',
+           'GERARDO', 'MILAGROS', 'RAFAEL', 'YUSMARY', 'FRANCISCO', 'NELLY', 'ANGEL', 'DAYANA', 'VICTOR']
+APELLIDOS = ['GONZALEZ', 'RODRIGUEZ', 'PEREZ', 'HERNANDEZ', 'GARCIA', 'MARTINEZ', 'LOPEZ', 'DIAZ', 'LUNA',
+             'SANCHEZ', 'ROMERO', 'TORRES', 'RAMIREZ', 'FLORES', 'MEDINA', 'CASTILLO', 'MORENO', 'ROJAS']
+COMERCIOS = ['FARMACIA', 'NATURISTA', 'INVERSIONES', 'DISTRIBUIDORA', 'BOTICA', 'TIENDA NATURAL', 'COMERCIAL']
+NOMBRES_COMERCIO = ['SAN JOSE', 'LA ESPERANZA', 'EL SOL', 'VIDA SANA', 'ARAGUA', 'LOS ANDES', 'SALUD TOTAL',
+                    'NATURA', 'BELLA VISTA', 'EL LLANO', 'ORIENTE', 'CARABOBO', 'LA FE', 'MIRANDA']
+SOCIEDADES = ['C.A.', 'C.A', 'S.A.', 'F.P.']
+CIUDADES = [('Maracay', 'Aragua', 10.2469, -67.5958), ('Valencia', 'Carabobo', 10.1620, -68.0077),
+            ('Caracas', 'Distrito Capital', 10.4806, -66.9036), ('Barquisimeto', 'Lara', 10.0678, -69.3474),
+            ('Ciudad Bolivar', 'Bolivar', 8.1222, -63.5497), ('Maracaibo', 'Zulia', 10.6427, -71.6125),
+            ('Puerto Ordaz', 'Bolivar', 8.2930, -62.7116), ('San Cristobal', 'Tachira', 7.7669, -72.2250)]
+CALLES = ['Calle Bolivar', 'Av. Las Delicias', 'Calle Paramaconi', 'Av. Sucre', 'Urb. Las Beatrices',
+          'Calle Miranda', 'Av. Principal', 'Centro Comercial Caña de Azúcar']
+
+CATEGORIAS = ['Adelgazante-Laxante', 'Protector Hepatico', 'Antitumorales - anticancerigeno',
+              'Vitaminas y Minerales', 'Circulación Insuficiencia Venosa', 'Adelgazante-Diuretico', 'Cosmetico',
+              'Bronco-Dilatadores', 'Protector Ocular', 'Bactericida', 'Calculo Renal', 'Oxigenante Cerebral',
+              'Via Respiratoria', 'Anti-inflamatorio', 'Cardiovascular', 'Menopausia', 'Laxante', 'Expectorante']
+PLANTAS = ['CENTELLA ASIATICA', 'ALCACHOFA', 'CARDO MARIANO', 'GINKGO BILOBA', 'GRAVIOLA', 'MORINGA',
+           'CURCUMA', 'UÑA DE GATO', 'SEN', 'CASTAÑO DE INDIAS', 'PIÑA + GRAPEFRUIT', 'CHANCA PIEDRA',
+           'GINSENG', 'EQUINACEA', 'SABILA', 'OREGANO', 'AJO', 'JENGIBRE', 'ESPIRULINA', 'COLA DE CABALLO']
+PRESENTACIONES = ['X 60 CAP', 'X 100 CAP', 'X 30 TAB', 'JARABE 240 ML', 'GOTAS 30 ML', 'CREMA 120 GR', 'TE X 20']
+PRECIOS = [1.5, 3.0, 3.0, 3.0, 3.0, 4.2, 4.5, 6.0, 8.0, 12.0]
+
+USUARIOS = ['admin', 'angel', 'vendedor1', 'vendedor2']
+METODOS_PAGO = ['pago_movil', 'pago_movil', 'efectivo_usd', 'transferencia', 'zelle']
+BANCOS = ['0102', '0102', '0105', '0108', '0115', '0134', '0151', '0191']
+DIAS_CREDITO = ['21', '21', '21', '15', '30', '8']
+IPS = ['190.202.123.123', '200.44.32.12', '186.185.14.77', '201.249.8.150', '190.37.210.5']
+
+# Tasa BCV sintética: crece de forma continua entre el inicio y la fecha final
+TASA_INICIAL = 36.5
+TASA_FINAL = 140.0
+
+# Partes fijas del log de auditoría (el generador no depende de la máquina)
+IP_LOCAL = '192.168.1.10'
+MAC = '02:42:ac:11:00:02'
+HOST = 'servidor-facturacion'
+
+_codificar = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), check_circular=False).encode
+
+
+class EscritorDiccionarioJSON:
+    """Escribe un objeto JSON clave → registro en streaming, un registro por línea (atómico al cerrar)"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.registros = 0
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._temporal = f'{ruta}.{os.getpid()}.tmp'
+        self._archivo = open(self._temporal, 'w', encoding='utf-8', buffering=1024 * 1024)
+        self._archivo.write('{')
+
+    def agregar(self, clave: str, valor: Any) -> None:
+        self._archivo.write(f'{"," if self.registros else ""}\n{_codificar(clave)}:{_codificar(valor)}')
+        self.registros += 1
+
+    def cerrar(self) -> int:
+        """Cierra el archivo, lo coloca en su ruta final y devuelve su tamaño en bytes"""
+        self._archivo.write('\n}\n')
+        self._archivo.close()
+        os.replace(self._temporal, self.ruta)
+        return os.path.getsize(self.ruta)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is None:
+            self.cerrar()
+        else:
+            self._archivo.close()
+            os.remove(self._temporal)
+
+
+class EscritorAuditoriaSintetico:
+    """Escribe el log de auditoría fiscal encadenado (mismo formato que EscritorAuditoria) y su ancla"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self.lineas = 0
+        self._ultimo_hash = HASH_GENESIS
+        os.makedirs(os.path.dirname(ruta) or '.', exist_ok=True)
+        self._archivo = open(ruta, 'w', encoding='utf-8', buffering=1024 * 1024)
+
+    def registrar(self, marca: str, usuario: str, accion: str, numero: str, ip: str, sesion: str, detalles: str) -> None:
+        linea = (f"[{marca}] USUARIO:{usuario} | ACCION:{accion} | DOC_TIPO:FACTURA | DOC_NUM:{numero} | "
+                 f"IP_EXT:{ip} | IP_LOC:{IP_LOCAL} | MAC:{MAC} | HOST:{HOST} | SESION:{sesion} | "
+                 f"DETALLES:{detalles}{SEPARADOR_PREV}{self._ultimo_hash}")
+        self._ultimo_hash = calcular_hash_linea(linea)
+        self._archivo.write(f"{linea}{SEPARADOR_HASH}{self._ultimo_hash}\n")
+        self.lineas += 1
+
+    def cerrar(self, fecha: str) -> int:
+        self._archivo.close()
+        tamano = os.path.getsize(self.ruta)
+        with open(self.ruta + '.ancla', 'w', encoding='utf-8') as f:
+            json.dump({'ultimo_hash': self._ultimo_hash, 'tamano_bytes': tamano,
+                       'entradas_ultimo_lote': self.lineas, 'fecha': fecha}, f)
+        return tamano
+
+
+class GeneradorDatos:
+    """Clase que genera el conjunto de datos sintético completo de forma determinista"""
+
+    def __init__(self,
+                 facturas: int = 1000,
+                 semilla: int = 42,
+                 fecha_final: str = '2025-08-31',
+                 meses: int = 24,
+                 clientes: Optional[int] = None,
+                 productos: Optional[int] = None):
+        """
+        Inicializa el generador
+
+        Args:
+            facturas: Número de facturas
+            semilla: Semilla del generador aleatorio (mismo valor → mismos archivos)
+            fecha_final: Fecha de la última factura (YYYY-MM-DD); hace de "hoy" para los vencimientos
+            meses: Meses de historia hacia atrás desde fecha_final
+            clientes: Número de clientes (por defecto 1 cada 20 facturas, mínimo 50)
+            productos: Número de productos (por defecto 1 cada 100 facturas, entre 60 y 2000)
+        """
+        self.facturas = facturas
+        self.semilla = semilla
+        self.fecha_final = date.fromisoformat(fecha_final)
+        self.fecha_inicial = self.fecha_final - timedelta(days=int(meses * 30.4))
+        self.dias = (self.fecha_final - self.fecha_inicial).days
+        self.clientes = clientes or max(50, facturas // 20)
+        self.productos = productos or max(60, min(2000, facturas // 100))
+        self.notas_entrega = max(1, facturas // 10)
+        self.cotizaciones = max(1, facturas // 20)
+
+    # ------------------------------------------------------------------
+    # Utilidades deterministas
+    # ------------------------------------------------------------------
+
+    def _uuid(self, rng: random.Random) -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def _momento(self, indice: int, total: int, rng: random.Random) -> datetime:
+        """Instante del documento `indice` de `total`, creciente y en horario comercial (8:00 a 19:00)"""
+        posicion = self.dias * (indice + rng.random()) / total
+        dia = int(posicion)
+        segundos = int(8 * 3600 + (posicion - dia) * 11 * 3600)
+        return datetime.combine(self.fecha_inicial + timedelta(days=dia), datetime.min.time()) + timedelta(seconds=segundos)
+
+    def _tasa(self, momento: datetime) -> float:
+        avance = (momento.date() - self.fecha_inicial).days / max(1, self.dias)
+        return round(TASA_INICIAL * (TASA_FINAL / TASA_INICIAL) ** avance, 2)
+
+    def _antiguedad(self, momento: datetime) -> int:
+        return (self.fecha_final - momento.date()).days
+
+    # ------------------------------------------------------------------
+    # Entidades
+    # ------------------------------------------------------------------
+
+    def _generar_clientes(self, rng: random.Random) -> List[Dict[str, Any]]:
+        clientes = []
+        paso = 7919  # primo: los números de identificación no se repiten
+        for i in range(self.clientes):
+            ciudad, estado, _, _ = rng.choice(CIUDADES)
+            if rng.random() < 0.35:
+                tipo = 'J'
+                numero = f'{300000000 + i * paso + rng.randrange(paso)}'
+                nombre = (f'{rng.choice(COMERCIOS)} {rng.choice(NOMBRES_COMERCIO)}'
+                          f'{"" if i < len(NOMBRES_COMERCIO) else f" {i}"}, {rng.choice(SOCIEDADES)}')
+            else:
+                tipo = rng.choice('VVVVE')
+                cedula = 5000000 + i * paso + rng.randrange(paso)
+                numero = f'{cedula:,}'.replace(',', '.')
+                nombre = f'{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}'
+            rif = f'{tipo}-{numero}'
+            creado = self._momento(i, self.clientes * 2, rng).isoformat()
+            clientes.append({
+                'id': rif,
+                'rif': rif,
+                'tipo_identificacion': tipo,
+                'numero_identificacion': numero,
+                'digito_verificador': '',
+                'nombre': nombre,
+                'email': f"{nombre.split(',')[0].lower().replace(' ', '.')}@dominioinventado.com",
+                'telefono': f'+58{rng.choice(["0412", "0414", "0424", "0416"])}{rng.randrange(1000000, 9999999)}',
+                'direccion': f'{rng.choice(CALLES)} # {rng.randrange(1, 200)} - {ciudad}, Edo. {estado}',
+                'fecha_creacion': creado,
+                'usuario_creacion': rng.choice(USUARIOS),
+                'activo': rng.random() > 0.03,
+                'validado_seniat': rng.random() > 0.2,
+            })
+        return clientes
+
+    def _generar_productos(self, rng: random.Random) -> List[Dict[str, Any]]:
+        productos = []
+        for i in range(1, self.productos + 1):
+            nombre = f'{rng.choice(PLANTAS)} {rng.choice(PRESENTACIONES)}'
+            if i > len(PLANTAS):
+                nombre = f'{nombre} #{i}'
+            historial = []
+            for _ in range(rng.randrange(0, 19)):
+                momento = self._momento(rng.randrange(1000), 1000, rng)
+                entrada = rng.random() < 0.4
+                historial.append({
+                    'fecha': momento.strftime('%Y-%m-%d %H:%M:%S'),
+                    'tipo': 'entrada' if entrada else 'salida',
+                    'cantidad': rng.choice([100, 200, 500, 1000]) if entrada else rng.randrange(1, 13),
+                    'motivo': 'CARGA DE PRODUCTO' if entrada else 'Venta',
+                    'usuario': rng.choice(USUARIOS),
+                })
+            historial.sort(key=lambda ajuste: ajuste['fecha'])
+            entradas = [a['fecha'] for a in historial if a['tipo'] == 'entrada']
+            salidas = [a['fecha'] for a in historial if a['tipo'] == 'salida']
+            productos.append({
+                'id': str(i),
+                'nombre': nombre,
+                'precio': rng.choice(PRECIOS),
+                'cantidad': rng.randrange(0, 1500),
+                'categoria': rng.choice(CATEGORIAS),
+                'ruta_imagen': '',
+                'ultima_entrada': entradas[-1] if entradas else '',
+                'ultima_salida': salidas[-1] if salidas else '',
+                'historial_ajustes': historial,
+            })
+        return productos
+
+    def _pagos(self, rng: random.Random, momento: datetime, monto: float, partes: int, limite_dias: int) -> List[Dict[str, Any]]:
+        pagos = []
+        restante = round(monto, 2)
+        fecha = momento
+        for parte in range(partes):
+            importe = restante if parte == partes - 1 else round(restante * rng.uniform(0.3, 0.7), 2)
+            restante = round(restante - importe, 2)
+            fecha = fecha + timedelta(days=rng.randrange(0, max(1, limite_dias // partes)), seconds=rng.randrange(3600))
+            metodo = rng.choice(METODOS_PAGO)
+            electronico = metodo in ('pago_movil', 'transferencia')
+            pagos.append({
+                'id': self._uuid(rng),
+                'monto': importe,
+                'moneda': 'USD',
+                'metodo': metodo,
+                'referencia': str(rng.randrange(1000, 999999)) if electronico else '',
+                'banco': rng.choice(BANCOS) if electronico else '',
+                'captura_path': '',
+                'fecha': fecha.strftime('%Y-%m-%d %H:%M:%S'),
+            })
+        return pagos
+
+    def _factura(self, indice: int, rng: random.Random, clientes, productos, pesos_items) -> Dict[str, Any]:
+        momento = self._momento(indice, self.facturas, rng)
+        fecha = momento.strftime('%Y-%m-%d')
+        tasa = self._tasa(momento)
+        cliente = clientes[int(rng.paretovariate(1.2) * 7) % len(clientes)]
+        elegidos = rng.sample(productos, rng.choices(range(1, len(pesos_items) + 1), cum_weights=pesos_items)[0])
+
+        items, ids, cantidades, precios = [], [], [], []
+        subtotal_usd = 0.0
+        for producto in elegidos:
+            cantidad = rng.choice((1, 2, 2, 3, 3, 3, 5, 6, 12))
+            precio = producto['precio']
+            precio_bs = round(precio * tasa, 2)
+            subtotal_usd += precio * cantidad
+            ids.append(producto['id'])
+            cantidades.append(str(cantidad))
+            precios.append(precio)
+            items.append({
+                'id_producto': producto['id'],
+                'nombre': producto['nombre'],
+                'categoria': producto['categoria'],
+                'cantidad': cantidad,
+                'precio_unitario_usd': precio,
+                'precio_unitario_bs': precio_bs,
+                'subtotal_usd': round(precio * cantidad, 2),
+                'subtotal_bs': round(precio_bs * cantidad, 2),
+            })
+        total_usd = round(subtotal_usd, 2)
+
+        contado = rng.random() < 0.05
+        dias_credito = '0' if contado else rng.choice(DIAS_CREDITO)
+        antiguedad = self._antiguedad(momento)
+        vencida_hace = antiguedad - int(dias_credito)
+        if contado:
+            estado, pagos = 'pagada', self._pagos(rng, momento, total_usd, 1, 0)
+        else:
+            azar = rng.random()
+            probabilidad_pagada = 0.93 if vencida_hace > 60 else 0.6 if vencida_hace > 0 else 0.25
+            if azar < probabilidad_pagada:
+                estado = 'pagada'
+                pagos = self._pagos(rng, momento, total_usd, rng.choice((1, 1, 1, 2, 3)), min(antiguedad, int(dias_credito) + 30))
+            elif azar < probabilidad_pagada + 0.1:
+                estado = 'abonada'
+                pagos = self._pagos(rng, momento, round(total_usd * rng.uniform(0.2, 0.8), 2), rng.choice((1, 2)),
+                                    min(antiguedad, int(dias_credito)))
+            else:
+                estado, pagos = 'pendiente', []
+        abonado = round(sum(p['monto'] for p in pagos), 2)
+
+        return {
+            'id': self._uuid(rng),
+            'numero': f'FAC-{indice + 1:08d}',
+            'numero_secuencial': indice + 1,
+            'fecha': fecha,
+            'hora': momento.strftime('%H:%M:%S'),
+            'timestamp_creacion': momento.isoformat(),
+            'cliente_id': cliente['id'],
+            'condicion_pago': 'contado' if contado else 'credito',
+            'dias_credito': dias_credito,
+            'fecha_vencimiento': (momento + timedelta(days=int(dias_credito))).strftime('%Y-%m-%d'),
+            'tasa_bcv': tasa,
+            'estado': estado,
+            'productos': ids,
+            'cantidades': cantidades,
+            'precios': precios,
+            'descuento': 0.0,
+            'tipo_descuento': 'bs',
+            'iva': 0.0,
+            'subtotal_usd': total_usd,
+            'subtotal_bs': round(total_usd * tasa, 2),
+            'descuento_total': 0.0,
+            'iva_total': 0.0,
+            'total_usd': total_usd,
+            'total_bs': round(total_usd * tasa, 2),
+            'pagos': pagos,
+            'total_abonado': abonado,
+            'saldo_pendiente': round(total_usd - abonado, 2),
+            'items': items,
+            'cliente_datos': {
+                'rif': cliente['rif'],
+                'nombre': cliente['nombre'],
+                'direccion': cliente['direccion'],
+                'telefono': cliente['telefono'],
+                'email': cliente['email'],
+            },
+            'moneda_principal': 'USD',
+            'moneda_secundaria': 'VES',
+            'usuario_creacion': rng.choice(USUARIOS),
+        }
+
+    def _nota_entrega(self, indice: int, rng: random.Random, clientes, productos) -> Dict[str, Any]:
+        momento = self._momento(indice, self.notas_entrega, rng)
+        cliente = clientes[int(rng.paretovariate(1.2) * 7) % len(clientes)]
+        elegidos = rng.sample(productos, rng.randrange(1, min(12, len(productos)) + 1))
+        cantidades = [rng.choice((1, 3, 6, 10, 12)) for _ in elegidos]
+        subtotal = round(sum(p['precio'] * c for p, c in zip(elegidos, cantidades)), 2)
+        modalidad = rng.choice(('contado', 'contado', 'credito', 'nota_credito'))
+        antiguedad = self._antiguedad(momento)
+        if antiguedad < 7:
+            estado = 'PENDIENTE_FACTURACION' if modalidad == 'credito' else 'PENDIENTE_ENTREGA'
+        else:
+            estado = rng.choice(('PAGADA', 'PAGADA', 'PAGADA', 'ENTREGADO', 'FACTURADO', 'ABONADA', 'ANULADO'))
+        entregada = estado not in ('PENDIENTE_ENTREGA', 'PENDIENTE_FACTURACION', 'ANULADO')
+        entrega = momento + timedelta(days=rng.randrange(0, 5), seconds=rng.randrange(3600))
+        nota = {
+            'numero': f'NE-{indice + 1:04d}',
+            'numero_secuencial': indice + 1,
+            'fecha': momento.strftime('%Y-%m-%d'),
+            'hora': momento.strftime('%H:%M:%S'),
+            'timestamp_creacion': momento.isoformat(),
+            'cliente_id': cliente['id'],
+            'modalidad_pago': modalidad,
+            'dias_credito': 21 if modalidad == 'credito' else None,
+            'fecha_vencimiento_factura': (momento + timedelta(days=21)).strftime('%Y-%m-%d') if modalidad == 'credito' else None,
+            'productos': [p['id'] for p in elegidos],
+            'cantidades': [str(c) for c in cantidades],
+            'precios': [f"{p['precio']:g}" for p in elegidos],
+            'subtotal_usd': subtotal,
+            'porcentaje_descuento': 0.0,
+            'descuento': 0.0,
+            'total_usd': subtotal,
+            'tasa_bcv': self._tasa(momento),
+            'fecha_tasa_bcv': momento.strftime('%Y-%m-%d'),
+            'observaciones': '',
+            'estado': estado,
+            'usuario_creacion': rng.choice(USUARIOS),
+            'firma_recibido': entregada,
+            'fecha_entrega': entrega.strftime('%Y-%m-%d') if entregada else None,
+            'hora_entrega': entrega.strftime('%H:%M:%S') if entregada else None,
+            'entregado_por': rng.choice(USUARIOS) if entregada else None,
+            'recibido_por': cliente['nombre'] if entregada else None,
+            'documento_identidad': '',
+        }
+        if estado in ('PAGADA', 'ABONADA'):
+            monto = subtotal if estado == 'PAGADA' else round(subtotal * rng.uniform(0.2, 0.8), 2)
+            nota['pagos'] = [{
+                'id': str(numero + 1),
+                'fecha': pago['fecha'],
+                'monto': pago['monto'],
+                'metodo': 'efectivo' if pago['metodo'] == 'efectivo_usd' else pago['metodo'],
+                'referencia': pago['referencia'],
+                'timestamp': pago['fecha'].replace(' ', 'T'),
+            } for numero, pago in enumerate(self._pagos(rng, entrega, monto, rng.choice((1, 1, 2)), 20))]
+            if estado == 'PAGADA':
+                nota['fecha_pago_completo'] = nota['pagos'][-1]['fecha']
+        return nota
+
+    def _cotizacion(self, indice: int, rng: random.Random, clientes, productos) -> Dict[str, Any]:
+        momento = self._momento(indice, self.cotizaciones, rng)
+        tasa = self._tasa(momento)
+        elegidos = rng.sample(productos, rng.randrange(1, min(8, len(productos)) + 1))
+        cantidades = [rng.choice((1, 2, 3, 6, 10, 20)) for _ in elegidos]
+        total = round(sum(p['precio'] * c for p, c in zip(elegidos, cantidades)), 2)
+        return {
+            'numero_cotizacion': f'{indice + 1:04d}',
+            'fecha': momento.strftime('%Y-%m-%d'),
+            'hora': momento.strftime('%H:%M'),
+            'cliente': rng.choice(clientes),
+            'productos': [p['id'] for p in elegidos],
+            'cantidades': [str(c) for c in cantidades],
+            'precios': [p['precio'] for p in elegidos],
+            'subtotal_usd': total,
+            'subtotal_bs': round(total * tasa, 2),
+            'descuento': 0.0,
+            'tipo_descuento': 'bs',
+            'descuento_total': 0.0,
+            'iva': 0.0,
+            'iva_total': 0.0,
+            'total_usd': total,
+            'total_bs': round(total * tasa, 2),
+            'tasa_bcv': tasa,
+            'validez_dias': rng.choice((3, 7, 7, 15)),
+        }
+
+    def _linea_bitacora(self, rng: random.Random, momento: datetime, usuario: str, accion: str, detalles: str) -> str:
+        ciudad, estado, lat, lon = rng.choice(CIUDADES)
+        return (f"[{momento.strftime('%Y-%m-%d %H:%M:%S')}] Usuario: {usuario} | Acción: {accion} | "
+                f"Detalles: {detalles} | IP: {rng.choice(IPS)} | Ubicación: {ciudad}, {estado}, Venezuela | "
+                f"Coordenadas: {lat},{lon}\n")
+
+    def _control_numeracion(self) -> Dict[str, Any]:
+        inicio = datetime.combine(self.fecha_inicial, datetime.min.time()).isoformat()
+        final = datetime.combine(self.fecha_final, datetime.max.time()).isoformat()
+
+        def serie(prefijo: str, emitidos: int) -> Dict[str, Any]:
+            return {'prefijo': prefijo, 'siguiente_numero': emitidos + 1, 'longitud_numero': 8,
+                    'formato': f'{prefijo}{{numero:08d}}', 'activa': True, 'fecha_inicio': inicio,
+                    'ultimo_numero_emitido': emitidos, 'total_documentos': emitidos}
+
+        return {
+            'series': {'FACTURA': serie('FAC-', self.facturas), 'NOTA_CREDITO': serie('NC-', 0),
+                       'NOTA_DEBITO': serie('ND-', 0)},
+            'configuracion': {'validar_consecutivos': True, 'permitir_saltos': False, 'reinicio_anual': False,
+                              'longitud_minima': 8, 'prefijo_obligatorio': True},
+            'auditoria': {'fecha_creacion': inicio, 'ultima_modificacion': final,
+                          'total_documentos_emitidos': self.facturas},
+        }
+
+    # ------------------------------------------------------------------
+    # Generación
+    # ------------------------------------------------------------------
+
+    def generar(self, destino: str, progreso: bool = False) -> Dict[str, Any]:
+        """
+        Genera todos los archivos en `destino` (con la misma estructura que la raíz del proyecto)
+
+        Args:
+            destino: Directorio de salida (se crea si no existe; los archivos se reemplazan)
+            progreso: Mostrar el avance de las facturas cada 10%
+
+        Returns:
+            Resumen con registros y bytes por archivo y la duración
+        """
+        inicio = time.perf_counter()
+        os.makedirs(destino, exist_ok=True)
+        rng = random.Random(self.semilla)
+        archivos: Dict[str, Dict[str, int]] = {}
+
+        def ruta(nombre: str) -> str:
+            return os.path.join(destino, nombre)
+
+        clientes = self._generar_clientes(rng)
+        with EscritorDiccionarioJSON(ruta('clientes.json')) as escritor:
+            for cliente in clientes:
+                escritor.agregar(cliente['id'], cliente)
+        archivos['clientes.json'] = {'registros': len(clientes), 'bytes': os.path.getsize(ruta('clientes.json'))}
+
+        productos = self._generar_productos(rng)
+        with EscritorDiccionarioJSON(ruta('inventario.json')) as escritor:
+            for producto in productos:
+                escritor.agregar(producto['id'], {k: v for k, v in producto.items() if k != 'id'})
+        archivos['inventario.json'] = {'registros': len(productos), 'bytes': os.path.getsize(ruta('inventario.json'))}
+
+        # Facturas, cuentas por cobrar, notas de entrega, bitácora y auditoría en una sola pasada
+        pesos_items = list(_acumulados([3, 5, 6, 6, 5, 4, 3, 2, 2, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1, 1][:len(productos)]))
+        auditoria = EscritorAuditoriaSintetico(ruta(os.path.join('logs', 'auditoria_fiscal.log')))
+        sesiones: Dict[str, str] = {}
+        with EscritorDiccionarioJSON(ruta(os.path.join('facturas_json', 'facturas.json'))) as facturas, \
+                EscritorDiccionarioJSON(ruta('cuentas_por_cobrar.json')) as cuentas, \
+                EscritorDiccionarioJSON(ruta(os.path.join('notas_entrega_json', 'notas_entrega.json'))) as notas, \
+                open(ruta('bitacora.log'), 'w', encoding='utf-8', buffering=1024 * 1024) as bitacora:
+            bitacora_lineas = 0
+            for indice in range(self.facturas):
+                factura = self._factura(indice, rng, clientes, productos, pesos_items)
+                usuario = factura.pop('usuario_creacion')
+                facturas.agregar(factura['id'], factura)
+                detalles = f"Total: ${factura['total_usd']:.2f}, Cliente: {factura['cliente_datos']['nombre']}"
+                dia = factura['fecha']
+                sesion = sesiones.get(dia)
+                if sesion is None:
+                    sesiones.clear()
+                    sesion = sesiones[dia] = self._uuid(rng)
+                marca = f"{dia} {factura['hora']}.{rng.randrange(1000):03d}"
+                auditoria.registrar(marca, usuario, 'Nueva factura fiscal', factura['numero'], rng.choice(IPS), sesion, detalles)
+                bitacora.write(self._linea_bitacora(rng, datetime.fromisoformat(factura['timestamp_creacion']), usuario,
+                                                    'Nueva factura fiscal', detalles))
+                bitacora_lineas += 1
+                for pago in factura['pagos']:
+                    detalles_pago = f"Factura: {factura['numero']}, Monto: ${pago['monto']:.2f}, Método: {pago['metodo']}"
+                    auditoria.registrar(f"{pago['fecha']}.000", usuario, 'Registrar pago', factura['numero'],
+                                        rng.choice(IPS), sesion, detalles_pago)
+                    bitacora.write(self._linea_bitacora(rng, datetime.fromisoformat(pago['fecha']), usuario,
+                                                        'Registrar pago', detalles_pago))
+                    bitacora_lineas += 1
+                if factura['condicion_pago'] == 'credito':
+                    cuentas.agregar(f"{factura['numero_secuencial']:04d}", {
+                        'rif': factura['cliente_id'],
+                        'total_usd': factura['total_usd'],
+                        'abonado_usd': factura['total_abonado'],
+                        'estado': {'pagada': 'Cobrada', 'abonada': 'Abonada'}.get(factura['estado'], 'Pendiente'),
+                        'tipo_pago': 'Pago móvil' if any(p['metodo'] == 'pago_movil' for p in factura['pagos']) else 'Efectivo (USD)',
+                        'fecha_ultimo_abono': factura['pagos'][-1]['fecha'][:16] if factura['pagos'] else '',
+                        'fecha_emision': f"{factura['fecha']} {factura['hora'][:5]}",
+                    })
+                if progreso and self.facturas >= 10 and (indice + 1) % (self.facturas // 10) == 0:
+                    print(f"   📄 {indice + 1:,} facturas ({time.perf_counter() - inicio:.1f} s)")
+
+            for indice in range(self.notas_entrega):
+                nota = self._nota_entrega(indice, rng, clientes, productos)
+                bitacora.write(self._linea_bitacora(rng, datetime.fromisoformat(nota['timestamp_creacion']),
+                                                    nota['usuario_creacion'], 'Nueva nota de entrega',
+                                                    f"Cliente: {nota['cliente_id']}, Modalidad: {nota['modalidad_pago']}"))
+                bitacora_lineas += 1
+                notas.agregar(nota['numero'], nota)
+
+        archivos['facturas_json/facturas.json'] = {'registros': facturas.registros, 'bytes': os.path.getsize(facturas.ruta)}
+        archivos['cuentas_por_cobrar.json'] = {'registros': cuentas.registros, 'bytes': os.path.getsize(cuentas.ruta)}
+        archivos['bitacora.log'] = {'registros': bitacora_lineas, 'bytes': os.path.getsize(ruta('bitacora.log'))}
+        tamano = auditoria.cerrar(datetime.combine(self.fecha_final, datetime.max.time()).isoformat())
+        archivos['logs/auditoria_fiscal.log'] = {'registros': auditoria.lineas, 'bytes': tamano}
+        archivos['notas_entrega_json/notas_entrega.json'] = {'registros': notas.registros, 'bytes': os.path.getsize(notas.ruta)}
+
+        # Las cotizaciones se guardan una por archivo (cotizaciones_json/cotizacion_<número>.json)
+        directorio_cotizaciones = ruta('cotizaciones_json')
+        os.makedirs(directorio_cotizaciones, exist_ok=True)
+        bytes_cotizaciones = 0
+        huella_cotizaciones = hashlib.sha256()
+        for indice in range(self.cotizaciones):
+            cotizacion = self._cotizacion(indice, rng, clientes, productos)
+            contenido = _codificar(cotizacion).encode('utf-8')
+            with open(os.path.join(directorio_cotizaciones, f"cotizacion_{cotizacion['numero_cotizacion']}.json"),
+                      'wb') as f:
+                f.write(contenido)
+            bytes_cotizaciones += len(contenido)
+            huella_cotizaciones.update(contenido)
+        archivos['cotizaciones_json/cotizacion_*.json'] = {'registros': self.cotizaciones, 'bytes': bytes_cotizaciones}
+
+        with open(ruta('control_numeracion_fiscal.json'), 'w', encoding='utf-8') as f:
+            json.dump(self._control_numeracion(), f, ensure_ascii=False, indent=2)
+
+        huella = hashlib.sha256()
+        for nombre in sorted(archivos):
+            if '*' in nombre:
+                huella.update(huella_cotizaciones.digest())
+                continue
+            with open(ruta(nombre), 'rb') as f:
+                for bloque in iter(lambda: f.read(1024 * 1024), b''):
+                    huella.update(bloque)
+        return {
+            'destino': destino,
+            'semilla': self.semilla,
+            'facturas': self.facturas,
+            'archivos': archivos,
+            'huella': huella.hexdigest(),
+            'duracion_segundos': round(time.perf_counter() - inicio, 2),
+        }
+
+
+def _acumulados(pesos: List[int]):
+    total = 0
+    for peso in pesos:
+        total += peso
+        yield total
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Generador de datos sintéticos para pruebas de escala')
+    subparsers = parser.add_subparsers(dest='accion', required=True)
+    generar = subparsers.add_parser('generar', help='Genera el conjunto de datos en un directorio')
+    generar.add_argument('--tamano', choices=sorted(TAMANOS, key=TAMANOS.get), default='1k',
+                         help='Número de facturas predefinido')
+    generar.add_argument('--facturas', type=int, help='Número de facturas (reemplaza --tamano)')
+    generar.add_argument('--semilla', type=int, default=42, help='Semilla (mismo valor → mismos archivos)')
+    generar.add_argument('--fecha-final', default='2025-08-31', help='Fecha de la última factura (YYYY-MM-DD)')
+    generar.add_argument('--meses', type=int, default=24, help='Meses de historia')
+    generar.add_argument('--destino', default='datos_prueba', help='Directorio de salida')
+    args = parser.parse_args(argv[1:])
+
+    generador = GeneradorDatos(facturas=args.facturas or TAMANOS[args.tamano], semilla=args.semilla,
+                               fecha_final=args.fecha_final, meses=args.meses)
+    print(f"🧪 Generando {generador.facturas:,} facturas, {generador.clientes:,} clientes y "
+          f"{generador.productos:,} productos en {args.destino} (semilla {args.semilla})...")
+    resumen = generador.generar(args.destino, progreso=True)
+    for nombre, datos in resumen['archivos'].items():
+        print(f"   ✅ {nombre:40} {datos['registros']:>10,} registros {datos['bytes'] / 1024 / 1024:>9,.1f} MB")
+    print(f"📊 Listo en {resumen['duracion_segundos']:.1f} s (huella {resumen['huella'][:16]})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Estatus SENIAT - Caché de Consultas de Documentos
+===========================================================
+
+Guarda el último estatus conocido de cada documento en el SENIAT
+(numero → estatus, fecha) en la base local de la bandeja de salida, para que
+las rutas /seniat/* respondan sin consultar al SENIAT en cada petición.
+
+- Cada estatus tiene un TTL; una consulta con el dato vencido lo devuelve
+  marcado como no vigente (o lo refresca si se permite la consulta remota).
+- La conciliación masiva refresca los vencidos con concurrencia acotada
+  sobre las conexiones persistentes de cliente_http.
+- Los envíos exitosos de cola_seniat actualizan el estatus sin consultar.
+
+Uso:
+    python estatus_seniat.py conciliar [--tipo FACTURA] [--concurrencia 8] [--limite 500]
+    python estatus_seniat.py consultar FAC-00000001
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Iterable
+from carga_perezosa import InstanciaPerezosa
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_FACTURAS = 'facturas_json/facturas.json'
+ESTATUS_DESCONOCIDO = 'DESCONOCIDO'
+
+
+class CacheEstatusSENIAT:
+    """Clase para cachear y conciliar el estatus de los documentos en el SENIAT"""
+
+    def __init__(self, archivo: str = 'cola_seniat/bandeja_salida.db', comunicador=None, ttl: int = 3600):
+        """
+        Inicializa la caché de estatus
+
+        Args:
+            archivo: Base SQLite (la misma de la bandeja de salida)
+            comunicador: Instancia de ComunicacionSENIAT (por defecto la global)
+            ttl: Segundos durante los que un estatus se considera vigente
+        """
+        self.archivo = archivo
+        self._comunicador = comunicador
+        self.ttl = ttl
+        self._crear_tabla()
+
+    @property
+    def comunicador(self):
+        if self._comunicador is None:
+            from comunicacion_seniat import comunicador_seniat
+            self._comunicador = comunicador_seniat
+        return self._comunicador
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexion = sqlite3.connect(self.archivo, timeout=30, isolation_level=None)
+        conexion.row_factory = sqlite3.Row
+        return conexion
+
+    def _crear_tabla(self) -> None:
+        directorio = os.path.dirname(self.archivo)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        conexion = self._conectar()
+        try:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('''
+                CREATE TABLE IF NOT EXISTS estatus_documentos (
+                    tipo TEXT NOT NULL,
+                    numero TEXT NOT NULL,
+                    estatus TEXT NOT NULL,
+                    datos TEXT,
+                    origen TEXT NOT NULL,
+                    consultado_en REAL NOT NULL,
+                    ultimo_error TEXT,
+                    PRIMARY KEY (tipo, numero)
+                )
+            ''')
+        finally:
+            conexion.close()
+
+    def _fila_a_estatus(self, fila: sqlite3.Row) -> Dict[str, Any]:
+        antiguedad = time.time() - fila['consultado_en']
+        return {
+            'numero': fila['numero'],
+            'tipo': fila['tipo'],
+            'estatus': fila['estatus'],
+            'datos': json.loads(fila['datos']) if fila['datos'] else {},
+            'origen': fila['origen'],
+            'fecha_consulta': datetime.fromtimestamp(fila['consultado_en']).isoformat(),
+            'antiguedad_segundos': int(antiguedad),
+            'vigente': antiguedad < self.ttl,
+            'ultimo_error': fila['ultimo_error']
+        }
+
+    def registrar(self, tipo: str, numero: str, estatus: str, datos: Optional[Dict[str, Any]] = None,
+                  origen: str = 'consulta') -> None:
+        """Guarda el estatus conocido de un documento"""
+        conexion = self._conectar()
+        try:
+            conexion.execute(
+                '''INSERT OR REPLACE INTO estatus_documentos
+                   (tipo, numero, estatus, datos, origen, consultado_en, ultimo_error)
+                   VALUES (?, ?, ?, ?, ?, ?, NULL)''',
+                (tipo, numero, estatus, json.dumps(datos or {}, ensure_ascii=False, default=str),
+                 origen, time.time())
+            )
+        finally:
+            conexion.close()
+
+    def _registrar_error(self, tipo: str, numero: str, error: str) -> None:
+        """Anota un error de consulta sin perder el último estatus conocido"""
+        conexion = self._conectar()
+        try:
+            cursor = conexion.execute(
+                'UPDATE estatus_documentos SET ultimo_error = ? WHERE tipo = ? AND numero = ?',
+                (error, tipo, numero)
+            )
+            if cursor.rowcount == 0:
+                # Sin estatus previo: se guarda como desconocido y vencido para reintentar
+                conexion.execute(
+                    '''INSERT INTO estatus_documentos
+                       (tipo, numero, estatus, datos, origen, consultado_en, ultimo_error)
+                       VALUES (?, ?, ?, NULL, 'consulta', 0, ?)''',
+                    (tipo, numero, ESTATUS_DESCONOCIDO, error)
+                )
+        finally:
+            conexion.close()
+
+    def obtener(self, numero: str, tipo: str = 'FACTURA') -> Optional[Dict[str, Any]]:
+        """Estatus en caché de un documento (vigente o no), sin consultar al SENIAT"""
+        return self.obtener_varios([numero], tipo).get(numero)
+
+    def obtener_varios(self, numeros: Iterable[str], tipo: str = 'FACTURA') -> Dict[str, Dict[str, Any]]:
+        """Estatus en caché de varios documentos en una sola consulta local"""
+        numeros = [n for n in numeros if n]
+        resultado: Dict[str, Dict[str, Any]] = {}
+        conexion = self._conectar()
+        try:
+            # SQLite limita la cantidad de parámetros por sentencia
+            for i in range(0, len(numeros), 500):
+                bloque = numeros[i:i + 500]
+                filas = conexion.execute(
+                    f'''SELECT * FROM estatus_documentos
+                        WHERE tipo = ? AND numero IN ({','.join('?' * len(bloque))})''',
+                    [tipo, *bloque]
+                ).fetchall()
+                for fila in filas:
+                    resultado[fila['numero']] = self._fila_a_estatus(fila)
+        finally:
+            conexion.close()
+        return resultado
+
+    def consultar(self, numero: str, tipo: str = 'FACTURA', permitir_remoto: bool = False) -> Dict[str, Any]:
+        """
+        Estatus de un documento, consultando al SENIAT solo si el dato venció
+
+        Args:
+            numero: Número del documento
+            tipo: Tipo de documento
+            permitir_remoto: Consultar al SENIAT si no hay estatus vigente
+
+        Returns:
+            Estatus (con 'vigente' indicando si está dentro del TTL)
+        """
+        estatus = self.obtener(numero, tipo)
+        if (estatus is None or not estatus['vigente']) and permitir_remoto:
+            self._refrescar(tipo, numero)
+            estatus = self.obtener(numero, tipo)
+        return estatus or {'numero': numero, 'tipo': tipo, 'estatus': ESTATUS_DESCONOCIDO, 'vigente': False}
+
+    def _refrescar(self, tipo: str, numero: str) -> bool:
+        """
+        Consulta al SENIAT un documento y actualiza la caché
+
+        Nunca lanza excepciones: un documento con error no debe cortar la
+        conciliación masiva (pool.map se detiene en la primera excepción).
+        """
+        try:
+            respuesta = self.comunicador.consultar_documento(numero, tipo)
+            if 'error' in respuesta:
+                self._registrar_error(tipo, numero, respuesta['error'])
+                return False
+            estatus = respuesta.get('estatus') or respuesta.get('estado') or ESTATUS_DESCONOCIDO
+            self.registrar(tipo, numero, str(estatus), respuesta, origen='consulta')
+            return True
+        except Exception as e:
+            logger.error("Error consultando estatus SENIAT de %s %s: %s", tipo, numero, e)
+            try:
+                self._registrar_error(tipo, numero, f'Error interno: {e}')
+            except Exception as error_registro:
+                logger.error("Error registrando fallo de estatus de %s: %s", numero, error_registro)
+            return False
+
+    def numeros_vencidos(self, numeros: Iterable[str], tipo: str = 'FACTURA') -> List[str]:
+        """Números sin estatus en caché o con estatus vencido"""
+        numeros = list(numeros)
+        en_cache = self.obtener_varios(numeros, tipo)
+        return [n for n in numeros if n not in en_cache or not en_cache[n]['vigente']]
+
+    def conciliar(self, tipo: str = 'FACTURA', numeros: Optional[Iterable[str]] = None,
+                  concurrencia: int = 8, limite: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Refresca en paralelo el estatus de los documentos vencidos
+
+        Args:
+            tipo: Tipo de documento
+            numeros: Números a conciliar (por defecto, todas las facturas guardadas)
+            concurrencia: Consultas simultáneas al SENIAT
+            limite: Máximo de documentos a consultar en esta ejecución
+
+        Returns:
+            Resumen con consultados, actualizados y errores
+        """
+        inicio = time.perf_counter()
+        if numeros is None:
+            numeros = self._numeros_facturas() if tipo == 'FACTURA' else []
+        pendientes = self.numeros_vencidos(numeros, tipo)
+        if limite:
+            pendientes = pendientes[:limite]
+
+        actualizados = 0
+        if pendientes:
+            with ThreadPoolExecutor(max_workers=max(1, min(concurrencia, len(pendientes)))) as pool:
+                actualizados = sum(pool.map(lambda n: self._refrescar(tipo, n), pendientes))
+
+        return {
+            'tipo': tipo,
+            'consultados': len(pendientes),
+            'actualizados': actualizados,
+            'errores': len(pendientes) - actualizados,
+            'duracion_segundos': time.perf_counter() - inicio
+        }
+
+    def _numeros_facturas(self) -> List[str]:
+        if not os.path.exists(ARCHIVO_FACTURAS):
+            return []
+        with open(ARCHIVO_FACTURAS, 'r', encoding='utf-8') as f:
+            facturas = json.load(f)
+        return [str(f['numero']) for f in facturas.values() if isinstance(f, dict) and f.get('numero')]
+
+
+# Instancia global de la caché de estatus (se construye en el primer uso)
+cache_estatus_seniat = InstanciaPerezosa(CacheEstatusSENIAT)
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Caché de estatus de documentos en el SENIAT')
+    subparsers = parser.add_subparsers(dest='accion', required=True)
+    conciliar = subparsers.add_parser('conciliar', help='Refresca los estatus vencidos')
+    conciliar.add_argument('--tipo', default='FACTURA')
+    conciliar.add_argument('--concurrencia', type=int, default=8)
+    conciliar.add_argument('--limite', type=int, default=None)
+    consultar = subparsers.add_parser('consultar', help='Muestra el estatus en caché de un documento')
+    consultar.add_argument('numero')
+    consultar.add_argument('--tipo', default='FACTURA')
+    args = parser.parse_args(argv[1:])
+
+    if args.accion == 'conciliar':
+        print(f"🔄 Conciliando estatus SENIAT de {args.tipo}...")
+        resumen = cache_estatus_seniat.conciliar(args.tipo, concurrencia=args.concurrencia, limite=args.limite)
+        print(f"📊 {resumen['consultados']} consultados, {resumen['actualizados']} actualizados, "
+              f"{resumen['errores']} con error en {resumen['duracion_segundos']:.2f} s")
+        return 0 if resumen['errores'] == 0 else 1
+
+    print(json.dumps(cache_estatus_seniat.consultar(args.numero, args.tipo), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -18,6 +18,7 @@ Funcionalidades:
 
 import json
 import csv
+import logging
 import xml.etree.ElementTree as ET
 import xml.dom.minidom as minidom
 import zipfile
@@ -26,6 +27,10 @@ import io
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Tuple
 from seguridad_fiscal import seguridad_fiscal
+from carga_perezosa import InstanciaPerezosa
+from integridad_fiscal import verificador_integridad, periodo_documento
+
+logger = logging.getLogger(__name__)
 
 class ExportacionSENIAT:
     """Clase para manejar exportaciones de datos fiscales para SENIAT"""
@@ -147,7 +152,7 @@ class ExportacionSENIAT:
             return facturas_lista
             
         except Exception as e:
-            print(f"Error cargando facturas: {str(e)}")
+            logger.error("Error cargando facturas: %s", e)
             return []
             
     def _exportar_facturas_csv(self, facturas: List[Dict[str, Any]], ruta_archivo: str, incluir_metadatos: bool):
@@ -358,6 +363,9 @@ class ExportacionSENIAT:
         logs = []
         archivo_logs = 'logs/auditoria_fiscal.log'
         
+        # Asegurar que las entradas del lote en memoria estén en disco
+        seguridad_fiscal.vaciar_log_auditoria()
+        
         if not os.path.exists(archivo_logs):
             return logs
             
@@ -381,14 +389,14 @@ class ExportacionSENIAT:
                         logs.append(log_entry)
                         
         except Exception as e:
-            print(f"Error cargando logs: {str(e)}")
+            logger.error("Error cargando logs: %s", e)
             
         return logs
         
     def _parsear_linea_log(self, linea: str) -> Optional[Dict[str, Any]]:
         """Parsea una línea de log fiscal"""
         try:
-            # Formato: [timestamp] USUARIO:x | ACCION:x | DOC_TIPO:x | DOC_NUM:x | IP_EXT:x | IP_LOC:x | MAC:x | HOST:x | DETALLES:x | HASH:x
+            # Formato: [timestamp] USUARIO:x | ACCION:x | DOC_TIPO:x | DOC_NUM:x | IP_EXT:x | IP_LOC:x | MAC:x | HOST:x | SESION:x | DETALLES:x | PREV:x | HASH:x
             if not linea.startswith('['):
                 return None
                 
@@ -420,6 +428,7 @@ class ExportacionSENIAT:
                 'mac_address': campos.get('mac', ''),
                 'hostname': campos.get('host', ''),
                 'detalles': campos.get('detalles', ''),
+                'hash_anterior': campos.get('prev', ''),
                 'hash_inmutable': campos.get('hash', '')
             }
             
@@ -431,7 +440,8 @@ class ExportacionSENIAT:
         with open(ruta_archivo, 'w', newline='', encoding='utf-8') as csvfile:
             campos = [
                 'timestamp', 'usuario', 'accion', 'documento_tipo', 'documento_numero',
-                'ip_externa', 'ip_local', 'mac_address', 'hostname', 'detalles', 'hash_inmutable'
+                'ip_externa', 'ip_local', 'mac_address', 'hostname', 'detalles',
+                'hash_anterior', 'hash_inmutable'
             ]
             
             writer = csv.DictWriter(csvfile, fieldnames=campos)
@@ -481,6 +491,22 @@ class ExportacionSENIAT:
                 if resultado_logs['exito']:
                     zipf.write(resultado_logs['archivo'], os.path.basename(resultado_logs['archivo']))
                     
+                # Raíces Merkle guardadas de los períodos incluidos (la verificación
+                # corre fuera de la petición: python integridad_fiscal.py)
+                periodos = sorted({periodo_documento(f) for f in self._cargar_facturas_filtradas(fecha_desde, fecha_hasta)})
+                raices_merkle = {}
+                integridad_periodos = {}
+                for periodo, datos in verificador_integridad.raices_guardadas(periodos).items():
+                    raices_merkle[periodo] = datos['raiz_merkle']
+                    integridad_periodos[periodo] = {
+                        'fecha_verificacion': datos['fecha_verificacion'],
+                        'vigente': datos['vigente'],
+                        'documentos_con_fallas': len(datos['documentos_con_fallas']),
+                        'documentos_sin_firma': len(datos['documentos_sin_firma'])
+                    }
+                    zipf.write(datos['archivo'], f"integridad/{os.path.basename(datos['archivo'])}")
+                periodos_sin_verificar = [p for p in periodos if p not in raices_merkle]
+
                 # Crear archivo de metadatos del reporte
                 metadatos_reporte = {
                     'fecha_generacion': datetime.now().isoformat(),
@@ -492,8 +518,12 @@ class ExportacionSENIAT:
                         'facturas_seniat_*.csv',
                         'facturas_seniat_*.xml', 
                         'facturas_seniat_*.json',
-                        'logs_auditoria_seniat_*.csv'
+                        'logs_auditoria_seniat_*.csv',
+                        'integridad/merkle_*.json'
                     ],
+                    'raices_merkle': raices_merkle,
+                    'integridad_periodos': integridad_periodos,
+                    'periodos_sin_verificar': periodos_sin_verificar,
                     'proposito': 'Reporte consolidado para auditoría SENIAT',
                     'version_sistema': '1.0.0'
                 }
@@ -527,5 +557,5 @@ class ExportacionSENIAT:
         except Exception:
             pass
 
-# Instancia global del exportador SENIAT
-exportador_seniat = ExportacionSENIAT() 
\ No newline at end of file
+# Instancia global del exportador SENIAT (se construye en el primer uso)
+exportador_seniat = InstanciaPerezosa(ExportacionSENIAT) 
\ No newline at end of file
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Gestión de Claves Fiscales
+====================================
+
+Administra la clave maestra usada por SeguridadFiscal y la clave de cifrado
+derivada de ella, de forma que todos los workers y reinicios compartan las
+mismas claves y la derivación PBKDF2 solo se ejecute una vez.
+
+Origen de la clave maestra (en orden de prioridad):
+1. Variable de entorno SENIAT_CLAVE_MAESTRA
+2. Archivo indicado en SENIAT_CLAVE_MAESTRA_ARCHIVO
+3. Archivo claves_fiscales/clave_maestra.key (se genera si no existe)
+
+Funcionalidades:
+- Carga de la clave maestra configurada
+- Derivación PBKDF2-HMAC-SHA256 con registro de parámetros
+- Caché en disco de la clave derivada (permisos 0600)
+- Escrituras atómicas seguras entre procesos
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Parámetros de derivación vigentes
+KDF_ALGORITMO = 'PBKDF2HMAC-SHA256'
+KDF_ITERACIONES = 100000
+KDF_LONGITUD = 32
+KDF_SALT = b'seniat_fiscal_salt_2024'  # Salt fijo para consistencia con versiones anteriores
+
+VARIABLE_CLAVE = 'SENIAT_CLAVE_MAESTRA'
+VARIABLE_ARCHIVO_CLAVE = 'SENIAT_CLAVE_MAESTRA_ARCHIVO'
+
+
+class GestorClavesFiscales:
+    """Clase para cargar la clave maestra y cachear la clave derivada"""
+
+    def __init__(self, directorio: str = 'claves_fiscales'):
+        """
+        Inicializa el gestor de claves
+
+        Args:
+            directorio: Directorio donde se guardan la clave maestra y la caché
+        """
+        self.directorio = directorio
+        self.archivo_clave = os.environ.get(VARIABLE_ARCHIVO_CLAVE) or os.path.join(directorio, 'clave_maestra.key')
+        self.archivo_cache = os.path.join(directorio, 'clave_derivada.json')
+        self._cache_memoria: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def cargar_clave_maestra(self) -> str:
+        """
+        Obtiene la clave maestra configurada
+
+        Returns:
+            Clave maestra como cadena de texto
+        """
+        clave = os.environ.get(VARIABLE_CLAVE, '').strip()
+        if clave:
+            return clave
+
+        if os.path.exists(self.archivo_clave):
+            return self._leer_archivo_clave()
+
+        return self._crear_archivo_clave()
+
+    def _leer_archivo_clave(self) -> str:
+        """Lee la clave maestra desde el archivo de clave"""
+        with open(self.archivo_clave, 'r', encoding='utf-8') as f:
+            clave = f.read().strip()
+        if not clave:
+            raise ValueError(f"El archivo de clave maestra {self.archivo_clave} está vacío")
+        return clave
+
+    def _crear_archivo_clave(self) -> str:
+        """Genera y persiste una clave maestra nueva (solo el primer proceso la escribe)"""
+        from cryptography.fernet import Fernet
+
+        os.makedirs(os.path.dirname(self.archivo_clave) or '.', exist_ok=True)
+        clave = Fernet.generate_key().decode()
+        try:
+            # O_EXCL garantiza que si dos workers arrancan a la vez solo uno crea la clave
+            fd = os.open(self.archivo_clave, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            return self._leer_archivo_clave()
+
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(clave)
+            f.flush()
+            os.fsync(f.fileno())
+        return clave
+
+    def huella_clave(self, clave_maestra: str) -> str:
+        """Identificador no reversible de la clave maestra, para validar la caché"""
+        return hmac.new(b'huella_clave_maestra', clave_maestra.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def parametros_kdf(self) -> Dict[str, Any]:
+        """Parámetros de derivación que debe cumplir una entrada de caché válida"""
+        return {
+            'algoritmo': KDF_ALGORITMO,
+            'iteraciones': KDF_ITERACIONES,
+            'longitud': KDF_LONGITUD,
+            'salt': base64.b64encode(KDF_SALT).decode('ascii')
+        }
+
+    def obtener_clave_cifrado(self, clave_maestra: str) -> bytes:
+        """
+        Devuelve la clave Fernet derivada de la clave maestra
+
+        Usa, en orden: caché en memoria, caché en disco y, si ninguna es válida,
+        deriva con PBKDF2 y actualiza la caché en disco.
+
+        Args:
+            clave_maestra: Clave maestra en texto
+
+        Returns:
+            Clave en base64 urlsafe lista para Fernet
+        """
+        huella = self.huella_clave(clave_maestra)
+        if huella in self._cache_memoria:
+            return self._cache_memoria[huella]
+
+        with self._lock:
+            if huella in self._cache_memoria:
+                return self._cache_memoria[huella]
+
+            clave = self._leer_cache_disco(huella)
+            if clave is None:
+                clave = self._derivar(clave_maestra)
+                self._guardar_cache_disco(huella, clave)
+
+            self._cache_memoria[huella] = clave
+            return clave
+
+    def _derivar(self, clave_maestra: str) -> bytes:
+        """Ejecuta la derivación PBKDF2 (costosa, ~100.000 iteraciones)"""
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+        kdf = PBKDF2HMAC(
+            algorithm=hashes.SHA256(),
+            length=KDF_LONGITUD,
+            salt=KDF_SALT,
+            iterations=KDF_ITERACIONES,
+        )
+        return base64.urlsafe_b64encode(kdf.derive(clave_maestra.encode('utf-8')))
+
+    def _leer_cache_disco(self, huella: str) -> Optional[bytes]:
+        """Lee la clave derivada de disco si corresponde a la clave y parámetros actuales"""
+        try:
+            with open(self.archivo_cache, 'r', encoding='utf-8') as f:
+                registro = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if registro.get('huella_clave_maestra') != huella:
+            return None
+        if registro.get('kdf') != self.parametros_kdf():
+            return None
+
+        clave = registro.get('clave_derivada', '')
+        return clave.encode('ascii') if clave else None
+
+    def _guardar_cache_disco(self, huella: str, clave: bytes) -> None:
+        """Escribe la caché de forma atómica con permisos restringidos"""
+        registro = {
+            'huella_clave_maestra': huella,
+            'kdf': self.parametros_kdf(),
+            'clave_derivada': clave.decode('ascii'),
+            'fecha_derivacion': datetime.now().isoformat()
+        }
+
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            temp_file = f"{self.archivo_cache}.{os.getpid()}.tmp"
+            fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(registro, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, self.archivo_cache)
+        except OSError as e:
+            # Sin caché en disco el sistema sigue funcionando; solo se pierde la optimización
+            logger.error("Error guardando caché de clave derivada: %s", e)
+
+
+# Instancia global del gestor de claves
+gestor_claves = GestorClavesFiscales()
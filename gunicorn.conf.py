@@ -2,16 +2,67 @@
 # -*- coding: utf-8 -*-
 """
 Configuración de Gunicorn optimizada para Render.
+
+Modos de servicio (GUNICORN_MODO):
+    sync      1 worker con 2 hilos, como hasta ahora (por defecto)
+    gthread   1 worker con GUNICORN_THREADS hilos (por defecto 4)
+    gevent    1 worker cooperativo: mientras una petición espera al BCV,
+              ip-api, DolarToday o a wkhtmltopdf, el worker atiende otras
+              (gevent está en requirements; sin él se usa gthread)
+    eventlet  Igual que gevent, con eventlet (requiere pip install eventlet)
+
+Todos los modos usan un solo worker por defecto. Varios workers no son seguros
+todavía: los JSON de datos (facturas, inventario, clientes...) se leen, se
+modifican en memoria y se reescriben completos sin bloqueo entre procesos, así
+que dos workers pueden pisarse los cambios. La concurrencia se obtiene con hilos
+o con gevent dentro del worker. WEB_CONCURRENCY permite subir el número de
+workers bajo responsabilidad de quien despliega (por ejemplo con datos de solo
+lectura o cuando el almacenamiento sea seguro entre procesos).
+
+Variables de entorno:
+    WEB_CONCURRENCY         Número de workers (por defecto 1; ver advertencia arriba)
+    GUNICORN_THREADS        Hilos por worker en sync/gthread
+    GUNICORN_CONEXIONES     Peticiones simultáneas por worker en gevent/eventlet (por defecto 100)
+    PDF_MAX_PENDIENTES      PDF admitidos a la vez (por defecto hilos - 1; 2 en gevent/eventlet)
+
+Uso:
+    gunicorn --config gunicorn.conf.py app:app
+    GUNICORN_MODO=gthread gunicorn --config gunicorn.conf.py app:app
+    python benchmark_concurrencia.py --modos sync,gthread,gevent
 """
 
+import importlib.util
 import os
-import multiprocessing
+
+MODO = os.environ.get('GUNICORN_MODO', 'sync').lower()
+
+# El logger de Gunicorn aún no existe al leer este archivo: el aviso se emite en on_starting
+AVISO_MODO = None
+if MODO in ('gevent', 'eventlet') and importlib.util.find_spec(MODO) is None:
+    AVISO_MODO = f"⚠️ GUNICORN_MODO={MODO} requiere 'pip install {MODO}'; se usa gthread"
+    MODO = 'gthread'
 
 # Configuración del servidor
 bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
-workers = 1
-threads = 2
-worker_class = "sync"
+
+# Un solo worker en todos los modos mientras el almacenamiento JSON no sea seguro entre procesos
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+
+if MODO == 'sync':
+    threads = int(os.environ.get('GUNICORN_THREADS', '2'))
+    worker_class = "sync"
+elif MODO == 'gthread':
+    threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+    worker_class = "gthread"
+elif MODO in ('gevent', 'eventlet'):
+    threads = 1
+    worker_class = MODO
+else:
+    raise ValueError(f"GUNICORN_MODO desconocido: {MODO} (sync, gthread, gevent o eventlet)")
+
+# Los PDF admitidos a la vez dejan al menos un hilo libre para las páginas;
+# en gevent/eventlet la espera por wkhtmltopdf no ocupa hilos
+os.environ.setdefault('PDF_MAX_PENDIENTES', str(2 if threads == 1 else threads - 1))
 
 # Configuración de timeout
 timeout = 180
@@ -25,7 +76,7 @@ errorlog = "-"
 loglevel = "info"
 
 # Configuración de workers
-worker_connections = 1000
+worker_connections = int(os.environ.get('GUNICORN_CONEXIONES', '100')) if MODO in ('gevent', 'eventlet') else 1000
 worker_tmp_dir = "/dev/shm"
 
 # Configuración de seguridad
@@ -34,15 +85,21 @@ limit_request_fields = 100
 limit_request_field_size = 8190
 
 # Configuración de performance
-preload_app = True
+# gevent/eventlet parchean socket, ssl y threading al iniciar cada worker: la app
+# debe importarse después, en el worker, y no en el proceso maestro
+preload_app = MODO not in ('gevent', 'eventlet')
 forwarded_allow_ips = "*"
 
 # Configuración de health check
 def when_ready(server):
-    server.log.info("🚀 Servidor Gunicorn listo")
+    server.log.info(f"🚀 Servidor Gunicorn listo (modo {MODO}: {workers} workers {worker_class}"
+                    + (f", {threads} hilos" if threads > 1 else '')
+                    + (f", {worker_connections} conexiones" if MODO in ('gevent', 'eventlet') else '') + ")")
 
 def on_starting(server):
     server.log.info("🔄 Iniciando servidor Gunicorn")
+    if AVISO_MODO:
+        server.log.warning(AVISO_MODO)
 
 def on_reload(server):
     server.log.info("🔄 Recargando servidor Gunicorn")
@@ -57,6 +114,10 @@ def post_fork(server, worker):
     server.log.info(f"✅ Worker {worker.pid} creado")
 
 def post_worker_init(worker):
+    # La app ya está cargada en el worker (también con preload_app): las tareas de
+    # arranque corren aquí para que cada worker las haga y el maestro no
+    from app import iniciar_tareas_worker
+    iniciar_tareas_worker()
     worker.log.info(f"🚀 Worker {worker.pid} inicializado")
 
 def worker_abort(worker):
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Imágenes de Productos - Derivados Redimensionados
+===========================================================
+
+Las imágenes de productos se suben tal cual (varios MB). Este módulo genera
+versiones reducidas al subirlas, para que las páginas y los PDF no incrusten
+el original:
+
+- miniatura (200 px) y mediana (600 px) del lado mayor, en
+  static/imagenes_productos/derivados/
+- opcionalmente WebP de cada tamaño (si Pillow lo soporta)
+- imagen_producto(ruta, tamano): helper de plantillas que devuelve la URL del
+  derivado, o la del original si el derivado no existe
+
+Configuración por variables de entorno:
+    IMAGENES_WEBP      '1' (por defecto) genera también .webp; '0' no
+    IMAGENES_CALIDAD   Calidad JPEG/WebP de los derivados (por defecto 82)
+
+Requiere Pillow (pip install Pillow); sin él solo se guarda el original.
+
+Uso:
+    python imagenes_productos.py generar [--procesos N] [--forzar]
+"""
+
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, List
+from carga_perezosa import importar_opcional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DIRECTORIO_STATIC = os.path.join(BASE_DIR, 'static')
+CARPETA_IMAGENES = 'imagenes_productos'
+CARPETA_DERIVADOS = 'derivados'
+
+# Lado mayor máximo (px) de cada derivado
+TAMANOS_DERIVADOS = {
+    'miniatura': 200,
+    'mediana': 600,
+}
+
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png', '.gif')
+
+_advertencia_pillow_mostrada = False
+
+
+def _pillow():
+    global _advertencia_pillow_mostrada
+    imagen = importar_opcional('PIL.Image')
+    if imagen is None and not _advertencia_pillow_mostrada:
+        logger.warning("⚠️ Pillow no está instalado: no se generan miniaturas (pip install Pillow)")
+        _advertencia_pillow_mostrada = True
+    return imagen
+
+
+def _webp_habilitado() -> bool:
+    if os.environ.get('IMAGENES_WEBP', '1') == '0':
+        return False
+    features = importar_opcional('PIL.features')
+    return features is not None and features.check('webp')
+
+
+def ruta_derivado_relativa(ruta_imagen: str, tamano: str, extension: str) -> str:
+    """Ruta (relativa a static/) del derivado de una imagen"""
+    directorio, archivo = os.path.split(ruta_imagen.replace('\\', '/'))
+    base = os.path.splitext(archivo)[0]
+    return f"{directorio}/{CARPETA_DERIVADOS}/{base}_{tamano}.{extension}".lstrip('/')
+
+
+def _extension_derivado(imagen) -> str:
+    # Las imágenes con transparencia se mantienen en PNG; el resto va a JPEG
+    tiene_alfa = imagen.mode in ('RGBA', 'LA') or (imagen.mode == 'P' and 'transparency' in imagen.info)
+    return 'png' if tiene_alfa else 'jpg'
+
+
+def generar_derivados(ruta_imagen: str, forzar: bool = False,
+                      directorio_static: str = DIRECTORIO_STATIC) -> Dict[str, Any]:
+    """
+    Genera los derivados de una imagen de producto
+
+    Args:
+        ruta_imagen: Ruta relativa a static/ (como se guarda en ruta_imagen)
+        forzar: Regenerar aunque los derivados estén al día
+        directorio_static: Directorio static de la aplicación
+
+    Returns:
+        Dict con los derivados escritos ({tamano: [rutas relativas]}),
+        bytes_original y bytes_derivados; o 'error' si no se pudo
+    """
+    Image = _pillow()
+    if Image is None:
+        return {'error': 'Pillow no está instalado'}
+
+    ruta_original = os.path.join(directorio_static, ruta_imagen)
+    try:
+        mtime_original = os.path.getmtime(ruta_original)
+        resultado: Dict[str, Any] = {'imagen': ruta_imagen, 'derivados': {}, 'omitidos': 0,
+                                     'bytes_original': os.path.getsize(ruta_original), 'bytes_derivados': 0}
+        webp = _webp_habilitado()
+        calidad = int(os.environ.get('IMAGENES_CALIDAD', '82'))
+
+        with Image.open(ruta_original) as original:
+            original.load()
+            extension = _extension_derivado(original)
+            for tamano, lado in TAMANOS_DERIVADOS.items():
+                destinos = [(extension, ruta_derivado_relativa(ruta_imagen, tamano, extension))]
+                if webp:
+                    destinos.append(('webp', ruta_derivado_relativa(ruta_imagen, tamano, 'webp')))
+                rutas_absolutas = [os.path.join(directorio_static, relativa) for _, relativa in destinos]
+                if not forzar and all(os.path.exists(r) and os.path.getmtime(r) >= mtime_original
+                                      for r in rutas_absolutas):
+                    resultado['omitidos'] += 1
+                    continue
+
+                copia = original.copy()
+                copia.thumbnail((lado, lado), Image.LANCZOS)
+                if extension == 'jpg' and copia.mode != 'RGB':
+                    copia = copia.convert('RGB')
+                elif extension == 'png' and copia.mode == 'P':
+                    copia = copia.convert('RGBA')
+
+                os.makedirs(os.path.dirname(rutas_absolutas[0]), exist_ok=True)
+                resultado['derivados'][tamano] = []
+                for (formato, relativa), absoluta in zip(destinos, rutas_absolutas):
+                    temporal = f'{absoluta}.{os.getpid()}.tmp'
+                    if formato == 'jpg':
+                        copia.save(temporal, 'JPEG', quality=calidad, optimize=True, progressive=True)
+                    elif formato == 'png':
+                        copia.save(temporal, 'PNG', optimize=True)
+                    else:
+                        copia.save(temporal, 'WEBP', quality=calidad, method=4)
+                    os.replace(temporal, absoluta)
+                    resultado['derivados'][tamano].append(relativa)
+                    resultado['bytes_derivados'] += os.path.getsize(absoluta)
+        return resultado
+    except Exception as e:
+        return {'imagen': ruta_imagen, 'error': f'{type(e).__name__}: {e}'}
+
+
+def eliminar_derivados(ruta_imagen: str, directorio_static: str = DIRECTORIO_STATIC) -> int:
+    """Elimina los derivados de una imagen (al reemplazarla o borrar el producto)"""
+    eliminados = 0
+    for tamano in TAMANOS_DERIVADOS:
+        for extension in ('jpg', 'png', 'webp'):
+            ruta = os.path.join(directorio_static, ruta_derivado_relativa(ruta_imagen, tamano, extension))
+            try:
+                os.remove(ruta)
+                eliminados += 1
+            except FileNotFoundError:
+                pass
+    return eliminados
+
+
+def imagen_producto(ruta_imagen: Optional[str], tamano: str = 'mediana', webp: bool = False,
+                    directorio_static: str = DIRECTORIO_STATIC) -> Optional[str]:
+    """
+    Ruta relativa a static/ de la versión adecuada de una imagen de producto
+
+    Args:
+        ruta_imagen: ruta_imagen del producto
+        tamano: 'miniatura', 'mediana' u 'original'
+        webp: Devolver la versión WebP (None si no existe)
+
+    Returns:
+        Ruta del derivado; si no existe, la del original (o None si webp=True)
+    """
+    if not ruta_imagen:
+        return None
+    if tamano in TAMANOS_DERIVADOS:
+        extensiones = ('webp',) if webp else ('jpg', 'png')
+        for extension in extensiones:
+            relativa = ruta_derivado_relativa(ruta_imagen, tamano, extension)
+            if os.path.exists(os.path.join(directorio_static, relativa)):
+                return relativa
+    return None if webp else ruta_imagen
+
+
+def imagenes_existentes(directorio_static: str = DIRECTORIO_STATIC) -> List[str]:
+    """Rutas relativas a static/ de todas las imágenes originales de productos"""
+    directorio = os.path.join(directorio_static, CARPETA_IMAGENES)
+    try:
+        archivos = sorted(os.listdir(directorio))
+    except FileNotFoundError:
+        return []
+    return [f'{CARPETA_IMAGENES}/{archivo}' for archivo in archivos
+            if archivo.lower().endswith(EXTENSIONES_IMAGEN) and os.path.isfile(os.path.join(directorio, archivo))]
+
+
+def generar_todos(procesos: Optional[int] = None, forzar: bool = False,
+                  directorio_static: str = DIRECTORIO_STATIC) -> Dict[str, Any]:
+    """
+    Genera los derivados de todas las imágenes existentes en un pool de procesos
+
+    Returns:
+        Resumen con imágenes procesadas, errores, bytes y duración
+    """
+    inicio = time.perf_counter()
+    imagenes = imagenes_existentes(directorio_static)
+    procesos = max(1, min(procesos or os.cpu_count() or 1, len(imagenes) or 1))
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        resultados = list(pool.map(generar_derivados, imagenes, [forzar] * len(imagenes),
+                                   [directorio_static] * len(imagenes)))
+    errores = [r for r in resultados if 'error' in r]
+    return {
+        'imagenes': len(imagenes),
+        'generadas': sum(1 for r in resultados if r.get('derivados')),
+        'al_dia': sum(1 for r in resultados if 'error' not in r and not r.get('derivados')),
+        'errores': errores,
+        'bytes_originales': sum(r.get('bytes_original', 0) for r in resultados),
+        'bytes_derivados': sum(r.get('bytes_derivados', 0) for r in resultados),
+        'procesos': procesos,
+        'duracion_segundos': time.perf_counter() - inicio
+    }
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Derivados de las imágenes de productos')
+    subparsers = parser.add_subparsers(dest='accion', required=True)
+    generar = subparsers.add_parser('generar', help='Genera los derivados de las imágenes existentes')
+    generar.add_argument('--procesos', type=int, default=None, help='Procesos (por defecto, los núcleos)')
+    generar.add_argument('--forzar', action='store_true', help='Regenerar aunque estén al día')
+    args = parser.parse_args(argv[1:])
+
+    if _pillow() is None:
+        return 1
+    print("🖼️ Generando derivados de imágenes de productos...")
+    resumen = generar_todos(args.procesos, args.forzar)
+    print(f"📊 {resumen['imagenes']} imágenes: {resumen['generadas']} generadas, {resumen['al_dia']} al día, "
+          f"{len(resumen['errores'])} con error ({resumen['procesos']} procesos, "
+          f"{resumen['duracion_segundos']:.2f} s)")
+    for error in resumen['errores']:
+        print(f"  ❌ {error['imagen']}: {error['error']}")
+    return 0 if not resumen['errores'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo Índice de Clientes - Búsqueda Predictiva en Memoria
+==========================================================
+
+Índice de búsqueda sobre clientes.json para /api/buscar-clientes y el filtro
+de /clientes, en lugar de releer el archivo y recorrer todos los clientes en
+cada tecla.
+
+- Texto normalizado: minúsculas y sin acentos; el RIF y el teléfono también
+  se indexan compactos (solo letras y dígitos), con y sin código de país
+- Resultados por niveles, y se detiene al llegar al límite:
+    1. el nombre, RIF o teléfono empieza por lo buscado
+    2. cada palabra buscada es prefijo de alguna palabra del cliente
+    3. cada palabra buscada aparece dentro del texto (postings de trigramas)
+- Se actualiza al crear/editar/eliminar clientes, y se reconstruye si
+  clientes.json cambió por otra vía (otro worker, importación CSV...)
+
+Uso:
+    from indice_clientes import indice_clientes
+    indice_clientes.buscar('alicia lu', limite=10)
+
+    firma = indice_clientes.firma_archivo()   # antes de guardar clientes.json
+    guardar_datos(ARCHIVO_CLIENTES, clientes)
+    indice_clientes.actualizar_cliente(rif, cliente, firma)
+"""
+
+import bisect
+import json
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Dict, Any, Optional, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_CLIENTES = 'clientes.json'
+
+# Campos que devuelve la búsqueda (los que muestra el buscador de la factura)
+CAMPOS_RESULTADO = ('nombre', 'rif', 'email', 'telefono')
+
+
+def normalizar(texto: Any) -> str:
+    """Minúsculas, sin acentos y con cualquier signo reemplazado por un espacio"""
+    texto = str(texto or '')
+    if not texto.isascii():
+        texto = unicodedata.normalize('NFKD', texto)
+        texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = texto.lower()
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', texto).split())
+
+
+def compactar(texto: Any) -> str:
+    """Solo letras y dígitos (p. ej. 'V-13.058.545' → 'v13058545')"""
+    return normalizar(texto).replace(' ', '')
+
+
+def trigramas(texto: str) -> Set[str]:
+    """Subcadenas de 3 caracteres de un texto normalizado"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceClientes:
+    """Clase para buscar clientes por nombre, RIF o teléfono sin recorrer todo el archivo"""
+
+    def __init__(self, archivo: str = ARCHIVO_CLIENTES):
+        """
+        Inicializa el índice (se construye en la primera búsqueda)
+
+        Args:
+            archivo: Archivo JSON de clientes
+        """
+        self.archivo = archivo
+        self._lock = threading.RLock()
+        self._firma: Optional[Tuple[int, int]] = None
+        self._datos: Dict[str, Dict[str, Any]] = {}
+        self._documentos: Dict[str, Dict[str, Any]] = {}
+        self._claves: List[Tuple[str, str]] = []      # (clave completa, id), ordenada
+        self._tokens: List[Tuple[str, str]] = []      # (palabra, id), ordenada
+        self._postings: Dict[str, Set[str]] = {}      # trigrama → ids
+
+    # --- Construcción ---
+
+    def _firma_archivo(self) -> Optional[Tuple[int, int]]:
+        try:
+            info = os.stat(self.archivo)
+        except FileNotFoundError:
+            return None
+        return (info.st_mtime_ns, info.st_size)
+
+    def firma_archivo(self) -> Optional[Tuple[int, int]]:
+        """Firma actual de clientes.json: tomarla antes de guardar y pasarla a actualizar_cliente/eliminar_cliente"""
+        return self._firma_archivo()
+
+    @staticmethod
+    def _documento(id_cliente: str, cliente: Dict[str, Any]) -> Dict[str, Any]:
+        """Claves, palabras y texto normalizados de un cliente"""
+        nombre = normalizar(cliente.get('nombre'))
+        claves = {nombre} if nombre else set()
+        tokens = set(nombre.split())
+        for valor in (id_cliente, cliente.get('rif')):
+            compacto = compactar(valor)
+            if compacto:
+                claves.add(compacto)
+                tokens.add(compacto)
+                # RIF sin la letra: 'v13058545' → '13058545'
+                tokens.add(compacto.lstrip('vejgpc'))
+        digitos = re.sub(r'\D', '', str(cliente.get('telefono') or ''))
+        if len(digitos) >= 7:
+            variantes = {digitos}
+            if digitos.startswith('58'):
+                # +58 414-... también se busca como 0414-... y 414-...
+                variantes |= {digitos[2:], '0' + digitos[2:]}
+            variantes |= {v.lstrip('0') for v in variantes}
+            claves |= variantes
+            tokens |= variantes
+        tokens.discard('')
+        return {'claves': claves, 'tokens': tokens, 'texto': ' '.join(sorted(tokens))}
+
+    def _construir(self, clientes: Dict[str, Dict[str, Any]]) -> None:
+        self._datos = {}
+        self._documentos = {}
+        claves, tokens = [], []
+        self._postings = {}
+        for id_cliente, cliente in clientes.items():
+            if not isinstance(cliente, dict):
+                continue
+            documento = self._documento(id_cliente, cliente)
+            self._documentos[id_cliente] = documento
+            self._datos[id_cliente] = self._resultado(id_cliente, cliente)
+            claves.extend((clave, id_cliente) for clave in documento['claves'])
+            tokens.extend((token, id_cliente) for token in documento['tokens'])
+            for trigrama in trigramas(documento['texto']):
+                self._postings.setdefault(trigrama, set()).add(id_cliente)
+        claves.sort()
+        tokens.sort()
+        self._claves = claves
+        self._tokens = tokens
+
+    @staticmethod
+    def _resultado(id_cliente: str, cliente: Dict[str, Any]) -> Dict[str, Any]:
+        return {'id': id_cliente, **{campo: cliente.get(campo, '') for campo in CAMPOS_RESULTADO}}
+
+    def asegurar_actualizado(self) -> None:
+        """Reconstruye el índice si clientes.json cambió desde la última vez"""
+        firma = self._firma_archivo()
+        if firma == self._firma and self._firma is not None:
+            return
+        with self._lock:
+            firma = self._firma_archivo()
+            if firma == self._firma and self._firma is not None:
+                return
+            clientes = {}
+            if firma is not None:
+                try:
+                    with open(self.archivo, 'r', encoding='utf-8') as f:
+                        clientes = json.load(f)
+                except ValueError as e:
+                    logger.error("Error leyendo %s para el índice de clientes: %s", self.archivo, e)
+            self._construir(clientes if isinstance(clientes, dict) else {})
+            self._firma = firma
+
+    # --- Actualización incremental ---
+
+    def _quitar(self, id_cliente: str) -> None:
+        documento = self._documentos.pop(id_cliente, None)
+        self._datos.pop(id_cliente, None)
+        if documento is None:
+            return
+        for lista, valores in ((self._claves, documento['claves']), (self._tokens, documento['tokens'])):
+            for valor in valores:
+                i = bisect.bisect_left(lista, (valor, id_cliente))
+                if i < len(lista) and lista[i] == (valor, id_cliente):
+                    del lista[i]
+        for trigrama in trigramas(documento['texto']):
+            ids = self._postings.get(trigrama)
+            if ids is not None:
+                ids.discard(id_cliente)
+                if not ids:
+                    del self._postings[trigrama]
+
+    def _parchear_firma(self, firma_anterior: Optional[Tuple[int, int]]) -> bool:
+        """
+        Indica si el índice puede parchearse con un solo cambio. Solo si el
+        archivo que se reemplazó era el que ya estaba indexado; si no, otro
+        worker escribió antes y el índice se invalida para reconstruirse.
+        Debe llamarse con self._lock tomado.
+        """
+        if self._firma is None or firma_anterior is None or firma_anterior != self._firma:
+            self._firma = None
+            return False
+        return True
+
+    def actualizar_cliente(self, id_cliente: str, cliente: Dict[str, Any],
+                           firma_anterior: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Agrega o reemplaza un cliente (llamar después de guardar clientes.json)
+
+        Args:
+            id_cliente: RIF del cliente
+            cliente: Datos guardados del cliente
+            firma_anterior: firma_archivo() tomada antes de guardar; sin ella
+                            (o si no coincide) el índice se reconstruye
+        """
+        with self._lock:
+            if not self._parchear_firma(firma_anterior):
+                return
+            self._quitar(id_cliente)
+            documento = self._documento(id_cliente, cliente)
+            self._documentos[id_cliente] = documento
+            self._datos[id_cliente] = self._resultado(id_cliente, cliente)
+            for clave in documento['claves']:
+                bisect.insort(self._claves, (clave, id_cliente))
+            for token in documento['tokens']:
+                bisect.insort(self._tokens, (token, id_cliente))
+            for trigrama in trigramas(documento['texto']):
+                self._postings.setdefault(trigrama, set()).add(id_cliente)
+            self._firma = self._firma_archivo()
+
+    def eliminar_cliente(self, id_cliente: str, firma_anterior: Optional[Tuple[int, int]] = None) -> None:
+        """Quita un cliente del índice (llamar después de guardar clientes.json, ver actualizar_cliente)"""
+        with self._lock:
+            if not self._parchear_firma(firma_anterior):
+                return
+            self._quitar(id_cliente)
+            self._firma = self._firma_archivo()
+
+    # --- Búsqueda ---
+
+    @staticmethod
+    def _rango_prefijo(lista: List[Tuple[str, str]], prefijo: str) -> Tuple[int, int]:
+        inicio = bisect.bisect_left(lista, (prefijo, ''))
+        fin = bisect.bisect_left(lista, (prefijo + '\uffff', ''))
+        return inicio, fin
+
+    def buscar_ids(self, consulta: str, limite: Optional[int] = 10) -> List[str]:
+        """
+        IDs de los clientes que coinciden, del más al menos relevante
+
+        Args:
+            consulta: Texto buscado (nombre, RIF o teléfono, completos o parciales)
+            limite: Máximo de resultados (None para todos)
+
+        Returns:
+            Lista de IDs de cliente
+        """
+        self.asegurar_actualizado()
+        palabras = normalizar(consulta).split()
+        if not palabras:
+            return []
+        compacta = ''.join(palabras)
+        encontrados: Dict[str, None] = {}
+
+        def completo() -> bool:
+            return limite is not None and len(encontrados) >= limite
+
+        with self._lock:
+            # 1. Nombre, RIF o teléfono que empieza por lo buscado (orden alfabético)
+            for prefijo in dict.fromkeys((' '.join(palabras), compacta)):
+                inicio, fin = self._rango_prefijo(self._claves, prefijo)
+                for _, id_cliente in self._claves[inicio:fin]:
+                    encontrados.setdefault(id_cliente)
+                    if completo():
+                        return list(encontrados)
+
+            # 2. Cada palabra es prefijo de alguna palabra del cliente: se recorre la
+            #    palabra con menos candidatos y se verifican las demás
+            rangos = sorted(((self._rango_prefijo(self._tokens, p), p) for p in palabras),
+                            key=lambda r: r[0][1] - r[0][0])
+            (inicio, fin), _ = rangos[0]
+            resto = [p for _, p in rangos[1:]]
+            for _, id_cliente in self._tokens[inicio:fin]:
+                if id_cliente in encontrados:
+                    continue
+                tokens = self._documentos[id_cliente]['tokens']
+                if all(any(t.startswith(p) for t in tokens) for p in resto):
+                    encontrados[id_cliente] = None
+                    if completo():
+                        return list(encontrados)
+
+            # 3. Cada palabra aparece dentro del texto (candidatos por trigramas)
+            largas = [p for p in palabras if len(p) >= 3]
+            if largas:
+                candidatos: Optional[Set[str]] = None
+                for trigrama in sorted({t for p in largas for t in trigramas(p)},
+                                       key=lambda t: len(self._postings.get(t, ()))):
+                    ids = self._postings.get(trigrama, set())
+                    candidatos = set(ids) if candidatos is None else candidatos & ids
+                    if not candidatos:
+                        break
+                for id_cliente in sorted(candidatos or (), key=lambda i: self._datos[i]['nombre']):
+                    if id_cliente in encontrados:
+                        continue
+                    texto = self._documentos[id_cliente]['texto']
+                    if all(p in texto for p in palabras):
+                        encontrados[id_cliente] = None
+                        if completo():
+                            break
+            return list(encontrados)
+
+    def buscar(self, consulta: str, limite: Optional[int] = 10) -> List[Dict[str, Any]]:
+        """Clientes que coinciden (id, nombre, rif, email, telefono), del más al menos relevante"""
+        ids = self.buscar_ids(consulta, limite)
+        with self._lock:
+            return [dict(self._datos[i]) for i in ids if i in self._datos]
+
+
+# Instancia global del índice de clientes
+indice_clientes = IndiceClientes()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo Índice de Productos - Búsqueda y Filtros del Catálogo en Memoria
+=======================================================================
+
+Índice sobre inventario.json para el inventario, el ajuste de stock, la lista
+de precios (HTML y PDF) y el buscador de productos de la factura, en lugar de
+recorrer todo el catálogo en cada petición:
+
+- postings de palabras del nombre normalizado (sin acentos) y de trigramas
+  para búsquedas parciales
+- categoría → productos, en el orden del inventario
+- código de barras → producto, y códigos ordenados para buscar por prefijo
+- productos ordenados por precio para los filtros precio_min / precio_max
+
+El índice guarda solo los campos que busca y muestra; se reconstruye cuando
+inventario.json cambia (ventas, ajustes, ediciones, otro worker...).
+
+Uso:
+    from indice_productos import indice_productos
+    ids = indice_productos.filtrar(q='adelga', categoria='Adelgazante-Laxante')
+    indice_productos.buscar('7591', limite=20)
+"""
+
+import bisect
+import heapq
+import json
+import logging
+import os
+import threading
+from typing import Dict, Any, Optional, List, Set, Tuple
+from indice_clientes import normalizar, trigramas
+
+logger = logging.getLogger(__name__)
+
+ARCHIVO_INVENTARIO = 'inventario.json'
+
+# Campos que devuelve la búsqueda (los que muestra el buscador de la factura)
+CAMPOS_RESULTADO = ('nombre', 'categoria', 'codigo_barras', 'cantidad', 'precio')
+
+
+def _precio(producto: Dict[str, Any]) -> float:
+    try:
+        return float(producto.get('precio', 0) or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class IndiceProductos:
+    """Clase para buscar y filtrar productos del inventario sin recorrer todo el archivo"""
+
+    def __init__(self, archivo: str = ARCHIVO_INVENTARIO):
+        """
+        Inicializa el índice (se construye en la primera consulta)
+
+        Args:
+            archivo: Archivo JSON del inventario
+        """
+        self.archivo = archivo
+        self._lock = threading.Lock()
+        self._firma: Optional[Tuple[int, int]] = None
+        self._orden: Dict[str, int] = {}              # id → posición en el inventario
+        self._datos: Dict[str, Dict[str, Any]] = {}   # id → campos de CAMPOS_RESULTADO
+        self._nombres: Dict[str, str] = {}            # id → nombre normalizado
+        self._textos: Dict[str, str] = {}             # id → nombre y categoría normalizados
+        self._por_nombre: List[Tuple[str, str]] = []  # (nombre normalizado, id), ordenada
+        self._palabras: Dict[str, Set[str]] = {}      # palabra → ids
+        self._vocabulario: List[str] = []             # palabras ordenadas (búsqueda por prefijo)
+        self._postings: Dict[str, Set[str]] = {}      # trigrama → ids
+        self._categorias: Dict[str, List[str]] = {}   # categoría → ids
+        self._codigos: Dict[str, str] = {}            # código de barras → id
+        self._por_codigo: List[Tuple[str, str]] = []  # (código de barras, id), ordenada
+        self._precios: List[Tuple[float, str]] = []   # (precio, id), ordenada
+
+    # --- Construcción ---
+
+    def _firma_archivo(self) -> Optional[Tuple[int, int]]:
+        try:
+            info = os.stat(self.archivo)
+        except FileNotFoundError:
+            return None
+        return (info.st_mtime_ns, info.st_size)
+
+    def _construir(self, inventario: Dict[str, Dict[str, Any]]) -> None:
+        self._orden, self._datos, self._nombres, self._textos = {}, {}, {}, {}
+        self._palabras, self._postings, self._categorias, self._codigos = {}, {}, {}, {}
+        precios, codigos = [], []
+        for posicion, (id_producto, producto) in enumerate(inventario.items()):
+            if not isinstance(producto, dict):
+                continue
+            nombre = normalizar(producto.get('nombre'))
+            self._orden[id_producto] = posicion
+            self._nombres[id_producto] = nombre
+            self._textos[id_producto] = f"{nombre} {normalizar(producto.get('categoria'))}".strip()
+            self._datos[id_producto] = {'id': id_producto,
+                                        **{campo: producto.get(campo, '') for campo in CAMPOS_RESULTADO}}
+            for palabra in set(nombre.split()):
+                self._palabras.setdefault(palabra, set()).add(id_producto)
+            for trigrama in trigramas(self._textos[id_producto]):
+                self._postings.setdefault(trigrama, set()).add(id_producto)
+            if producto.get('categoria'):
+                self._categorias.setdefault(producto['categoria'], []).append(id_producto)
+            codigo = str(producto.get('codigo_barras') or '').strip()
+            if codigo:
+                self._codigos.setdefault(codigo, id_producto)
+                codigos.append((codigo, id_producto))
+            precios.append((_precio(producto), id_producto))
+        precios.sort()
+        self._precios = precios
+        codigos.sort()
+        self._por_codigo = codigos
+        self._por_nombre = sorted((nombre, id_producto) for id_producto, nombre in self._nombres.items())
+        self._vocabulario = sorted(self._palabras)
+
+    def asegurar_actualizado(self) -> None:
+        """Reconstruye el índice si inventario.json cambió desde la última vez"""
+        firma = self._firma_archivo()
+        if firma == self._firma and self._firma is not None:
+            return
+        with self._lock:
+            firma = self._firma_archivo()
+            if firma == self._firma and self._firma is not None:
+                return
+            inventario = {}
+            if firma is not None:
+                try:
+                    with open(self.archivo, 'r', encoding='utf-8') as f:
+                        inventario = json.load(f)
+                except ValueError as e:
+                    logger.error("Error leyendo %s para el índice de productos: %s", self.archivo, e)
+            self._construir(inventario if isinstance(inventario, dict) else {})
+            self._firma = firma
+
+    # --- Consultas básicas ---
+
+    def categorias(self, ordenadas: bool = False) -> List[str]:
+        """Categorías del catálogo (en orden de aparición, o alfabético)"""
+        self.asegurar_actualizado()
+        return sorted(self._categorias) if ordenadas else list(self._categorias)
+
+    def por_codigo(self, codigo: str) -> Optional[str]:
+        """ID del producto con ese código de barras"""
+        self.asegurar_actualizado()
+        return self._codigos.get(str(codigo or '').strip())
+
+    def _por_prefijo(self, prefijo: str) -> Set[str]:
+        """IDs con alguna palabra del nombre que empieza por el prefijo"""
+        ids: Set[str] = set()
+        posicion = bisect.bisect_left(self._vocabulario, prefijo)
+        while posicion < len(self._vocabulario) and self._vocabulario[posicion].startswith(prefijo):
+            ids |= self._palabras[self._vocabulario[posicion]]
+            posicion += 1
+        return ids
+
+    def _por_subcadena(self, texto: str, campos: Optional[Dict[str, str]] = None) -> Set[str]:
+        """IDs cuyo nombre normalizado (o el campo indicado) contiene el texto"""
+        campos = self._nombres if campos is None else campos
+        if len(texto) < 3:
+            return {i for i, valor in campos.items() if texto in valor}
+        candidatos: Optional[Set[str]] = None
+        for trigrama in sorted(trigramas(texto), key=lambda t: len(self._postings.get(t, ()))):
+            ids = self._postings.get(trigrama, set())
+            candidatos = set(ids) if candidatos is None else candidatos & ids
+            if not candidatos:
+                return set()
+        return {i for i in candidatos or () if texto in campos[i]}
+
+    def _por_precio(self, minimo: Optional[float], maximo: Optional[float]) -> Set[str]:
+        inicio = 0 if minimo is None else bisect.bisect_left(self._precios, (minimo, ''))
+        fin = len(self._precios) if maximo is None else bisect.bisect_right(self._precios, (maximo, '\uffff'))
+        return {id_producto for _, id_producto in self._precios[inicio:fin]}
+
+    # --- Filtros de las rutas ---
+
+    def filtrar(self, q: str = '', categoria: str = '', categoria_contiene: str = '',
+                precio_min: Optional[float] = None, precio_max: Optional[float] = None) -> List[str]:
+        """
+        IDs de los productos que cumplen todos los filtros, en el orden del inventario
+
+        Args:
+            q: Texto contenido en el nombre (sin distinguir mayúsculas ni acentos)
+            categoria: Categoría exacta
+            categoria_contiene: Texto contenido en la categoría (ajuste de stock)
+            precio_min: Precio mínimo (inclusive)
+            precio_max: Precio máximo (inclusive)
+        """
+        self.asegurar_actualizado()
+        with self._lock:
+            conjuntos: List[Set[str]] = []
+            if categoria:
+                conjuntos.append(set(self._categorias.get(categoria, ())))
+            if categoria_contiene:
+                texto = categoria_contiene.lower()
+                conjuntos.append({i for nombre, ids in self._categorias.items()
+                                  if texto in nombre.lower() for i in ids})
+            if precio_min is not None or precio_max is not None:
+                conjuntos.append(self._por_precio(precio_min, precio_max))
+            texto = normalizar(q)
+            if texto:
+                conjuntos.append(self._por_subcadena(texto))
+            if not conjuntos:
+                return sorted(self._orden, key=self._orden.get)
+            conjuntos.sort(key=len)
+            resultado = conjuntos[0].intersection(*conjuntos[1:])
+            return sorted(resultado, key=self._orden.get)
+
+    # --- Buscador de productos (factura / nota de entrega) ---
+
+    def buscar(self, consulta: str, limite: int = 20) -> List[Dict[str, Any]]:
+        """
+        Productos más relevantes para lo escrito en el buscador
+
+        Orden: código de barras exacto, código de barras que empieza por lo
+        buscado, nombre que empieza por lo buscado, cada palabra como inicio de
+        una palabra del nombre, y cada palabra contenida en el nombre o la
+        categoría.
+        """
+        self.asegurar_actualizado()
+        with self._lock:
+            encontrados: Dict[str, None] = {}
+            codigo = str(consulta or '').strip()
+            id_codigo = self._codigos.get(codigo)
+            if id_codigo:
+                encontrados[id_codigo] = None
+            if codigo:
+                posicion = bisect.bisect_left(self._por_codigo, (codigo, ''))
+                while (posicion < len(self._por_codigo) and len(encontrados) < limite
+                       and self._por_codigo[posicion][0].startswith(codigo)):
+                    encontrados.setdefault(self._por_codigo[posicion][1])
+                    posicion += 1
+            texto = normalizar(consulta)
+            palabras = texto.split()
+            if palabras:
+                inicio = bisect.bisect_left(self._por_nombre, (texto, ''))
+                fin = bisect.bisect_left(self._por_nombre, (texto + '\uffff', ''))
+                niveles = [
+                    lambda: [i for _, i in self._por_nombre[inicio:fin]],
+                    lambda: self._primeros(set.intersection(*(self._por_prefijo(p) for p in palabras)),
+                                           limite + len(encontrados)),
+                    lambda: self._primeros(set.intersection(*(self._por_subcadena(p, self._textos)
+                                                              for p in palabras)), limite + len(encontrados)),
+                ]
+                for nivel in niveles:
+                    if len(encontrados) >= limite:
+                        break
+                    for id_producto in nivel():
+                        encontrados.setdefault(id_producto)
+            elif not id_codigo:
+                # Sin texto: los primeros productos del inventario
+                encontrados = dict.fromkeys(sorted(self._orden, key=self._orden.get)[:limite])
+            # Los campos se copian para no exponer el índice
+            return [dict(self._datos[i]) for i in list(encontrados)[:limite]]
+
+    def _primeros(self, ids: Set[str], cantidad: int) -> List[str]:
+        """Los primeros IDs por nombre, sin ordenar todo el conjunto"""
+        return heapq.nsmallest(cantidad, ids, key=lambda i: (self._nombres[i], self._orden[i]))
+
+
+# Instancia global del índice de productos
+indice_productos = IndiceProductos()
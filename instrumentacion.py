@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Instrumentación - Tiempos por Ruta, Métricas y Perfilado
+==================================================================
+
+Mide cada petición de la aplicación y publica los resultados:
+
+- Histograma de latencia por ruta (endpoint de Flask) y método, y conteo
+  por código HTTP
+- Por petición: llamadas y bytes de cargar_datos/guardar_datos, y tiempo
+  en HTTP saliente (cliente_http), generación de PDF (servicio_pdf y
+  pdf_tabular) y renderizado de plantillas (señales de Flask)
+- Exportación en formato de texto de Prometheus (/metrics), junto con las
+  métricas que ya llevan cliente_http, servicio_pdf y la caché de fragmentos
+- Perfilado opcional de una petición con la cabecera X-Perfil: el perfil
+  (pyinstrument si está instalado; si no, cProfile) se guarda en
+  PERFILES_DIR y su nombre se devuelve en X-Perfil-Archivo
+
+Las métricas son por proceso: con varios workers de Gunicorn cada uno
+publica las suyas (Prometheus las distingue por la etiqueta instance).
+Flask solo se importa en init_app y en los hooks: cliente_http y pdf_tabular
+registran sus tiempos con sumar/medir y se pueden usar sin Flask instalado
+(cola SENIAT, scripts, procesos del pool de PDF).
+Los componentes no se excluyen entre sí: el HTML de un PDF cuenta como
+plantilla y la conversión como pdf.
+
+Configuración por variables de entorno:
+    METRICAS_TOKEN          Token para /metrics (Authorization: Bearer ...);
+                            sin token solo se permite la sesión de admin o
+                            peticiones desde localhost
+    PERFIL_TOKEN            Token para perfilar sin sesión (cabecera X-Perfil-Token)
+    PERFILES_DIR            Directorio de los perfiles (por defecto perfiles)
+    PERFILES_MAX            Perfiles que se conservan (por defecto 50)
+    SERVER_TIMING           '1' añade Server-Timing a todas las respuestas
+                            (por defecto solo a las perfiladas)
+    METRICAS_RECIENTES      Peticiones recientes que se guardan para la
+                            página de administración (por defecto 200)
+
+Uso:
+    from instrumentacion import instrumentacion
+    instrumentacion.init_app(app, autorizar=lambda: session.get('usuario') == 'admin')
+
+    with instrumentacion.medir('pdf'):
+        ...
+    instrumentacion.registrar_datos('cargar', bytes_leidos, segundos)
+
+    curl -H 'X-Perfil: 1' -H 'X-Perfil-Token: ...' https://.../facturas
+"""
+
+import hmac
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from carga_perezosa import importar_opcional
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores (ms) de los intervalos del histograma de latencia por ruta
+INTERVALOS_DURACION_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+COMPONENTES = ('http_saliente', 'pdf', 'plantillas')
+OPERACIONES_DATOS = ('cargar', 'guardar')
+
+_peticion_actual: ContextVar[Optional[Dict[str, Any]]] = ContextVar('instrumentacion_peticion', default=None)
+
+
+def _etiquetas(**valores: Any) -> str:
+    """Etiquetas de una muestra de Prometheus, con comillas y barras escapadas"""
+    partes = []
+    for nombre, valor in valores.items():
+        texto = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nombre}="{texto}"')
+    return '{' + ','.join(partes) + '}'
+
+
+def _segundos(ms: Any) -> str:
+    return '+Inf' if ms == '+Inf' else f'{float(ms) / 1000:g}'
+
+
+class Instrumentacion:
+    """Clase que mide las peticiones de una app Flask y publica sus métricas"""
+
+    def __init__(self, max_recientes: Optional[int] = None):
+        """
+        Args:
+            max_recientes: Peticiones recientes que se guardan con su desglose
+        """
+        self.max_recientes = max_recientes or int(os.environ.get('METRICAS_RECIENTES', '200'))
+        self.directorio_perfiles = os.environ.get('PERFILES_DIR', 'perfiles')
+        self.max_perfiles = int(os.environ.get('PERFILES_MAX', '50'))
+        self.token_metricas = os.environ.get('METRICAS_TOKEN', '')
+        self.token_perfil = os.environ.get('PERFIL_TOKEN', '')
+        self.server_timing = os.environ.get('SERVER_TIMING', '0') == '1'
+        self._autorizar: Callable[[], bool] = lambda: False
+        self._reiniciar()
+
+        if hasattr(os, 'register_at_fork'):
+            # Cada worker publica solo sus propias peticiones
+            os.register_at_fork(after_in_child=self._reiniciar)
+
+    def _reiniciar(self) -> None:
+        self._lock = threading.Lock()
+        # Un perfil a la vez: cProfile no admite dos perfiladores activos en el mismo proceso
+        self._perfilando = threading.Lock()
+        self._rutas: Dict[tuple, Dict[str, Any]] = {}
+        self._componentes = {c: {'operaciones': 0, 'segundos': 0.0} for c in COMPONENTES}
+        self._datos = {o: {'operaciones': 0, 'bytes': 0, 'segundos': 0.0} for o in OPERACIONES_DATOS}
+        self._recientes: deque = deque(maxlen=self.max_recientes)
+        self.inicio = time.time()
+
+    def init_app(self, app, autorizar: Optional[Callable[[], bool]] = None) -> None:
+        """
+        Registra los hooks de la app; conviene llamarlo antes que las demás
+        extensiones para que la medición incluya sus before/after_request
+
+        Args:
+            app: Aplicación Flask
+            autorizar: Callable que indica si la petición actual es de un
+                administrador (acceso a /metrics y al perfilado)
+        """
+        from flask import before_render_template, template_rendered
+
+        if autorizar is not None:
+            self._autorizar = autorizar
+        app.before_request(self._antes_peticion)
+        app.after_request(self._despues_peticion)
+        app.teardown_request(self._fin_peticion)
+        before_render_template.connect(self._antes_plantilla, app)
+        template_rendered.connect(self._despues_plantilla, app)
+
+    # --- Registro desde otros módulos ---
+
+    @contextmanager
+    def medir(self, componente: str):
+        """Suma la duración del bloque al componente (http_saliente, pdf, plantillas)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sumar(componente, time.perf_counter() - inicio)
+
+    def sumar(self, componente: str, segundos: float) -> None:
+        """Suma un tiempo ya medido al componente y a la petición en curso"""
+        with self._lock:
+            total = self._componentes[componente]
+            total['operaciones'] += 1
+            total['segundos'] += segundos
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            peticion['componentes'][componente] += segundos
+
+    def registrar_datos(self, operacion: str, n_bytes: int, segundos: float) -> None:
+        """Registra una llamada a cargar_datos ('cargar') o guardar_datos ('guardar')"""
+        with self._lock:
+            total = self._datos[operacion]
+            total['operaciones'] += 1
+            total['bytes'] += n_bytes
+            total['segundos'] += segundos
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            datos = peticion['datos'][operacion]
+            datos['operaciones'] += 1
+            datos['bytes'] += n_bytes
+
+    # --- Hooks de Flask ---
+
+    def _antes_peticion(self) -> None:
+        from flask import request
+
+        peticion = {
+            'inicio': time.perf_counter(),
+            'componentes': dict.fromkeys(COMPONENTES, 0.0),
+            'datos': {o: {'operaciones': 0, 'bytes': 0} for o in OPERACIONES_DATOS},
+            'plantillas': [],
+            'perfil': None,
+        }
+        _peticion_actual.set(peticion)
+        if request.headers.get('X-Perfil') and self.perfil_autorizado():
+            peticion['perfil'] = self._iniciar_perfil(request.headers['X-Perfil'])
+
+    def _despues_peticion(self, respuesta):
+        from flask import request
+
+        peticion = _peticion_actual.get()
+        if peticion is None:
+            return respuesta
+        duracion = time.perf_counter() - peticion['inicio']
+        endpoint = request.endpoint or 'sin_ruta'
+        self._registrar_peticion(endpoint, request.method, request.path, respuesta.status_code, duracion, peticion)
+
+        if peticion['perfil'] is not None:
+            perfil, peticion['perfil'] = peticion['perfil'], None
+            archivo = self._guardar_perfil(perfil, endpoint)
+            respuesta.headers['X-Perfil-Archivo'] = archivo or 'error'
+        elif request.headers.get('X-Perfil'):
+            respuesta.headers['X-Perfil-Archivo'] = 'no-autorizado' if not self.perfil_autorizado() else 'ocupado'
+        if self.server_timing or 'X-Perfil-Archivo' in respuesta.headers:
+            respuesta.headers['Server-Timing'] = self._server_timing(duracion, peticion)
+        return respuesta
+
+    def _fin_peticion(self, error=None) -> None:
+        peticion = _peticion_actual.get()
+        if peticion is None:
+            return
+        if peticion['perfil'] is not None:
+            # La petición terminó sin pasar por after_request: se descarta el perfil
+            self._detener_perfil(peticion['perfil'])
+            self._perfilando.release()
+        _peticion_actual.set(None)
+
+    def _antes_plantilla(self, app, template, context, **extra) -> None:
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            peticion['plantillas'].append(time.perf_counter())
+
+    def _despues_plantilla(self, app, template, context, **extra) -> None:
+        peticion = _peticion_actual.get()
+        if peticion is not None and peticion['plantillas']:
+            inicio = peticion['plantillas'].pop()
+            if not peticion['plantillas']:
+                # Solo la plantilla exterior: las anidadas ya están dentro de su tiempo
+                self.sumar('plantillas', time.perf_counter() - inicio)
+
+    def _registrar_peticion(self, endpoint: str, metodo: str, ruta_url: str, codigo: int, duracion: float,
+                            peticion: Dict[str, Any]) -> None:
+        ms = duracion * 1000
+        intervalo = next((str(limite) for limite in INTERVALOS_DURACION_MS if ms <= limite), '+Inf')
+        with self._lock:
+            ruta = self._rutas.get((endpoint, metodo))
+            if ruta is None:
+                ruta = self._rutas[(endpoint, metodo)] = {
+                    'peticiones': 0,
+                    'duracion_total_ms': 0.0,
+                    'duracion_maxima_ms': 0.0,
+                    'histograma_ms': {**{str(limite): 0 for limite in INTERVALOS_DURACION_MS}, '+Inf': 0},
+                    'codigos': {},
+                    'componentes_segundos': dict.fromkeys(COMPONENTES, 0.0),
+                    'datos': {o: {'operaciones': 0, 'bytes': 0} for o in OPERACIONES_DATOS},
+                }
+            ruta['peticiones'] += 1
+            ruta['duracion_total_ms'] += ms
+            ruta['duracion_maxima_ms'] = max(ruta['duracion_maxima_ms'], ms)
+            ruta['histograma_ms'][intervalo] += 1
+            ruta['codigos'][str(codigo)] = ruta['codigos'].get(str(codigo), 0) + 1
+            for componente, segundos in peticion['componentes'].items():
+                ruta['componentes_segundos'][componente] += segundos
+            for operacion, datos in peticion['datos'].items():
+                ruta['datos'][operacion]['operaciones'] += datos['operaciones']
+                ruta['datos'][operacion]['bytes'] += datos['bytes']
+            self._recientes.append({
+                'fecha': datetime.now().isoformat(timespec='seconds'),
+                'endpoint': endpoint,
+                'metodo': metodo,
+                'ruta': ruta_url,
+                'codigo': codigo,
+                'duracion_ms': ms,
+                'componentes_ms': {c: s * 1000 for c, s in peticion['componentes'].items()},
+                'datos': {o: dict(d) for o, d in peticion['datos'].items()},
+            })
+
+    @staticmethod
+    def _server_timing(duracion: float, peticion: Dict[str, Any]) -> str:
+        metricas = [f'total;dur={duracion * 1000:.1f}']
+        metricas += [f'{c};dur={s * 1000:.1f}' for c, s in peticion['componentes'].items() if s]
+        for operacion, datos in peticion['datos'].items():
+            if datos['operaciones']:
+                metricas.append(f'{operacion}_datos;desc="{datos["operaciones"]} llamadas, '
+                                f'{datos["bytes"] / 1024:.0f} KB"')
+        return ', '.join(metricas)
+
+    # --- Acceso ---
+
+    def _token_valido(self, esperado: str, recibido: Optional[str]) -> bool:
+        return bool(esperado) and bool(recibido) and hmac.compare_digest(esperado, recibido)
+
+    def perfil_autorizado(self) -> bool:
+        """Indica si la petición actual puede pedir un perfil (admin o PERFIL_TOKEN)"""
+        from flask import request
+
+        return self._token_valido(self.token_perfil, request.headers.get('X-Perfil-Token')) or self._autorizar()
+
+    def acceso_metricas(self) -> bool:
+        """Indica si la petición actual puede leer /metrics"""
+        from flask import request
+
+        autorizacion = request.headers.get('Authorization', '')
+        if self._token_valido(self.token_metricas, autorizacion[7:] if autorizacion.startswith('Bearer ') else None):
+            return True
+        if self._autorizar():
+            return True
+        return not self.token_metricas and request.remote_addr in ('127.0.0.1', '::1')
+
+    # --- Perfilado ---
+
+    def _iniciar_perfil(self, modo: str) -> Optional[Dict[str, Any]]:
+        if not self._perfilando.acquire(blocking=False):
+            return None
+        pyinstrument = importar_opcional('pyinstrument') if modo.lower() != 'cprofile' else None
+        try:
+            if pyinstrument is not None:
+                perfilador = pyinstrument.Profiler()
+                perfilador.start()
+                return {'tipo': 'pyinstrument', 'perfilador': perfilador}
+            import cProfile
+            perfilador = cProfile.Profile()
+            perfilador.enable()
+            return {'tipo': 'cprofile', 'perfilador': perfilador}
+        except (ValueError, RuntimeError) as e:
+            # Otro perfilador (p. ej. un depurador) ya está activo
+            logger.warning("⚠️ No se pudo iniciar el perfil: %s", e)
+            self._perfilando.release()
+            return None
+
+    @staticmethod
+    def _detener_perfil(perfil: Dict[str, Any]) -> None:
+        if perfil['tipo'] == 'pyinstrument':
+            perfil['perfilador'].stop()
+        else:
+            perfil['perfilador'].disable()
+
+    def _guardar_perfil(self, perfil: Dict[str, Any], endpoint: str) -> Optional[str]:
+        try:
+            self._detener_perfil(perfil)
+            os.makedirs(self.directorio_perfiles, exist_ok=True)
+            base = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{re.sub(r'[^A-Za-z0-9_]', '_', endpoint)}"
+            if perfil['tipo'] == 'pyinstrument':
+                nombre = f'{base}.html'
+                with open(os.path.join(self.directorio_perfiles, nombre), 'w', encoding='utf-8') as f:
+                    f.write(perfil['perfilador'].output_html())
+            else:
+                nombre = f'{base}.prof'
+                perfil['perfilador'].dump_stats(os.path.join(self.directorio_perfiles, nombre))
+            self._recortar_perfiles()
+            logger.info("🔬 Perfil de %s guardado en %s/%s", endpoint, self.directorio_perfiles, nombre)
+            return nombre
+        except OSError as e:
+            logger.warning("⚠️ No se pudo guardar el perfil: %s", e)
+            return None
+        finally:
+            self._perfilando.release()
+
+    def _recortar_perfiles(self) -> None:
+        perfiles = self.listar_perfiles()
+        for perfil in perfiles[self.max_perfiles:]:
+            try:
+                os.remove(os.path.join(self.directorio_perfiles, perfil['nombre']))
+            except OSError:
+                pass
+
+    def listar_perfiles(self) -> List[Dict[str, Any]]:
+        """Perfiles guardados, del más reciente al más antiguo"""
+        perfiles = []
+        try:
+            with os.scandir(self.directorio_perfiles) as entradas:
+                for entrada in entradas:
+                    if entrada.is_file() and entrada.name.endswith(('.prof', '.html')):
+                        info = entrada.stat()
+                        perfiles.append({'nombre': entrada.name, 'bytes': info.st_size, 'mtime': info.st_mtime})
+        except FileNotFoundError:
+            return []
+        return sorted(perfiles, key=lambda p: p['mtime'], reverse=True)
+
+    # --- Consulta ---
+
+    def obtener_resumen(self, lentas: int = 20) -> Dict[str, Any]:
+        """Métricas por ruta, totales por componente y las peticiones recientes más lentas"""
+        with self._lock:
+            rutas = []
+            for (endpoint, metodo), ruta in self._rutas.items():
+                rutas.append({
+                    'endpoint': endpoint,
+                    'metodo': metodo,
+                    **ruta,
+                    'histograma_ms': dict(ruta['histograma_ms']),
+                    'codigos': dict(ruta['codigos']),
+                    'componentes_segundos': dict(ruta['componentes_segundos']),
+                    'datos': {o: dict(d) for o, d in ruta['datos'].items()},
+                    'duracion_promedio_ms': ruta['duracion_total_ms'] / ruta['peticiones'],
+                })
+            recientes = list(self._recientes)
+            return {
+                'inicio': datetime.fromtimestamp(self.inicio).isoformat(timespec='seconds'),
+                'pid': os.getpid(),
+                'rutas': sorted(rutas, key=lambda r: r['duracion_total_ms'], reverse=True),
+                'componentes': {c: dict(v) for c, v in self._componentes.items()},
+                'datos': {o: dict(v) for o, v in self._datos.items()},
+                'lentas': sorted(recientes, key=lambda r: r['duracion_ms'], reverse=True)[:lentas],
+            }
+
+    def exportar_prometheus(self) -> str:
+        """Métricas en el formato de texto de Prometheus (versión 0.0.4)"""
+        resumen = self.obtener_resumen(lentas=0)
+        lineas: List[str] = []
+
+        def metrica(nombre: str, tipo: str, ayuda: str) -> None:
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} {tipo}')
+
+        def histograma(nombre: str, histograma_ms: Dict[str, int], total_ms: float, cantidad: int, **etiquetas) -> None:
+            acumulado = 0
+            for limite, valor in histograma_ms.items():
+                acumulado += valor
+                lineas.append(f'{nombre}_bucket{_etiquetas(**etiquetas, le=_segundos(limite))} {acumulado}')
+            lineas.append(f'{nombre}_sum{_etiquetas(**etiquetas)} {total_ms / 1000:.6f}')
+            lineas.append(f'{nombre}_count{_etiquetas(**etiquetas)} {cantidad}')
+
+        metrica('app_inicio_proceso_segundos', 'gauge', 'Momento de arranque del proceso (epoch)')
+        lineas.append(f'app_inicio_proceso_segundos {self.inicio:.0f}')
+
+        metrica('app_peticion_duracion_segundos', 'histogram', 'Duración de las peticiones por ruta')
+        for r in resumen['rutas']:
+            histograma('app_peticion_duracion_segundos', r['histograma_ms'], r['duracion_total_ms'],
+                       r['peticiones'], endpoint=r['endpoint'], metodo=r['metodo'])
+
+        metrica('app_peticiones_total', 'counter', 'Peticiones por ruta y código HTTP')
+        for r in resumen['rutas']:
+            for codigo, cantidad in r['codigos'].items():
+                lineas.append(f"app_peticiones_total{_etiquetas(endpoint=r['endpoint'], metodo=r['metodo'], codigo=codigo)} {cantidad}")
+
+        metrica('app_componente_segundos_total', 'counter',
+                'Tiempo en HTTP saliente, generación de PDF y plantillas por ruta')
+        for r in resumen['rutas']:
+            for componente, segundos in r['componentes_segundos'].items():
+                lineas.append(f"app_componente_segundos_total{_etiquetas(endpoint=r['endpoint'], componente=componente)} {segundos:.6f}")
+
+        metrica('app_datos_operaciones_total', 'counter', 'Llamadas a cargar_datos/guardar_datos por ruta')
+        for r in resumen['rutas']:
+            for operacion, datos in r['datos'].items():
+                lineas.append(f"app_datos_operaciones_total{_etiquetas(endpoint=r['endpoint'], operacion=operacion)} {datos['operaciones']}")
+        metrica('app_datos_bytes_total', 'counter', 'Bytes leídos/escritos por cargar_datos/guardar_datos por ruta')
+        for r in resumen['rutas']:
+            for operacion, datos in r['datos'].items():
+                lineas.append(f"app_datos_bytes_total{_etiquetas(endpoint=r['endpoint'], operacion=operacion)} {datos['bytes']}")
+        metrica('app_datos_segundos_total', 'counter', 'Tiempo en cargar_datos/guardar_datos (todo el proceso)')
+        for operacion, datos in resumen['datos'].items():
+            lineas.append(f'app_datos_segundos_total{_etiquetas(operacion=operacion)} {datos["segundos"]:.6f}')
+
+        self._exportar_externas(lineas, metrica, histograma)
+        return '\n'.join(lineas) + '\n'
+
+    @staticmethod
+    def _exportar_externas(lineas: List[str], metrica: Callable, histograma: Callable) -> None:
+        """Métricas que ya llevan otros módulos (se importan aquí para no crear ciclos)"""
+        from cliente_http import cliente_http
+        from servicio_pdf import servicio_pdf
+        from plantillas import capa_plantillas
+
+        hosts = cliente_http.obtener_metricas()
+        metrica('app_http_saliente_duracion_segundos', 'histogram', 'Duración de las solicitudes HTTP salientes por host')
+        for host, m in hosts.items():
+            histograma('app_http_saliente_duracion_segundos', m['histograma_ms'], m['latencia_total_ms'],
+                       m['solicitudes'], host=host)
+        metrica('app_http_saliente_respuestas_total', 'counter', 'Respuestas HTTP salientes por host y código')
+        for host, m in hosts.items():
+            for codigo, cantidad in m['codigos'].items():
+                lineas.append(f'app_http_saliente_respuestas_total{_etiquetas(host=host, codigo=codigo)} {cantidad}')
+        metrica('app_http_saliente_errores_total', 'counter', 'Errores HTTP salientes por host y tipo')
+        for host, m in hosts.items():
+            for error, cantidad in m['errores'].items():
+                lineas.append(f'app_http_saliente_errores_total{_etiquetas(host=host, error=error)} {cantidad}')
+
+        # El servicio PDF se construye en su primer uso; sin PDF generados no hay nada que publicar
+        if servicio_pdf.esta_inicializada():
+            metrica('app_pdf_documentos_total', 'counter', 'Documentos PDF por resultado')
+            for resultado, cantidad in servicio_pdf.estadisticas.items():
+                lineas.append(f'app_pdf_documentos_total{_etiquetas(resultado=resultado)} {cantidad}')
+        if servicio_pdf.esta_inicializada() and servicio_pdf.cache is not None:
+            metrica('app_pdf_cache_total', 'counter', 'Operaciones de la caché de PDF')
+            for resultado, cantidad in servicio_pdf.cache.estadisticas.items():
+                lineas.append(f'app_pdf_cache_total{_etiquetas(resultado=resultado)} {cantidad}')
+
+        fragmentos = capa_plantillas.fragmentos.estadisticas
+        metrica('app_fragmentos_total', 'counter', 'Aciertos y fallos de la caché de fragmentos de plantillas')
+        for resultado in ('aciertos', 'fallos'):
+            lineas.append(f'app_fragmentos_total{_etiquetas(resultado=resultado)} {fragmentos[resultado]}')
+
+
+# Instancia global de la instrumentación (se registra con init_app)
+instrumentacion = Instrumentacion()
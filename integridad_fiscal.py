@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Integridad Fiscal - Verificación Masiva SENIAT
+========================================================
+
+Verifica en lote la integridad de las facturas inmutables
+(SeguridadFiscal.validar_documento_inmutable) usando un pool de procesos, y
+genera por período (YYYY-MM) una raíz Merkle que se guarda junto a las
+exportaciones SENIAT (exportaciones_seniat/integridad/merkle_<periodo>.json).
+
+Cada hoja del árbol es el hash canónico del documento almacenado. Al volver a
+verificar se detectan primero los cambios, de lo más barato a lo más caro:
+
+1. Si el archivo de facturas tiene el mismo mtime y tamaño que en la última
+   verificación de cada período pedido, se devuelven las raíces guardadas sin
+   leer el archivo.
+2. Si cambió, cada período se compara con una huella de su contenido (una sola
+   serialización por período); los períodos sin cambios no recalculan hojas,
+   no revalidan firmas ni reconstruyen su árbol.
+3. En los períodos que cambiaron solo se revalidan las firmas de los
+   documentos cuya hoja cambió o que son nuevos.
+
+Los documentos sin _metadatos_seguridad (creados antes de firmar facturas) no
+tienen firma que validar: se listan aparte en documentos_sin_firma y no cuentan
+como fallas; documentos_con_fallas son solo firmas o hashes que no coinciden.
+
+El estado de esa detección se guarda en exportaciones_seniat/integridad/estado.json.
+
+Funcionalidades:
+- Verificación paralela de firmas y hashes
+- Raíz Merkle por período
+- Reporte de documentos con fallas y, aparte, de documentos sin firma
+- Reverificación incremental por archivo, período y documento
+- Raíces guardadas para reportes (raices_guardadas) sin verificar en la petición
+
+Uso:
+    python integridad_fiscal.py
+    python integridad_fiscal.py --periodo 2025-08 --procesos 4
+    python integridad_fiscal.py --completo   # ignora resultados previos
+"""
+
+import hashlib
+import json
+import os
+import sys
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from carga_perezosa import InstanciaPerezosa
+
+ARCHIVO_FACTURAS = 'facturas_json/facturas.json'
+SIN_PERIODO = 'sin-fecha'
+# Versión del formato de estado.json: al cambiar, la próxima verificación recalcula todo
+VERSION_ESTADO = 2
+
+
+def hash_hoja(documento: Dict[str, Any]) -> str:
+    """Hash canónico del documento completo tal como está almacenado"""
+    documento_json = json.dumps(documento, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(b'\x00' + documento_json.encode('utf-8')).hexdigest()
+
+
+def raiz_merkle(hojas: List[str]) -> str:
+    """
+    Calcula la raíz Merkle de una lista de hashes hexadecimales
+
+    Los nodos internos se prefijan con 0x01 (las hojas con 0x00) para evitar
+    colisiones entre niveles; un nodo impar sube sin emparejarse.
+    """
+    if not hojas:
+        return hashlib.sha256(b'').hexdigest()
+
+    nivel = [bytes.fromhex(h) for h in hojas]
+    while len(nivel) > 1:
+        siguiente = []
+        for i in range(0, len(nivel) - 1, 2):
+            siguiente.append(hashlib.sha256(b'\x01' + nivel[i] + nivel[i + 1]).digest())
+        if len(nivel) % 2:
+            siguiente.append(nivel[-1])
+        nivel = siguiente
+    return nivel[0].hex()
+
+
+def huella_periodo(documentos: Dict[str, Dict[str, Any]]) -> str:
+    """
+    Huella barata del contenido de un período: una serialización sin ordenar
+    claves (el orden de lectura del archivo es estable mientras no cambie)
+    """
+    contenido = json.dumps(documentos, ensure_ascii=False, default=str)
+    return hashlib.blake2b(contenido.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def firma_archivo(archivo: str) -> Optional[Dict[str, int]]:
+    """mtime y tamaño de un archivo (None si no existe)"""
+    try:
+        estado = os.stat(archivo)
+    except OSError:
+        return None
+    return {'mtime_ns': estado.st_mtime_ns, 'tamano': estado.st_size}
+
+
+def documento_firmado(documento: Dict[str, Any]) -> bool:
+    """Indica si el documento tiene firma que validar (los anteriores a la firma no la tienen)"""
+    return '_metadatos_seguridad' in documento
+
+
+def periodo_documento(documento: Dict[str, Any]) -> str:
+    """Período fiscal (YYYY-MM) de un documento"""
+    fecha = str(documento.get('fecha') or '')
+    return fecha[:7] if len(fecha) >= 7 else SIN_PERIODO
+
+
+# --- Funciones del pool de procesos (deben ser de nivel de módulo) ---
+_seguridad_trabajador = None
+
+
+def _inicializar_trabajador():
+    global _seguridad_trabajador
+    from seguridad_fiscal import SeguridadFiscal
+    _seguridad_trabajador = SeguridadFiscal()
+
+
+def _verificar_bloque(bloque: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, bool]]:
+    resultados = []
+    for id_documento, documento in bloque:
+        try:
+            valido = _seguridad_trabajador.validar_documento_inmutable(documento)
+        except Exception:
+            valido = False
+        resultados.append((id_documento, valido))
+    return resultados
+
+
+class VerificadorIntegridad:
+    """Clase para verificar en lote la integridad de los documentos fiscales"""
+
+    def __init__(self, directorio: str = 'exportaciones_seniat/integridad'):
+        """
+        Inicializa el verificador
+
+        Args:
+            directorio: Carpeta donde se guardan las raíces Merkle por período
+        """
+        self.directorio = directorio
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta_periodo(self, periodo: str) -> str:
+        return os.path.join(self.directorio, f'merkle_{periodo}.json')
+
+    def _ruta_estado(self) -> str:
+        return os.path.join(self.directorio, 'estado.json')
+
+    def _cargar_estado(self) -> Dict[str, Any]:
+        try:
+            with open(self._ruta_estado(), 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+        except (OSError, ValueError):
+            estado = {}
+        if estado.get('version') != VERSION_ESTADO:
+            return {'version': VERSION_ESTADO, 'periodos': {}}
+        return estado
+
+    def _guardar_estado(self, estado: Dict[str, Any]) -> None:
+        ruta = self._ruta_estado()
+        temp_file = f'{ruta}.{uuid.uuid4().hex}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(estado, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, ruta)
+
+    def _resumen_periodo(self, entrada: Dict[str, Any], periodo: str) -> Dict[str, Any]:
+        return {
+            'raiz_merkle': entrada['raiz_merkle'],
+            'total_documentos': entrada['total_documentos'],
+            'documentos_con_fallas': entrada['documentos_con_fallas'],
+            'documentos_sin_firma': entrada['documentos_sin_firma'],
+            'archivo': self._ruta_periodo(periodo)
+        }
+
+    def _cargar_periodo(self, periodo: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._ruta_periodo(periodo), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _guardar_periodo(self, periodo: str, registro: Dict[str, Any]) -> None:
+        ruta = self._ruta_periodo(periodo)
+        temp_file = ruta + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(registro, f, indent=2, ensure_ascii=False)
+        os.replace(temp_file, ruta)
+
+    def verificar(self,
+                  periodos: Optional[List[str]] = None,
+                  procesos: Optional[int] = None,
+                  completo: bool = False,
+                  archivo_facturas: str = ARCHIVO_FACTURAS) -> Dict[str, Any]:
+        """
+        Verifica las facturas y actualiza la raíz Merkle de cada período
+
+        Args:
+            periodos: Lista de períodos YYYY-MM a verificar (None = todos)
+            procesos: Procesos del pool (None = núcleos disponibles)
+            completo: Revalidar todas las firmas aunque no hayan cambiado
+            archivo_facturas: Archivo JSON de facturas
+
+        Returns:
+            Resumen con raíz, totales, documentos con fallas y documentos sin
+            firma por período
+        """
+        inicio = datetime.now()
+        origen = firma_archivo(archivo_facturas)
+        if origen is None:
+            return {'exito': False, 'error': f'No existe {archivo_facturas}', 'periodos': {}}
+        origen['archivo'] = os.path.abspath(archivo_facturas)
+
+        estado = self._cargar_estado()
+        guardados = estado.setdefault('periodos', {})
+
+        # 1. Archivo sin cambios desde la última verificación de los períodos pedidos
+        # (sin períodos pedidos, solo si la última verificación también fue de todos)
+        pedidos = periodos or (list(guardados) if estado.get('todos_verificados') else [])
+        if (not completo and pedidos
+                and all(guardados.get(p, {}).get('origen') == origen for p in pedidos)):
+            return {
+                'exito': True,
+                'sin_cambios': True,
+                'periodos': {p: self._resumen_periodo(guardados[p], p) for p in pedidos},
+                'revalidados': 0,
+                'total_documentos': sum(guardados[p]['total_documentos'] for p in pedidos),
+                'duracion_segundos': (datetime.now() - inicio).total_seconds()
+            }
+
+        with open(archivo_facturas, 'r', encoding='utf-8') as f:
+            facturas = json.load(f)
+
+        # Agrupar por período y calcular hojas (barato: un hash por documento)
+        por_periodo: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for id_documento, factura in facturas.items():
+            periodo = periodo_documento(factura)
+            if periodos and periodo not in periodos:
+                continue
+            por_periodo.setdefault(periodo, {})[id_documento] = factura
+
+        # 2. Períodos cuyo contenido no cambió: se reutiliza su resultado completo
+        resumen = {'exito': True, 'sin_cambios': False, 'periodos': {}, 'revalidados': 0, 'total_documentos': 0}
+        huellas: Dict[str, str] = {}
+        for periodo in list(por_periodo):
+            huellas[periodo] = huella_periodo(por_periodo[periodo])
+            entrada = guardados.get(periodo)
+            if (not completo and entrada and entrada.get('huella') == huellas[periodo]
+                    and os.path.exists(self._ruta_periodo(periodo))):
+                entrada['origen'] = origen
+                resumen['periodos'][periodo] = self._resumen_periodo(entrada, periodo)
+                resumen['total_documentos'] += entrada['total_documentos']
+                del por_periodo[periodo]
+
+        # 3. Períodos modificados: hojas y firmas de documentos nuevos o modificados
+        hojas: Dict[str, Dict[str, str]] = {}
+        pendientes: List[Tuple[str, Dict[str, Any]]] = []
+        previos: Dict[str, Dict[str, Any]] = {}
+        for periodo, documentos in por_periodo.items():
+            previo = None if completo else self._cargar_periodo(periodo)
+            previos[periodo] = (previo or {}).get('documentos', {})
+            hojas[periodo] = {}
+            for id_documento, documento in documentos.items():
+                hoja = hash_hoja(documento)
+                hojas[periodo][id_documento] = hoja
+                anterior = previos[periodo].get(id_documento)
+                if not documento_firmado(documento):
+                    continue
+                if not anterior or anterior.get('hoja') != hoja:
+                    pendientes.append((id_documento, documento))
+
+        # Validar firmas solo de los documentos firmados nuevos o modificados
+        validez = self._validar_en_pool(pendientes, procesos)
+
+        resumen['revalidados'] = len(pendientes)
+        for periodo, documentos in por_periodo.items():
+            registro_docs = {}
+            fallas = []
+            sin_firma = []
+            for id_documento, documento in documentos.items():
+                registro_docs[id_documento] = {
+                    'numero': documento.get('numero', ''),
+                    'hoja': hojas[periodo][id_documento]
+                }
+                referencia = {'id': id_documento, 'numero': documento.get('numero', '')}
+                if not documento_firmado(documento):
+                    registro_docs[id_documento]['sin_firma'] = True
+                    sin_firma.append(referencia)
+                    continue
+                if id_documento in validez:
+                    valido = validez[id_documento]
+                else:
+                    valido = previos[periodo][id_documento]['valido']
+                registro_docs[id_documento]['valido'] = valido
+                if not valido:
+                    fallas.append(referencia)
+
+            # Orden estable de hojas: por número de documento y luego por id
+            orden = sorted(registro_docs, key=lambda i: (str(registro_docs[i]['numero']), i))
+            raiz = raiz_merkle([registro_docs[i]['hoja'] for i in orden])
+
+            registro = {
+                'periodo': periodo,
+                'raiz_merkle': raiz,
+                'total_documentos': len(registro_docs),
+                'documentos_con_fallas': fallas,
+                'documentos_sin_firma': sin_firma,
+                'fecha_verificacion': datetime.now().isoformat(),
+                'documentos': registro_docs
+            }
+            self._guardar_periodo(periodo, registro)
+
+            guardados[periodo] = {
+                'origen': origen,
+                'huella': huellas[periodo],
+                'raiz_merkle': raiz,
+                'total_documentos': len(registro_docs),
+                'documentos_con_fallas': fallas,
+                'documentos_sin_firma': sin_firma,
+                'fecha_verificacion': registro['fecha_verificacion']
+            }
+            resumen['total_documentos'] += len(registro_docs)
+            resumen['periodos'][periodo] = self._resumen_periodo(guardados[periodo], periodo)
+
+        if not periodos:
+            # Verificación de todos los períodos: olvidar los que ya no tienen documentos
+            for periodo in set(guardados) - set(huellas):
+                del guardados[periodo]
+            estado['todos_verificados'] = True
+        self._guardar_estado(estado)
+
+        resumen['duracion_segundos'] = (datetime.now() - inicio).total_seconds()
+        return resumen
+
+    def _validar_en_pool(self, pendientes: List[Tuple[str, Dict[str, Any]]],
+                         procesos: Optional[int]) -> Dict[str, bool]:
+        """Valida firmas en paralelo repartiendo los documentos en bloques"""
+        if not pendientes:
+            return {}
+
+        procesos = procesos or os.cpu_count() or 1
+        tamano_bloque = max(1, min(500, len(pendientes) // (procesos * 4) or 1))
+        bloques = [pendientes[i:i + tamano_bloque] for i in range(0, len(pendientes), tamano_bloque)]
+
+        validez: Dict[str, bool] = {}
+        if procesos == 1 or len(bloques) == 1:
+            _inicializar_trabajador()
+            for bloque in bloques:
+                validez.update(_verificar_bloque(bloque))
+            return validez
+
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_trabajador) as pool:
+            for resultados in pool.map(_verificar_bloque, bloques):
+                validez.update(resultados)
+        return validez
+
+    def raices_guardadas(self, periodos: List[str],
+                         archivo_facturas: str = ARCHIVO_FACTURAS) -> Dict[str, Dict[str, Any]]:
+        """
+        Raíces Merkle guardadas de los períodos pedidos, sin verificar nada
+
+        Pensado para reportes generados dentro de una petición: la verificación
+        (con su pool de procesos) corre fuera, con 'python integridad_fiscal.py'.
+
+        Returns:
+            Por período: raíz, archivo, fecha de verificación y si sigue vigente
+            (el archivo de facturas no cambió desde esa verificación). Los
+            períodos nunca verificados no aparecen.
+        """
+        origen = firma_archivo(archivo_facturas)
+        if origen is not None:
+            origen['archivo'] = os.path.abspath(archivo_facturas)
+        guardados = self._cargar_estado().get('periodos', {})
+        raices = {}
+        for periodo in periodos:
+            entrada = guardados.get(periodo)
+            if not entrada or not os.path.exists(self._ruta_periodo(periodo)):
+                continue
+            raices[periodo] = dict(self._resumen_periodo(entrada, periodo),
+                                   fecha_verificacion=entrada.get('fecha_verificacion'),
+                                   vigente=entrada.get('origen') == origen)
+        return raices
+
+    def obtener_raices(self, periodos: Optional[List[str]] = None) -> Dict[str, str]:
+        """Raíces Merkle guardadas, por período"""
+        raices = {}
+        for archivo in sorted(os.listdir(self.directorio)):
+            if not (archivo.startswith('merkle_') and archivo.endswith('.json')):
+                continue
+            periodo = archivo[len('merkle_'):-len('.json')]
+            if periodos and periodo not in periodos:
+                continue
+            registro = self._cargar_periodo(periodo)
+            if registro:
+                raices[periodo] = registro.get('raiz_merkle', '')
+        return raices
+
+
+# Instancia global del verificador de integridad (se construye en el primer uso)
+verificador_integridad = InstanciaPerezosa(VerificadorIntegridad)
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Verificación masiva de integridad de facturas (Merkle por período)')
+    parser.add_argument('--periodo', action='append', help='Período YYYY-MM (se puede repetir)')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos del pool (por defecto: núcleos)')
+    parser.add_argument('--completo', action='store_true', help='Revalidar todas las firmas')
+    args = parser.parse_args(argv[1:])
+
+    print("🔐 Verificando integridad de facturas...")
+    resumen = verificador_integridad.verificar(args.periodo, args.procesos, args.completo)
+    if not resumen['exito']:
+        print(f"❌ {resumen['error']}")
+        return 2
+
+    total_fallas = 0
+    for periodo, datos in sorted(resumen['periodos'].items()):
+        fallas = datos['documentos_con_fallas']
+        total_fallas += len(fallas)
+        estado = '✅' if not fallas else '❌'
+        print(f"  {estado} {periodo}: {datos['total_documentos']} docs, raíz {datos['raiz_merkle'][:16]}…, "
+              f"{len(fallas)} con fallas, {len(datos['documentos_sin_firma'])} sin firma")
+        for falla in fallas[:10]:
+            print(f"      - {falla['numero'] or falla['id']}")
+        if len(fallas) > 10:
+            print(f"      ... y {len(fallas) - 10} más")
+
+    if resumen['sin_cambios']:
+        print("ℹ️  El archivo de facturas no cambió desde la última verificación")
+    print(f"📊 {resumen['total_documentos']} documentos, {resumen['revalidados']} firmas revalidadas, "
+          f"{resumen['duracion_segundos']:.2f} s")
+    return 0 if total_fallas == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
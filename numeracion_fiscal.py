@@ -13,81 +13,125 @@ Funcionalidades:
 - Prevención de duplicados
 - Control de series por tipo de documento
 - Auditoría de numeración
+- Bloqueo entre procesos (varios workers de Gunicorn)
+- Arrendamiento opcional de bloques por worker con registro de huecos
+
+Arrendamiento de bloques:
+    Con SENIAT_NUMERACION_BLOQUE=N (o tamano_bloque=N) cada proceso reserva N
+    números con reservar_rango_numeros y los entrega sin tocar disco. Los
+    números que un proceso no llega a usar se registran como huecos en el
+    archivo de control (liberar_arrendamientos / conciliar_arrendamientos),
+    de modo que reporte_consecutividad puede justificar cada número. Con
+    bloques, el orden de emisión entre workers deja de ser cronológico; por
+    eso está desactivado por defecto. app.py concilia los bloques abandonados
+    al iniciar cada worker y publica el reporte en /seniat/numeracion/consecutividad.
 """
 
+import atexit
 import json
+import logging
 import os
+import socket
 import threading
-from typing import Dict, Any, Optional, Tuple
+import uuid
+from typing import Dict, Any, Optional, Tuple, List, Set
 from datetime import datetime
 from seguridad_fiscal import seguridad_fiscal
+from carga_perezosa import InstanciaPerezosa
+from bloqueo_procesos import BloqueoArchivo
+
+logger = logging.getLogger(__name__)
 
 class ControlNumeracionFiscal:
     """Clase para controlar la numeración consecutiva de documentos fiscales"""
     
-    def __init__(self, archivo_control: str = 'control_numeracion_fiscal.json'):
+    def __init__(self, archivo_control: str = 'control_numeracion_fiscal.json',
+                 tamano_bloque: Optional[int] = None,
+                 archivo_facturas: str = 'facturas_json/facturas.json'):
         """
         Inicializa el sistema de control de numeración
         
         Args:
             archivo_control: Archivo donde se almacena el control de numeración
+            tamano_bloque: Números por arrendamiento de bloque (0 = sin bloques).
+                           Por defecto se toma de SENIAT_NUMERACION_BLOQUE
+            archivo_facturas: Archivo de facturas usado para detectar duplicados
         """
         self.archivo_control = archivo_control
+        self.archivo_bloqueo = archivo_control + '.lock'
+        self.archivo_facturas = archivo_facturas
+        if tamano_bloque is None:
+            tamano_bloque = int(os.environ.get('SENIAT_NUMERACION_BLOQUE', '0') or 0)
+        self.tamano_bloque = max(0, min(tamano_bloque, 1000))
         self._lock = threading.Lock()
+        self._lock_bloques = threading.RLock()
+        self._arrendamientos: Dict[str, Dict[str, Any]] = {}
+        self._cache_numeros: Optional[Tuple[float, int, Set[str]]] = None
         self._asegurar_archivo_control()
         
+        atexit.register(self.liberar_arrendamientos)
+        if hasattr(os, 'register_at_fork'):
+            # Un hijo no debe heredar el bloque del padre: ambos entregarían los mismos números
+            os.register_at_fork(after_in_child=self._reiniciar_tras_fork)
+            
+    def _reiniciar_tras_fork(self):
+        self._lock = threading.Lock()
+        self._lock_bloques = threading.RLock()
+        self._arrendamientos = {}
+        
     def _asegurar_archivo_control(self):
         """Asegura que existe el archivo de control de numeración"""
-        if not os.path.exists(self.archivo_control):
+        with BloqueoArchivo(self.archivo_bloqueo):
+            if os.path.exists(self.archivo_control):
+                return
             estructura_inicial = {
-                "series": {
-                    "FACTURA": {
-                        "prefijo": "FAC-",
-                        "siguiente_numero": 1,
-                        "longitud_numero": 8,
-                        "formato": "FAC-{numero:08d}",
-                        "activa": True,
-                        "fecha_inicio": datetime.now().isoformat(),
-                        "ultimo_numero_emitido": 0,
-                        "total_documentos": 0
+                    "series": {
+                        "FACTURA": {
+                            "prefijo": "FAC-",
+                            "siguiente_numero": 1,
+                            "longitud_numero": 8,
+                            "formato": "FAC-{numero:08d}",
+                            "activa": True,
+                            "fecha_inicio": datetime.now().isoformat(),
+                            "ultimo_numero_emitido": 0,
+                            "total_documentos": 0
+                        },
+                        "NOTA_CREDITO": {
+                            "prefijo": "NC-",
+                            "siguiente_numero": 1,
+                            "longitud_numero": 8,
+                            "formato": "NC-{numero:08d}",
+                            "activa": True,
+                            "fecha_inicio": datetime.now().isoformat(),
+                            "ultimo_numero_emitido": 0,
+                            "total_documentos": 0
+                        },
+                        "NOTA_DEBITO": {
+                            "prefijo": "ND-",
+                            "siguiente_numero": 1,
+                            "longitud_numero": 8,
+                            "formato": "ND-{numero:08d}",
+                            "activa": True,
+                            "fecha_inicio": datetime.now().isoformat(),
+                            "ultimo_numero_emitido": 0,
+                            "total_documentos": 0
+                        }
                     },
-                    "NOTA_CREDITO": {
-                        "prefijo": "NC-",
-                        "siguiente_numero": 1,
-                        "longitud_numero": 8,
-                        "formato": "NC-{numero:08d}",
-                        "activa": True,
-                        "fecha_inicio": datetime.now().isoformat(),
-                        "ultimo_numero_emitido": 0,
-                        "total_documentos": 0
+                    "configuracion": {
+                        "validar_consecutivos": True,
+                        "permitir_saltos": False,
+                        "reinicio_anual": False,
+                        "longitud_minima": 8,
+                        "prefijo_obligatorio": True
                     },
-                    "NOTA_DEBITO": {
-                        "prefijo": "ND-",
-                        "siguiente_numero": 1,
-                        "longitud_numero": 8,
-                        "formato": "ND-{numero:08d}",
-                        "activa": True,
-                        "fecha_inicio": datetime.now().isoformat(),
-                        "ultimo_numero_emitido": 0,
-                        "total_documentos": 0
+                    "auditoria": {
+                        "fecha_creacion": datetime.now().isoformat(),
+                        "ultima_modificacion": datetime.now().isoformat(),
+                        "total_documentos_emitidos": 0
                     }
-                },
-                "configuracion": {
-                    "validar_consecutivos": True,
-                    "permitir_saltos": False,
-                    "reinicio_anual": False,
-                    "longitud_minima": 8,
-                    "prefijo_obligatorio": True
-                },
-                "auditoria": {
-                    "fecha_creacion": datetime.now().isoformat(),
-                    "ultima_modificacion": datetime.now().isoformat(),
-                    "total_documentos_emitidos": 0
                 }
-            }
             
-            with open(self.archivo_control, 'w', encoding='utf-8') as f:
-                json.dump(estructura_inicial, f, indent=2, ensure_ascii=False)
+            self._escribir_atomico(estructura_inicial)
                 
     def _cargar_control(self) -> Dict[str, Any]:
         """Carga el archivo de control de numeración"""
@@ -101,11 +145,19 @@ class ControlNumeracionFiscal:
         """Guarda el archivo de control de numeración"""
         try:
             control['auditoria']['ultima_modificacion'] = datetime.now().isoformat()
-            with open(self.archivo_control, 'w', encoding='utf-8') as f:
-                json.dump(control, f, indent=2, ensure_ascii=False)
+            self._escribir_atomico(control)
         except Exception as e:
             raise Exception(f"Error guardando control de numeración: {str(e)}")
             
+    def _escribir_atomico(self, control: Dict[str, Any]) -> None:
+        """Escribe el control en un temporal y lo reemplaza (nunca queda a medio escribir)"""
+        temp_file = f"{self.archivo_control}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(control, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, self.archivo_control)
+            
     def obtener_siguiente_numero(self, tipo_documento: str, usuario: str = '') -> Tuple[str, int]:
         """
         Obtiene el siguiente número consecutivo para un tipo de documento
@@ -120,7 +172,11 @@ class ControlNumeracionFiscal:
         Raises:
             Exception: Si hay error en la numeración o validación
         """
-        with self._lock:  # Asegurar atomicidad
+        if self.tamano_bloque:
+            return self._obtener_de_arrendamiento(tipo_documento, usuario)
+            
+        # Asegurar atomicidad dentro del proceso (hilos) y entre workers (archivo)
+        with self._lock, BloqueoArchivo(self.archivo_bloqueo):
             control = self._cargar_control()
             
             if tipo_documento not in control['series']:
@@ -176,13 +232,7 @@ class ControlNumeracionFiscal:
         try:
             # Verificar en facturas existentes
             if tipo_documento == 'FACTURA':
-                facturas_file = 'facturas_json/facturas.json'
-                if os.path.exists(facturas_file):
-                    with open(facturas_file, 'r', encoding='utf-8') as f:
-                        facturas = json.load(f)
-                        for factura in facturas.values():
-                            if factura.get('numero') == numero:
-                                return True
+                return numero in self._numeros_facturas()
                                 
             # TODO: Verificar en notas de crédito y débito cuando se implementen
             return False
@@ -190,6 +240,21 @@ class ControlNumeracionFiscal:
             # En caso de error, asumir que existe para evitar duplicados
             return True
             
+    def _numeros_facturas(self) -> Set[str]:
+        """Conjunto de números de factura existentes, recargado solo si el archivo cambió"""
+        if not os.path.exists(self.archivo_facturas):
+            return set()
+        estado = os.stat(self.archivo_facturas)
+        cache = self._cache_numeros
+        if cache and cache[0] == estado.st_mtime and cache[1] == estado.st_size:
+            return cache[2]
+            
+        with open(self.archivo_facturas, 'r', encoding='utf-8') as f:
+            facturas = json.load(f)
+        numeros = {factura.get('numero') for factura in facturas.values() if isinstance(factura, dict)}
+        self._cache_numeros = (estado.st_mtime, estado.st_size, numeros)
+        return numeros
+            
     def validar_numero_consecutivo(self, numero: str, tipo_documento: str) -> bool:
         """
         Valida que un número sea consecutivo válido
@@ -269,10 +334,11 @@ class ControlNumeracionFiscal:
             
             return True
         except Exception as e:
-            print(f"Error marcando número utilizado: {str(e)}")
+            logger.error("Error marcando número utilizado: %s", e)
             return False
             
-    def reservar_rango_numeros(self, tipo_documento: str, cantidad: int, usuario: str = '') -> Dict[str, Any]:
+    def reservar_rango_numeros(self, tipo_documento: str, cantidad: int, usuario: str = '',
+                               arrendamiento: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Reserva un rango de números consecutivos (para procesamiento por lotes)
         
@@ -280,6 +346,8 @@ class ControlNumeracionFiscal:
             tipo_documento: Tipo de documento
             cantidad: Cantidad de números a reservar
             usuario: Usuario que reserva
+            arrendamiento: Datos del arrendamiento de bloque a registrar en el control
+                           (id, pid, hostname); None para una reserva normal
             
         Returns:
             Diccionario con los números reservados
@@ -287,7 +355,7 @@ class ControlNumeracionFiscal:
         if cantidad <= 0 or cantidad > 1000:  # Límite de seguridad
             raise ValueError("Cantidad debe estar entre 1 y 1000")
             
-        with self._lock:
+        with self._lock, BloqueoArchivo(self.archivo_bloqueo):
             control = self._cargar_control()
             
             if tipo_documento not in control['series']:
@@ -307,6 +375,15 @@ class ControlNumeracionFiscal:
             serie['total_documentos'] += cantidad
             control['auditoria']['total_documentos_emitidos'] += cantidad
             
+            if arrendamiento is not None:
+                control.setdefault('arrendamientos', {}).setdefault(tipo_documento, []).append({
+                    **arrendamiento,
+                    'inicio': inicio,
+                    'fin': fin,
+                    'estado': 'abierto',
+                    'fecha_inicio': datetime.now().isoformat()
+                })
+            
             self._guardar_control(control)
             
             # Registrar reserva
@@ -327,5 +404,175 @@ class ControlNumeracionFiscal:
                 'fecha_reserva': datetime.now().isoformat()
             }
 
-# Instancia global del controlador de numeración
-control_numeracion = ControlNumeracionFiscal() 
\ No newline at end of file
+    # --- Arrendamiento de bloques por worker ---
+    
+    def _obtener_de_arrendamiento(self, tipo_documento: str, usuario: str) -> Tuple[str, int]:
+        """Entrega el siguiente número del bloque del proceso, reservando uno nuevo si se agotó"""
+        with self._lock_bloques:
+            bloque = self._arrendamientos.get(tipo_documento)
+            if bloque is None or bloque['siguiente'] > bloque['fin']:
+                if bloque is not None:
+                    self.liberar_arrendamientos(tipo_documento)
+                datos = {'id': uuid.uuid4().hex, 'pid': os.getpid(), 'hostname': socket.gethostname()}
+                reserva = self.reservar_rango_numeros(tipo_documento, self.tamano_bloque, usuario,
+                                                      arrendamiento=datos)
+                bloque = {**datos, 'inicio': reserva['inicio'], 'fin': reserva['fin'],
+                          'siguiente': reserva['inicio'], 'numeros': reserva['numeros_reservados']}
+                self._arrendamientos[tipo_documento] = bloque
+                
+            numero_secuencial = bloque['siguiente']
+            numero_formateado = bloque['numeros'][numero_secuencial - bloque['inicio']]
+            
+            # La misma doble verificación que sin bloques
+            if self._numero_existe(numero_formateado, tipo_documento):
+                raise Exception(f"Error crítico: Número {numero_formateado} ya existe")
+            bloque['siguiente'] += 1
+            
+        seguridad_fiscal.registrar_log_fiscal(
+            usuario=usuario or 'SISTEMA',
+            accion='ASIGNACION_NUMERO',
+            documento_tipo=tipo_documento,
+            documento_numero=numero_formateado,
+            detalles=f'Número asignado: {numero_formateado} (secuencial: {numero_secuencial}, bloque {bloque["id"]})'
+        )
+        return numero_formateado, numero_secuencial
+        
+    def liberar_arrendamientos(self, tipo_documento: Optional[str] = None) -> None:
+        """
+        Cierra los bloques de este proceso y registra como huecos los números no usados
+        
+        Args:
+            tipo_documento: Tipo a liberar, o None para todos
+        """
+        with self._lock_bloques:
+            tipos = [tipo_documento] if tipo_documento else list(self._arrendamientos)
+            bloques = [(t, self._arrendamientos.pop(t)) for t in tipos if t in self._arrendamientos]
+        if not bloques:
+            return
+            
+        try:
+            with self._lock, BloqueoArchivo(self.archivo_bloqueo):
+                control = self._cargar_control()
+                for tipo, bloque in bloques:
+                    no_usados = [(bloque['siguiente'], bloque['fin'])] if bloque['siguiente'] <= bloque['fin'] else []
+                    self._cerrar_arrendamiento(control, tipo, bloque['id'], bloque['siguiente'] - bloque['inicio'],
+                                               no_usados, 'arrendamiento_liberado')
+                self._guardar_control(control)
+            # Al salir del proceso el log de auditoría puede vaciarse antes que esta liberación
+            seguridad_fiscal.vaciar_log_auditoria()
+        except Exception as e:
+            logger.error("Error liberando arrendamientos de numeración: %s", e)
+            
+    def _cerrar_arrendamiento(self, control: Dict[str, Any], tipo: str, id_arrendamiento: str,
+                              usados: int, no_usados: List[Tuple[int, int]], motivo: str) -> None:
+        """Marca un arrendamiento como cerrado y agrega sus números no usados a los huecos"""
+        for registro in control.get('arrendamientos', {}).get(tipo, []):
+            if registro.get('id') == id_arrendamiento:
+                registro['estado'] = 'cerrado'
+                registro['usados'] = usados
+                registro['fecha_cierre'] = datetime.now().isoformat()
+                
+        for desde, hasta in no_usados:
+            control.setdefault('huecos', {}).setdefault(tipo, []).append({
+                'desde': desde,
+                'hasta': hasta,
+                'cantidad': hasta - desde + 1,
+                'motivo': motivo,
+                'arrendamiento': id_arrendamiento,
+                'fecha': datetime.now().isoformat()
+            })
+            seguridad_fiscal.registrar_log_fiscal(
+                usuario='SISTEMA',
+                accion='NUMEROS_NO_UTILIZADOS',
+                documento_tipo=tipo,
+                documento_numero=f'{desde}-{hasta}',
+                detalles=f'{hasta - desde + 1} números sin usar ({motivo}, bloque {id_arrendamiento})'
+            )
+            
+    def conciliar_arrendamientos(self, tipo_documento: str = 'FACTURA') -> List[Dict[str, Any]]:
+        """
+        Cierra los bloques abiertos de procesos que ya no existen en este equipo
+        (por ejemplo, un worker terminado abruptamente) y registra como huecos
+        los números del bloque que no aparecen en los documentos emitidos
+        
+        Returns:
+            Lista de arrendamientos conciliados
+        """
+        conciliados = []
+        hostname = socket.gethostname()
+        with self._lock, BloqueoArchivo(self.archivo_bloqueo):
+            control = self._cargar_control()
+            serie = control['series'].get(tipo_documento)
+            if not serie:
+                return conciliados
+            emitidos = self._numeros_facturas() if tipo_documento == 'FACTURA' else set()
+            
+            for registro in list(control.get('arrendamientos', {}).get(tipo_documento, [])):
+                if registro.get('estado') != 'abierto' or registro.get('hostname') != hostname:
+                    continue
+                if _proceso_vivo(registro.get('pid')):
+                    continue
+                    
+                # Cada número del bloque sin documento emitido se registra como hueco
+                no_usados: List[Tuple[int, int]] = []
+                usados = 0
+                for n in range(registro['inicio'], registro['fin'] + 1):
+                    if serie['formato'].format(numero=n) in emitidos:
+                        usados += 1
+                    elif no_usados and no_usados[-1][1] == n - 1:
+                        no_usados[-1] = (no_usados[-1][0], n)
+                    else:
+                        no_usados.append((n, n))
+                self._cerrar_arrendamiento(control, tipo_documento, registro['id'], usados,
+                                           no_usados, 'arrendamiento_abandonado')
+                conciliados.append(registro)
+                
+            if conciliados:
+                self._guardar_control(control)
+        return conciliados
+        
+    def reporte_consecutividad(self, tipo_documento: str = 'FACTURA') -> Dict[str, Any]:
+        """
+        Resume cómo se justifica cada número de la serie: emitido, hueco
+        registrado o pendiente dentro de un bloque abierto
+        
+        Returns:
+            Diccionario con totales, huecos y arrendamientos abiertos
+        """
+        control = self._cargar_control()
+        serie = control['series'][tipo_documento]
+        ultimo_asignado = serie['siguiente_numero'] - 1
+        huecos = control.get('huecos', {}).get(tipo_documento, [])
+        abiertos = [a for a in control.get('arrendamientos', {}).get(tipo_documento, []) if a.get('estado') == 'abierto']
+        
+        total_huecos = sum(h['cantidad'] for h in huecos)
+        # Huecos solapados indicarían una doble liberación del mismo rango
+        rangos = sorted((h['desde'], h['hasta']) for h in huecos)
+        solapados = any(a[1] >= b[0] for a, b in zip(rangos, rangos[1:]))
+        
+        return {
+            'tipo_documento': tipo_documento,
+            'ultimo_numero_asignado': ultimo_asignado,
+            'numeros_en_huecos': total_huecos,
+            'huecos': huecos,
+            'arrendamientos_abiertos': abiertos,
+            'numeros_pendientes_en_bloques': sum(a['fin'] - a['inicio'] + 1 for a in abiertos),
+            'numeros_emitidos_o_en_uso': ultimo_asignado - total_huecos,
+            'huecos_consistentes': not solapados and all(1 <= h['desde'] <= h['hasta'] <= ultimo_asignado for h in huecos)
+        }
+
+
+def _proceso_vivo(pid: Optional[int]) -> bool:
+    """Indica si un proceso local sigue en ejecución"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+# Instancia global del controlador de numeración (se construye en el primer uso)
+control_numeracion = InstanciaPerezosa(ControlNumeracionFiscal) 
\ No newline at end of file
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo PDF Tabular - Motor PDF Nativo para Documentos en Tabla
+==============================================================
+
+Alternativa a wkhtmltopdf para documentos que son básicamente una tabla
+larga (lista de precios, estados de cuenta, inventario): las filas se
+dibujan directamente en un canvas de reportlab a medida que se recorren,
+sin pasar por Jinja ni por un motor de maquetación HTML.
+
+- Encabezado con logo, datos de la empresa, título y fecha
+- Secciones (p. ej. categorías) con el encabezado de columnas repetido en
+  cada página y número de página al pie
+- El motor se elige por tipo de documento (ver motor_pdf)
+
+Configuración por variables de entorno:
+    PDF_MOTOR_<TIPO>    'wkhtmltopdf' (por defecto) o 'reportlab'; p. ej.
+                        PDF_MOTOR_LISTA_PRECIOS=reportlab
+
+Requiere reportlab (pip install reportlab); sin él se usa wkhtmltopdf.
+"""
+
+import io
+import os
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Iterable, Tuple
+from carga_perezosa import importar_opcional
+from instrumentacion import instrumentacion
+
+MOTOR_WKHTMLTOPDF = 'wkhtmltopdf'
+MOTOR_REPORTLAB = 'reportlab'
+
+# Colores de la plantilla HTML de la lista de precios
+COLOR_ENCABEZADO = (0x1a / 255, 0x23 / 255, 0x7e / 255)
+COLOR_FILA_PAR = (0xf3 / 255, 0xf6 / 255, 0xfa / 255)
+COLOR_TEXTO_SECUNDARIO = (0.35, 0.35, 0.35)
+
+
+def motor_pdf(tipo: str) -> str:
+    """
+    Motor configurado para un tipo de documento
+
+    Devuelve 'reportlab' solo si está configurado para el tipo y reportlab
+    está instalado; en cualquier otro caso 'wkhtmltopdf'.
+    """
+    configurado = os.environ.get(f'PDF_MOTOR_{tipo.upper()}', MOTOR_WKHTMLTOPDF).strip().lower()
+    if configurado == MOTOR_REPORTLAB and importar_opcional('reportlab') is not None:
+        return MOTOR_REPORTLAB
+    return MOTOR_WKHTMLTOPDF
+
+
+class DocumentoTabularPDF:
+    """Clase para dibujar un documento tabular fila por fila con reportlab"""
+
+    MARGEN_MM = 20
+    ALTO_FILA = 16
+    TAMANO_FUENTE = 9
+
+    def __init__(self, titulo: str, columnas: List[Tuple[str, float, str]], empresa: Optional[Dict[str, Any]] = None,
+                 fecha: Optional[datetime] = None, ruta_logo: Optional[str] = None):
+        """
+        Args:
+            titulo: Título del documento
+            columnas: (título, ancho relativo, alineación) de cada columna; la
+                alineación es 'izquierda', 'centro' o 'derecha'
+            empresa: Datos de empresa.json para el encabezado
+            fecha: Fecha de emisión (por defecto, ahora)
+            ruta_logo: Ruta local de la imagen del logo
+        """
+        if importar_opcional('reportlab') is None:
+            raise ImportError('reportlab no está instalado. Instala con: pip install reportlab')
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import mm
+        from reportlab.pdfgen import canvas
+
+        self.titulo = titulo
+        self.columnas = columnas
+        self.empresa = empresa or {}
+        self.fecha = fecha or datetime.now()
+        self.ruta_logo = ruta_logo if ruta_logo and os.path.exists(ruta_logo) else None
+
+        self._salida = io.BytesIO()
+        self._canvas = canvas.Canvas(self._salida, pagesize=A4, pageCompression=1)
+        self._canvas.setTitle(titulo)
+        self._ancho_pagina, self._alto_pagina = A4
+        self._margen = self.MARGEN_MM * mm
+        ancho_util = self._ancho_pagina - 2 * self._margen
+        total = sum(ancho for _, ancho, _ in columnas)
+        self._anchos = [ancho_util * ancho / total for _, ancho, _ in columnas]
+        self._pagina = 0
+        self._y = 0.0
+        self._seccion: Optional[str] = None
+
+    # --- Dibujo ---
+
+    def _nueva_pagina(self, con_encabezado_empresa: bool = False) -> None:
+        if self._pagina:
+            self._pie_pagina()
+            self._canvas.showPage()
+        self._pagina += 1
+        self._y = self._alto_pagina - self._margen
+        if con_encabezado_empresa:
+            self._encabezado_empresa()
+
+    def _encabezado_empresa(self) -> None:
+        c = self._canvas
+        x = self._margen
+        alto_logo = 50
+        if self.ruta_logo:
+            try:
+                c.drawImage(self.ruta_logo, x, self._y - alto_logo, width=alto_logo * 1.6, height=alto_logo,
+                            preserveAspectRatio=True, mask='auto')
+                x += alto_logo * 1.6 + 12
+            except Exception:
+                pass
+        c.setFillColorRGB(*COLOR_ENCABEZADO)
+        c.setFont('Helvetica-Bold', 14)
+        c.drawString(x, self._y - 14, str(self.empresa.get('nombre', '')))
+        c.setFillColorRGB(*COLOR_TEXTO_SECUNDARIO)
+        c.setFont('Helvetica', 8)
+        linea = self._y - 26
+        for clave, prefijo in (('direccion', ''), ('telefono', 'Tel: '), ('email', ''), ('rif', 'RIF: ')):
+            if self.empresa.get(clave):
+                c.drawString(x, linea, f'{prefijo}{self.empresa[clave]}')
+                linea -= 10
+        self._y = min(self._y - alto_logo, linea) - 8
+        c.setStrokeColorRGB(*COLOR_ENCABEZADO)
+        c.setLineWidth(1.5)
+        c.line(self._margen, self._y, self._ancho_pagina - self._margen, self._y)
+
+        self._y -= 22
+        c.setFillColorRGB(*COLOR_ENCABEZADO)
+        c.setFont('Helvetica-Bold', 13)
+        c.drawCentredString(self._ancho_pagina / 2, self._y, self.titulo)
+        self._y -= 14
+        c.setFillColorRGB(*COLOR_TEXTO_SECUNDARIO)
+        c.setFont('Helvetica', 8)
+        c.drawCentredString(self._ancho_pagina / 2, self._y,
+                            f"Fecha de emisión: {self.fecha.strftime('%d/%m/%Y')}")
+        self._y -= 16
+
+    def _pie_pagina(self) -> None:
+        c = self._canvas
+        c.setFillColorRGB(*COLOR_TEXTO_SECUNDARIO)
+        c.setFont('Helvetica', 7)
+        c.drawRightString(self._ancho_pagina - self._margen, self._margen / 2, f'Página {self._pagina}')
+
+    def _titulo_seccion(self, nombre: str) -> None:
+        c = self._canvas
+        self._y -= 6
+        c.setFillColorRGB(*COLOR_ENCABEZADO)
+        c.setFont('Helvetica-Bold', 10)
+        c.drawString(self._margen, self._y - 10, nombre)
+        self._y -= 16
+
+    def _encabezado_columnas(self) -> None:
+        c = self._canvas
+        c.setFillColorRGB(*COLOR_ENCABEZADO)
+        c.rect(self._margen, self._y - self.ALTO_FILA, sum(self._anchos), self.ALTO_FILA, stroke=0, fill=1)
+        c.setFillColorRGB(1, 1, 1)
+        self._textos_fila([titulo for titulo, _, _ in self.columnas], 'Helvetica-Bold', centrar=True)
+        self._y -= self.ALTO_FILA
+
+    def _textos_fila(self, valores: List[str], fuente: str, centrar: bool = False) -> None:
+        from reportlab.pdfbase.pdfmetrics import stringWidth
+
+        c = self._canvas
+        c.setFont(fuente, self.TAMANO_FUENTE)
+        x = self._margen
+        base = self._y - self.ALTO_FILA + 5
+        for valor, columna, ancho in zip(valores, self.columnas, self._anchos):
+            texto = str(valor)
+            # Recortar el texto que no cabe en la columna
+            while texto and stringWidth(texto, fuente, self.TAMANO_FUENTE) > ancho - 8:
+                texto = texto[:-2] + '…' if len(texto) > 2 else ''
+            alineacion = 'centro' if centrar else columna[2]
+            if alineacion == 'derecha':
+                c.drawRightString(x + ancho - 4, base, texto)
+            elif alineacion == 'centro':
+                c.drawCentredString(x + ancho / 2, base, texto)
+            else:
+                c.drawString(x + 4, base, texto)
+            x += ancho
+
+    def _espacio_restante(self) -> float:
+        return self._y - self._margen
+
+    def agregar_seccion(self, nombre: Optional[str], filas: Iterable[Iterable[Any]]) -> None:
+        """Dibuja una sección (título opcional + tabla) consumiendo las filas una a una"""
+        if self._pagina == 0:
+            self._nueva_pagina(con_encabezado_empresa=True)
+        if self._espacio_restante() < 4 * self.ALTO_FILA:
+            self._nueva_pagina()
+        self._seccion = nombre
+        if nombre:
+            self._titulo_seccion(nombre)
+        self._encabezado_columnas()
+
+        c = self._canvas
+        for indice, fila in enumerate(filas):
+            if self._espacio_restante() < self.ALTO_FILA:
+                self._nueva_pagina()
+                if self._seccion:
+                    self._titulo_seccion(f'{self._seccion} (continuación)')
+                self._encabezado_columnas()
+            if indice % 2:
+                c.setFillColorRGB(*COLOR_FILA_PAR)
+                c.rect(self._margen, self._y - self.ALTO_FILA, sum(self._anchos), self.ALTO_FILA, stroke=0, fill=1)
+            c.setFillColorRGB(0, 0, 0)
+            self._textos_fila(list(fila), 'Helvetica')
+            self._y -= self.ALTO_FILA
+        self._y -= 6
+
+    def finalizar(self) -> bytes:
+        """Cierra el documento y devuelve el PDF"""
+        if self._pagina == 0:
+            self._nueva_pagina(con_encabezado_empresa=True)
+        self._pie_pagina()
+        self._canvas.save()
+        return self._salida.getvalue()
+
+
+def agrupar_por_categoria(inventario: Dict[str, Dict[str, Any]]) -> List[Tuple[str, List[Tuple[str, Dict[str, Any]]]]]:
+    """Productos agrupados por categoría en el orden en que aparece cada una (como la plantilla HTML)"""
+    categorias: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+    for id_producto, producto in inventario.items():
+        categorias.setdefault(producto.get('categoria') or '', []).append((id_producto, producto))
+    return list(categorias.items())
+
+
+def generar_lista_precios(inventario: Dict[str, Dict[str, Any]], tipo: str, empresa: Dict[str, Any],
+                          fecha: Optional[datetime] = None, ruta_logo: Optional[str] = None) -> bytes:
+    """
+    Lista de precios en PDF con el motor nativo
+
+    Args:
+        inventario: Productos ya filtrados (id → producto)
+        tipo: 'detal' o 'distribuidor'
+        empresa: Datos de empresa.json
+        fecha: Fecha de emisión
+        ruta_logo: Ruta local del logo
+
+    Returns:
+        Contenido del PDF
+    """
+    titulo = 'Lista de Precio a Tiendas' if tipo == 'detal' else 'Lista de Precios a Distribuidores'
+    campo_precio = 'precio_detal' if tipo == 'detal' else 'precio_distribuidor'
+    with instrumentacion.medir('pdf'):
+        documento = DocumentoTabularPDF(
+            titulo,
+            [('ID', 1.2, 'centro'), ('Nombre', 6, 'izquierda'), ('Precio', 1.8, 'derecha')],
+            empresa=empresa, fecha=fecha, ruta_logo=ruta_logo
+        )
+        for categoria, productos in agrupar_por_categoria(inventario):
+            documento.agregar_seccion(categoria, (
+                (id_producto, producto.get('nombre', ''),
+                 f"${float(producto.get(campo_precio, producto.get('precio', 0)) or 0):.2f}")
+                for id_producto, producto in productos
+            ))
+        return documento.finalizar()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Plantillas - Bytecode Persistente, Precompilación y Fragmentos
+========================================================================
+
+Capa sobre el entorno Jinja de la aplicación:
+
+- Caché de bytecode en disco (FileSystemBytecodeCache): un worker nuevo
+  carga las plantillas compiladas en lugar de volver a compilarlas
+- Precalentamiento al iniciar: se compilan todas las plantillas de
+  templates/ antes de la primera petición
+- Caché de fragmentos para bloques caros que cambian poco (selectores de
+  clientes y productos, menús de categorías), con clave por versión de los
+  datos:
+
+    {% call cache_fragmento('facturas.clientes', version_datos('clientes')) %}
+        ... bloque ...
+    {% endcall %}
+
+Configuración por variables de entorno:
+    JINJA_CACHE_DIR          Directorio del bytecode (por defecto cache_jinja)
+    PLANTILLAS_PRECALENTAR   '1' (por defecto) compila todo al iniciar; '0' no
+    FRAGMENTOS_MAX           Fragmentos en memoria por proceso (por defecto 256)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from jinja2 import FileSystemBytecodeCache, TemplateError
+from markupsafe import Markup
+
+logger = logging.getLogger(__name__)
+
+
+class CacheFragmentos:
+    """Clase para guardar fragmentos HTML renderizados, por nombre y versión de sus datos"""
+
+    def __init__(self, max_entradas: Optional[int] = None):
+        """
+        Args:
+            max_entradas: Máximo de fragmentos en memoria (se descartan los menos usados)
+        """
+        self.max_entradas = max_entradas or int(os.environ.get('FRAGMENTOS_MAX', '256'))
+        self._fragmentos: 'OrderedDict[tuple, Markup]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.estadisticas = {'aciertos': 0, 'fallos': 0}
+
+    def __call__(self, nombre: str, *dependencias: Any, caller=None) -> Markup:
+        """
+        Devuelve el fragmento guardado o lo renderiza (bloque {% call %})
+
+        Args:
+            nombre: Nombre único del fragmento (p. ej. 'plantilla.bloque')
+            dependencias: Valores de los que depende el contenido (versión de
+                los datos, filtro seleccionado...); si cambian, se renderiza de nuevo
+            caller: Cuerpo del bloque {% call %} (lo pasa Jinja)
+        """
+        clave = (nombre,) + tuple(str(d) for d in dependencias)
+        with self._lock:
+            fragmento = self._fragmentos.get(clave)
+            if fragmento is not None:
+                self._fragmentos.move_to_end(clave)
+                self.estadisticas['aciertos'] += 1
+                return fragmento
+        fragmento = Markup(caller())
+        with self._lock:
+            self.estadisticas['fallos'] += 1
+            self._fragmentos[clave] = fragmento
+            while len(self._fragmentos) > self.max_entradas:
+                self._fragmentos.popitem(last=False)
+        return fragmento
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._fragmentos.clear()
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        return {**self.estadisticas, 'fragmentos': len(self._fragmentos), 'max_entradas': self.max_entradas}
+
+
+class CapaPlantillas:
+    """Clase que configura el entorno Jinja de la app (bytecode, precalentamiento y fragmentos)"""
+
+    def __init__(self):
+        self.directorio_bytecode = os.environ.get('JINJA_CACHE_DIR', 'cache_jinja')
+        self.fragmentos = CacheFragmentos()
+        self.precalentamiento: Dict[str, Any] = {}
+
+    def init_app(self, app, precalentar: Optional[bool] = None) -> None:
+        """
+        Configura app.jinja_env y registra cache_fragmento como global de plantillas
+
+        Args:
+            app: Aplicación Flask
+            precalentar: Compilar todas las plantillas ahora (por defecto según
+                PLANTILLAS_PRECALENTAR)
+        """
+        os.makedirs(self.directorio_bytecode, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(self.directorio_bytecode)
+        app.jinja_env.globals['cache_fragmento'] = self.fragmentos
+        if precalentar is None:
+            precalentar = os.environ.get('PLANTILLAS_PRECALENTAR', '1') != '0'
+        if precalentar:
+            self.precalentar(app)
+
+    def precalentar(self, app) -> Dict[str, Any]:
+        """Compila (o carga del bytecode) todas las plantillas HTML de la app"""
+        inicio = time.perf_counter()
+        nombres = app.jinja_env.list_templates(filter_func=lambda nombre: nombre.endswith('.html'))
+        errores = {}
+        for nombre in nombres:
+            try:
+                app.jinja_env.get_template(nombre)
+            except TemplateError as e:
+                errores[nombre] = str(e)
+        self.precalentamiento = {
+            'plantillas': len(nombres),
+            'errores': errores,
+            'segundos': time.perf_counter() - inicio,
+        }
+        logger.info("🔥 %s plantillas listas en %.2f s%s", len(nombres) - len(errores), self.precalentamiento['segundos'],
+                    f" ({len(errores)} con error: {', '.join(errores)})" if errores else '')
+        return self.precalentamiento
+
+
+# Instancia global de la capa de plantillas (se registra con init_app)
+capa_plantillas = CapaPlantillas()
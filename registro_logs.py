@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Registro de Logs - Logging por Niveles Fuera del Hilo de la Petición
+==============================================================================
+
+Reemplaza los print() de la aplicación por loggers con nivel:
+
+- Un logger por módulo (logging.getLogger(__name__)); los de rutas calientes
+  (cargar_datos/guardar_datos, tasa BCV) se obtienen con obtener_logger(...,
+  muestreo=True) y solo emiten la primera vez y 1 de cada LOG_MUESTREO
+  repeticiones de cada mensaje por debajo de ERROR
+- QueueHandler en el logger raíz: la petición solo encola el registro y un
+  QueueListener en un hilo aparte hace la escritura (stdout y, si se
+  configura, un archivo rotativo). Tras un fork (workers de Gunicorn con
+  preload_app) el hijo arranca su propio hilo
+- Formato de texto o JSON por línea, con método y ruta de la petición en curso
+
+Configuración por variables de entorno:
+    LOG_NIVEL       Nivel del logger raíz (por defecto INFO)
+    LOG_NIVELES     Niveles por logger, p. ej. 'app.datos=DEBUG,cola_seniat=WARNING'
+    LOG_FORMATO     'texto' (por defecto) o 'json'
+    LOG_ARCHIVO     Archivo de log adicional (rotativo, 10 MB x 5); vacío = solo stdout
+    LOG_MUESTREO    En los loggers con muestreo, emitir 1 de cada N repeticiones (por defecto 100)
+
+Uso:
+    from registro_logs import registro_logs, obtener_logger
+    registro_logs.configurar()
+
+    logger = obtener_logger(__name__)
+    logger.info("💾 Tasa BCV guardada: %s", tasa)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+FORMATO_TEXTO = '%(asctime)s %(levelname)-7s %(name)s %(contexto)s%(message)s'
+
+
+class FiltroContexto(logging.Filter):
+    """Añade al registro el método y la ruta de la petición Flask en curso"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.metodo = record.ruta = None
+        try:
+            from flask import has_request_context, request
+            if has_request_context():
+                record.metodo = request.method
+                record.ruta = request.path
+        except ImportError:
+            pass
+        record.contexto = f'[{record.metodo} {record.ruta}] ' if record.ruta else ''
+        return True
+
+
+class FiltroMuestreo(logging.Filter):
+    """Deja pasar la primera vez y 1 de cada N repeticiones de cada mensaje por debajo de ERROR"""
+
+    def __init__(self, cada: int):
+        super().__init__()
+        self.cada = max(1, cada)
+        self._vistos: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR or self.cada == 1:
+            return True
+        clave = (record.name, record.levelno, record.msg)
+        with self._lock:
+            veces = self._vistos.get(clave, 0) + 1
+            if len(self._vistos) > 10000:
+                self._vistos.clear()
+            self._vistos[clave] = veces
+        if veces == 1:
+            return True
+        if veces % self.cada == 0:
+            if isinstance(record.msg, str):
+                record.msg = f'{record.msg} [{self.cada - 1} similares omitidos]'
+            return True
+        return False
+
+
+class FormateadorJSON(logging.Formatter):
+    """Un objeto JSON por línea"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        registro = {
+            'fecha': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensaje': record.getMessage(),
+            'pid': record.process,
+        }
+        if getattr(record, 'ruta', None):
+            registro['metodo'] = record.metodo
+            registro['ruta'] = record.ruta
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            registro['excepcion'] = record.exc_text
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+class RegistroLogs:
+    """Clase que configura el logging de la aplicación con una cola y un hilo escritor"""
+
+    def __init__(self):
+        self.nivel = os.environ.get('LOG_NIVEL', 'INFO').upper()
+        self.formato = os.environ.get('LOG_FORMATO', 'texto').lower()
+        self.archivo = os.environ.get('LOG_ARCHIVO', '')
+        self.muestreo = int(os.environ.get('LOG_MUESTREO', '100'))
+        self.salida = sys.stdout
+        self._manejador_cola: Optional[logging.handlers.QueueHandler] = None
+        self._oyente: Optional[logging.handlers.QueueListener] = None
+        self._lock = threading.Lock()
+
+    def configurar(self) -> None:
+        """Instala el QueueHandler en el logger raíz y arranca el hilo escritor (idempotente)"""
+        with self._lock:
+            if self._manejador_cola is not None:
+                return
+            raiz = logging.getLogger()
+            raiz.setLevel(self.nivel)
+            for par in filter(None, os.environ.get('LOG_NIVELES', '').split(',')):
+                nombre, _, nivel = par.partition('=')
+                logging.getLogger(nombre.strip()).setLevel(nivel.strip().upper())
+
+            self._manejador_cola = logging.handlers.QueueHandler(queue.SimpleQueue())
+            # El contexto de la petición se toma aquí, en el hilo que registra
+            self._manejador_cola.addFilter(FiltroContexto())
+            raiz.addHandler(self._manejador_cola)
+            self._iniciar_oyente()
+
+            atexit.register(self.detener)
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._reiniciar_tras_fork)
+
+    def _manejadores(self):
+        formateador = FormateadorJSON() if self.formato == 'json' else logging.Formatter(FORMATO_TEXTO)
+        salida = logging.StreamHandler(self.salida)
+        salida.setFormatter(formateador)
+        manejadores = [salida]
+        if self.archivo:
+            directorio = os.path.dirname(self.archivo)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            archivo = logging.handlers.RotatingFileHandler(self.archivo, maxBytes=10 * 1024 * 1024,
+                                                           backupCount=5, encoding='utf-8')
+            archivo.setFormatter(formateador)
+            manejadores.append(archivo)
+        return manejadores
+
+    def _iniciar_oyente(self) -> None:
+        self._oyente = logging.handlers.QueueListener(self._manejador_cola.queue, *self._manejadores(),
+                                                      respect_handler_level=True)
+        self._oyente.start()
+
+    def _reiniciar_tras_fork(self) -> None:
+        # El hilo escritor no sobrevive al fork: el hijo usa una cola y un hilo nuevos
+        self._lock = threading.Lock()
+        if self._manejador_cola is not None:
+            self._manejador_cola.queue = queue.SimpleQueue()
+            self._iniciar_oyente()
+
+    def detener(self) -> None:
+        """Escribe lo que quede en la cola y detiene el hilo escritor"""
+        if self._oyente is not None and self._oyente._thread is not None:
+            self._oyente.stop()
+
+
+def obtener_logger(nombre: str, muestreo: bool = False) -> logging.Logger:
+    """
+    Logger del módulo o de una ruta caliente
+
+    Args:
+        nombre: Nombre del logger (normalmente __name__ o 'app.<área>')
+        muestreo: Emitir solo la primera vez y 1 de cada LOG_MUESTREO
+            repeticiones de cada mensaje por debajo de ERROR
+    """
+    logger = logging.getLogger(nombre)
+    if muestreo and not any(isinstance(f, FiltroMuestreo) for f in logger.filters):
+        logger.addFilter(FiltroMuestreo(registro_logs.muestreo))
+    return logger
+
+
+# Instancia global del registro de logs (se activa con configurar())
+registro_logs = RegistroLogs()
@@ -20,14 +20,28 @@ import hmac
 import json
 import base64
 import uuid
-import psutil
 import socket
 from datetime import datetime
-from typing import Dict, Any, Optional, List
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from typing import Dict, Any, Optional, List, TYPE_CHECKING
 import os
+from carga_perezosa import InstanciaPerezosa
+from gestion_claves import gestor_claves
+from auditoria_fiscal import EscritorAuditoria
+
+if TYPE_CHECKING:
+    from cryptography.fernet import Fernet
+
+# Campos operativos que cambian después de emitir el documento (cobranza) y
+# por lo tanto no forman parte del contenido fiscal firmado
+CAMPOS_OPERATIVOS = ('pagos', 'total_abonado', 'saldo_pendiente')
+
+# El estado también cambia después de emitir, pero no puede quedar sin firmar:
+# cada cambio de estado se firma aparte (firma_estado) ligado al hash inmutable
+CAMPO_ESTADO = 'estado'
+
+# Versión del esquema de firma guardada en _metadatos_seguridad. Los documentos
+# sin 'version_esquema' se firmaron sobre el documento completo.
+VERSION_ESQUEMA = 2
 
 class SeguridadFiscal:
     """Clase principal para manejo de seguridad fiscal según SENIAT"""
@@ -37,12 +51,15 @@ class SeguridadFiscal:
         Inicializa el sistema de seguridad fiscal
         
         Args:
-            clave_maestra: Clave para cifrado de datos (si no se proporciona, se genera)
+            clave_maestra: Clave para cifrado de datos (si no se proporciona, se usa
+                           la configurada en gestion_claves: entorno o archivo de clave)
         """
-        self.clave_maestra = clave_maestra or self._generar_clave_maestra()
+        self.clave_maestra = clave_maestra or gestor_claves.cargar_clave_maestra()
         self.fernet = self._inicializar_cifrado()
         self.log_auditoria_file = 'logs/auditoria_fiscal.log'
+        self._huella_host: Optional[Dict[str, Any]] = None
         self._asegurar_directorios()
+        self.escritor_auditoria = EscritorAuditoria(self.log_auditoria_file)
         
     def _asegurar_directorios(self):
         """Crear directorios necesarios si no existen"""
@@ -50,27 +67,18 @@ class SeguridadFiscal:
         os.makedirs('documentos_fiscales', exist_ok=True)
         os.makedirs('backups_seguridad', exist_ok=True)
         
-    def _generar_clave_maestra(self) -> str:
-        """Genera una clave maestra segura para el sistema"""
-        return Fernet.generate_key().decode()
-        
-    def _inicializar_cifrado(self) -> Fernet:
+    def _inicializar_cifrado(self) -> 'Fernet':
         """Inicializa el sistema de cifrado con la clave maestra"""
-        if isinstance(self.clave_maestra, str):
-            clave_bytes = self.clave_maestra.encode()
+        # Importación diferida: cryptography solo se carga al crear la instancia
+        from cryptography.fernet import Fernet
+        
+        if isinstance(self.clave_maestra, bytes):
+            clave_texto = self.clave_maestra.decode('utf-8')
         else:
-            clave_bytes = self.clave_maestra
+            clave_texto = self.clave_maestra
             
-        # Usar PBKDF2 para derivar la clave de cifrado
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=b'seniat_fiscal_salt_2024',  # Salt fijo para consistencia
-            iterations=100000,
-        )
-        
-        key = base64.urlsafe_b64encode(kdf.derive(clave_bytes))
-        return Fernet(key)
+        # La derivación PBKDF2 se ejecuta una sola vez y queda cacheada en disco
+        return Fernet(gestor_claves.obtener_clave_cifrado(clave_texto))
         
     def generar_hash_documento(self, documento: Dict[str, Any]) -> str:
         """
@@ -93,6 +101,19 @@ class SeguridadFiscal:
         
         return hashlib.sha256(datos_completos).hexdigest()
     
+    def _hash_canonico(self, documento: Dict[str, Any]) -> str:
+        """
+        Hash SHA-256 determinista de un documento (sin timestamp), usado para
+        firmas y validación de documentos inmutables
+        """
+        documento_ordenado = self._ordenar_recursivamente(documento)
+        documento_json = json.dumps(documento_ordenado, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(documento_json.encode('utf-8')).hexdigest()
+        
+    def _contenido_fiscal(self, documento: Dict[str, Any]) -> Dict[str, Any]:
+        """Copia superficial del documento sin los campos operativos ni el estado (firmado aparte)"""
+        return {k: v for k, v in documento.items() if k not in CAMPOS_OPERATIVOS and k != CAMPO_ESTADO}
+        
     def _ordenar_recursivamente(self, obj):
         """Ordena recursivamente los diccionarios para hash consistente"""
         if isinstance(obj, dict):
@@ -113,7 +134,7 @@ class SeguridadFiscal:
         Returns:
             Firma HMAC en formato hexadecimal
         """
-        hash_documento = self.generar_hash_documento(documento)
+        hash_documento = self._hash_canonico(documento)
         firma = hmac.new(
             clave_secreta.encode('utf-8'),
             hash_documento.encode('utf-8'),
@@ -174,8 +195,27 @@ class SeguridadFiscal:
         except Exception:
             return "MAC_NO_DISPONIBLE"
             
-    def obtener_info_sistema(self) -> Dict[str, str]:
-        """Obtiene información detallada del sistema para auditoría"""
+    def obtener_huella_host(self, refrescar: bool = False) -> Dict[str, Any]:
+        """
+        Obtiene la huella del equipo (MAC, hostname, IP, CPU, memoria)
+        
+        Se calcula una sola vez por proceso porque no cambia durante su vida
+        y la resolución DNS del hostname puede bloquear.
+        
+        Args:
+            refrescar: Forzar un nuevo cálculo de la huella
+            
+        Returns:
+            Diccionario con los datos del equipo
+        """
+        if self._huella_host is None or refrescar:
+            self._huella_host = self._calcular_huella_host()
+        return self._huella_host
+        
+    def _calcular_huella_host(self) -> Dict[str, Any]:
+        """Calcula la huella del equipo consultando el sistema operativo"""
+        import psutil
+        
         try:
             hostname = socket.gethostname()
             ip_local = socket.gethostbyname(hostname)
@@ -187,11 +227,21 @@ class SeguridadFiscal:
             'mac_address': self.obtener_mac_address(),
             'hostname': hostname,
             'ip_local': ip_local,
-            'timestamp_preciso': datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
             'cpu_count': psutil.cpu_count() if hasattr(psutil, 'cpu_count') else 'N/A',
             'memoria_total': str(psutil.virtual_memory().total) if hasattr(psutil, 'virtual_memory') else 'N/A'
         }
         
+    def obtener_info_sistema(self, refrescar: bool = False) -> Dict[str, str]:
+        """
+        Obtiene información detallada del sistema para auditoría
+        
+        Args:
+            refrescar: Recalcular la huella del equipo en lugar de usar la cacheada
+        """
+        info = dict(self.obtener_huella_host(refrescar))
+        info['timestamp_preciso'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        return info
+        
     def registrar_log_fiscal(self, 
                            usuario: str, 
                            accion: str, 
@@ -202,6 +252,9 @@ class SeguridadFiscal:
         """
         Registra un log de auditoría fiscal inmutable
         
+        La entrada se encadena con la anterior (hash de la línea previa) y se
+        escribe por lotes; ver auditoria_fiscal.EscritorAuditoria.
+        
         Args:
             usuario: Usuario que realizó la acción
             accion: Tipo de acción realizada
@@ -223,28 +276,19 @@ class SeguridadFiscal:
             'mac_address': info_sistema['mac_address'],
             'hostname': info_sistema['hostname'],
             'detalles': detalles,
-            'session_id': str(uuid.uuid4())
+            'session_id': self.escritor_auditoria.session_id
         }
         
-        # Generar hash del log para inmutabilidad
-        log_hash = self.generar_hash_documento(log_entry)
-        log_entry['hash_inmutable'] = log_hash
-        
-        # Formatear línea de log
+        # Formatear línea de log (los campos PREV y HASH los agrega el escritor encadenado)
         linea_log = self._formatear_linea_log(log_entry)
+        self.escritor_auditoria.registrar(linea_log)
         
-        # Escribir al archivo de auditoría
-        try:
-            with open(self.log_auditoria_file, 'a', encoding='utf-8') as f:
-                f.write(linea_log + '\n')
-        except Exception as e:
-            # Log de emergencia en caso de error
-            emergency_log = f"[ERROR_LOG] {datetime.now().isoformat()} - Error escribiendo log: {str(e)}\n"
-            with open('logs/emergency.log', 'a', encoding='utf-8') as f:
-                f.write(emergency_log)
+    def vaciar_log_auditoria(self) -> None:
+        """Escribe en disco las entradas de auditoría pendientes del lote actual"""
+        self.escritor_auditoria.vaciar()
                 
     def _formatear_linea_log(self, log_entry: Dict[str, str]) -> str:
-        """Formatea una línea de log según estándares SENIAT"""
+        """Formatea una línea de log según estándares SENIAT (sin PREV/HASH)"""
         return (f"[{log_entry['timestamp']}] "
                 f"USUARIO:{log_entry['usuario']} | "
                 f"ACCION:{log_entry['accion']} | "
@@ -254,8 +298,8 @@ class SeguridadFiscal:
                 f"IP_LOC:{log_entry['ip_local']} | "
                 f"MAC:{log_entry['mac_address']} | "
                 f"HOST:{log_entry['hostname']} | "
-                f"DETALLES:{log_entry['detalles']} | "
-                f"HASH:{log_entry['hash_inmutable']}")
+                f"SESION:{log_entry['session_id']} | "
+                f"DETALLES:{log_entry['detalles']}")
                 
     def validar_campos_obligatorios_factura(self, factura: Dict[str, Any]) -> List[str]:
         """
@@ -339,21 +383,46 @@ class SeguridadFiscal:
             'mac_address': info_sistema['mac_address'],
             'hostname': info_sistema['hostname'],
             'version_sistema': '1.0.0',
+            'version_esquema': VERSION_ESQUEMA,
             'inmutable': True,
             'id_documento': str(uuid.uuid4())
         }
         
-        # Generar hash inmutable
-        hash_documento = self.generar_hash_documento(documento_seguro)
+        # Generar hash inmutable (determinista y solo sobre el contenido fiscal)
+        hash_documento = self._hash_canonico(self._contenido_fiscal(documento_seguro))
         documento_seguro['_metadatos_seguridad']['hash_inmutable'] = hash_documento
         
         # Firmar documento
         clave_firma = self.clave_maestra[:32]  # Usar primeros 32 chars como clave de firma
-        firma = self.firmar_documento(documento_seguro, clave_firma)
+        firma = self.firmar_documento(self._contenido_fiscal(documento_seguro), clave_firma)
         documento_seguro['_metadatos_seguridad']['firma_digital'] = firma
         
+        if CAMPO_ESTADO in documento_seguro:
+            self.firmar_estado(documento_seguro)
+        
         return documento_seguro
         
+    def firmar_estado(self, documento: Dict[str, Any]) -> None:
+        """
+        Firma el estado actual de un documento inmutable
+        
+        Debe llamarse después de cada cambio de estado (pagada, pendiente,
+        anulada...). La firma liga el estado al hash inmutable del documento,
+        de modo que el estado no puede cambiarse sin la clave de firma.
+        
+        Args:
+            documento: Documento creado con crear_documento_inmutable (se modifica)
+        """
+        metadatos = documento.get('_metadatos_seguridad')
+        if not metadatos or not metadatos.get('version_esquema'):
+            # Documentos sin metadatos o del esquema anterior: no hay firma de estado
+            return
+        metadatos['firma_estado'] = self._firma_estado(metadatos.get('hash_inmutable', ''), documento.get(CAMPO_ESTADO))
+        
+    def _firma_estado(self, hash_inmutable: str, estado: Optional[str]) -> str:
+        """Firma HMAC del par (hash inmutable, estado)"""
+        return self.firmar_documento({'hash_inmutable': hash_inmutable, 'estado': estado}, self.clave_maestra[:32])
+        
     def validar_documento_inmutable(self, documento: Dict[str, Any]) -> bool:
         """
         Valida que un documento fiscal no haya sido alterado
@@ -377,24 +446,37 @@ class SeguridadFiscal:
         hash_almacenado = metadatos.get('hash_inmutable', '')
         firma_almacenada = metadatos.get('firma_digital', '')
         
-        # Crear copia temporal sin metadatos para validar hash original
-        documento_temp = documento.copy()
+        # Crear copia temporal sin metadatos para validar hash original: los
+        # documentos sin version_esquema se firmaron sobre el documento completo
+        esquema_actual = bool(metadatos.get('version_esquema'))
+        documento_temp = self._contenido_fiscal(documento) if esquema_actual else documento.copy()
         documento_temp.pop('_metadatos_seguridad')
         
-        # Recrear metadatos sin hash y firma para validación
+        # Recrear metadatos sin hash y firmas para validación
         metadatos_temp = metadatos.copy()
         metadatos_temp.pop('hash_inmutable', None)
         metadatos_temp.pop('firma_digital', None)
+        firma_estado = metadatos_temp.pop('firma_estado', None)
         documento_temp['_metadatos_seguridad'] = metadatos_temp
         
         # Validar hash
-        hash_calculado = self.generar_hash_documento(documento_temp)
+        hash_calculado = self._hash_canonico(documento_temp)
         
-        # Validar firma
+        # Validar firma (al firmar, los metadatos ya incluían el hash inmutable)
+        metadatos_temp['hash_inmutable'] = hash_almacenado
         clave_firma = self.clave_maestra[:32]
         firma_valida = self.validar_firma_documento(documento_temp, firma_almacenada, clave_firma)
         
-        return hash_calculado == hash_almacenado and firma_valida
+        # Validar el estado firmado aparte (sin estado no debe haber firma de estado, ni viceversa)
+        estado_valido = True
+        if esquema_actual:
+            estado = documento.get(CAMPO_ESTADO)
+            if estado is None and firma_estado is None:
+                estado_valido = True
+            else:
+                estado_valido = hmac.compare_digest(firma_estado or '', self._firma_estado(hash_almacenado, estado))
+        
+        return hash_calculado == hash_almacenado and firma_valida and estado_valido
 
-# Instancia global del sistema de seguridad fiscal
-seguridad_fiscal = SeguridadFiscal() 
\ No newline at end of file
+# Instancia global del sistema de seguridad fiscal (se construye en el primer uso)
+seguridad_fiscal = InstanciaPerezosa(SeguridadFiscal) 
\ No newline at end of file
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo Servicio PDF - Generación de PDF con wkhtmltopdf
+=======================================================
+
+Centraliza la conversión HTML → PDF que antes hacía cada ruta con
+pdfkit.from_string:
+
+- La ruta de wkhtmltopdf se resuelve una sola vez por proceso
+- Un pool acotado de renderizados simultáneos y un límite de solicitudes en
+  espera: si el servicio está saturado se rechaza de inmediato
+  (ServicioPDFOcupado) en lugar de ocupar todos los hilos de Gunicorn
+- Timeout por trabajo: el proceso wkhtmltopdf se termina si lo excede
+- Opciones por tipo de documento (PERFILES_PDF); las plantillas de PDF no
+  ejecutan JavaScript, así que se omite la espera fija de 1 s
+- Caché en disco direccionada por contenido (CachePDF): la clave es un hash
+  del documento + perfil, sirve también como ETag, y los archivos menos
+  usados se eliminan al superar el tamaño máximo
+
+Configuración por variables de entorno:
+    WKHTMLTOPDF_PATH        Ruta del ejecutable (opcional)
+    PDF_MAX_SIMULTANEOS     Renderizados simultáneos por proceso (por defecto 1)
+    PDF_MAX_PENDIENTES      Solicitudes admitidas, en curso + en espera (por defecto 1;
+                            gunicorn.conf.py lo ajusta a los hilos del worker - 1)
+    PDF_TIMEOUT             Segundos máximos por documento (por defecto 60)
+    PDF_CACHE_DIR           Directorio de la caché (por defecto cache_pdf)
+    PDF_CACHE_MAX_MB        Tamaño máximo de la caché; 0 la desactiva (por defecto 256)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Callable
+from carga_perezosa import InstanciaPerezosa, importar_opcional
+from cache_http import quitar_hash_estatico
+from instrumentacion import instrumentacion
+
+logger = logging.getLogger(__name__)
+
+RUTAS_WKHTMLTOPDF = [
+    'C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe',
+    '/usr/bin/wkhtmltopdf',
+    '/usr/local/bin/wkhtmltopdf',
+]
+
+OPCIONES_BASE = {
+    'page-size': 'A4',
+    'encoding': 'UTF-8',
+    'no-outline': None,
+    'quiet': '',
+    'print-media-type': None,
+    'enable-local-file-access': None,
+    'disable-javascript': None,
+}
+
+# Opciones por tipo de documento (se combinan con OPCIONES_BASE)
+PERFILES_PDF: Dict[str, Dict[str, Any]] = {
+    'cotizacion': {
+        'margin-top': '20mm',
+        'margin-right': '15mm',
+        'margin-bottom': '20mm',
+        'margin-left': '15mm',
+        'disable-smart-shrinking': '',
+        'dpi': 300,
+        'image-quality': 100,
+        'footer-right': '[page] de [topage]',
+        'footer-font-size': '8',
+        'footer-spacing': '5',
+    },
+    'lista_precios': {
+        'margin-top': '20mm',
+        'margin-right': '20mm',
+        'margin-bottom': '20mm',
+        'margin-left': '20mm',
+        'orientation': 'Portrait',
+        # Lista tabular: texto y miniaturas, no necesita resolución de imagen de impresión
+        'dpi': 150,
+        'image-quality': 85,
+    },
+    'factura': {
+        'margin-top': '10mm',
+        'margin-right': '10mm',
+        'margin-bottom': '10mm',
+        'margin-left': '10mm',
+        'disable-smart-shrinking': '',
+        'dpi': 300,
+        'image-quality': 100,
+    },
+    'historial_cliente': {
+        'margin-top': '15mm',
+        'margin-right': '15mm',
+        'margin-bottom': '15mm',
+        'margin-left': '15mm',
+        'dpi': 150,
+        'image-quality': 85,
+        'footer-right': '[page] de [topage]',
+        'footer-font-size': '8',
+    },
+}
+
+# Cambiar al modificar OPCIONES_BASE o la forma de generar, para invalidar la caché
+VERSION_CACHE = 1
+
+
+class ServicioPDFOcupado(Exception):
+    """Se alcanzó el máximo de solicitudes de PDF admitidas por el proceso"""
+
+
+class CachePDF:
+    """Clase para guardar PDF generados en disco, indexados por su clave de contenido"""
+
+    def __init__(self, directorio: Optional[str] = None, max_bytes: Optional[int] = None):
+        """
+        Inicializa la caché
+
+        Args:
+            directorio: Directorio donde se guardan los PDF
+            max_bytes: Tamaño máximo total; al superarlo se eliminan los menos usados
+        """
+        self.directorio = directorio or os.environ.get('PDF_CACHE_DIR', 'cache_pdf')
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('PDF_CACHE_MAX_MB', '256')) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self._bytes_totales: Optional[int] = None
+        self._lock = threading.Lock()
+        self.estadisticas = {'aciertos': 0, 'fallos': 0, 'guardados': 0, 'eliminados': 0}
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f'{clave}.pdf')
+
+    def obtener(self, clave: str) -> Optional[bytes]:
+        """PDF guardado con esa clave, o None"""
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'rb') as f:
+                pdf = f.read()
+            # La fecha de modificación es la de último uso (orden LRU al recortar)
+            os.utime(ruta, None)
+        except OSError:
+            self.estadisticas['fallos'] += 1
+            return None
+        self.estadisticas['aciertos'] += 1
+        return pdf
+
+    def guardar(self, clave: str, pdf: bytes) -> None:
+        """Guarda un PDF (escritura atómica) y recorta la caché si excede el máximo"""
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta(clave)
+        temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporal, 'wb') as f:
+            f.write(pdf)
+        os.replace(temporal, ruta)
+        self.estadisticas['guardados'] += 1
+
+        with self._lock:
+            if self._bytes_totales is None:
+                self._bytes_totales = sum(tamano for _, _, tamano in self._archivos())
+            else:
+                self._bytes_totales += len(pdf)
+            if self._bytes_totales > self.max_bytes:
+                self._recortar()
+
+    def _archivos(self) -> List[tuple]:
+        """(ruta, último uso, tamaño) de cada PDF de la caché"""
+        archivos = []
+        try:
+            entradas = list(os.scandir(self.directorio))
+        except FileNotFoundError:
+            return archivos
+        for entrada in entradas:
+            if not entrada.name.endswith('.pdf'):
+                continue
+            try:
+                info = entrada.stat()
+            except FileNotFoundError:
+                continue
+            archivos.append((entrada.path, info.st_mtime, info.st_size))
+        return archivos
+
+    def _recortar(self) -> None:
+        """Elimina los PDF usados hace más tiempo hasta quedar en el 90 % del máximo"""
+        # Se vuelve a medir el directorio: otros procesos también escriben en él
+        archivos = sorted(self._archivos(), key=lambda archivo: archivo[1])
+        total = sum(tamano for _, _, tamano in archivos)
+        objetivo = self.max_bytes * 0.9
+        for ruta, _, tamano in archivos:
+            if total <= objetivo:
+                break
+            try:
+                os.remove(ruta)
+                self.estadisticas['eliminados'] += 1
+            except FileNotFoundError:
+                pass
+            total -= tamano
+        self._bytes_totales = total
+
+    def limpiar(self) -> int:
+        """Elimina todos los PDF de la caché y devuelve cuántos había"""
+        with self._lock:
+            archivos = self._archivos()
+            for ruta, _, _ in archivos:
+                try:
+                    os.remove(ruta)
+                except FileNotFoundError:
+                    pass
+            self._bytes_totales = 0
+        return len(archivos)
+
+    def obtener_estadisticas(self) -> Dict[str, Any]:
+        archivos = self._archivos()
+        return {
+            **self.estadisticas,
+            'archivos': len(archivos),
+            'bytes': sum(tamano for _, _, tamano in archivos),
+            'max_bytes': self.max_bytes
+        }
+
+
+class ServicioPDF:
+    """Clase para renderizar PDF con un pool acotado de procesos wkhtmltopdf"""
+
+    def __init__(self,
+                 max_simultaneos: Optional[int] = None,
+                 max_pendientes: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 cache: Optional[CachePDF] = None):
+        """
+        Inicializa el servicio de PDF
+
+        Args:
+            max_simultaneos: Procesos wkhtmltopdf en paralelo
+            max_pendientes: Solicitudes admitidas a la vez (en curso + en espera)
+            timeout: Segundos máximos por documento
+            cache: Caché de PDF (por defecto en PDF_CACHE_DIR; None si PDF_CACHE_MAX_MB=0)
+        """
+        self.max_simultaneos = max_simultaneos or int(os.environ.get('PDF_MAX_SIMULTANEOS', '1'))
+        self.max_pendientes = max(self.max_simultaneos,
+                                  max_pendientes or int(os.environ.get('PDF_MAX_PENDIENTES', '1')))
+        self.timeout = timeout or float(os.environ.get('PDF_TIMEOUT', '60'))
+
+        self._configuracion = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._cupos = threading.BoundedSemaphore(self.max_pendientes)
+        self._lock = threading.Lock()
+        self.estadisticas = {'generados': 0, 'rechazados': 0, 'timeouts': 0, 'errores': 0}
+        self._hashes_plantillas: Dict[str, tuple] = {}
+        if cache is None:
+            cache = CachePDF()
+        self.cache = cache if cache.max_bytes > 0 else None
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reiniciar_tras_fork)
+
+    def _reiniciar_tras_fork(self):
+        # Los hilos del pool no existen en el proceso hijo
+        self._pool = None
+        self._lock = threading.Lock()
+        self._cupos = threading.BoundedSemaphore(self.max_pendientes)
+        if self.cache is not None:
+            self.cache._lock = threading.Lock()
+
+    def _obtener_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_simultaneos, thread_name_prefix='pdf')
+        return self._pool
+
+    def obtener_configuracion(self):
+        """Configuración de pdfkit con la ruta de wkhtmltopdf resuelta (una vez por proceso)"""
+        if self._configuracion is None:
+            pdfkit = importar_opcional('pdfkit')
+            if pdfkit is None:
+                raise ImportError('PDFKit no está instalado. Instala con: pip install pdfkit')
+
+            ruta = os.environ.get('WKHTMLTOPDF_PATH') or shutil.which('wkhtmltopdf')
+            if not ruta:
+                ruta = next((r for r in RUTAS_WKHTMLTOPDF if os.path.exists(r)), 'wkhtmltopdf')
+            self._configuracion = pdfkit.configuration(wkhtmltopdf=ruta)
+        return self._configuracion
+
+    def opciones(self, tipo: str, opciones_extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Opciones de wkhtmltopdf para un tipo de documento"""
+        return {**OPCIONES_BASE, **PERFILES_PDF.get(tipo, {}), **(opciones_extra or {})}
+
+    def clave_documento(self, tipo: str, *partes: Any, opciones_extra: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Clave de caché (y ETag) de un documento
+
+        Args:
+            tipo: Tipo de documento (clave de PERFILES_PDF)
+            *partes: Lo que determina el contenido: el HTML renderizado, o los
+                datos + versión de plantilla + empresa cuando se quiere evitar
+                renderizar el HTML en un acierto
+            opciones_extra: Las mismas que se pasarán a renderizar
+
+        Returns:
+            Hash SHA-256 en hexadecimal
+        """
+        resumen = hashlib.sha256()
+        resumen.update(json.dumps([VERSION_CACHE, tipo, self.opciones(tipo, opciones_extra)],
+                                  sort_keys=True, default=str).encode('utf-8'))
+        for parte in partes:
+            if not isinstance(parte, (str, bytes)):
+                parte = json.dumps(parte, sort_keys=True, ensure_ascii=False, default=str)
+            resumen.update(b'\x00')
+            resumen.update(parte.encode('utf-8') if isinstance(parte, str) else parte)
+        return resumen.hexdigest()
+
+    def hash_plantilla(self, ruta: str) -> str:
+        """
+        Hash del contenido de una plantilla, para usarlo en clave_documento
+
+        A diferencia de la fecha de modificación, no cambia al desplegar o
+        copiar el archivo sin editarlo. Se recalcula solo si cambian su
+        mtime o su tamaño.
+        """
+        info = os.stat(ruta)
+        guardado = self._hashes_plantillas.get(ruta)
+        if guardado and guardado[0] == info.st_mtime_ns and guardado[1] == info.st_size:
+            return guardado[2]
+        with open(ruta, 'rb') as f:
+            valor = hashlib.sha256(f.read()).hexdigest()
+        self._hashes_plantillas[ruta] = (info.st_mtime_ns, info.st_size, valor)
+        return valor
+
+    def renderizar(self, html: str, tipo: str, opciones_extra: Optional[Dict[str, Any]] = None,
+                   timeout: Optional[float] = None, clave: Optional[str] = None) -> bytes:
+        """
+        Convierte HTML a PDF, usando la caché si hay un PDF con la misma clave
+
+        Args:
+            html: HTML ya renderizado
+            tipo: Tipo de documento (clave de PERFILES_PDF)
+            opciones_extra: Opciones de wkhtmltopdf que reemplazan las del perfil
+            timeout: Segundos máximos (por defecto PDF_TIMEOUT)
+            clave: Clave de caché (por defecto, el hash del HTML y el perfil)
+
+        Returns:
+            Contenido del PDF
+
+        Raises:
+            ServicioPDFOcupado: Si ya hay max_pendientes solicitudes en curso
+            TimeoutError: Si wkhtmltopdf excede el timeout
+        """
+        clave = clave or self.clave_documento(tipo, html, opciones_extra=opciones_extra)
+        return self.obtener_o_renderizar(clave, tipo, lambda: html, opciones_extra, timeout)
+
+    def obtener_o_renderizar(self, clave: str, tipo: str, generar_html: Callable[[], str],
+                             opciones_extra: Optional[Dict[str, Any]] = None,
+                             timeout: Optional[float] = None) -> bytes:
+        """
+        PDF de la caché o, si no está, generado a partir de generar_html()
+
+        El HTML solo se renderiza cuando no hay acierto en la caché.
+        """
+        return self.obtener_o_generar(
+            clave, lambda: self._renderizar_sin_cache(generar_html(), tipo, opciones_extra, timeout)
+        )
+
+    def obtener_o_generar(self, clave: str, generar_pdf: Callable[[], bytes]) -> bytes:
+        """
+        PDF de la caché o, si no está, el que devuelva generar_pdf()
+
+        Sirve para cualquier motor (p. ej. pdf_tabular); la clave debe
+        distinguir el motor usado.
+        """
+        if self.cache is not None:
+            pdf = self.cache.obtener(clave)
+            if pdf is not None:
+                return pdf
+
+        pdf = generar_pdf()
+        if self.cache is not None:
+            try:
+                self.cache.guardar(clave, pdf)
+            except OSError as e:
+                logger.warning("⚠️ No se pudo guardar el PDF en caché: %s", e)
+        return pdf
+
+    def _renderizar_sin_cache(self, html: str, tipo: str, opciones_extra: Optional[Dict[str, Any]],
+                              timeout: Optional[float]) -> bytes:
+        if not self._cupos.acquire(blocking=False):
+            self.estadisticas['rechazados'] += 1
+            raise ServicioPDFOcupado('El servidor está generando otros PDF; intente de nuevo en unos segundos')
+        try:
+            with instrumentacion.medir('pdf'):
+                futuro = self._obtener_pool().submit(
+                    self._ejecutar, html, self.opciones(tipo, opciones_extra), timeout or self.timeout
+                )
+                pdf = futuro.result()
+            self.estadisticas['generados'] += 1
+            return pdf
+        except subprocess.TimeoutExpired:
+            self.estadisticas['timeouts'] += 1
+            raise TimeoutError(f'La generación del PDF excedió {timeout or self.timeout:.0f} s')
+        except Exception:
+            self.estadisticas['errores'] += 1
+            raise
+        finally:
+            self._cupos.release()
+
+    def _ejecutar(self, html: str, opciones: Dict[str, Any], timeout: float) -> bytes:
+        """Ejecuta wkhtmltopdf leyendo el HTML de stdin y el PDF de stdout"""
+        pdfkit = importar_opcional('pdfkit')
+        generador = pdfkit.PDFKit(html, 'string', options=opciones, configuration=self.obtener_configuracion())
+        # pdfkit arma el comando; subprocess.run permite terminar el proceso por timeout
+        resultado = subprocess.run(
+            list(generador.command()),
+            input=html.encode('utf-8'),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=timeout
+        )
+        # wkhtmltopdf devuelve código 1 si falta algún recurso (p. ej. una imagen) aunque genere el PDF
+        if not resultado.stdout.startswith(b'%PDF'):
+            error = resultado.stderr.decode('utf-8', errors='replace').strip()
+            raise IOError(f'wkhtmltopdf falló (código {resultado.returncode}): {error[-500:]}')
+        return resultado.stdout
+
+
+def rutas_estaticas_locales(html: str, directorio_static: str, url_static: str = '/static/') -> str:
+    """
+    Reemplaza las URL relativas a /static/ por rutas file:// locales
+
+    Las plantillas de impresión usan url_for('static', ...), que wkhtmltopdf no
+    puede resolver al recibir el HTML por stdin; así lee las imágenes del disco
+    (enable-local-file-access) en lugar de pedirlas al propio servidor.
+    """
+    ruta = os.path.abspath(directorio_static).replace(os.sep, '/').rstrip('/')
+    prefijo = 'file://' + ('' if ruta.startswith('/') else '/') + ruta + '/'
+
+    def archivo_local(coincidencia):
+        # url_for('static') agrega el hash del contenido al nombre (cache_http); en disco no lo tiene
+        nombre, _ = quitar_hash_estatico(coincidencia.group(3))
+        return f'{coincidencia.group(1)}{coincidencia.group(2)}{prefijo}{nombre}{coincidencia.group(2)}'
+
+    patron = re.compile(r'(src=|href=)(["\'])' + re.escape(url_static) + r'([^"\']*)\2')
+    return patron.sub(archivo_local, html)
+
+
+# Instancia global del servicio de PDF (se construye en el primer uso)
+servicio_pdf = InstanciaPerezosa(ServicioPDF)
@@ -1,11 +1,7 @@
-import requests
 import json
-import urllib3
 from bs4 import BeautifulSoup
 from datetime import datetime
-
-# Desactivar advertencias de SSL
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from cliente_http import cliente_http
 
 # Archivo donde se guardará la última tasa
 ULTIMA_TASA_BCV_FILE = 'ultima_tasa_bcv.json'
@@ -50,7 +46,7 @@ def obtener_tasa_bcv_dia():
     """Obtiene la tasa oficial USD/BS del BCV desde la web. Devuelve float o None si falla."""
     url = 'https://www.bcv.org.ve/glosario/cambio-oficial'
     try:
-        resp = requests.get(url, timeout=10, verify=False)
+        resp = cliente_http.get(url, timeout=(5, 10))
         if resp.status_code != 200:
             return None
         
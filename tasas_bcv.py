@@ -1,16 +1,12 @@
-import requests
 from bs4 import BeautifulSoup
-import urllib3
 from datetime import datetime
-
-# Desactivar advertencias de SSL
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from cliente_http import cliente_http
 
 def obtener_tasas_bcv():
     """Obtiene las tasas oficiales USD/BS y EUR/BS del BCV."""
     url = 'https://www.bcv.org.ve/'
     try:
-        resp = requests.get(url, timeout=10, verify=False)
+        resp = cliente_http.get(url, timeout=(5, 10))
         if resp.status_code != 200:
             print("Error al conectar con BCV")
             return 35.1234, 38.9012  # Tasas de ejemplo por si falla
@@ -48,7 +44,7 @@ def obtener_tasa_euro():
     """Obtiene la tasa EUR/BS desde la página oficial del BCV."""
     url = 'https://www.bcv.org.ve/'
     try:
-        resp = requests.get(url, timeout=10, verify=False)
+        resp = cliente_http.get(url, timeout=(5, 10))
         if resp.status_code == 200:
             soup = BeautifulSoup(resp.text, 'html.parser')
             # Buscar todos los <strong> que contengan un número con coma decimal
@@ -69,7 +65,7 @@ def obtener_tasa_euro():
 def obtener_tasas_monitor_dolar():
     """Obtiene las tasas desde Monitor Dólar."""
     try:
-        r = requests.get('https://s3.amazonaws.com/dolartoday/data.json', timeout=5)
+        r = cliente_http.get('https://s3.amazonaws.com/dolartoday/data.json')
         data = r.json()
         return {
             'tasa_bcv': float(data['USD']['bcv']) if 'USD' in data and 'bcv' in data['USD'] else None,
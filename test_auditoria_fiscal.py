@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar el log de auditoría fiscal encadenado
+
+Comprueba que:
+- el escritor encadena las líneas por lotes y la verificación las acepta
+- las líneas heredadas (sin PREV) solo se aceptan antes de la primera encadenada
+- alterar, eliminar o truncar entradas rompe la cadena o la ancla
+- quitar el PREV de una línea encadenada y editar su texto se detecta
+"""
+
+import os
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from auditoria_fiscal import EscritorAuditoria, SEPARADOR_PREV, SEPARADOR_HASH, verificar_cadena
+
+
+def escribir_log(archivo, entradas=20, heredadas=0):
+    if heredadas:
+        os.makedirs(os.path.dirname(archivo), exist_ok=True)
+        with open(archivo, 'w', encoding='utf-8') as f:
+            for i in range(heredadas):
+                f.write(f"[2024-01-01T00:00:0{i}] USUARIO:admin | ACCION:LEGADO | DETALLES:{i} | HASH:{'a' * 64}\n")
+    escritor = EscritorAuditoria(archivo, politica_fsync='nunca', tamano_lote=7)
+    for i in range(entradas):
+        escritor.registrar(f"[2025-01-01T00:00:00] USUARIO:admin | ACCION:CREAR_FACTURA | DOC_NUM:{i:08d} | DETALLES:monto {i}")
+    escritor.cerrar()
+
+
+def leer(archivo):
+    with open(archivo, encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def guardar(archivo, lineas):
+    with open(archivo, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lineas) + '\n')
+
+
+def test_cadena():
+    print("🧪 PROBANDO LOG DE AUDITORÍA ENCADENADO")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory(prefix='auditoria_fiscal_') as directorio:
+        archivo = os.path.join(directorio, 'logs', 'auditoria_fiscal.log')
+        escribir_log(archivo, entradas=20, heredadas=3)
+        resultado = verificar_cadena(archivo)
+        assert resultado['valido'] and resultado['ancla'] == 'coincide', resultado
+        assert resultado['lineas_heredadas'] == 3 and resultado['lineas_encadenadas'] == 20
+        print("✅ 20 líneas encadenadas tras 3 heredadas; ancla coincide")
+
+        originales = leer(archivo)
+
+        lineas = list(originales)
+        lineas[10] = lineas[10].replace('monto 7', 'monto 7000')
+        guardar(archivo, lineas)
+        assert any('línea alterada' in e for e in verificar_cadena(archivo)['errores'])
+        print("✅ Línea alterada detectada")
+
+        guardar(archivo, originales[:10] + originales[11:])
+        assert any('PREV no coincide' in e for e in verificar_cadena(archivo)['errores'])
+        print("✅ Línea eliminada detectada")
+
+        guardar(archivo, originales[:-2])
+        resultado = verificar_cadena(archivo)
+        assert not resultado['valido'] and resultado['ancla'] == 'no_encontrada'
+        print("✅ Truncamiento detectado por la ancla")
+
+        # Quitar PREV y editar el texto conservando el HASH: la línea siguiente
+        # sigue encadenando con ese HASH, así que solo la regla de líneas
+        # heredadas puede detectarlo
+        lineas = list(originales)
+        linea = lineas[10]
+        base, hash_linea = linea.rsplit(SEPARADOR_HASH, 1)
+        texto = base.rsplit(SEPARADOR_PREV, 1)[0].replace('monto 7', 'monto 7000')
+        lineas[10] = f"{texto}{SEPARADOR_HASH}{hash_linea}"
+        guardar(archivo, lineas)
+        resultado = verificar_cadena(archivo)
+        assert not resultado['valido'], resultado
+        assert resultado['errores'] == ['Línea 11: línea sin encadenar después del inicio de la cadena'], resultado
+        print("✅ PREV eliminado en una línea encadenada detectado")
+
+        guardar(archivo, originales)
+        escribir_log(archivo, entradas=5)
+        resultado = verificar_cadena(archivo)
+        assert resultado['valido'] and resultado['lineas_encadenadas'] == 25, resultado
+        print("✅ Un segundo escritor continúa la cadena existente")
+
+
+if __name__ == '__main__':
+    test_cadena()
+    print("\n🎉 Todas las pruebas del log de auditoría pasaron")
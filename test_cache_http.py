@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar la capa de caché HTTP (compresión, ETags y estáticos con hash)
+
+Comprueba que:
+- url_for('static') lleva el hash del contenido y se sirve como immutable
+- las páginas y las APIs grandes se comprimen con gzip si el navegador lo acepta
+- las respuestas JSON llevan ETag fuerte y devuelven 304, también con el sufijo -gz
+- el HTML para wkhtmltopdf apunta al archivo real, sin el hash en el nombre
+"""
+
+import gzip
+import json
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+
+def test_cache_http():
+    import app as aplicacion
+    from cache_http import cache_http, quitar_hash_estatico
+    from servicio_pdf import rutas_estaticas_locales
+
+    print("🧪 PROBANDO CACHÉ HTTP")
+    print("=" * 60)
+    cliente = aplicacion.app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['usuario'] = 'admin'
+
+    # Estáticos con hash
+    with aplicacion.app.test_request_context('/'):
+        url = aplicacion.url_for('static', filename='logo.png')
+    valor = cache_http.hash_archivo('logo.png')
+    assert url == f'/static/logo.{valor}.png', url
+    assert quitar_hash_estatico(f'logo.{valor}.png') == ('logo.png', valor)
+    respuesta = cliente.get(url)
+    with open(os.path.join(aplicacion.app.static_folder, 'logo.png'), 'rb') as f:
+        assert respuesta.status_code == 200 and respuesta.data == f.read()
+    assert respuesta.cache_control.immutable and respuesta.cache_control.max_age == 365 * 24 * 3600
+    viejo = cliente.get('/static/logo.0123456789.png')
+    assert viejo.status_code == 200 and not viejo.cache_control.immutable and viejo.cache_control.max_age == 0
+    sin_hash = cliente.get('/static/logo.png')
+    assert sin_hash.status_code == 200 and sin_hash.cache_control.max_age == 3600 and sin_hash.get_etag()[0]
+    assert cliente.get('/static/no-existe.0123456789.png').status_code == 404
+    assert cliente.get('/static/%2e%2e/requirements.0123456789.txt').status_code == 404
+    assert not any('requirements' in ruta for ruta in cache_http._hashes), 'no se debe leer fuera de static/'
+    print(f"✅ {url} servido con Cache-Control: {respuesta.headers['Cache-Control']}")
+
+    # Compresión de HTML y JSON
+    pagina = cliente.get('/inventario', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert pagina.headers.get('Content-Encoding') == 'gzip' and 'Accept-Encoding' in pagina.headers['Vary']
+    html = gzip.decompress(pagina.data)
+    assert b'</html>' in html and len(pagina.data) < len(html) / 3
+    assert 'Content-Encoding' not in cliente.get('/inventario').headers
+    print(f"✅ /inventario: {len(html) / 1024:,.0f} KB → {len(pagina.data) / 1024:,.0f} KB con gzip")
+
+    # ETag fuerte y 304 en JSON (con y sin sufijo de compresión)
+    api = cliente.get('/api/buscar-productos?q=cap&limite=50', headers={'Accept-Encoding': 'gzip'})
+    etag, debil = api.get_etag()
+    assert not debil and etag.endswith('-gz') and json.loads(gzip.decompress(api.data))['productos']
+    repetida = cliente.get('/api/buscar-productos?q=cap&limite=50',
+                           headers={'Accept-Encoding': 'gzip', 'If-None-Match': f'"{etag}"'})
+    assert repetida.status_code == 304 and not repetida.data
+    sin_compresion = cliente.get('/api/buscar-productos?q=cap&limite=50', headers={'If-None-Match': f'"{etag}"'})
+    assert sin_compresion.status_code == 304
+    productos = cliente.get('/api/productos', headers={'Accept-Encoding': 'gzip'})
+    assert productos.headers['Content-Encoding'] == 'gzip'
+    assert cliente.get('/api/productos', headers={'Accept-Encoding': 'gzip',
+                                                  'If-None-Match': productos.headers['ETag']}).status_code == 304
+    print("✅ ETag fuerte con sufijo -gz y 304 en /api/buscar-productos y /api/productos")
+
+    # HTML para wkhtmltopdf: rutas locales sin hash
+    local = rutas_estaticas_locales(f'<img src="{url}"><link href=\'/static/css/x.css\'>',
+                                    aplicacion.app.static_folder)
+    assert local.endswith("css/x.css'>") and '/static/logo.png"' in local and local.startswith('<img src="file://')
+    print("✅ Rutas locales para wkhtmltopdf sin el hash del nombre")
+
+
+if __name__ == '__main__':
+    test_cache_http()
+    print("\n🎉 Todas las pruebas de caché HTTP pasaron")
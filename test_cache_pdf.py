@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar la caché de PDF del servicio de PDF
+
+No necesita wkhtmltopdf: se reemplaza el renderizado por un generador falso
+que cuenta las llamadas. Comprueba que:
+- la segunda descarga del mismo documento sale de disco sin renderizar
+- la clave cambia si cambia el contenido o el perfil
+- al superar el tamaño máximo se eliminan los PDF usados hace más tiempo
+- respuesta_pdf devuelve 304 con If-None-Match sin generar el PDF
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from servicio_pdf import CachePDF, ServicioPDF
+
+
+class ServicioPDFFalso(ServicioPDF):
+    """Genera un 'PDF' de tamaño fijo sin llamar a wkhtmltopdf"""
+
+    renderizados = 0
+
+    def _renderizar_sin_cache(self, html, tipo, opciones_extra, timeout):
+        ServicioPDFFalso.renderizados += 1
+        time.sleep(0.05)
+        return b'%PDF-1.4\n' + html.encode('utf-8').ljust(1024, b' ')
+
+
+def test_cache_pdf():
+    with tempfile.TemporaryDirectory(prefix='cache_pdf_') as directorio:
+        print("🧪 PROBANDO CACHÉ DE PDF")
+        print("=" * 60)
+
+        servicio = ServicioPDFFalso(cache=CachePDF(directorio, max_bytes=10 * 1024))
+        inicio = time.perf_counter()
+        pdf1 = servicio.renderizar('<h1>Cotización 1</h1>', 'cotizacion')
+        primera = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        pdf2 = servicio.renderizar('<h1>Cotización 1</h1>', 'cotizacion')
+        segunda = time.perf_counter() - inicio
+        assert pdf1 == pdf2 and ServicioPDFFalso.renderizados == 1
+        print(f"✅ Segunda descarga desde disco: {primera * 1000:.1f} ms → {segunda * 1000:.2f} ms")
+
+        base = servicio.clave_documento('cotizacion', '<h1>A</h1>')
+        assert base == servicio.clave_documento('cotizacion', '<h1>A</h1>')
+        assert base != servicio.clave_documento('cotizacion', '<h1>B</h1>')
+        assert base != servicio.clave_documento('lista_precios', '<h1>A</h1>')
+        assert (servicio.clave_documento('lista_precios', {'a': 1, 'b': 2})
+                == servicio.clave_documento('lista_precios', {'b': 2, 'a': 1}))
+        plantilla = os.path.join(directorio, 'plantilla.html')
+        with open(plantilla, 'w', encoding='utf-8') as f:
+            f.write('<h1>{{ titulo }}</h1>')
+        version = servicio.hash_plantilla(plantilla)
+        os.utime(plantilla, (time.time() + 60, time.time() + 60))
+        assert servicio.hash_plantilla(plantilla) == version
+        with open(plantilla, 'w', encoding='utf-8') as f:
+            f.write('<h2>{{ titulo }}</h2>')
+        assert servicio.hash_plantilla(plantilla) != version
+        print("✅ La clave depende del contenido y del perfil (y de la plantilla por contenido, no por fecha)")
+
+        # 1 KB por PDF y 10 KB de máximo: el primero, usado recién, debe sobrevivir
+        clave_frecuente = servicio.clave_documento('cotizacion', '<h1>Cotización 1</h1>')
+        for i in range(2, 15):
+            servicio.renderizar(f'<h1>Cotización {i}</h1>', 'cotizacion')
+            servicio.renderizar('<h1>Cotización 1</h1>', 'cotizacion')
+            time.sleep(0.01)
+        estadisticas = servicio.cache.obtener_estadisticas()
+        assert estadisticas['bytes'] <= 10 * 1024, estadisticas
+        assert estadisticas['eliminados'] > 0, estadisticas
+        assert servicio.cache.obtener(clave_frecuente) is not None
+        assert servicio.cache.obtener(servicio.clave_documento('cotizacion', '<h1>Cotización 2</h1>')) is None
+        print(f"✅ Recorte LRU: {estadisticas['archivos']} PDF, {estadisticas['bytes']} bytes, "
+              f"{estadisticas['eliminados']} eliminados")
+
+
+def test_etag():
+    import app as aplicacion
+
+    with tempfile.TemporaryDirectory(prefix='cache_pdf_') as directorio:
+        object.__setattr__(aplicacion.servicio_pdf, '_instancia', ServicioPDFFalso(cache=CachePDF(directorio)))
+        antes = ServicioPDFFalso.renderizados
+        clave = aplicacion.servicio_pdf.clave_documento('cotizacion', '<h1>ETag</h1>')
+
+        with aplicacion.app.test_request_context('/'):
+            respuesta = aplicacion.respuesta_pdf(clave, 'x.pdf', lambda: aplicacion.servicio_pdf.obtener_o_renderizar(
+                clave, 'cotizacion', lambda: '<h1>ETag</h1>'))
+        assert respuesta.status_code == 200 and respuesta.headers['ETag'] == f'"{clave}"'
+
+        with aplicacion.app.test_request_context('/', headers={'If-None-Match': f'"{clave}"'}):
+            respuesta = aplicacion.respuesta_pdf(clave, 'x.pdf',
+                                                 lambda: (_ for _ in ()).throw(AssertionError('no debe generar')))
+        assert respuesta.status_code == 304
+        assert ServicioPDFFalso.renderizados == antes + 1
+        print("✅ ETag en la respuesta y 304 con If-None-Match sin generar el PDF")
+
+
+if __name__ == '__main__':
+    test_cache_pdf()
+    test_etag()
+    print("\n🎉 Todas las pruebas de la caché de PDF pasaron")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar el cliente HTTP compartido contra un servidor local
+
+Comprueba que:
+- las solicitudes a un host reutilizan su sesión y una sola conexión TCP
+- configurar_host descarta la sesión y la siguiente toma la nueva configuración
+- las métricas por host cuentan solicitudes, códigos, errores y latencia
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from cliente_http import ClienteHTTP
+
+
+class ManejadorPrueba(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive: la conexión se reutiliza
+    puertos_cliente = set()
+
+    def do_GET(self):
+        ManejadorPrueba.puertos_cliente.add(self.client_address[1])
+        codigo = 503 if self.path == '/falla' else 200
+        cuerpo = b'{"ok": true}'
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_cliente_http():
+    print("🧪 PROBANDO CLIENTE HTTP COMPARTIDO")
+    print("=" * 60)
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), ManejadorPrueba)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{servidor.server_port}'
+    host = f'127.0.0.1:{servidor.server_port}'
+    try:
+        cliente = ClienteHTTP({host: {'reintentos': 0, 'timeout': 5}})
+
+        sesion = cliente.sesion(base)
+        for _ in range(5):
+            assert cliente.get(f'{base}/ok').status_code == 200
+        assert cliente.sesion(base) is sesion
+        assert len(ManejadorPrueba.puertos_cliente) == 1, ManejadorPrueba.puertos_cliente
+        print("✅ 5 solicitudes con la misma sesión y una sola conexión TCP")
+
+        assert cliente.get(f'{base}/falla').status_code == 503
+        try:
+            cliente.get('http://127.0.0.1:1/cerrado', timeout=1)
+            raise AssertionError('se esperaba un error de conexión')
+        except Exception as e:
+            assert type(e).__name__ == 'ConnectionError', e
+
+        metricas = cliente.obtener_metricas()
+        local = metricas[host]
+        assert local['solicitudes'] == 6
+        assert local['codigos'] == {'200': 5, '503': 1}
+        assert local['errores'] == {'HTTP_503': 1}
+        assert sum(local['histograma_ms'].values()) == 6
+        assert 0 < local['latencia_promedio_ms'] <= local['latencia_maxima_ms']
+        assert metricas['127.0.0.1:1']['errores'] == {'ConnectionError': 1}
+        print("✅ Métricas por host: solicitudes, códigos, errores e histograma")
+
+        cliente.configurar_host(base, headers={'X-Prueba': '1'})
+        nueva = cliente.sesion(base)
+        assert nueva is not sesion and nueva.headers['X-Prueba'] == '1'
+        cliente.configurar_host(base, headers={'X-Prueba': '1'})
+        assert cliente.sesion(base) is nueva
+        print("✅ configurar_host renueva la sesión solo si la configuración cambia")
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    test_cliente_http()
+    print("\n🎉 Todas las pruebas del cliente HTTP pasaron")
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar la cola de envío SENIAT contra un servidor SENIAT falso
+
+Levanta un servidor HTTP local que simula la API del SENIAT (responde 503
+a las dos primeras peticiones de cada documento, luego acepta y responde
+409 a duplicados) y comprueba que:
+- encolar no hace llamadas de red
+- los reintentos terminan enviando el documento
+- encolar dos veces el mismo número no lo envía dos veces
+- la clave de idempotencia viaja en el encabezado Idempotency-Key
+- un error de validación no se reintenta
+- un documento fallido vuelve a la cola al encolarlo de nuevo o con reencolar_fallidos
+- una excepción al enviar un documento no detiene la ronda: se reprograma y
+  queda fallido al agotar los intentos
+- la caché de estatus se llena con los envíos y la conciliación masiva, y
+  una consulta que lanza una excepción no corta la conciliación
+- todo lo anterior funciona sin Flask (la cola corre en scripts y workers sin la app)
+- enviar_lote cuenta los duplicados como enviados y un corte de conexión como fallido
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+# Cualquier 'import flask' de la cola o sus dependencias falla con ImportError
+sys.modules['flask'] = None
+
+
+class SeniatFalso(BaseHTTPRequestHandler):
+    """Simula los endpoints de documentos del SENIAT"""
+
+    fallos_por_documento = 2
+    peticiones = []
+    recibidos = {}
+    consultas = 0
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, codigo, datos):
+        cuerpo = json.dumps(datos).encode('utf-8')
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        if self.path.startswith('/consultas/documento'):
+            SeniatFalso.consultas += 1
+            return self._responder(200, {'estatus': 'PROCESADO'})
+        self._responder(200, {'estado': 'ok'})
+
+    def do_POST(self):
+        largo = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(largo))
+        clave = self.headers.get('Idempotency-Key')
+        SeniatFalso.peticiones.append(clave)
+
+        if payload['documento'].get('numero') == 'FAC-CORTE':
+            self.close_connection = True  # Se corta la conexión sin responder
+            return
+        if SeniatFalso.peticiones.count(clave) <= self.fallos_por_documento:
+            return self._responder(503, {'mensaje': 'Servicio no disponible'})
+        if not payload['documento'].get('fecha'):
+            return self._responder(400, {'mensaje': 'Fecha requerida'})
+        if clave in SeniatFalso.recibidos:
+            return self._responder(409, {'mensaje': 'Documento duplicado'})
+
+        SeniatFalso.recibidos[clave] = payload
+        self._responder(200, {'id_seniat': f'S-{len(SeniatFalso.recibidos)}', 'codigo_control': 'OK'})
+
+
+def esperar(condicion, segundos=10):
+    limite = time.time() + segundos
+    while time.time() < limite:
+        if condicion():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_cola_con_servidor_falso():
+    """Envía documentos a través de la cola contra el SENIAT falso"""
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), SeniatFalso)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    directorio_original = os.getcwd()
+    os.environ.setdefault('SENIAT_CLAVE_MAESTRA', 'clave-prueba-cola')
+
+    with tempfile.TemporaryDirectory(prefix='prueba_cola_seniat_') as directorio:
+        os.chdir(directorio)
+        try:
+            from comunicacion_seniat import ComunicacionSENIAT
+            from cola_seniat import ColaEnvioSENIAT
+
+            config = ComunicacionSENIAT()._cargar_configuracion_default()
+            config['url_base'] = f'http://127.0.0.1:{servidor.server_port}/'
+            config['timeout_conexion'] = 5
+            comunicador = ComunicacionSENIAT(config)
+            cola = ColaEnvioSENIAT('cola.db', comunicador, espera_base=0.05, espera_maxima=0.2)
+
+            print("🧪 PROBANDO COLA DE ENVÍO SENIAT")
+            print("=" * 60)
+
+            factura = {'numero': 'FAC-00000001', 'fecha': '2025-08-01', 'total_usd': 10}
+            inicio = time.perf_counter()
+            r1 = cola.encolar(factura, 'FACTURA', 'prueba', iniciar_trabajador=False)
+            r2 = cola.encolar(factura, 'FACTURA', 'prueba', iniciar_trabajador=False)
+            duracion_encolar = time.perf_counter() - inicio
+            assert r1['encolado'] and r2['duplicado']
+            assert not SeniatFalso.peticiones, 'encolar no debe llamar al SENIAT'
+            print(f"✅ Encolado sin red en {duracion_encolar * 1000:.1f} ms (duplicado ignorado)")
+
+            cola.encolar({'numero': 'FAC-00000002', 'fecha': ''}, 'FACTURA', 'prueba', iniciar_trabajador=False)
+            cola.iniciar_trabajador()
+            listo = esperar(lambda: cola.obtener_estadisticas()['por_estado']['pendiente'] == 0
+                            and cola.obtener_estadisticas()['por_estado']['enviando'] == 0)
+            cola.detener_trabajador()
+            assert listo, 'la cola no terminó de procesar'
+
+            envio = cola.obtener_envio('FACTURA', 'FAC-00000001')
+            assert envio['estado'] == 'enviado', envio
+            assert envio['intentos'] == 3, envio  # dos 503 y luego éxito
+            assert list(SeniatFalso.recibidos) == ['FACTURA:FAC-00000001']
+            print(f"✅ Factura enviada tras {envio['intentos']} intentos con retroceso")
+
+            invalida = cola.obtener_envio('FACTURA', 'FAC-00000002')
+            assert invalida['estado'] == 'fallido' and invalida['intentos'] == 3, invalida
+            print("✅ Error de validación marcado como fallido sin más reintentos")
+
+            assert cola.reencolar_fallidos('FACTURA', 'FAC-00000002') == 1
+            reencolada = cola.obtener_envio('FACTURA', 'FAC-00000002')
+            assert reencolada['estado'] == 'pendiente' and reencolada['intentos'] == 0, reencolada
+            assert cola.reencolar_fallidos() == 0
+            assert cola.procesar_pendientes()['fallidos'] == 1
+            r3 = cola.encolar({'numero': 'FAC-00000002', 'fecha': '2025-08-02'}, 'FACTURA', 'prueba',
+                              iniciar_trabajador=False)
+            assert r3['encolado'] and r3['reencolado'], r3
+            assert cola.procesar_pendientes()['enviados'] == 1
+            assert cola.obtener_envio('FACTURA', 'FAC-00000002')['estado'] == 'enviado'
+            print("✅ Documento fallido reencolado con reencolar_fallidos y al encolarlo corregido")
+
+            # Reencolar un documento ya enviado no genera otra petición
+            antes = len(SeniatFalso.peticiones)
+            assert cola.encolar(factura, 'FACTURA', 'prueba', iniciar_trabajador=False)['duplicado']
+            assert cola.procesar_pendientes() == {'enviados': 0, 'reprogramados': 0, 'fallidos': 0}
+            assert len(SeniatFalso.peticiones) == antes
+            print("✅ Idempotencia por número verificada")
+
+            class ComunicadorRoto:
+                def enviar_documento_una_vez(self, documento, tipo, usuario, clave_idempotencia=None):
+                    if documento['numero'] == 'FAC-00000003':
+                        raise RuntimeError('falla interna')
+                    return {'exito': True}
+
+            cola_errores = ColaEnvioSENIAT('cola_errores.db', ComunicadorRoto(), max_intentos=2,
+                                           espera_base=0.01, espera_maxima=0.01)
+            for numero in ('FAC-00000003', 'FAC-00000004'):
+                cola_errores.encolar({'numero': numero, 'fecha': '2025-08-01'}, 'FACTURA', 'prueba',
+                                     iniciar_trabajador=False)
+            assert cola_errores.procesar_pendientes() == {'enviados': 1, 'reprogramados': 1, 'fallidos': 0}
+            time.sleep(0.05)
+            assert cola_errores.procesar_pendientes() == {'enviados': 0, 'reprogramados': 0, 'fallidos': 1}
+            roto = cola_errores.obtener_envio('FACTURA', 'FAC-00000003')
+            assert roto['estado'] == 'fallido' and roto['intentos'] == 2 and 'falla interna' in roto['ultimo_error'], roto
+            print("✅ Excepción al enviar: reprogramado y luego fallido sin bloquear la ronda")
+
+            from estatus_seniat import CacheEstatusSENIAT
+            cache = CacheEstatusSENIAT('cola.db', comunicador, ttl=60)
+            assert cache.obtener('FAC-00000001')['estatus'] == 'RECIBIDO'
+            numeros = ['FAC-00000001'] + [f'FAC-{i:08d}' for i in range(100, 120)]
+            resumen = cache.conciliar('FACTURA', numeros, concurrencia=4)
+            assert resumen['consultados'] == 20 and resumen['actualizados'] == 20, resumen
+            assert cache.conciliar('FACTURA', numeros)['consultados'] == 0
+            assert SeniatFalso.consultas == 20
+            assert cache.obtener('FAC-00000105')['estatus'] == 'PROCESADO'
+            print("✅ Caché de estatus: envíos registrados y conciliación solo de vencidos")
+
+            class ConsultorRoto:
+                def consultar_documento(self, numero, tipo):
+                    if numero == 'FAC-00000202':
+                        raise RuntimeError('respuesta ilegible')
+                    return {'estatus': 'PROCESADO'}
+
+            cache_rota = CacheEstatusSENIAT('estatus_errores.db', ConsultorRoto(), ttl=60)
+            numeros = [f'FAC-{i:08d}' for i in range(200, 206)]
+            resumen = cache_rota.conciliar('FACTURA', numeros, concurrencia=3)
+            assert resumen['actualizados'] == 5 and resumen['errores'] == 1, resumen
+            fallido = cache_rota.obtener('FAC-00000202')
+            assert not fallido['vigente'] and 'respuesta ilegible' in fallido['ultimo_error'], fallido
+            print("✅ Una consulta con excepción no corta la conciliación masiva")
+        finally:
+            os.chdir(directorio_original)
+            servidor.shutdown()
+
+
+class SeniatSinFallos(SeniatFalso):
+    """El SENIAT falso sin los 503 iniciales: acepta cada documento al primer intento"""
+
+    fallos_por_documento = 0
+
+
+def test_enviar_lote():
+    """Envía un lote con un documento nuevo, uno duplicado y un corte de conexión"""
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), SeniatSinFallos)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    directorio_original = os.getcwd()
+    os.environ.setdefault('SENIAT_CLAVE_MAESTRA', 'clave-prueba-cola')
+
+    from seguridad_fiscal import seguridad_fiscal
+
+    with tempfile.TemporaryDirectory(prefix='prueba_lote_seniat_') as directorio:
+        os.chdir(directorio)
+        try:
+            from comunicacion_seniat import ComunicacionSENIAT
+
+            config = ComunicacionSENIAT()._cargar_configuracion_default()
+            config['url_base'] = f'http://127.0.0.1:{servidor.server_port}/'
+            config['timeout_conexion'] = 5
+            comunicador = ComunicacionSENIAT(config)
+
+            previo = comunicador.enviar_lote([{'numero': 'FAC-00000300', 'fecha': '2025-08-01'}])
+            assert previo['exito'] and previo['enviados'] == 1 and previo['duplicados'] == 0, previo
+
+            lote = [{'numero': 'FAC-00000301', 'fecha': '2025-08-01'},
+                    {'numero': 'FAC-00000300', 'fecha': '2025-08-01'},
+                    {'numero': 'FAC-CORTE', 'fecha': '2025-08-01'}]
+            resumen = comunicador.enviar_lote(lote, concurrencia=3)
+            assert resumen['enviados'] == 2 and resumen['duplicados'] == 1, resumen
+            assert resumen['fallidos'] == 1 and not resumen['exito'], resumen
+            resultados = resumen['resultados']
+            assert resultados['FAC-00000301']['exito']
+            assert resultados['FAC-00000300']['codigo_error'] == 'DOCUMENTO_DUPLICADO'
+            assert resultados['FAC-CORTE']['codigo_error'] == 'COMUNICACION_ERROR', resultados['FAC-CORTE']
+            print("✅ Lote: nuevo enviado, duplicado contado como enviado, corte de conexión fallido")
+        finally:
+            # El log de auditoría usa rutas relativas: vaciarlo antes de volver al directorio original
+            if seguridad_fiscal.esta_inicializada():
+                seguridad_fiscal.vaciar_log_auditoria()
+            os.chdir(directorio_original)
+            servidor.shutdown()
+
+
+if __name__ == '__main__':
+    test_cola_con_servidor_falso()
+    test_enviar_lote()
+    print("\n🎉 Todas las pruebas de la cola SENIAT pasaron")
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar el generador de datos sintéticos
+
+Comprueba que:
+- con la misma semilla los archivos son idénticos y con otra cambian
+- los registros siguen el esquema actual (pagos coherentes con el saldo, numeración continua)
+- el log de auditoría generado pasa la verificación de la cadena de hashes
+- la aplicación carga y muestra los datos generados
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from auditoria_fiscal import verificar_cadena
+from datos_sinteticos import GeneradorDatos
+
+
+def test_generador():
+    print("🧪 PROBANDO GENERADOR DE DATOS SINTÉTICOS")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory(prefix='datos_sinteticos_') as directorio:
+        a = GeneradorDatos(facturas=500, semilla=7).generar(os.path.join(directorio, 'a'))
+        b = GeneradorDatos(facturas=500, semilla=7).generar(os.path.join(directorio, 'b'))
+        c = GeneradorDatos(facturas=500, semilla=8).generar(os.path.join(directorio, 'c'))
+        assert a['huella'] == b['huella'] and a['huella'] != c['huella']
+        print(f"✅ Determinista: huella {a['huella'][:16]} con la semilla 7 (otra con la semilla 8)")
+
+        with open(os.path.join(directorio, 'a', 'facturas_json', 'facturas.json'), encoding='utf-8') as f:
+            facturas = list(json.load(f).values())
+        with open(os.path.join(directorio, 'a', 'clientes.json'), encoding='utf-8') as f:
+            clientes = json.load(f)
+        assert len(facturas) == 500 and [f['numero_secuencial'] for f in facturas] == list(range(1, 501))
+        assert all(f['fecha'] <= '2025-08-31' and f['cliente_id'] in clientes for f in facturas)
+        for factura in facturas:
+            abonado = round(sum(p['monto'] for p in factura['pagos']), 2)
+            assert abonado == factura['total_abonado']
+            assert round(factura['total_usd'] - abonado, 2) == factura['saldo_pendiente']
+            assert (factura['estado'] == 'pagada') == (factura['saldo_pendiente'] == 0)
+        estados = {estado: sum(f['estado'] == estado for f in facturas) for estado in ('pagada', 'abonada', 'pendiente')}
+        assert all(estados.values()), estados
+        print(f"✅ Esquema y saldos coherentes: {estados}")
+
+        verificacion = verificar_cadena(os.path.join(directorio, 'a', 'logs', 'auditoria_fiscal.log'))
+        assert verificacion['valido'] and verificacion['ancla'] == 'coincide', verificacion
+        print(f"✅ Cadena de auditoría íntegra ({verificacion['lineas_encadenadas']} líneas)")
+
+
+def test_app():
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='datos_sinteticos_app_') as directorio:
+        for nombre in ('empresa.json', 'usuarios.json', 'config.json'):
+            with open(os.path.join(BASE_DIR, nombre), 'rb') as origen, open(os.path.join(directorio, nombre), 'wb') as destino:
+                destino.write(origen.read())
+        GeneradorDatos(facturas=300, semilla=42).generar(directorio)
+        os.chdir(directorio)
+        try:
+            import app as aplicacion
+
+            cliente = aplicacion.app.test_client()
+            with cliente.session_transaction() as sesion:
+                sesion['usuario'] = 'admin'
+            for ruta in ('/facturas', '/cuentas-por-cobrar', '/clientes', '/inventario', '/notas-entrega',
+                         '/cotizaciones', '/api/productos', '/api/buscar-clientes?q=a'):
+                respuesta = cliente.get(ruta)
+                assert respuesta.status_code == 200, (ruta, respuesta.status_code)
+            assert b'FAC-00000300' in cliente.get('/facturas').data
+            assert cliente.get('/cotizaciones').data.count(b'/cotizaciones/0') >= 15
+            print("✅ La aplicación carga y muestra los datos sintéticos")
+        finally:
+            os.chdir(directorio_original)
+
+
+if __name__ == '__main__':
+    test_generador()
+    test_app()
+    print("\n🎉 Todas las pruebas del generador de datos sintéticos pasaron")
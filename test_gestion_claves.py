@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar la carga de la clave maestra y la caché de la clave derivada
+
+Comprueba que:
+- la clave maestra se toma de SENIAT_CLAVE_MAESTRA antes que del archivo
+- sin clave configurada se genera clave_maestra.key (0600) una sola vez
+- la clave derivada se guarda en disco (0600) y otro proceso la reutiliza sin derivar
+- la caché se descarta si cambia la clave maestra o los parámetros KDF
+"""
+
+import json
+import os
+import stat
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from gestion_claves import GestorClavesFiscales, VARIABLE_ARCHIVO_CLAVE, VARIABLE_CLAVE
+
+CLAVE_PRUEBA = 'clave-de-prueba-para-gestion-de-claves-0123456789'
+
+
+def gestor_contando(directorio):
+    """Gestor nuevo (como en otro proceso) que cuenta sus derivaciones PBKDF2"""
+    gestor = GestorClavesFiscales(directorio)
+    gestor.derivaciones = 0
+    derivar = gestor._derivar
+
+    def derivar_contando(clave_maestra):
+        gestor.derivaciones += 1
+        return derivar(clave_maestra)
+
+    gestor._derivar = derivar_contando
+    return gestor
+
+
+def permisos(ruta):
+    return stat.S_IMODE(os.stat(ruta).st_mode)
+
+
+def test_clave_maestra():
+    with tempfile.TemporaryDirectory(prefix='gestion_claves_') as directorio:
+        _clave_maestra(directorio)
+
+
+def test_cache_derivada():
+    with tempfile.TemporaryDirectory(prefix='gestion_claves_') as directorio:
+        _cache_derivada(directorio)
+
+
+def _clave_maestra(directorio):
+    os.environ[VARIABLE_CLAVE] = CLAVE_PRUEBA
+    gestor = GestorClavesFiscales(directorio)
+    assert gestor.cargar_clave_maestra() == CLAVE_PRUEBA
+    assert not os.path.exists(gestor.archivo_clave)
+    print("✅ Clave maestra tomada de SENIAT_CLAVE_MAESTRA sin crear archivo")
+
+    del os.environ[VARIABLE_CLAVE]
+    clave = gestor.cargar_clave_maestra()
+    assert clave and permisos(gestor.archivo_clave) == 0o600
+    assert GestorClavesFiscales(directorio).cargar_clave_maestra() == clave
+    print("✅ Sin configuración se genera clave_maestra.key (0600) y se reutiliza")
+
+    archivo = os.path.join(directorio, 'otra.key')
+    with open(archivo, 'w', encoding='utf-8') as f:
+        f.write('clave-desde-archivo\n')
+    os.environ[VARIABLE_ARCHIVO_CLAVE] = archivo
+    try:
+        assert GestorClavesFiscales(directorio).cargar_clave_maestra() == 'clave-desde-archivo'
+    finally:
+        del os.environ[VARIABLE_ARCHIVO_CLAVE]
+    print("✅ SENIAT_CLAVE_MAESTRA_ARCHIVO apunta a otro archivo de clave")
+
+
+def _cache_derivada(directorio):
+    gestor = gestor_contando(directorio)
+    clave = gestor.obtener_clave_cifrado(CLAVE_PRUEBA)
+    assert gestor.obtener_clave_cifrado(CLAVE_PRUEBA) == clave
+    assert gestor.derivaciones == 1
+    assert permisos(gestor.archivo_cache) == 0o600
+    with open(gestor.archivo_cache, encoding='utf-8') as f:
+        registro = json.load(f)
+    assert CLAVE_PRUEBA not in json.dumps(registro)
+    assert registro['kdf'] == gestor.parametros_kdf()
+    print("✅ Una sola derivación; caché en disco (0600) sin la clave maestra")
+
+    otro = gestor_contando(directorio)
+    assert otro.obtener_clave_cifrado(CLAVE_PRUEBA) == clave and otro.derivaciones == 0
+    print("✅ Un proceso nuevo reutiliza la clave derivada sin PBKDF2")
+
+    otro = gestor_contando(directorio)
+    assert otro.obtener_clave_cifrado(CLAVE_PRUEBA + '-nueva') != clave and otro.derivaciones == 1
+    print("✅ Otra clave maestra invalida la caché")
+
+    otro = gestor_contando(directorio)
+    assert otro.obtener_clave_cifrado(CLAVE_PRUEBA) == clave and otro.derivaciones == 1
+    registro = dict(registro, kdf=dict(registro['kdf'], iteraciones=1000))
+    with open(otro.archivo_cache, 'w', encoding='utf-8') as f:
+        json.dump(registro, f)
+    otro = gestor_contando(directorio)
+    assert otro.obtener_clave_cifrado(CLAVE_PRUEBA) == clave and otro.derivaciones == 1
+    print("✅ Parámetros KDF distintos en disco obligan a derivar de nuevo")
+
+
+if __name__ == '__main__':
+    print("🧪 PROBANDO GESTIÓN DE CLAVES FISCALES")
+    print("=" * 60)
+    test_clave_maestra()
+    test_cache_derivada()
+    print("\n🎉 Todas las pruebas de gestión de claves pasaron")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar los derivados de imágenes de productos
+
+Comprueba que:
+- sin derivados, el helper devuelve la imagen original
+- se generan miniatura y mediana (y WebP si Pillow lo soporta) sin exceder el tamaño
+- el backfill en pool de procesos omite las imágenes ya al día
+- eliminar_derivados deja al helper apuntando otra vez al original
+"""
+
+import os
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import imagenes_productos
+from imagenes_productos import (generar_derivados, generar_todos, eliminar_derivados, imagen_producto,
+                                TAMANOS_DERIVADOS)
+
+
+def test_derivados():
+    print("🧪 PROBANDO DERIVADOS DE IMÁGENES")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory(prefix='imagenes_') as directorio_static:
+        os.makedirs(os.path.join(directorio_static, 'imagenes_productos'))
+        ruta = 'imagenes_productos/producto_1.jpg'
+        assert imagen_producto(ruta, 'miniatura', directorio_static=directorio_static) == ruta
+        assert imagen_producto(ruta, 'mediana', webp=True, directorio_static=directorio_static) is None
+        print("✅ Sin derivados se usa el original")
+
+        try:
+            from PIL import Image
+        except ImportError:
+            print("⚠️ Pillow no está instalado: se omite la generación")
+            return
+
+        Image.new('RGB', (3000, 2000), (200, 30, 30)).save(os.path.join(directorio_static, ruta), quality=95)
+        Image.new('RGBA', (800, 800), (0, 0, 0, 0)).save(
+            os.path.join(directorio_static, 'imagenes_productos/producto_2.png'))
+
+        resultado = generar_derivados(ruta, directorio_static=directorio_static)
+        assert 'error' not in resultado, resultado
+        for tamano, lado in TAMANOS_DERIVADOS.items():
+            relativa = imagen_producto(ruta, tamano, directorio_static=directorio_static)
+            assert relativa.endswith(f'_{tamano}.jpg'), relativa
+            with Image.open(os.path.join(directorio_static, relativa)) as derivado:
+                assert max(derivado.size) == lado, derivado.size
+        print(f"✅ Derivados generados: {resultado['bytes_original'] / 1024:.0f} KB → "
+              f"{resultado['bytes_derivados'] / 1024:.0f} KB en total "
+              f"({'con' if imagenes_productos._webp_habilitado() else 'sin'} WebP)")
+
+        resumen = generar_todos(procesos=2, directorio_static=directorio_static)
+        assert resumen['imagenes'] == 2 and resumen['generadas'] == 1 and resumen['al_dia'] == 1, resumen
+        assert imagen_producto('imagenes_productos/producto_2.png', 'miniatura',
+                               directorio_static=directorio_static).endswith('_miniatura.png')
+        print("✅ Backfill: solo genera lo que falta y mantiene PNG con transparencia")
+
+        assert eliminar_derivados(ruta, directorio_static=directorio_static) >= 2
+        assert imagen_producto(ruta, 'mediana', directorio_static=directorio_static) == ruta
+        print("✅ Derivados eliminados")
+
+
+if __name__ == '__main__':
+    test_derivados()
+    print("\n🎉 Todas las pruebas de imágenes pasaron")
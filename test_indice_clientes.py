@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar el índice de búsqueda de clientes
+
+Comprueba que:
+- la búsqueda ignora acentos y encuentra por RIF o teléfono parciales
+- las altas, ediciones y bajas se reflejan sin reconstruir el índice
+- si otro worker escribió antes del guardado, el índice se reconstruye y no pierde su cambio
+- el índice se reconstruye si clientes.json cambia por otra vía
+- con 50.000 clientes la búsqueda tarda menos de 1 ms (vs. el recorrido lineal)
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from indice_clientes import IndiceClientes
+
+NOMBRES = ['José', 'María', 'Alicia', 'Luis', 'Ramón', 'Andrés', 'Carmen', 'Pedro', 'Ana', 'Jesús', 'Rosa', 'Óscar']
+APELLIDOS = ['Pérez', 'González', 'Rodríguez', 'Martínez', 'López', 'Hernández', 'Díaz', 'Muñoz', 'Lugo', 'Suárez']
+
+
+def guardar(archivo, clientes):
+    with open(archivo, 'w', encoding='utf-8') as f:
+        json.dump(clientes, f, ensure_ascii=False)
+
+
+def clientes_sinteticos(cantidad, semilla=7):
+    aleatorio = random.Random(semilla)
+    clientes = {}
+    for i in range(cantidad):
+        rif = f"{aleatorio.choice('VEJG')}-{10000000 + i}"
+        clientes[rif] = {
+            'nombre': f'{aleatorio.choice(NOMBRES)} {aleatorio.choice(APELLIDOS)} {aleatorio.choice(APELLIDOS)}',
+            'rif': rif,
+            'email': f'cliente{i}@ejemplo.com',
+            'telefono': f'+58 {aleatorio.choice(["412", "414", "424", "212"])}-{aleatorio.randint(1000000, 9999999)}'
+        }
+    return clientes
+
+
+def busqueda_lineal(clientes, q):
+    """Búsqueda anterior de /api/buscar-clientes (recorre todos los clientes)"""
+    resultados = []
+    q_lower = q.lower()
+    for id_cliente, cliente in clientes.items():
+        nombre_cliente = cliente.get('nombre', '').lower()
+        rif_cliente = cliente.get('rif', '').lower()
+        palabras_busqueda = q_lower.split()
+        if (q_lower in nombre_cliente or q_lower in rif_cliente
+                or all(p in nombre_cliente for p in palabras_busqueda)
+                or all(p in rif_cliente for p in palabras_busqueda)):
+            resultados.append(id_cliente)
+    return resultados[:10]
+
+
+def test_busqueda():
+    with tempfile.TemporaryDirectory(prefix='indice_clientes_') as directorio:
+        print("🧪 PROBANDO ÍNDICE DE CLIENTES")
+        print("=" * 60)
+        archivo = os.path.join(directorio, 'clientes.json')
+        guardar(archivo, {
+            'V-13058545': {'nombre': 'José Ramón Pérez', 'rif': 'V-13058545', 'telefono': '+58 414-5551234'},
+            'J-412345670': {'nombre': 'Ferretería Los Andes, C.A.', 'rif': 'J-412345670', 'telefono': '0212-9876543'},
+            'V-20111222': {'nombre': 'Alicia Lugo', 'rif': 'V-20111222', 'telefono': ''},
+        })
+        indice = IndiceClientes(archivo)
+
+        assert indice.buscar_ids('jose') == ['V-13058545']
+        assert indice.buscar_ids('PEREZ ramon') == ['V-13058545']
+        assert indice.buscar_ids('ferreteria andes') == ['J-412345670']
+        assert indice.buscar_ids('alicia lu') == ['V-20111222']
+        print("✅ Nombres sin acentos, en cualquier orden y con palabras parciales")
+
+        assert indice.buscar_ids('13058') == ['V-13058545']
+        assert indice.buscar_ids('v-1305') == ['V-13058545']
+        assert indice.buscar_ids('4123456') == ['J-412345670']
+        assert indice.buscar_ids('0414-555') == ['V-13058545']
+        assert indice.buscar_ids('9876543') == ['J-412345670']
+        assert indice.buscar_ids('andes c a') == ['J-412345670']
+        assert indice.buscar_ids('dro') == []
+        print("✅ RIF y teléfono parciales, con o sin guiones ni código de país")
+
+        resultado = indice.buscar('lugo')[0]
+        assert resultado == {'id': 'V-20111222', 'nombre': 'Alicia Lugo', 'rif': 'V-20111222',
+                             'email': '', 'telefono': ''}, resultado
+
+        # Actualización incremental (firma antes de guardar, como hace app.py)
+        with open(archivo, encoding='utf-8') as f:
+            clientes = json.load(f)
+        construir = indice._construir
+        reconstrucciones = []
+        indice._construir = lambda datos: reconstrucciones.append(1) or construir(datos)
+
+        def guardar_y_parchear(id_cliente, cliente=None):
+            firma = indice.firma_archivo()
+            time.sleep(0.01)
+            if cliente is None:
+                del clientes[id_cliente]
+                guardar(archivo, clientes)
+                indice.eliminar_cliente(id_cliente, firma)
+            else:
+                clientes[id_cliente] = cliente
+                guardar(archivo, clientes)
+                indice.actualizar_cliente(id_cliente, cliente, firma)
+
+        guardar_y_parchear('V-20111222', {'nombre': 'Alicia Lugo de Suárez', 'rif': 'V-20111222'})
+        guardar_y_parchear('V-9000001', {'nombre': 'Óscar Díaz', 'rif': 'V-9000001'})
+        guardar_y_parchear('J-412345670')
+        assert indice.buscar_ids('suarez') == ['V-20111222']
+        assert indice.buscar_ids('oscar') == ['V-9000001']
+        assert indice.buscar_ids('ferreteria') == [] and indice.buscar_ids('4123456') == []
+        assert not reconstrucciones
+        print("✅ Altas, ediciones y bajas reflejadas al instante sin reconstruir")
+
+        # Otro worker agrega un cliente y después este worker edita otro: el
+        # cliente del otro worker debe seguir encontrándose
+        time.sleep(0.01)
+        clientes['V-7000007'] = {'nombre': 'Carmen Hernández', 'rif': 'V-7000007'}
+        guardar(archivo, clientes)
+        guardar_y_parchear('V-9000001', {'nombre': 'Óscar Díaz Muñoz', 'rif': 'V-9000001'})
+        assert indice.buscar_ids('carmen') == ['V-7000007'] and indice.buscar_ids('oscar munoz') == ['V-9000001']
+        assert len(reconstrucciones) == 1
+        print("✅ Un cambio de otro worker antes de guardar invalida el índice en lugar de perderse")
+
+        # Cambio externo (otro worker o importación CSV): se reconstruye
+        time.sleep(0.01)
+        guardar(archivo, {'E-81234567': {'nombre': 'Pedro Muñoz', 'rif': 'E-81234567'}})
+        assert indice.buscar_ids('munoz') == ['E-81234567'] and indice.buscar_ids('jose') == []
+        print("✅ Índice reconstruido al cambiar clientes.json por otra vía")
+
+
+def test_rendimiento(cantidad=50000):
+    with tempfile.TemporaryDirectory(prefix='indice_clientes_') as directorio:
+        archivo = os.path.join(directorio, 'clientes.json')
+        clientes = clientes_sinteticos(cantidad)
+        guardar(archivo, clientes)
+        indice = IndiceClientes(archivo)
+
+        inicio = time.perf_counter()
+        indice.asegurar_actualizado()
+        construccion = time.perf_counter() - inicio
+
+        consultas = ['jo', 'jose', 'maria gonz', 'lopez diaz', 'v-1002', '1004567', '0414', 'carmen mu',
+                     'ramon suarez lugo', 'andres hern', 'xyz']
+        repeticiones = 20
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            for q in consultas:
+                indice.buscar(q, limite=10)
+        por_consulta = (time.perf_counter() - inicio) / (repeticiones * len(consultas))
+
+        inicio = time.perf_counter()
+        for q in consultas:
+            with open(archivo, 'r', encoding='utf-8') as f:
+                busqueda_lineal(json.load(f), q)
+        lineal = (time.perf_counter() - inicio) / len(consultas)
+
+        print(f"📊 {cantidad:,} clientes: índice construido en {construccion:.2f} s; "
+              f"{por_consulta * 1000:.3f} ms por búsqueda vs. {lineal * 1000:.1f} ms leyendo y recorriendo "
+              f"el archivo (x{lineal / por_consulta:,.0f})")
+        assert por_consulta < 0.001, f'{por_consulta * 1000:.3f} ms por búsqueda'
+        print("✅ Búsqueda por debajo de 1 ms")
+
+
+if __name__ == '__main__':
+    test_busqueda()
+    test_rendimiento()
+    print("\n🎉 Todas las pruebas del índice de clientes pasaron")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar el índice del catálogo de productos
+
+Comprueba que:
+- los filtros del índice devuelven lo mismo que los recorridos anteriores
+  (nombre, categoría, rango de precios), en el orden del inventario
+- el buscador de la factura prioriza código de barras (exacto y por prefijo)
+  y coincidencias al inicio
+- el índice se reconstruye cuando inventario.json cambia
+- con 20.000 productos filtrar y buscar es mucho más rápido que recorrer el catálogo
+"""
+
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from indice_productos import IndiceProductos
+
+CATEGORIAS = ['Adelgazante-Laxante', 'Antitumorales', 'Vitaminas', 'Tés e Infusiones', 'Cremas']
+PALABRAS = ['adelgalax', 'antitumoral', 'vitamina', 'colágeno', 'té verde', 'crema', 'omega', 'moringa',
+            'cúrcuma', 'jengibre', 'ginkgo', 'espirulina']
+
+
+def guardar(archivo, inventario):
+    with open(archivo, 'w', encoding='utf-8') as f:
+        json.dump(inventario, f, ensure_ascii=False)
+
+
+def catalogo_sintetico(cantidad, semilla=11):
+    aleatorio = random.Random(semilla)
+    inventario = {}
+    for i in range(1, cantidad + 1):
+        inventario[str(i)] = {
+            'nombre': f"{aleatorio.choice(PALABRAS).upper()} {aleatorio.choice(['X 60 CAP', 'X 30 CAP', '500 ML', 'X 12 UNID.'])} {i}",
+            'categoria': aleatorio.choice(CATEGORIAS),
+            'precio': round(aleatorio.uniform(0.5, 120), 2),
+            'cantidad': aleatorio.randint(0, 500),
+            'codigo_barras': f'759{i:010d}' if i % 3 else ''
+        }
+    return inventario
+
+
+def filtro_lineal(inventario, q='', categoria='', precio_min=None, precio_max=None):
+    """Filtro anterior de la lista de precios (recorre todo el inventario)"""
+    resultado = []
+    for id_producto, producto in inventario.items():
+        if categoria and producto.get('categoria') != categoria:
+            continue
+        precio = float(producto.get('precio', 0))
+        if precio_min is not None and precio < precio_min:
+            continue
+        if precio_max is not None and precio > precio_max:
+            continue
+        if q and q.lower() not in producto.get('nombre', '').lower():
+            continue
+        resultado.append(id_producto)
+    return resultado
+
+
+def test_filtros_y_busqueda():
+    with tempfile.TemporaryDirectory(prefix='indice_productos_') as directorio:
+        print("🧪 PROBANDO ÍNDICE DE PRODUCTOS")
+        print("=" * 60)
+        archivo = os.path.join(directorio, 'inventario.json')
+        inventario = catalogo_sintetico(2000)
+        guardar(archivo, inventario)
+        indice = IndiceProductos(archivo)
+
+        casos = [
+            {}, {'q': 'vitamina'}, {'q': 'x 60'}, {'q': 'ga'}, {'q': 'ML 1'}, {'categoria': 'Cremas'},
+            {'precio_min': 10.0, 'precio_max': 20.5}, {'precio_max': 3.0}, {'precio_min': 119.0},
+            {'q': 'omega', 'categoria': 'Vitaminas', 'precio_min': 50.0}, {'q': 'no existe'},
+        ]
+        for filtros in casos:
+            assert indice.filtrar(**filtros) == filtro_lineal(inventario, **filtros), filtros
+        print(f"✅ {len(casos)} combinaciones de filtros iguales al recorrido lineal")
+
+        assert indice.filtrar(q='colageno') == filtro_lineal(inventario, q='colágeno')
+        assert set(indice.filtrar(categoria_contiene='vita')) == set(filtro_lineal(inventario, categoria='Vitaminas'))
+        assert indice.categorias() == list(dict.fromkeys(p['categoria'] for p in inventario.values()))
+        assert indice.categorias(ordenadas=True) == sorted(CATEGORIAS)
+        print("✅ Búsqueda sin acentos, categoría parcial y lista de categorías")
+
+        assert indice.buscar('7590000000010')[0]['id'] == '10'
+        por_prefijo = indice.buscar('759000000001', limite=50)
+        assert [r['id'] for r in por_prefijo[:2]] == ['10', '11'], por_prefijo[:3]
+        assert all(r['codigo_barras'].startswith('759000000001') for r in por_prefijo[:7])
+        resultados = indice.buscar('omega x 60', limite=20)
+        assert len(resultados) == 20
+        assert all(r['nombre'].startswith('OMEGA X 60') for r in resultados), resultados[:3]
+        assert all(set(r) == {'id', 'nombre', 'categoria', 'codigo_barras', 'cantidad', 'precio'} for r in resultados)
+        assert indice.buscar('infusiones', limite=5) and all(
+            r['categoria'] == 'Tés e Infusiones' for r in indice.buscar('infusiones', limite=5))
+        assert len(indice.buscar('', limite=50)) == 50
+        print("✅ Buscador: código de barras exacto y por prefijo, nombre y categoría, con límite")
+
+        time.sleep(0.01)
+        inventario['2001'] = {'nombre': 'Maca Andina X 100', 'categoria': 'Nueva', 'precio': 7.5, 'cantidad': 3,
+                              'codigo_barras': '7591234567890'}
+        del inventario['10']
+        guardar(archivo, inventario)
+        assert indice.filtrar(q='maca andina') == ['2001'] and indice.por_codigo('7590000000010') is None
+        assert [r['id'] for r in indice.buscar('7591')] == ['2001']
+        assert 'Nueva' in indice.categorias()
+        print("✅ Índice reconstruido al cambiar inventario.json")
+
+
+def test_rendimiento(cantidad=20000):
+    with tempfile.TemporaryDirectory(prefix='indice_productos_') as directorio:
+        archivo = os.path.join(directorio, 'inventario.json')
+        inventario = catalogo_sintetico(cantidad)
+        guardar(archivo, inventario)
+        indice = IndiceProductos(archivo)
+        indice.asegurar_actualizado()
+
+        consultas = [{'q': 'moringa'}, {'q': 'x 30 cap 19'}, {'categoria': 'Cremas', 'precio_max': 5.0},
+                     {'q': 'ginkgo', 'precio_min': 100.0}]
+        inicio = time.perf_counter()
+        for filtros in consultas:
+            indice.filtrar(**filtros)
+        con_indice = (time.perf_counter() - inicio) / len(consultas)
+        inicio = time.perf_counter()
+        for filtros in consultas:
+            filtro_lineal(inventario, **filtros)
+        lineal = (time.perf_counter() - inicio) / len(consultas)
+
+        inicio = time.perf_counter()
+        for termino in ('om', 'omega', 'omega x 6', 'jengibre 500', 'cremas'):
+            indice.buscar(termino, limite=20)
+        busqueda = (time.perf_counter() - inicio) / 5
+
+        print(f"📊 {cantidad:,} productos: filtrar {con_indice * 1000:.2f} ms vs. {lineal * 1000:.2f} ms lineal; "
+              f"buscador {busqueda * 1000:.2f} ms por consulta (20 resultados)")
+
+
+if __name__ == '__main__':
+    test_filtros_y_busqueda()
+    test_rendimiento()
+    print("\n🎉 Todas las pruebas del índice de productos pasaron")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar la instrumentación (tiempos por ruta, /metrics y perfilado)
+
+Comprueba que:
+- cada petición queda en el histograma de su ruta con sus llamadas a
+  cargar_datos/guardar_datos y el tiempo de plantillas
+- el tiempo de HTTP saliente se atribuye a la petición que lo hizo
+- /metrics publica el formato de Prometheus y exige sesión de admin o token
+- la cabecera X-Perfil guarda un perfil solo si la petición está autorizada
+"""
+
+import os
+import pstats
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from flask import Flask, render_template_string
+from instrumentacion import Instrumentacion
+
+
+def test_instrumentacion():
+    print("🧪 PROBANDO INSTRUMENTACIÓN")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory(prefix='perfiles_') as directorio:
+        instrumentacion = Instrumentacion()
+        instrumentacion.directorio_perfiles = directorio
+        instrumentacion.token_perfil = 'secreto'
+        app = Flask(__name__)
+        instrumentacion.init_app(app)
+
+        @app.route('/lenta')
+        def lenta():
+            instrumentacion.registrar_datos('cargar', 2048, 0.001)
+            instrumentacion.registrar_datos('guardar', 512, 0.001)
+            with instrumentacion.medir('http_saliente'):
+                time.sleep(0.03)
+            return render_template_string('{% for i in range(3) %}{{ i }}{% endfor %}')
+
+        cliente = app.test_client()
+        for _ in range(3):
+            assert cliente.get('/lenta').status_code == 200
+        cliente.get('/no-existe')
+
+        resumen = instrumentacion.obtener_resumen()
+        ruta = next(r for r in resumen['rutas'] if r['endpoint'] == 'lenta')
+        assert ruta['peticiones'] == 3 and ruta['codigos'] == {'200': 3}
+        assert ruta['datos'] == {'cargar': {'operaciones': 3, 'bytes': 6144}, 'guardar': {'operaciones': 3, 'bytes': 1536}}
+        assert ruta['componentes_segundos']['http_saliente'] >= 0.09
+        assert ruta['componentes_segundos']['plantillas'] > 0
+        assert ruta['histograma_ms']['50'] == 3, ruta['histograma_ms']
+        assert any(r['endpoint'] == 'sin_ruta' and r['codigos'] == {'404': 1} for r in resumen['rutas'])
+        assert resumen['lentas'][0]['ruta'] == '/lenta'
+        print(f"✅ /lenta: {ruta['duracion_promedio_ms']:.0f} ms de promedio, "
+              f"{ruta['componentes_segundos']['http_saliente'] * 1000 / 3:.0f} ms de HTTP saliente por petición")
+
+        texto = instrumentacion.exportar_prometheus()
+        assert 'app_peticion_duracion_segundos_bucket{endpoint="lenta",metodo="GET",le="0.05"} 3' in texto
+        assert 'app_peticion_duracion_segundos_bucket{endpoint="lenta",metodo="GET",le="+Inf"} 3' in texto
+        assert 'app_datos_bytes_total{endpoint="lenta",operacion="cargar"} 6144' in texto
+        assert '# TYPE app_peticion_duracion_segundos histogram' in texto
+        print("✅ Formato de Prometheus con histogramas acumulados")
+
+        # Perfilado: sin autorización no se guarda nada
+        respuesta = cliente.get('/lenta', headers={'X-Perfil': '1'})
+        assert respuesta.headers['X-Perfil-Archivo'] == 'no-autorizado' and not os.listdir(directorio)
+        respuesta = cliente.get('/lenta', headers={'X-Perfil': 'cprofile', 'X-Perfil-Token': 'secreto'})
+        archivo = respuesta.headers['X-Perfil-Archivo']
+        assert archivo.endswith('.prof') and 'total;dur=' in respuesta.headers['Server-Timing']
+        funciones = pstats.Stats(os.path.join(directorio, archivo)).stats
+        assert any(nombre == 'lenta' for (_, _, nombre) in funciones)
+        assert instrumentacion.listar_perfiles()[0]['nombre'] == archivo
+        print(f"✅ Perfil guardado con X-Perfil: {archivo} (Server-Timing: {respuesta.headers['Server-Timing']})")
+
+
+def test_app():
+    import app as aplicacion
+    from cliente_http import cliente_http
+
+    cliente = aplicacion.app.test_client()
+    assert cliente.get('/metrics', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 401
+    with cliente.session_transaction() as sesion:
+        sesion['usuario'] = 'admin'
+    assert cliente.get('/inventario').status_code == 200
+
+    ruta = next(r for r in aplicacion.instrumentacion.obtener_resumen()['rutas']
+                if r['endpoint'] == 'mostrar_inventario')
+    assert ruta['datos']['cargar']['operaciones'] >= 1 and ruta['datos']['cargar']['bytes'] > 0
+    print(f"✅ /inventario: {ruta['datos']['cargar']['operaciones']} llamadas a cargar_datos, "
+          f"{ruta['datos']['cargar']['bytes'] / 1024:,.0f} KB, "
+          f"plantillas {ruta['componentes_segundos']['plantillas'] * 1000:.0f} ms")
+
+    # HTTP saliente fuera de una petición no se atribuye a ninguna ruta
+    try:
+        cliente_http.get('http://127.0.0.1:9/', timeout=0.5)
+    except Exception:
+        pass
+    assert aplicacion.instrumentacion.obtener_resumen()['componentes']['http_saliente']['operaciones'] >= 1
+
+    metricas = cliente.get('/metrics')
+    texto = metricas.get_data(as_text=True)
+    assert metricas.status_code == 200 and metricas.mimetype == 'text/plain'
+    assert 'app_datos_operaciones_total{endpoint="mostrar_inventario",operacion="cargar"}' in texto
+    assert 'app_http_saliente_errores_total{host="127.0.0.1:9"' in texto
+    pagina = cliente.get('/admin/metricas')
+    assert pagina.status_code == 200 and b'mostrar_inventario' in pagina.data
+    print("✅ /metrics y /admin/metricas con sesión de admin")
+
+
+if __name__ == '__main__':
+    test_instrumentacion()
+    test_app()
+    print("\n🎉 Todas las pruebas de instrumentación pasaron")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar la verificación de integridad con raíces Merkle por período
+
+Comprueba que:
+- todas las facturas firmadas pasan y cada período tiene su raíz Merkle
+- una factura alterada se reporta y cambia solo la raíz de su período
+- sin cambios en el archivo no se lee ni revalida nada
+- con el archivo cambiado, los períodos intactos no se recalculan
+- raices_guardadas indica si la raíz guardada sigue vigente
+- una factura sin firma (anterior a la firma) se reporta aparte, no como falla
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+os.environ['SENIAT_CLAVE_MAESTRA'] = 'clave-de-prueba-para-integridad-fiscal-0123456789'
+
+from integridad_fiscal import VerificadorIntegridad, raiz_merkle
+from seguridad_fiscal import SeguridadFiscal
+
+PERIODOS = ('2025-01', '2025-02', '2025-03')
+
+
+def crear_facturas(seguridad, por_periodo=20):
+    facturas = {}
+    for p, periodo in enumerate(PERIODOS):
+        for i in range(por_periodo):
+            numero = p * por_periodo + i + 1
+            factura = seguridad.crear_documento_inmutable({
+                'numero': f'FAC-{numero:08d}',
+                'fecha': f'{periodo}-{i % 28 + 1:02d}',
+                'hora': '09:00:00',
+                'cliente_id': 'J-12345678-9',
+                'items': [{'descripcion': 'Producto', 'cantidad': 1, 'precio': 10.0 + i}],
+                'subtotal_usd': 10.0 + i,
+                'iva_total': 0,
+                'total_usd': 10.0 + i,
+                'tasa_bcv': 100.0,
+                'total_bs': (10.0 + i) * 100,
+            }, 'FACTURA')
+            factura['estado'] = 'pendiente'
+            seguridad.firmar_estado(factura)
+            facturas[f'id-{numero}'] = factura
+    return facturas
+
+
+def guardar(archivo, facturas):
+    time.sleep(0.01)  # mtime distinto en sistemas de archivos con poca resolución
+    os.makedirs(os.path.dirname(archivo), exist_ok=True)
+    with open(archivo, 'w', encoding='utf-8') as f:
+        json.dump(facturas, f, ensure_ascii=False)
+
+
+def test_merkle():
+    print("🧪 PROBANDO INTEGRIDAD FISCAL (MERKLE POR PERÍODO)")
+    print("=" * 60)
+    assert raiz_merkle(['00' * 32]) == '00' * 32
+    assert raiz_merkle(['00' * 32, '11' * 32]) != raiz_merkle(['11' * 32, '00' * 32])
+
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='integridad_fiscal_') as directorio:
+        os.chdir(directorio)
+        try:
+            archivo = os.path.join('facturas_json', 'facturas.json')
+            facturas = crear_facturas(SeguridadFiscal())
+            guardar(archivo, facturas)
+            verificador = VerificadorIntegridad(os.path.join(directorio, 'integridad'))
+
+            resumen = verificador.verificar(procesos=2, archivo_facturas=archivo)
+            assert resumen['exito'] and resumen['revalidados'] == 60 and resumen['total_documentos'] == 60
+            assert sorted(resumen['periodos']) == list(PERIODOS)
+            assert all(not d['documentos_con_fallas'] for d in resumen['periodos'].values()), resumen
+            raices = {p: d['raiz_merkle'] for p, d in resumen['periodos'].items()}
+            print(f"✅ 60 facturas válidas en {len(raices)} períodos (pool de 2 procesos)")
+
+            resumen = verificador.verificar(archivo_facturas=archivo)
+            assert resumen['sin_cambios'] and resumen['revalidados'] == 0
+            assert {p: d['raiz_merkle'] for p, d in resumen['periodos'].items()} == raices
+            print("✅ Archivo sin cambios: raíces guardadas sin leer las facturas")
+
+            facturas['id-25']['total_usd'] = 1.0
+            guardar(archivo, facturas)
+            ruta_enero = verificador._ruta_periodo('2025-01')
+            mtime_enero = os.stat(ruta_enero).st_mtime_ns
+            resumen = verificador.verificar(procesos=1, archivo_facturas=archivo)
+            assert not resumen['sin_cambios'] and resumen['revalidados'] == 1, resumen
+            assert resumen['periodos']['2025-02']['documentos_con_fallas'] == [{'id': 'id-25', 'numero': 'FAC-00000025'}]
+            assert resumen['periodos']['2025-02']['raiz_merkle'] != raices['2025-02']
+            assert resumen['periodos']['2025-01']['raiz_merkle'] == raices['2025-01']
+            assert os.stat(ruta_enero).st_mtime_ns == mtime_enero
+            print("✅ Factura alterada reportada; solo su período se recalculó")
+
+            facturas['id-45']['estado'] = 'anulada'
+            guardar(archivo, facturas)
+            resumen = verificador.verificar(['2025-03'], procesos=1, archivo_facturas=archivo)
+            assert [f['id'] for f in resumen['periodos']['2025-03']['documentos_con_fallas']] == ['id-45']
+            print("✅ Estado cambiado sin firma reportado")
+
+            guardadas = verificador.raices_guardadas(['2025-02', '2025-03', '2025-09'], archivo_facturas=archivo)
+            assert set(guardadas) == {'2025-02', '2025-03'}
+            assert guardadas['2025-03']['vigente'] and not guardadas['2025-02']['vigente']
+            print("✅ raices_guardadas marca las raíces vigentes y omite períodos no verificados")
+
+            resumen = verificador.verificar(archivo_facturas=archivo)
+            assert resumen['revalidados'] == 0 and not resumen['sin_cambios']
+            assert verificador.verificar(archivo_facturas=archivo)['sin_cambios']
+            print("✅ Reverificación completa sin revalidar firmas ya verificadas")
+
+            facturas['id-antigua'] = {'numero': 'FAC-00000000', 'fecha': '2025-01-02', 'total_usd': 5.0}
+            guardar(archivo, facturas)
+            resumen = verificador.verificar(archivo_facturas=archivo)
+            enero = resumen['periodos']['2025-01']
+            assert resumen['revalidados'] == 0, resumen
+            assert enero['documentos_sin_firma'] == [{'id': 'id-antigua', 'numero': 'FAC-00000000'}]
+            assert not enero['documentos_con_fallas'] and enero['total_documentos'] == 21
+            assert verificador.raices_guardadas(['2025-01'], archivo_facturas=archivo)['2025-01']['documentos_sin_firma']
+            print("✅ Factura sin firma listada en documentos_sin_firma, no como falla")
+        finally:
+            os.chdir(directorio_original)
+
+
+if __name__ == '__main__':
+    test_merkle()
+    print("\n🎉 Todas las pruebas de integridad fiscal pasaron")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar la numeración fiscal con arrendamiento de bloques
+
+Comprueba que:
+- un bloque liberado con números sin usar los registra como hueco con su motivo
+- un número del bloque que ya tiene factura no se entrega (igual que sin bloques)
+- varios procesos pidiendo números a la vez nunca repiten uno, con y sin bloques
+- con un worker que muere sin liberar su bloque, conciliar_arrendamientos
+  justifica cada número del 1 al último asignado
+"""
+
+import json
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+os.environ['SENIAT_CLAVE_MAESTRA'] = 'clave-de-prueba-para-numeracion-fiscal-0123456789'
+
+from benchmark_numeracion import ejecutar
+from numeracion_fiscal import ControlNumeracionFiscal
+from seguridad_fiscal import seguridad_fiscal
+
+
+@contextmanager
+def directorio_temporal():
+    """Ejecuta la prueba en un directorio temporal: nunca toca los archivos reales de numeración"""
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='numeracion_fiscal_') as directorio:
+        os.chdir(directorio)
+        try:
+            yield directorio
+        finally:
+            # El log de auditoría usa rutas relativas: vaciarlo antes de volver al directorio original
+            if seguridad_fiscal.esta_inicializada():
+                seguridad_fiscal.vaciar_log_auditoria()
+            os.chdir(directorio_original)
+
+
+def test_bloque_liberado():
+    with directorio_temporal():
+        _bloque_liberado()
+
+
+def test_bloque_con_factura_existente():
+    with directorio_temporal():
+        _bloque_con_factura_existente()
+
+
+def test_procesos_concurrentes():
+    with directorio_temporal():
+        _procesos_concurrentes()
+
+
+def _bloque_liberado():
+    control = ControlNumeracionFiscal(tamano_bloque=10)
+    numeros = [control.obtener_siguiente_numero('FACTURA', 'prueba')[1] for _ in range(3)]
+    assert numeros == [1, 2, 3]
+    assert len(control.reporte_consecutividad('FACTURA')['arrendamientos_abiertos']) == 1
+    control.liberar_arrendamientos()
+
+    reporte = control.reporte_consecutividad('FACTURA')
+    assert not reporte['arrendamientos_abiertos'] and reporte['huecos_consistentes']
+    assert [(h['desde'], h['hasta'], h['motivo']) for h in reporte['huecos']] == [(4, 10, 'arrendamiento_liberado')]
+    assert ControlNumeracionFiscal(tamano_bloque=0).obtener_siguiente_numero('FACTURA', 'prueba')[1] == 11
+    print("✅ Bloque liberado: 3 usados, 4-10 registrados como hueco, la serie sigue en 11")
+
+
+def _bloque_con_factura_existente():
+    os.makedirs('facturas_json')
+    with open('facturas_json/facturas.json', 'w', encoding='utf-8') as f:
+        json.dump({'x': {'numero': 'FAC-00000002'}}, f)
+    control = ControlNumeracionFiscal(tamano_bloque=10)
+    assert control.obtener_siguiente_numero('FACTURA', 'prueba')[1] == 1
+    try:
+        control.obtener_siguiente_numero('FACTURA', 'prueba')
+        raise AssertionError('se entregó un número que ya tiene factura')
+    except Exception as e:
+        assert 'FAC-00000002 ya existe' in str(e), e
+    control.liberar_arrendamientos()
+    print("✅ Un número del bloque con factura existente no se entrega")
+
+
+def _procesos_concurrentes():
+    escenarios = [
+        ('sin bloques', 0, False),
+        ('bloques de 10', 10, False),
+        ('bloques de 10 + worker caído', 10, True),
+    ]
+    for nombre, bloque, con_caida in escenarios:
+        r = ejecutar(3, 40, bloque, con_caida)
+        assert r['duplicados'] == 0 and r['sin_justificar'] == 0, (nombre, r)
+        assert r['emitido_y_hueco'] == 0 and r['bloques_abiertos'] == 0, (nombre, r)
+        if con_caida:
+            assert r['conciliados'] == 1 and r['huecos'] == 5, (nombre, r)
+        print(f"✅ 3 procesos, {nombre}: {r['emitidos']} números sin duplicados "
+              f"({r['huecos']} en huecos, {r['conciliados']} bloque conciliado)")
+
+
+if __name__ == '__main__':
+    print("🧪 PROBANDO NUMERACIÓN FISCAL ENTRE PROCESOS")
+    print("=" * 60)
+    test_bloque_liberado()
+    test_bloque_con_factura_existente()
+    test_procesos_concurrentes()
+    print("\n🎉 Todas las pruebas de numeración fiscal pasaron")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar el motor PDF nativo (pdf_tabular)
+
+Comprueba que:
+- motor_pdf elige reportlab solo si está configurado para el tipo y disponible
+- la lista de precios agrupa por categoría en el orden del inventario
+- una lista de precios pequeña se genera como PDF de varias páginas
+  (se omite si reportlab no está instalado)
+"""
+
+import os
+import sys
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from carga_perezosa import importar_opcional
+from pdf_tabular import agrupar_por_categoria, generar_lista_precios, motor_pdf
+
+
+def inventario_prueba(cantidad=120):
+    categorias = ['Vitaminas', 'Cremas', 'Tés e Infusiones']
+    return {str(i): {'nombre': f'Producto {i} con nombre largo para la columna',
+                     'categoria': categorias[i % 3],
+                     'precio': i * 1.5, 'precio_detal': i * 1.25}
+            for i in range(1, cantidad + 1)}
+
+
+def test_lista_precios():
+    print("🧪 PROBANDO MOTOR PDF NATIVO")
+    print("=" * 60)
+    inventario = inventario_prueba()
+    grupos = agrupar_por_categoria(inventario)
+    assert [categoria for categoria, _ in grupos] == ['Cremas', 'Tés e Infusiones', 'Vitaminas']
+    assert sum(len(productos) for _, productos in grupos) == len(inventario)
+    print("✅ Productos agrupados por categoría en el orden del inventario")
+
+    os.environ.pop('PDF_MOTOR_LISTA_PRECIOS', None)
+    assert motor_pdf('lista_precios') == 'wkhtmltopdf'
+    os.environ['PDF_MOTOR_LISTA_PRECIOS'] = 'reportlab'
+    disponible = importar_opcional('reportlab') is not None
+    assert motor_pdf('lista_precios') == ('reportlab' if disponible else 'wkhtmltopdf')
+    os.environ.pop('PDF_MOTOR_LISTA_PRECIOS')
+    print("✅ motor_pdf respeta PDF_MOTOR_<TIPO> y la disponibilidad de reportlab")
+
+    if not disponible:
+        print("⚠️ reportlab no está instalado: se omite la generación del PDF")
+        return
+
+    empresa = {'nombre': 'Empresa de Prueba', 'rif': 'J-12345678-9', 'direccion': 'Caracas'}
+    for tipo in ('detal', 'distribuidor'):
+        pdf = generar_lista_precios(inventario, tipo, empresa, fecha=datetime(2025, 8, 31))
+        assert pdf.startswith(b'%PDF-') and pdf.rstrip().endswith(b'%%EOF')
+        paginas = pdf.count(b'/Type /Page') - pdf.count(b'/Type /Pages')
+        assert paginas > 1, paginas
+        print(f"✅ Lista de precios {tipo}: {len(pdf) / 1024:.1f} KB, {paginas} páginas")
+
+
+if __name__ == '__main__':
+    test_lista_precios()
+    print("\n🎉 Todas las pruebas del motor PDF nativo pasaron")
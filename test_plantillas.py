@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar la capa de plantillas (bytecode, precalentamiento y fragmentos)
+
+Comprueba que:
+- el precalentamiento compila todas las plantillas y deja su bytecode en disco
+- un entorno nuevo (otro worker) carga el bytecode más rápido que compilar
+- ver una factura ya no vacía la caché de plantillas compiladas
+- los fragmentos se reutilizan mientras no cambie la versión de sus datos
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from jinja2 import Environment, DictLoader, FileSystemLoader, FileSystemBytecodeCache
+from plantillas import CacheFragmentos
+
+DIRECTORIO_PLANTILLAS = os.path.join(BASE_DIR, 'templates')
+PESADAS = ['reporte_cuentas_por_cobrar.html', 'reporte_clientes.html', 'factura_dashboard.html',
+           'factura_detalle.html', 'cuentas_por_cobrar.html']
+
+
+def test_fragmentos():
+    print("🧪 PROBANDO PLANTILLAS")
+    print("=" * 60)
+    fragmentos = CacheFragmentos(max_entradas=2)
+    entorno = Environment(loader=DictLoader({'lista.html': (
+        "{% call cache_fragmento('lista', version) %}"
+        "{% for p in productos %}<li>{{ p }}</li>{% endfor %}"
+        "{% endcall %}|{{ seleccionado }}")}), autoescape=True)
+    entorno.globals['cache_fragmento'] = fragmentos
+    plantilla = entorno.get_template('lista.html')
+
+    assert plantilla.render(version=1, productos=['a', '<b>'], seleccionado='x') == '<li>a</li><li>&lt;b&gt;</li>|x'
+    # Misma versión: el bloque no se vuelve a renderizar aunque cambien los datos en memoria
+    assert plantilla.render(version=1, productos=['otro'], seleccionado='y') == '<li>a</li><li>&lt;b&gt;</li>|y'
+    assert plantilla.render(version=2, productos=['c'], seleccionado='z') == '<li>c</li>|z'
+    assert fragmentos.obtener_estadisticas() == {'aciertos': 1, 'fallos': 2, 'fragmentos': 2, 'max_entradas': 2}
+    plantilla.render(version=3, productos=[], seleccionado='')
+    assert fragmentos.obtener_estadisticas()['fragmentos'] == 2
+    print("✅ Fragmentos reutilizados por versión, sin perder el escape, con límite de entradas")
+
+
+def test_bytecode():
+    with tempfile.TemporaryDirectory(prefix='cache_jinja_') as directorio:
+        def compilar_pesadas(bytecode):
+            entorno = Environment(loader=FileSystemLoader(DIRECTORIO_PLANTILLAS), bytecode_cache=bytecode)
+            entorno.filters.update({'datetimeformat': str, 'es_number': str, 'split': str})
+            inicio = time.perf_counter()
+            for nombre in PESADAS:
+                entorno.get_template(nombre)
+            return time.perf_counter() - inicio
+
+        sin_cache = compilar_pesadas(None)
+        compilar_pesadas(FileSystemBytecodeCache(directorio))
+        desde_disco = compilar_pesadas(FileSystemBytecodeCache(directorio))
+        assert len(os.listdir(directorio)) >= len(PESADAS)
+        print(f"📊 {len(PESADAS)} plantillas pesadas: compilar {sin_cache * 1000:.0f} ms, "
+              f"cargar bytecode {desde_disco * 1000:.0f} ms (x{sin_cache / desde_disco:.1f})")
+        assert desde_disco < sin_cache
+
+
+def test_app():
+    import app as aplicacion
+    from plantillas import capa_plantillas
+
+    precalentamiento = capa_plantillas.precalentamiento
+    total = len([n for n in os.listdir(DIRECTORIO_PLANTILLAS) if n.endswith('.html')])
+    assert precalentamiento['plantillas'] == total, precalentamiento
+    assert os.listdir(capa_plantillas.directorio_bytecode)
+    print(f"✅ Precalentamiento: {total - len(precalentamiento['errores'])}/{total} plantillas "
+          f"en {precalentamiento['segundos']:.2f} s")
+
+    cliente = aplicacion.app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion['usuario'] = 'admin'
+    facturas = aplicacion.cargar_datos(aplicacion.ARCHIVO_FACTURAS)
+    compiladas = len(aplicacion.app.jinja_env.cache)
+    plantilla = aplicacion.app.jinja_env.get_template('factura_dashboard.html')
+    assert cliente.get(f'/facturas/{next(iter(facturas))}').status_code == 200
+    assert aplicacion.app.jinja_env.get_template('factura_dashboard.html') is plantilla
+    assert len(aplicacion.app.jinja_env.cache) >= compiladas
+    print("✅ ver_factura conserva las plantillas compiladas")
+
+    fragmentos = capa_plantillas.fragmentos
+    antes = dict(fragmentos.estadisticas)
+    primera = cliente.get('/inventario?categoria=')
+    segunda = cliente.get('/inventario?categoria=')
+    assert primera.data == segunda.data
+    assert fragmentos.estadisticas['aciertos'] > antes['aciertos']
+    print(f"✅ Fragmentos en la app: {fragmentos.obtener_estadisticas()}")
+
+
+if __name__ == '__main__':
+    test_fragmentos()
+    test_bytecode()
+    test_app()
+    print("\n🎉 Todas las pruebas de plantillas pasaron")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar el registro de logs (cola, muestreo y formato JSON)
+
+Comprueba que:
+- la escritura de los logs ocurre en el hilo del QueueListener, no en el que registra
+- el muestreo deja pasar la primera vez y 1 de cada N repeticiones, y siempre los errores
+- el formato JSON incluye el método y la ruta de la petición Flask en curso
+- tras un fork el proceso hijo sigue escribiendo sus logs
+"""
+
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from flask import Flask
+from registro_logs import RegistroLogs, FiltroMuestreo
+
+
+class ManejadorLento(logging.Handler):
+    """Simula un stdout lento (p. ej. el colector de logs de Render)"""
+
+    def __init__(self):
+        super().__init__()
+        self.hilos = set()
+        self.registros = []
+
+    def emit(self, record):
+        time.sleep(0.002)
+        self.hilos.add(threading.get_ident())
+        self.registros.append(record.getMessage())
+
+
+def leer_json(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+def test_registro_logs():
+    print("🧪 PROBANDO REGISTRO DE LOGS")
+    print("=" * 60)
+    with tempfile.TemporaryDirectory(prefix='logs_') as directorio:
+        registro = RegistroLogs()
+        registro.formato = 'json'
+        registro.archivo = os.path.join(directorio, 'app.log')
+        registro.salida = io.StringIO()
+        registro.configurar()
+        logger = logging.getLogger('prueba')
+
+        # La petición solo encola: un manejador lento no la frena
+        lento = ManejadorLento()
+        registro._oyente.handlers = registro._oyente.handlers + (lento,)
+        inicio = time.perf_counter()
+        for i in range(200):
+            logger.info("Mensaje %s", i)
+        encolar = time.perf_counter() - inicio
+        registro.detener()
+        assert len(lento.registros) == 200 and threading.get_ident() not in lento.hilos
+        print(f"✅ 200 logs encolados en {encolar * 1000:.1f} ms (escribirlos directamente: ≥ 400 ms)")
+        assert encolar < 0.2
+        registro._iniciar_oyente()
+
+        # Muestreo por mensaje
+        muestreado = logging.getLogger('prueba.caliente')
+        muestreado.addFilter(FiltroMuestreo(10))
+        for _ in range(25):
+            muestreado.info("Datos guardados en %s", 'inventario.json')
+            muestreado.error("Error leyendo %s", 'clientes.json')
+        app = Flask(__name__)
+        with app.test_request_context('/facturas/123', method='POST'):
+            logger.warning("Factura %s sin cliente", '123')
+        registro.detener()
+
+        registros = leer_json(registro.archivo)
+        guardados = [r for r in registros if r['mensaje'].startswith('Datos guardados')]
+        errores = [r for r in registros if r['mensaje'].startswith('Error leyendo')]
+        assert len(guardados) == 3 and guardados[1]['mensaje'].endswith('[9 similares omitidos]'), guardados
+        assert len(errores) == 25
+        print(f"✅ Muestreo: 25 repeticiones → {len(guardados)} registros; los 25 errores se conservan")
+        contexto = next(r for r in registros if r['mensaje'] == 'Factura 123 sin cliente')
+        assert contexto['metodo'] == 'POST' and contexto['ruta'] == '/facturas/123' and contexto['nivel'] == 'WARNING'
+        print(f"✅ JSON con contexto de la petición: {json.dumps(contexto, ensure_ascii=False)}")
+
+        # Fork: el hijo arranca su propio hilo escritor
+        registro._iniciar_oyente()
+        if hasattr(os, 'fork'):
+            pid = os.fork()
+            if pid == 0:
+                logger.info("Desde el worker")
+                registro.detener()
+                os._exit(0)
+            os.waitpid(pid, 0)
+            registro.detener()
+            hijo = [r for r in leer_json(registro.archivo) if r['mensaje'] == 'Desde el worker']
+            assert len(hijo) == 1 and hijo[0]['pid'] == pid
+            print("✅ El proceso hijo escribe sus logs tras el fork")
+        logging.getLogger().removeHandler(registro._manejador_cola)
+
+
+if __name__ == '__main__':
+    test_registro_logs()
+    print("\n🎉 Todas las pruebas de registro de logs pasaron")
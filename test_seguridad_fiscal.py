@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar la firma de documentos fiscales inmutables
+
+Comprueba que:
+- registrar pagos (pagos, total_abonado, saldo_pendiente) no invalida la factura
+- cambiar el estado sin firmarlo invalida la factura; firmar_estado lo vuelve válido
+- alterar el contenido fiscal invalida la factura
+- los documentos sin version_esquema se validan con la regla anterior (documento completo)
+- la huella del equipo se calcula una vez por instancia salvo que se pida refrescar
+"""
+
+import os
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from seguridad_fiscal import SeguridadFiscal
+
+
+def factura_prueba():
+    return {
+        'numero': 'FAC-00000001',
+        'numero_control': '00-00000001',
+        'fecha': '2025-01-15',
+        'hora': '10:30:00',
+        'cliente_id': 'J-12345678-9',
+        'cliente_nombre': 'Cliente de Prueba',
+        'items': [{'descripcion': 'Producto', 'cantidad': 2, 'precio': 10.0}],
+        'subtotal_usd': 20.0,
+        'iva_total': 3.2,
+        'total_usd': 23.2,
+        'tasa_bcv': 100.0,
+        'total_bs': 2320.0,
+        'pagos': [],
+    }
+
+
+def documento_esquema_anterior(seguridad, documento):
+    """Documento firmado como antes de version_esquema: hash y firma sobre el documento completo"""
+    documento = dict(documento, _metadatos_seguridad={'tipo_documento': 'FACTURA', 'inmutable': True,
+                                                      'version_sistema': '1.0.0', 'id_documento': 'x'})
+    hash_documento = seguridad._hash_canonico(documento)
+    documento['_metadatos_seguridad']['hash_inmutable'] = hash_documento
+    documento['_metadatos_seguridad']['firma_digital'] = seguridad.firmar_documento(documento, seguridad.clave_maestra[:32])
+    return documento
+
+
+def test_firma():
+    print("🧪 PROBANDO FIRMA DE DOCUMENTOS FISCALES")
+    print("=" * 60)
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='seguridad_fiscal_') as directorio:
+        os.chdir(directorio)
+        try:
+            seguridad = SeguridadFiscal(clave_maestra='clave-de-prueba-para-firmas-fiscales-0123456789')
+            factura = seguridad.crear_documento_inmutable(factura_prueba(), 'FACTURA')
+            assert factura['_metadatos_seguridad']['version_esquema'] == 2
+            assert seguridad.validar_documento_inmutable(factura)
+            print("✅ Factura recién creada válida (version_esquema 2)")
+
+            factura['estado'] = 'pendiente'
+            assert not seguridad.validar_documento_inmutable(factura)
+            seguridad.firmar_estado(factura)
+            assert seguridad.validar_documento_inmutable(factura)
+            factura['pagos'].append({'monto': 23.2})
+            factura['total_abonado'] = 23.2
+            factura['saldo_pendiente'] = 0
+            factura['estado'] = 'pagada'
+            seguridad.firmar_estado(factura)
+            assert seguridad.validar_documento_inmutable(factura)
+            print("✅ Pagos y cambios de estado firmados mantienen la factura válida")
+
+            factura['estado'] = 'anulada'
+            assert not seguridad.validar_documento_inmutable(factura)
+            del factura['estado']
+            assert not seguridad.validar_documento_inmutable(factura)
+            factura['estado'] = 'pagada'
+            assert seguridad.validar_documento_inmutable(factura)
+            print("✅ Estado cambiado o eliminado sin firmar detectado")
+
+            factura['total_usd'] = 2.32
+            assert not seguridad.validar_documento_inmutable(factura)
+            print("✅ Contenido fiscal alterado detectado")
+
+            anterior = documento_esquema_anterior(seguridad, dict(factura_prueba(), estado='pendiente'))
+            assert seguridad.validar_documento_inmutable(anterior)
+            anterior['estado'] = 'pagada'
+            assert not seguridad.validar_documento_inmutable(anterior)
+            seguridad.firmar_estado(anterior)
+            assert 'firma_estado' not in anterior['_metadatos_seguridad']
+            print("✅ Documentos sin version_esquema validados con la regla de documento completo")
+        finally:
+            os.chdir(directorio_original)
+
+
+def test_huella_host():
+    print("\n🧪 PROBANDO HUELLA DEL EQUIPO CACHEADA")
+    print("=" * 60)
+    directorio_original = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='seguridad_fiscal_') as directorio:
+        os.chdir(directorio)
+        try:
+            seguridad = SeguridadFiscal(clave_maestra='clave-de-prueba-para-firmas-fiscales-0123456789')
+            calculos = []
+            calcular = seguridad._calcular_huella_host
+            seguridad._calcular_huella_host = lambda: calculos.append(1) or calcular()
+
+            info = seguridad.obtener_info_sistema()
+            for _ in range(50):
+                seguridad.obtener_info_sistema()
+            assert len(calculos) == 1
+            assert {'mac_address', 'hostname', 'ip_local', 'cpu_count', 'memoria_total', 'timestamp_preciso'} <= set(info)
+            print("✅ 51 consultas con un solo cálculo de la huella")
+
+            info['hostname'] = 'alterado'
+            assert seguridad.obtener_huella_host()['hostname'] != 'alterado'
+            assert 'timestamp_preciso' not in seguridad.obtener_huella_host()
+            print("✅ obtener_info_sistema devuelve una copia; la huella cacheada no cambia")
+
+            seguridad.obtener_info_sistema(refrescar=True)
+            seguridad.obtener_huella_host(refrescar=True)
+            assert len(calculos) == 3
+            print("✅ refrescar=True recalcula la huella")
+        finally:
+            os.chdir(directorio_original)
+
+
+if __name__ == '__main__':
+    test_firma()
+    test_huella_host()
+    print("\n🎉 Todas las pruebas de firma fiscal pasaron")
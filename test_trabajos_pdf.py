@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar los trabajos de generación masiva de PDF
+
+No necesita wkhtmltopdf: el pool de procesos usa un generador falso que
+tarda un tiempo fijo por documento. Comprueba que:
+- los documentos se convierten en paralelo y el progreso se persiste
+- un trabajo interrumpido (proceso muerto) se reanuda solo con lo pendiente
+- eliminar_antiguos borra solo los trabajos terminados hace más de N días
+- el ZIP se arma por partes y contiene un PDF por documento
+- las rutas arman el HTML de las facturas del mes y de los historiales
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+from trabajos_pdf import GestorTrabajosPDF, DOCUMENTO_GENERADO, ESTADO_EN_PROCESO
+
+SEGUNDOS_POR_DOCUMENTO = 0.3
+
+
+def generador_falso(ruta_html, ruta_pdf, perfil):
+    time.sleep(SEGUNDOS_POR_DOCUMENTO)
+    with open(ruta_html, 'r', encoding='utf-8') as f:
+        html = f.read()
+    if 'ROTO' in html:
+        raise IOError('wkhtmltopdf falló (código 1)')
+    with open(ruta_pdf, 'wb') as f:
+        f.write(b'%PDF-1.4\n' + html.encode('utf-8'))
+    return len(html)
+
+
+def esperar(gestor, id_trabajo, segundos=30):
+    limite = time.time() + segundos
+    while time.time() < limite:
+        estado = gestor.obtener_estado(id_trabajo)
+        if estado['terminado']:
+            return estado
+        time.sleep(0.1)
+    raise AssertionError(f'el trabajo {id_trabajo} no terminó')
+
+
+def test_trabajos():
+    with tempfile.TemporaryDirectory(prefix='trabajos_pdf_') as directorio:
+        print("🧪 PROBANDO TRABAJOS PDF MASIVOS")
+        print("=" * 60)
+
+        gestor = GestorTrabajosPDF(directorio, max_procesos=4, generador=generador_falso)
+        documentos = [(f'factura_FAC-{i:08d}', f'<h1>Factura {i}</h1>') for i in range(1, 13)]
+        documentos.append(('factura_rota', '<h1>ROTO</h1>'))
+
+        inicio = time.perf_counter()
+        trabajo = gestor.crear_trabajo('facturas_mes', 'Facturas 2025-08', documentos, 'factura')
+        assert trabajo['total'] == 13 and not trabajo['terminado']
+        estado = esperar(gestor, trabajo['id'])
+        duracion = time.perf_counter() - inicio
+        secuencial = len(documentos) * SEGUNDOS_POR_DOCUMENTO
+        assert estado['generados'] == 12 and list(estado['errores']) == ['factura_rota'], estado
+        assert estado['progreso'] == 100.0
+        print(f"✅ {estado['generados']} PDF con {gestor.max_procesos} procesos en {duracion:.2f} s "
+              f"(secuencial ≈ {secuencial:.1f} s), 1 error registrado")
+
+        partes = list(gestor.generar_zip(trabajo['id']))
+        assert len(partes) > 1
+        archivo_zip = zipfile.ZipFile(io.BytesIO(b''.join(partes)))
+        nombres = archivo_zip.namelist()
+        assert len(nombres) == 13 and 'errores.txt' in nombres, nombres
+        assert archivo_zip.read('factura_FAC-00000001.pdf').startswith(b'%PDF')
+        print(f"✅ ZIP enviado en {len(partes)} partes con {len(nombres) - 1} PDF y errores.txt")
+
+        # Simular un worker reiniciado a mitad de trabajo
+        trabajo = gestor.crear_trabajo('facturas_mes', 'Interrumpido', documentos[:6], 'factura', iniciar=False)
+        ruta_estado = os.path.join(directorio, trabajo['id'], 'estado.json')
+        with open(ruta_estado, 'r', encoding='utf-8') as f:
+            estado = json.load(f)
+        for nombre in list(estado['documentos'])[:4]:
+            generador_falso(os.path.join(directorio, trabajo['id'], 'html', f'{nombre}.html'),
+                            os.path.join(directorio, trabajo['id'], 'pdf', f'{nombre}.pdf'), 'factura')
+            estado['documentos'][nombre] = DOCUMENTO_GENERADO
+        estado['estado'] = ESTADO_EN_PROCESO
+        estado['pid'] = 999999999  # proceso que ya no existe
+        with open(ruta_estado, 'w', encoding='utf-8') as f:
+            json.dump(estado, f)
+
+        otro_gestor = GestorTrabajosPDF(directorio, max_procesos=2, generador=generador_falso)
+        inicio = time.perf_counter()
+        assert otro_gestor.reanudar() == [trabajo['id']]
+        estado = esperar(otro_gestor, trabajo['id'])
+        assert estado['generados'] == 6 and not estado['errores'], estado
+        assert time.perf_counter() - inicio < 4 * SEGUNDOS_POR_DOCUMENTO
+        print("✅ Trabajo interrumpido reanudado con solo los 2 documentos pendientes")
+
+        with open(ruta_estado, 'r', encoding='utf-8') as f:
+            estado = json.load(f)
+        estado['finalizado_en'] = '2000-01-01T00:00:00'
+        with open(ruta_estado, 'w', encoding='utf-8') as f:
+            json.dump(estado, f)
+        assert otro_gestor.eliminar_antiguos() == 1
+        assert not os.path.exists(os.path.join(directorio, trabajo['id']))
+        assert len(otro_gestor.listar_trabajos()) == 1
+        print("✅ eliminar_antiguos borra solo el trabajo vencido")
+
+
+def test_documentos_desde_app():
+    import app as aplicacion
+
+    with aplicacion.app.test_request_context('/'):
+        facturas = aplicacion.cargar_datos(aplicacion.ARCHIVO_FACTURAS)
+        fecha = next(f['fecha'] for f in facturas.values() if f.get('fecha'))
+        anio, mes = int(fecha[:4]), int(fecha[5:7])
+        documentos = aplicacion._documentos_facturas_mes(anio, mes)
+        assert documentos and all(nombre.startswith('factura_') for nombre, _ in documentos)
+        assert 'src="/static/' not in documentos[0][1] and 'file://' in documentos[0][1]
+        historiales = aplicacion._documentos_historiales(anio)
+        assert historiales and all(nombre.startswith('historial_cliente_') for nombre, _ in historiales)
+        assert 'Historial de compras' in historiales[0][1] and '<nav' not in historiales[0][1]
+    print(f"✅ HTML armado: {len(documentos)} facturas de {anio}-{mes:02d}, {len(historiales)} historiales de {anio}")
+
+
+if __name__ == '__main__':
+    test_trabajos()
+    test_documentos_desde_app()
+    print("\n🎉 Todas las pruebas de trabajos PDF pasaron")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script para probar la sincronización por versiones de /api/productos y /api/clientes
+
+Comprueba que:
+- cada cambio del archivo sube la versión solo de los registros modificados
+- since=<id>-v<n> devuelve cambios y eliminaciones, o todo si la versión es vieja
+- un token de otro registro (estado borrado en un despliegue) o ilegible recibe todo
+- dos registros de versiones (dos workers) comparten la misma numeración
+- las rutas responden fields=, since= y 304 con If-None-Match
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BASE_DIR)
+
+import versiones_datos
+from versiones_datos import RegistroVersiones
+
+
+def guardar(archivo, datos):
+    time.sleep(0.01)  # mtime distinto en sistemas de archivos con poca resolución
+    temporal = archivo + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(datos, f, ensure_ascii=False)
+    os.replace(temporal, archivo)
+
+
+def token(foto, version):
+    return f"{foto['id']}-v{version}"
+
+
+def test_versiones():
+    with tempfile.TemporaryDirectory(prefix='versiones_datos_') as directorio:
+        print("🧪 PROBANDO VERSIONES DE DATOS")
+        print("=" * 60)
+        archivo = os.path.join(directorio, 'inventario.json')
+        estado = os.path.join(directorio, 'versiones')
+        datos = {str(i): {'nombre': f'Producto {i}', 'precio': float(i), 'historial_ajustes': [{'cantidad': i}]}
+                 for i in range(1, 101)}
+        guardar(archivo, datos)
+
+        versiones = RegistroVersiones(archivo, estado)
+        foto = versiones.sincronizar()
+        assert foto['version'] == 1 and len(foto['datos']) == 100
+        assert versiones.sincronizar() is foto
+
+        completo, cambios, eliminados = RegistroVersiones.cambios_desde(foto, token(foto, 0), ['id', 'precio'])
+        assert completo and len(cambios) == 100 and cambios['7'] == {'id': '7', 'precio': 7.0}
+        assert RegistroVersiones.cambios_desde(foto, token(foto, 1)) == (False, {}, [])
+
+        datos['5']['precio'] = 55.0
+        del datos['9']
+        datos['101'] = {'nombre': 'Nuevo', 'precio': 1.0}
+        guardar(archivo, datos)
+        foto = versiones.sincronizar()
+        assert foto['version'] == 2
+        completo, cambios, eliminados = RegistroVersiones.cambios_desde(foto, token(foto, 1), ['precio'])
+        assert not completo and cambios == {'5': {'precio': 55.0}, '101': {'precio': 1.0}} and eliminados == ['9']
+        print("✅ Solo los registros cambiados y eliminados desde la versión del cliente")
+
+        # Otro worker: mismo estado en disco, misma numeración
+        otro = RegistroVersiones(archivo, estado)
+        assert otro.sincronizar()['version'] == 2
+        guardar(archivo, datos)  # reescritura sin cambios: no sube la versión
+        assert versiones.sincronizar()['version'] == 2
+        datos['1']['nombre'] = 'Cambiado por otro worker'
+        guardar(archivo, datos)
+        assert otro.sincronizar()['version'] == 3 and versiones.sincronizar()['version'] == 3
+        foto = versiones.sincronizar()
+        assert RegistroVersiones.cambios_desde(foto, token(foto, 2))[1].keys() == {'1'}
+        print("✅ Numeración compartida entre workers y sin versiones nuevas si nada cambió")
+
+        # Eliminaciones olvidadas: una versión anterior recibe todo
+        limite_original = versiones_datos.MAX_ELIMINADOS
+        versiones_datos.MAX_ELIMINADOS = 2
+        try:
+            for id_registro in ('2', '3', '4'):
+                del datos[id_registro]
+                guardar(archivo, datos)
+                foto = versiones.sincronizar()
+        finally:
+            versiones_datos.MAX_ELIMINADOS = limite_original
+        assert RegistroVersiones.cambios_desde(foto, token(foto, 3))[0]
+        completo, _, eliminados = RegistroVersiones.cambios_desde(foto, token(foto, 4))
+        assert not completo and eliminados == ['3', '4']
+        assert RegistroVersiones.cambios_desde(foto, token(foto, foto['version'] + 10))[0]
+        print("✅ Versiones demasiado viejas o desconocidas reciben el archivo completo")
+
+        # Estado borrado (despliegue nuevo): la numeración vuelve a empezar con otro id
+        anterior = versiones.sincronizar()
+        for nombre in os.listdir(estado):
+            os.remove(os.path.join(estado, nombre))
+        datos['5']['precio'] = 66.0
+        guardar(archivo, datos)
+        foto = RegistroVersiones(archivo, estado).sincronizar()
+        assert foto['id'] != anterior['id'] and foto['version'] == 1
+        for since in (token(anterior, 1), '1', 'v1', 'basura', '', None):
+            completo, cambios, _ = RegistroVersiones.cambios_desde(foto, since)
+            assert completo and cambios['5']['precio'] == 66.0, since
+        print("✅ Token de otro registro de versiones o ilegible recibe el archivo completo")
+
+
+def test_rutas():
+    import app as aplicacion
+
+    cliente = aplicacion.app.test_client()
+    completo = cliente.get('/api/productos')
+    assert completo.status_code == 200 and completo.headers.get('X-Version-Datos')
+    version = completo.headers['X-Version-Datos']
+    assert '-v' in version
+    assert completo.get_json().keys() == aplicacion.cargar_datos(aplicacion.ARCHIVO_INVENTARIO).keys()
+
+    ligero = cliente.get('/api/productos?fields=id,nombre,precio,cantidad')
+    producto = next(iter(ligero.get_json().values()))
+    assert set(producto) <= {'id', 'nombre', 'precio', 'cantidad'}
+    print(f"✅ fields=: {len(completo.data) / 1024:,.1f} KB → {len(ligero.data) / 1024:,.1f} KB")
+
+    repetido = cliente.get('/api/productos?fields=id,nombre,precio,cantidad',
+                           headers={'If-None-Match': ligero.headers['ETag']})
+    assert repetido.status_code == 304 and not repetido.data
+    delta = cliente.get(f'/api/productos?since={version}&fields=nombre').get_json()
+    assert delta == {'version': version, 'completo': False, 'cambios': {}, 'eliminados': []}, delta
+    print(f"✅ 304 con If-None-Match y delta vacío ({len(json.dumps(delta))} bytes) desde la versión {version}")
+
+    viejo = cliente.get('/api/productos?since=1&fields=nombre').get_json()
+    assert viejo['completo'] and viejo['version'] == version and len(viejo['cambios']) == len(completo.get_json())
+    print("✅ since= sin id del registro (cliente anterior) recibe el archivo completo")
+
+    assert cliente.get('/api/clientes?fields=nombre').status_code == 200
+
+
+if __name__ == '__main__':
+    test_versiones()
+    test_rutas()
+    print("\n🎉 Todas las pruebas de versiones de datos pasaron")
@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Trabajos PDF - Generación Masiva en Segundo Plano
+===========================================================
+
+Genera muchos PDF (todas las facturas de un mes, los historiales de los
+clientes...) fuera del request:
+
+- La ruta renderiza el HTML de cada documento (rápido) y crea el trabajo;
+  la conversión a PDF (wkhtmltopdf, lento) corre en un pool de procesos
+  limitado a los núcleos del servidor.
+- El estado de cada trabajo se guarda en trabajos_pdf/<id>/estado.json junto
+  con el HTML de los documentos, así que un trabajo interrumpido por un
+  reinicio del worker se reanuda con los documentos que faltan.
+- El progreso se consulta por polling y el resultado se descarga como un ZIP
+  que se va enviando a medida que se arma.
+
+Configuración por variables de entorno:
+    PDF_TRABAJOS_DIR        Directorio de los trabajos (por defecto trabajos_pdf)
+    PDF_TRABAJOS_PROCESOS   Procesos de conversión (por defecto, y como máximo, los núcleos)
+    PDF_TRABAJOS_DIAS       Días que se conservan los trabajos terminados (por defecto 7)
+
+Uso:
+    python trabajos_pdf.py estado [ID]
+    python trabajos_pdf.py reanudar     # procesa en primer plano los trabajos interrumpidos
+    python trabajos_pdf.py limpiar [--dias N]
+
+Cada worker llama a reanudar() y eliminar_antiguos() al iniciar (app.iniciar_tareas_worker).
+"""
+
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
+import secrets
+import shutil
+import sys
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Tuple, Callable
+from carga_perezosa import InstanciaPerezosa
+from bloqueo_procesos import BloqueoArchivo
+
+logger = logging.getLogger(__name__)
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_EN_PROCESO = 'en_proceso'
+ESTADO_COMPLETADO = 'completado'
+ESTADO_CON_ERRORES = 'completado_con_errores'
+
+DOCUMENTO_GENERADO = 'generado'
+
+
+def generar_documento(ruta_html: str, ruta_pdf: str, perfil: str) -> int:
+    """
+    Convierte un documento del trabajo (se ejecuta en un proceso del pool)
+
+    Returns:
+        Tamaño del PDF en bytes
+    """
+    from servicio_pdf import servicio_pdf
+
+    with open(ruta_html, 'r', encoding='utf-8') as f:
+        html = f.read()
+    pdf = servicio_pdf.renderizar(html, perfil)
+    temporal = f'{ruta_pdf}.tmp'
+    with open(temporal, 'wb') as f:
+        f.write(pdf)
+    os.replace(temporal, ruta_pdf)
+    return len(pdf)
+
+
+class _SalidaZip(io.RawIOBase):
+    """Flujo de solo escritura que acumula lo que escribe zipfile hasta que se vacía"""
+
+    def __init__(self):
+        super().__init__()
+        self._partes: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, datos) -> int:
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self) -> bytes:
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+class GestorTrabajosPDF:
+    """Clase para crear, ejecutar y reanudar trabajos de generación masiva de PDF"""
+
+    def __init__(self,
+                 directorio: Optional[str] = None,
+                 max_procesos: Optional[int] = None,
+                 generador: Callable[[str, str, str], int] = generar_documento):
+        """
+        Inicializa el gestor de trabajos
+
+        Args:
+            directorio: Directorio donde se guardan los trabajos
+            max_procesos: Procesos de conversión simultáneos (tope: núcleos del servidor)
+            generador: Función de nivel de módulo que convierte un documento
+                (ruta_html, ruta_pdf, perfil); se ejecuta en los procesos del pool
+        """
+        self.directorio = directorio or os.environ.get('PDF_TRABAJOS_DIR', 'trabajos_pdf')
+        nucleos = os.cpu_count() or 1
+        solicitados = max_procesos or int(os.environ.get('PDF_TRABAJOS_PROCESOS', str(nucleos)))
+        self.max_procesos = max(1, min(solicitados, nucleos))
+        self.dias_retencion = int(os.environ.get('PDF_TRABAJOS_DIAS', '7'))
+        self.generador = generador
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._activos: set = set()
+        self._lock = threading.Lock()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reiniciar_tras_fork)
+
+    def _reiniciar_tras_fork(self):
+        # Ni el pool ni los hilos que ejecutaban trabajos existen en el proceso hijo
+        self._pool = None
+        self._activos = set()
+        self._lock = threading.Lock()
+
+    def _obtener_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: el proceso web tiene hilos, y fork copiaría sus locks tomados
+                self._pool = ProcessPoolExecutor(max_workers=self.max_procesos,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    # --- Almacenamiento ---
+
+    def _ruta(self, id_trabajo: str, *partes: str) -> str:
+        if not re.fullmatch(r'[0-9a-f-]+', id_trabajo or ''):
+            raise ValueError(f'ID de trabajo inválido: {id_trabajo}')
+        return os.path.join(self.directorio, id_trabajo, *partes)
+
+    def _bloqueo(self) -> BloqueoArchivo:
+        return BloqueoArchivo(os.path.join(self.directorio, '.lock'))
+
+    def cargar_estado(self, id_trabajo: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._ruta(id_trabajo, 'estado.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _guardar_estado(self, estado: Dict[str, Any]) -> None:
+        ruta = self._ruta(estado['id'], 'estado.json')
+        temporal = f'{ruta}.{os.getpid()}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(estado, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+
+    @staticmethod
+    def _nombre_archivo(nombre: str) -> str:
+        return re.sub(r'[^\w.-]+', '_', nombre).strip('._') or 'documento'
+
+    # --- Creación y ejecución ---
+
+    def crear_trabajo(self, tipo: str, titulo: str, documentos: Iterable[Tuple[str, str]],
+                      perfil: str, usuario: Optional[str] = None, iniciar: bool = True) -> Dict[str, Any]:
+        """
+        Crea un trabajo con el HTML ya renderizado de cada documento
+
+        Args:
+            tipo: Tipo de trabajo (p. ej. 'facturas_mes', 'historiales_clientes')
+            titulo: Descripción para el usuario y nombre del ZIP
+            documentos: Pares (nombre, html); el nombre se usa para el PDF dentro del ZIP
+            perfil: Perfil de servicio_pdf (PERFILES_PDF)
+            usuario: Usuario que lo solicitó
+            iniciar: Comenzar la conversión en segundo plano
+
+        Returns:
+            Resumen del trabajo (ver obtener_estado)
+        """
+        id_trabajo = f"{datetime.now().strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(4)}"
+        os.makedirs(self._ruta(id_trabajo, 'html'), exist_ok=True)
+        os.makedirs(self._ruta(id_trabajo, 'pdf'), exist_ok=True)
+
+        estado_documentos: Dict[str, Any] = {}
+        for nombre, html in documentos:
+            nombre = self._nombre_archivo(nombre)
+            with open(self._ruta(id_trabajo, 'html', f'{nombre}.html'), 'w', encoding='utf-8') as f:
+                f.write(html)
+            estado_documentos[nombre] = ESTADO_PENDIENTE
+
+        estado = {
+            'id': id_trabajo,
+            'tipo': tipo,
+            'titulo': titulo,
+            'perfil': perfil,
+            'usuario': usuario,
+            'estado': ESTADO_PENDIENTE if estado_documentos else ESTADO_COMPLETADO,
+            'creado_en': datetime.now().isoformat(),
+            'iniciado_en': None,
+            'finalizado_en': None if estado_documentos else datetime.now().isoformat(),
+            'pid': None,
+            'documentos': estado_documentos
+        }
+        self._guardar_estado(estado)
+        if iniciar and estado_documentos:
+            self.iniciar(id_trabajo)
+        return self.obtener_estado(id_trabajo, reanudar=False)
+
+    def iniciar(self, id_trabajo: str) -> bool:
+        """Ejecuta el trabajo en un hilo de este proceso si no lo está ejecutando ya"""
+        with self._lock:
+            if id_trabajo in self._activos:
+                return False
+            self._activos.add(id_trabajo)
+        threading.Thread(target=self._ejecutar_en_hilo, args=(id_trabajo,),
+                         name=f'trabajo-pdf-{id_trabajo}', daemon=True).start()
+        return True
+
+    def _ejecutar_en_hilo(self, id_trabajo: str) -> None:
+        try:
+            self.ejecutar(id_trabajo)
+        except Exception as e:
+            logger.error("Error en el trabajo PDF %s: %s", id_trabajo, e)
+        finally:
+            with self._lock:
+                self._activos.discard(id_trabajo)
+
+    def _tomar(self, id_trabajo: str) -> Optional[Dict[str, Any]]:
+        """Marca el trabajo como de este proceso, salvo que otro proceso vivo lo esté ejecutando"""
+        with self._bloqueo():
+            estado = self.cargar_estado(id_trabajo)
+            if estado is None or estado['estado'] in (ESTADO_COMPLETADO, ESTADO_CON_ERRORES):
+                return None
+            if estado['pid'] not in (None, os.getpid()) and _proceso_vivo(estado['pid']):
+                return None
+            estado['pid'] = os.getpid()
+            estado['estado'] = ESTADO_EN_PROCESO
+            estado['iniciado_en'] = estado['iniciado_en'] or datetime.now().isoformat()
+            self._guardar_estado(estado)
+            return estado
+
+    def ejecutar(self, id_trabajo: str) -> Optional[Dict[str, Any]]:
+        """
+        Convierte los documentos pendientes del trabajo y espera a que terminen
+
+        Returns:
+            Resumen final, o None si el trabajo no existe, ya terminó o lo
+            ejecuta otro proceso
+        """
+        estado = self._tomar(id_trabajo)
+        if estado is None:
+            return None
+
+        pool = self._obtener_pool()
+        futuros = {}
+        for nombre, resultado in estado['documentos'].items():
+            if resultado == DOCUMENTO_GENERADO:
+                continue
+            futuro = pool.submit(self.generador,
+                                 self._ruta(id_trabajo, 'html', f'{nombre}.html'),
+                                 self._ruta(id_trabajo, 'pdf', f'{nombre}.pdf'),
+                                 estado['perfil'])
+            futuros[futuro] = nombre
+
+        for futuro in as_completed(futuros):
+            nombre = futuros[futuro]
+            try:
+                futuro.result()
+                estado['documentos'][nombre] = DOCUMENTO_GENERADO
+            except Exception as e:
+                estado['documentos'][nombre] = {'error': f'{type(e).__name__}: {e}'}
+            # Se persiste cada avance: un reinicio solo repite lo que estaba en curso
+            self._guardar_estado(estado)
+
+        errores = sum(1 for r in estado['documentos'].values() if r != DOCUMENTO_GENERADO)
+        estado['estado'] = ESTADO_CON_ERRORES if errores else ESTADO_COMPLETADO
+        estado['finalizado_en'] = datetime.now().isoformat()
+        self._guardar_estado(estado)
+        return self.obtener_estado(id_trabajo, reanudar=False)
+
+    def _interrumpido(self, estado: Dict[str, Any]) -> bool:
+        """Trabajo sin terminar que ningún proceso está ejecutando"""
+        if estado['estado'] not in (ESTADO_PENDIENTE, ESTADO_EN_PROCESO):
+            return False
+        if estado['pid'] == os.getpid():
+            return estado['id'] not in self._activos
+        return not _proceso_vivo(estado['pid'])
+
+    def reanudar(self) -> List[str]:
+        """Reanuda en segundo plano los trabajos interrumpidos (p. ej. por un reinicio del worker)"""
+        reanudados = []
+        for estado in self._estados():
+            if self._interrumpido(estado) and self.iniciar(estado['id']):
+                reanudados.append(estado['id'])
+        return reanudados
+
+    # --- Consultas ---
+
+    def _estados(self) -> List[Dict[str, Any]]:
+        estados = []
+        try:
+            ids = sorted(os.listdir(self.directorio), reverse=True)
+        except FileNotFoundError:
+            return estados
+        for id_trabajo in ids:
+            if id_trabajo.startswith('.'):
+                continue
+            estado = self.cargar_estado(id_trabajo)
+            if estado is not None:
+                estados.append(estado)
+        return estados
+
+    def _resumen(self, estado: Dict[str, Any]) -> Dict[str, Any]:
+        documentos = estado['documentos']
+        generados = sum(1 for r in documentos.values() if r == DOCUMENTO_GENERADO)
+        errores = {nombre: r['error'] for nombre, r in documentos.items() if isinstance(r, dict)}
+        terminados = generados + len(errores)
+        return {
+            'id': estado['id'],
+            'tipo': estado['tipo'],
+            'titulo': estado['titulo'],
+            'estado': estado['estado'],
+            'usuario': estado.get('usuario'),
+            'total': len(documentos),
+            'generados': generados,
+            'errores': errores,
+            'progreso': round(100.0 * terminados / len(documentos), 1) if documentos else 100.0,
+            'terminado': estado['estado'] in (ESTADO_COMPLETADO, ESTADO_CON_ERRORES),
+            'creado_en': estado['creado_en'],
+            'iniciado_en': estado['iniciado_en'],
+            'finalizado_en': estado['finalizado_en']
+        }
+
+    def obtener_estado(self, id_trabajo: str, reanudar: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Progreso de un trabajo
+
+        Args:
+            id_trabajo: ID del trabajo
+            reanudar: Si el trabajo quedó interrumpido, reanudarlo en este proceso
+
+        Returns:
+            Resumen con total, generados, errores, progreso (%) y fechas, o None
+        """
+        estado = self.cargar_estado(id_trabajo)
+        if estado is None:
+            return None
+        if reanudar and self._interrumpido(estado):
+            self.iniciar(id_trabajo)
+        return self._resumen(estado)
+
+    def listar_trabajos(self, limite: int = 20) -> List[Dict[str, Any]]:
+        """Resumen de los trabajos más recientes"""
+        return [self._resumen(estado) for estado in self._estados()[:limite]]
+
+    def generar_zip(self, id_trabajo: str) -> Iterator[bytes]:
+        """
+        ZIP con los PDF generados, producido por partes para enviarlo en streaming
+
+        Los PDF ya están comprimidos, así que se guardan sin compresión. Si hubo
+        errores se agrega errores.txt con el detalle.
+        """
+        estado = self.cargar_estado(id_trabajo)
+        if estado is None:
+            raise ValueError(f'Trabajo no encontrado: {id_trabajo}')
+
+        salida = _SalidaZip()
+        with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_STORED) as archivo_zip:
+            for nombre, resultado in estado['documentos'].items():
+                if resultado != DOCUMENTO_GENERADO:
+                    continue
+                archivo_zip.write(self._ruta(id_trabajo, 'pdf', f'{nombre}.pdf'), f'{nombre}.pdf')
+                yield salida.vaciar()
+            errores = [f'{nombre}: {r["error"]}' for nombre, r in estado['documentos'].items()
+                       if isinstance(r, dict)]
+            if errores:
+                archivo_zip.writestr('errores.txt', '\n'.join(errores) + '\n')
+        yield salida.vaciar()
+
+    def eliminar_antiguos(self, dias: Optional[int] = None) -> int:
+        """Borra los trabajos terminados hace más de `dias` días (por defecto PDF_TRABAJOS_DIAS)"""
+        dias = self.dias_retencion if dias is None else dias
+        limite = (datetime.now() - timedelta(days=dias)).isoformat()
+        eliminados = 0
+        for estado in self._estados():
+            if estado['finalizado_en'] and estado['finalizado_en'] < limite:
+                shutil.rmtree(self._ruta(estado['id']), ignore_errors=True)
+                eliminados += 1
+        return eliminados
+
+
+def _proceso_vivo(pid: Optional[int]) -> bool:
+    """Indica si un proceso local sigue en ejecución"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+    return True
+
+
+# Instancia global del gestor de trabajos (se construye en el primer uso)
+gestor_trabajos_pdf = InstanciaPerezosa(GestorTrabajosPDF)
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Trabajos de generación masiva de PDF')
+    subparsers = parser.add_subparsers(dest='accion', required=True)
+    estado = subparsers.add_parser('estado', help='Muestra el progreso de los trabajos')
+    estado.add_argument('id', nargs='?')
+    subparsers.add_parser('reanudar', help='Ejecuta en primer plano los trabajos interrumpidos')
+    limpiar = subparsers.add_parser('limpiar', help='Borra los trabajos terminados hace más de N días')
+    limpiar.add_argument('--dias', type=int, default=None)
+    args = parser.parse_args(argv[1:])
+
+    if args.accion == 'estado':
+        if args.id:
+            print(json.dumps(gestor_trabajos_pdf.obtener_estado(args.id, reanudar=False),
+                             indent=2, ensure_ascii=False))
+        else:
+            for trabajo in gestor_trabajos_pdf.listar_trabajos():
+                print(f"{trabajo['id']}  {trabajo['estado']:<24} {trabajo['generados']}/{trabajo['total']}  "
+                      f"{trabajo['titulo']}")
+        return 0
+
+    if args.accion == 'limpiar':
+        eliminados = gestor_trabajos_pdf.eliminar_antiguos(args.dias)
+        print(f"🧹 {eliminados} trabajos PDF antiguos eliminados")
+        return 0
+
+    pendientes = [e['id'] for e in gestor_trabajos_pdf._estados() if gestor_trabajos_pdf._interrumpido(e)]
+    print(f"🔄 Reanudando {len(pendientes)} trabajos PDF con {gestor_trabajos_pdf.max_procesos} procesos...")
+    for id_trabajo in pendientes:
+        resumen = gestor_trabajos_pdf.ejecutar(id_trabajo)
+        if resumen:
+            print(f"  {'✅' if not resumen['errores'] else '⚠️'} {resumen['titulo']}: "
+                  f"{resumen['generados']}/{resumen['total']} generados")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
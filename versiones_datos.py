@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Versiones de Datos - Cambios por Registro para Sincronización
+=======================================================================
+
+Lleva un contador de versión por archivo JSON (inventario, clientes) y la
+versión en que cambió cada registro, para que /api/productos y /api/clientes
+puedan responder solo lo que cambió desde la última vez (since=<token>).
+
+- Los cambios se detectan comparando un hash de cada registro cuando cambia
+  el archivo, así que cubren cualquier escritura (rutas, importaciones CSV,
+  otros workers) sin tocar guardar_datos
+- El estado se guarda en versiones_datos/<archivo>.json, compartido entre
+  workers con BloqueoArchivo
+- Las eliminaciones se recuerdan (hasta MAX_ELIMINADOS); una versión más vieja
+  que la última eliminación olvidada recibe el archivo completo
+- El token de versión es '<id>-v<n>': si el estado se pierde (por ejemplo en
+  un despliegue nuevo) el registro tiene otro id y la numeración vuelve a 1,
+  así que un token de otro id o ilegible también recibe el archivo completo
+
+Configuración por variables de entorno:
+    VERSIONES_DATOS_DIR   Directorio del estado (por defecto versiones_datos)
+
+Uso:
+    versiones = RegistroVersiones('inventario.json')
+    foto = versiones.sincronizar()
+    RegistroVersiones.cambios_desde(foto, since='3f2a9c1b7d0e-v41', campos=['nombre', 'precio'])
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Dict, Any, Optional, List, Tuple
+from bloqueo_procesos import BloqueoArchivo
+
+logger = logging.getLogger(__name__)
+
+VERSIONES_DIR = os.environ.get('VERSIONES_DATOS_DIR', 'versiones_datos')
+
+# Eliminaciones recordadas por archivo (las más viejas se olvidan)
+MAX_ELIMINADOS = 5000
+
+
+def _hash_registro(registro: Any) -> str:
+    contenido = json.dumps(registro, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(contenido.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def proyectar(registro: Dict[str, Any], id_registro: str, campos: Optional[List[str]]) -> Dict[str, Any]:
+    """Solo los campos pedidos de un registro ('id' es la clave del registro)"""
+    if not campos:
+        return registro
+    return {campo: id_registro if campo == 'id' else registro.get(campo) for campo in campos
+            if campo == 'id' or campo in registro}
+
+
+class RegistroVersiones:
+    """Clase para llevar la versión de cada registro de un archivo JSON"""
+
+    def __init__(self, archivo: str, directorio: str = VERSIONES_DIR):
+        """
+        Args:
+            archivo: Archivo JSON de datos (id → registro)
+            directorio: Directorio donde se guarda el estado de versiones
+        """
+        self.archivo = archivo
+        nombre = os.path.splitext(os.path.basename(archivo))[0]
+        self.ruta_estado = os.path.join(directorio, f'{nombre}.json')
+        self.ruta_bloqueo = os.path.join(directorio, f'{nombre}.lock')
+        self._lock = threading.Lock()
+        self._foto: Optional[Dict[str, Any]] = None
+
+    def _firma_archivo(self) -> Optional[List[int]]:
+        try:
+            info = os.stat(self.archivo)
+        except FileNotFoundError:
+            return None
+        return [info.st_mtime_ns, info.st_size]
+
+    def _leer_estado(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.ruta_estado, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _guardar_estado(self, estado: Dict[str, Any]) -> None:
+        temporal = f'{self.ruta_estado}.{os.getpid()}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(estado, f)
+        os.replace(temporal, self.ruta_estado)
+
+    def _leer_datos(self) -> Dict[str, Any]:
+        try:
+            with open(self.archivo, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        return datos if isinstance(datos, dict) else {}
+
+    @staticmethod
+    def _registrar_cambios(estado: Dict[str, Any], datos: Dict[str, Any]) -> int:
+        """Compara los hashes y sube la versión si algo cambió; devuelve cuántos registros cambiaron"""
+        hashes = {id_registro: _hash_registro(registro) for id_registro, registro in datos.items()}
+        anteriores = estado['hashes']
+        cambiados = [i for i, h in hashes.items() if anteriores.get(i) != h]
+        eliminados = [i for i in anteriores if i not in hashes]
+        if not cambiados and not eliminados:
+            return 0
+
+        estado['version'] += 1
+        version = estado['version']
+        for id_registro in cambiados:
+            estado['versiones'][id_registro] = version
+            estado['eliminados'].pop(id_registro, None)
+        for id_registro in eliminados:
+            estado['versiones'].pop(id_registro, None)
+            estado['eliminados'][id_registro] = version
+        if len(estado['eliminados']) > MAX_ELIMINADOS:
+            ordenados = sorted(estado['eliminados'].items(), key=lambda e: e[1])
+            olvidados = ordenados[:len(ordenados) - MAX_ELIMINADOS]
+            estado['eliminados'] = dict(ordenados[len(olvidados):])
+            estado['version_minima'] = max(estado['version_minima'], olvidados[-1][1])
+        estado['hashes'] = hashes
+        return len(cambiados) + len(eliminados)
+
+    def sincronizar(self) -> Dict[str, Any]:
+        """
+        Registra los cambios del archivo (si los hay) y devuelve una foto consistente
+
+        Returns:
+            Dict con id (del registro de versiones), version, version_minima,
+            datos, versiones (id → versión) y eliminados (id → versión). La
+            foto no se modifica después: los cambios crean una nueva.
+        """
+        firma = self._firma_archivo()
+        foto = self._foto
+        if foto is not None and foto['firma'] == firma:
+            return foto
+        with self._lock:
+            firma = self._firma_archivo()
+            if self._foto is not None and self._foto['firma'] == firma:
+                return self._foto
+            os.makedirs(os.path.dirname(self.ruta_estado) or '.', exist_ok=True)
+            with BloqueoArchivo(self.ruta_bloqueo):
+                # guardar_datos reemplaza el archivo completo: si cambió mientras se leía, se relee
+                for _ in range(3):
+                    firma = self._firma_archivo()
+                    datos = self._leer_datos()
+                    if self._firma_archivo() == firma:
+                        break
+                estado = self._leer_estado()
+                if estado is None:
+                    estado = {'id': uuid.uuid4().hex[:12], 'version': 0, 'version_minima': 1,
+                              'hashes': {}, 'versiones': {}, 'eliminados': {}, 'firma': None}
+                # Otro worker pudo haber registrado ya esta misma versión del archivo
+                if estado['firma'] != firma:
+                    cambiados = self._registrar_cambios(estado, datos)
+                    estado['firma'] = firma
+                    self._guardar_estado(estado)
+                    if cambiados:
+                        logger.info("🔄 %s: versión %s (%s registros cambiados)", self.archivo, estado['version'], cambiados)
+            self._foto = {
+                'id': estado['id'], 'version': estado['version'], 'version_minima': estado['version_minima'],
+                'firma': firma, 'datos': datos, 'versiones': estado['versiones'],
+                'eliminados': estado['eliminados'],
+            }
+            return self._foto
+
+    @staticmethod
+    def token(foto: Dict[str, Any]) -> str:
+        """Token de versión que el cliente devuelve en since=: '<id>-v<versión>'"""
+        return f"{foto['id']}-v{foto['version']}"
+
+    @staticmethod
+    def version_de_token(foto: Dict[str, Any], token: Optional[str]) -> Optional[int]:
+        """Versión del token si pertenece a este registro de versiones; None si no"""
+        id_registro, separador, version = (token or '').rpartition('-v')
+        if not separador or id_registro != foto['id'] or not version.isdigit():
+            return None
+        return int(version)
+
+    @staticmethod
+    def etag(foto: Dict[str, Any], *variantes: Any) -> str:
+        """ETag de una respuesta: versión de los datos + parámetros que cambian el contenido"""
+        partes = json.dumps(variantes, sort_keys=True, default=str)
+        sufijo = hashlib.blake2b(partes.encode('utf-8'), digest_size=6).hexdigest()
+        return f"{RegistroVersiones.token(foto)}-{sufijo}"
+
+    @staticmethod
+    def cambios_desde(foto: Dict[str, Any], since: Optional[str],
+                      campos: Optional[List[str]] = None) -> Tuple[bool, Dict[str, Any], List[str]]:
+        """
+        Registros cambiados y eliminados después de una versión
+
+        Args:
+            foto: Resultado de sincronizar()
+            since: Token de la última versión que tiene el cliente ('<id>-v<n>')
+            campos: Campos a devolver de cada registro (None para todos)
+
+        Returns:
+            (completo, cambios, eliminados); completo=True si el token es de
+            otro registro, ilegible, demasiado viejo o desconocido y se
+            devuelven todos los registros
+        """
+        datos = foto['datos']
+        version = RegistroVersiones.version_de_token(foto, since)
+        if version is None or version < foto['version_minima'] or version > foto['version']:
+            return True, {i: proyectar(r, i, campos) for i, r in datos.items()}, []
+        versiones = foto['versiones']
+        cambios = {i: proyectar(datos[i], i, campos) for i, v in versiones.items() if v > version and i in datos}
+        eliminados = [i for i, v in foto['eliminados'].items() if v > version]
+        return False, cambios, eliminados